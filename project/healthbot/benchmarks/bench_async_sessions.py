@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+HealthBot Async Sessions Benchmark
+Runs many patient sessions concurrently on one event loop with the async
+workflow and fake LLM/search latency, and reports how far their I/O waits
+overlap
+
+Usage:
+    python benchmarks/bench_async_sessions.py --sessions 200 --latency 0.2
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Every session must do real (fake) I/O: no cached searches or summaries
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+
+import utils
+from fakes import install_fakes
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+
+async def run_session(app, session_id, topic):
+    """Run one scripted session: topic -> ready -> answer -> exit"""
+    session = HealthBotSession(app, thread_id=f"bench_async_{session_id}")
+    turn = await session.astart()
+    for answer in [topic, "ready", "D", "3"]:
+        turn = await session.arespond(answer)
+    return turn["state"]
+
+
+async def main(sessions, latency):
+    install_fakes(llm_latency=latency, search_latency=latency)
+    utils.print = lambda *args, **kwargs: None  # Silence node status lines
+
+    app = create_healthbot_workflow(async_mode=True)
+    topics = ["diabetes", "hypertension", "asthma", "migraine"]
+
+    # One session alone gives the per-session I/O time
+    start = time.perf_counter()
+    await run_session(app, "solo", "diabetes")
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        run_session(app, i, topics[i % len(topics)]) for i in range(sessions)
+    ))
+    concurrent = time.perf_counter() - start
+
+    sequential_estimate = single * sessions
+    overlap = sequential_estimate / concurrent
+
+    print(f"Sessions:                 {sessions}")
+    print(f"Fake latency per call:    {latency:.3f}s")
+    print(f"Single session:           {single:.3f}s")
+    print(f"Concurrent wall time:     {concurrent:.3f}s")
+    print(f"Sequential estimate:      {sequential_estimate:.3f}s")
+    print(f"Overlap factor:           {overlap:.1f}x")
+    print(f"Completed sessions:       {sum(1 for r in results if r.get('grade') is not None)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sessions, args.latency))
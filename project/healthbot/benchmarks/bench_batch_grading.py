@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+HealthBot Batch Grading Benchmark
+Grades a cohort of answers one by one and through the batch API with fake
+LLM latency (a few answers fail), and reports the speedup
+
+Usage:
+    python benchmarks/bench_batch_grading.py --answers 200 --latency 0.1
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fakes import FakeHealthChatModel
+from batch_grading import grade_answers, agrade_answers, summarize_grades
+
+SUMMARY = "Asthma narrows the airways. Inhalers relieve symptoms (Source: example.org)."
+
+
+class FlakyFakeModel(FakeHealthChatModel):
+    """Fake model that fails on answers containing 'FAIL'"""
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if "FAIL" in messages[-1].content:
+            raise RuntimeError("simulated provider error")
+        return super()._generate(messages, stop, run_manager, **kwargs)
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if "FAIL" in messages[-1].content:
+            raise RuntimeError("simulated provider error")
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def make_records(count):
+    records = []
+    for i in range(count):
+        answer = "FAIL" if i % 50 == 7 else f"Answer {i}: inhalers open the airways"
+        records.append({
+            "topic": "asthma",
+            "summary": SUMMARY,
+            "question": "How do inhalers help with asthma?",
+            "answer": answer,
+        })
+    records.append({"topic": "asthma", "summary": SUMMARY, "question": "Q", "answer": ""})
+    return records
+
+
+def main(answers, latency, concurrency):
+    llm = FlakyFakeModel(latency=latency)
+    records = make_records(answers)
+    
+    start = time.perf_counter()
+    for record in records[:20]:
+        grade_answers([record], llm=llm)
+    sequential = (time.perf_counter() - start) / 20 * len(records)
+    
+    start = time.perf_counter()
+    results = grade_answers(records, max_concurrency=concurrency, llm=llm)
+    batch = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    asyncio.run(agrade_answers(records, max_concurrency=concurrency, llm=llm))
+    abatch = time.perf_counter() - start
+    
+    print(f"Answers: {len(records)}  Latency: {latency:.2f}s  Max concurrency: {concurrency}")
+    print(f"Sequential (estimated): {sequential:.2f}s")
+    print(f"batch():                {batch:.2f}s ({sequential / batch:.1f}x)")
+    print(f"abatch():               {abatch:.2f}s ({sequential / abatch:.1f}x)")
+    print(f"Cohort summary:         {summarize_grades(results)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    
+    main(args.answers, args.latency, args.concurrency)
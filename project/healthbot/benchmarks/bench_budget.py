@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+HealthBot Token Budget Benchmark
+Runs scripted sessions (fake LLM and search, no API keys) without a budget
+and then with a per-session token budget, and reports tokens, LLM calls and
+cost per session, and how far budgeted sessions overshoot their budget.
+
+Usage:
+    python benchmarks/bench_budget.py --sessions 10 --topics 3 --quizzes 2 --budget-ratio 0.5
+"""
+
+import os
+import sys
+import argparse
+import statistics
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Count every call: no cached searches or summaries
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+
+import utils
+import nodes
+from langgraph.checkpoint.memory import MemorySaver
+from fakes import install_fakes
+from budget import BudgetPolicy, set_budget_policy, get_daily_ledger
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+# Illustrative prices per 1000 tokens (prompt, completion)
+PRICES = (0.5, 1.5)
+
+# Largest single LLM call accounted so far (how far one call can overshoot)
+largest_call = 0
+
+
+def track_calls(usage_update):
+    """Wrap a nodes usage update function to record the largest call it accounts"""
+    def wrapper(topic, prompt_tokens, completion_tokens):
+        global largest_call
+        largest_call = max(largest_call, prompt_tokens + completion_tokens)
+        return usage_update(topic, prompt_tokens, completion_tokens)
+    return wrapper
+
+
+def script(topics, quizzes):
+    """Patient replies for one session: topics x quizzes, then exit"""
+    replies = []
+    for t in range(topics):
+        replies += [f"topic {t}", "ready"]
+        for q in range(quizzes):
+            replies.append("B")
+            if q < quizzes - 1:
+                replies += ["1"]
+        replies.append("2" if t < topics - 1 else "3")
+    return replies
+
+
+def run_sessions(app, sessions, replies, label):
+    """Run sessions to the end; returns (usage reports, failed count)"""
+    reports, failed = [], 0
+    for i in range(sessions):
+        session = HealthBotSession(app, f"bench_budget_{label}_{i}")
+        try:
+            session.start()
+            for reply in replies:
+                session.respond(reply)
+        except Exception:
+            failed += 1
+        reports.append(session.usage())
+    return reports, failed
+
+
+def describe(label, reports, failed):
+    tokens = [r["prompt_tokens"] + r["completion_tokens"] for r in reports]
+    print(
+        f"{label:<12} tokens/session {statistics.mean(tokens):>7.0f} (max {max(tokens)})  "
+        f"calls/session {statistics.mean(r['calls'] for r in reports):>5.1f}  "
+        f"cost/session ${statistics.mean(r['cost'] for r in reports):.4f}  failed {failed}"
+    )
+    return tokens
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--topics", type=int, default=3)
+    parser.add_argument("--quizzes", type=int, default=2)
+    parser.add_argument("--budget-ratio", type=float, default=0.5,
+                        help="Session budget as a fraction of unbudgeted usage")
+    args = parser.parse_args()
+    
+    install_fakes()
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    nodes.usage_update = track_calls(nodes.usage_update)
+    nodes.session_usage_update = track_calls(nodes.session_usage_update)  # Speculated quiz banks
+    app = create_healthbot_workflow(checkpointer=MemorySaver())
+    replies = script(args.topics, args.quizzes)
+    
+    prompt_price, completion_price = PRICES
+    set_budget_policy(BudgetPolicy(prompt_cost_per_1k=prompt_price, completion_cost_per_1k=completion_price))
+    reports, failed = run_sessions(app, args.sessions, replies, "free")
+    free_tokens = describe("no budget", reports, failed)
+    
+    budget = int(statistics.mean(free_tokens) * args.budget_ratio)
+    set_budget_policy(BudgetPolicy(
+        session_tokens=budget, prompt_cost_per_1k=prompt_price, completion_cost_per_1k=completion_price
+    ))
+    get_daily_ledger().reset()
+    reports, failed = run_sessions(app, args.sessions, replies, "budget")
+    budget_tokens = describe(f"budget {budget}", reports, failed)
+    modes = [r["mode"] for r in reports]
+    print(f"\nFinal modes: {', '.join(f'{m}={modes.count(m)}' for m in sorted(set(modes)))}")
+    print(f"Largest overshoot: {max(budget_tokens) - budget} tokens (largest call {largest_call})")
+    print(f"Tokens saved: {1 - statistics.mean(budget_tokens) / statistics.mean(free_tokens):.0%}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+HealthBot Cassette Benchmark
+Records sessions over a few repeated health topics (fake LLM and search with
+production-like latency, no caches) to a cassette, then replays them with
+no network: with the recorded latency (wall time should match the
+recording), with zero latency (the graph's own overhead), and with zero
+latency under each caching strategy, reporting the LLM calls and searches
+each one still makes.
+
+Usage:
+    python benchmarks/bench_cassette.py --sessions 12 --llm-latency 0.2 --search-latency 0.1
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Record full traffic: no caches, no background calls, private cache dir
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_TOPIC_INDEX"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+os.environ["HEALTHBOT_CACHE_DIR"] = tempfile.mkdtemp()
+
+import utils
+from cache import get_summary_store
+from cassette import LLM, SEARCH, RECORD, REPLAY, ORIGINAL, ZERO, install_cassette
+from fakes import install_fakes
+from tools import get_search_cache
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+TOPICS = ["asthma", "diabetes", "gout", "asthma", "migraine", "diabetes"]
+
+# Caching strategy -> (search cache, summary cache)
+STRATEGIES = {
+    "no caches": ("off", "off"),
+    "search cache": ("on", "off"),
+    "summary cache": ("off", "on"),
+    "both caches": ("on", "on"),
+}
+
+
+def run_sessions(sessions):
+    """Run the sessions (one topic and quiz each); returns (seconds, summaries)"""
+    app = create_healthbot_workflow()
+    summaries = []
+    start = time.perf_counter()
+    for i in range(sessions):
+        session = HealthBotSession(app, f"bench-{i}")
+        session.start()
+        for reply in (TOPICS[i % len(TOPICS)], "ready", "B"):
+            turn = session.respond(reply)
+        summaries.append(turn["state"].get("summary"))
+    return time.perf_counter() - start, summaries
+
+
+def use_caches(search, summary):
+    os.environ["HEALTHBOT_SEARCH_CACHE"] = search
+    os.environ["HEALTHBOT_SUMMARY_CACHE"] = summary
+    for store in (get_search_cache(), get_summary_store()):
+        if store is not None:
+            store.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=12)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per recorded LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.1, help="Seconds per recorded search")
+    args = parser.parse_args()
+    
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    path = os.path.join(tempfile.mkdtemp(), "bench.cassette.gz")
+    
+    install_fakes(llm_latency=args.llm_latency, search_latency=args.search_latency)
+    cassette = install_cassette(RECORD, path)
+    recorded_seconds, recorded = run_sessions(args.sessions)
+    cassette.close()
+    size = os.path.getsize(path)
+    print(f"Sessions: {args.sessions}  Topics: {len(set(TOPICS))}  LLM: {args.llm_latency * 1000:.0f}ms  "
+          f"Search: {args.search_latency * 1000:.0f}ms")
+    print(f"Recorded {cassette.stats[LLM]} LLM calls and {cassette.stats[SEARCH]} searches in "
+          f"{recorded_seconds:.2f}s: {size} bytes ({size / cassette.stats['recorded']:.0f} bytes per call)\n")
+    
+    print(f"{'replay':<28} {'seconds':>8} {'llm calls':>10} {'searches':>9} {'misses':>7} {'same':>5}")
+    print(f"{'(recording)':<28} {recorded_seconds:>8.2f} {cassette.stats[LLM]:>10} {cassette.stats[SEARCH]:>9}")
+    
+    runs = [(f"{latency} latency", latency, STRATEGIES["no caches"]) for latency in (ORIGINAL, ZERO)]
+    runs += [(f"zero latency, {name}", ZERO, caches) for name, caches in STRATEGIES.items() if name != "no caches"]
+    results = {}
+    for label, latency, caches in runs:
+        use_caches(*caches)
+        replay = install_cassette(REPLAY, path, latency)
+        seconds, summaries = run_sessions(args.sessions)
+        same = summaries == recorded
+        results[label] = seconds
+        print(f"{label:<28} {seconds:>8.2f} {replay.stats[LLM]:>10} {replay.stats[SEARCH]:>9} "
+              f"{replay.stats['misses']:>7} {'yes' if same else 'no':>5}")
+    
+    original, zero = results[f"{ORIGINAL} latency"], results[f"{ZERO} latency"]
+    print(f"\nOriginal-latency replay: {original / recorded_seconds:.0%} of the recorded wall time")
+    print(f"Graph overhead: {zero / args.sessions * 1000:.1f}ms per session "
+          f"({zero / recorded_seconds:.1%} of the recorded wall time)")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+HealthBot Checkpoint Serializer Benchmark
+Runs scripted sessions (fake LLM and search, full-length search results),
+captures everything checkpointing serializes, then encodes and decodes it
+with the default JsonPlusSerializer and the CompactSerializer (with and
+without compression). Reports bytes per checkpoint, metadata and write
+blob, and encode/decode time.
+
+Usage:
+    python benchmarks/bench_checkpoint_serde.py --sessions 3 --topics 3 --quizzes 3 --doc-chars 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+
+import utils
+from fakes import install_fakes
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from checkpointer import InstrumentedSerializer
+from checkpoint_serde import CompactSerializer
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+KINDS = ("checkpoint", "metadata", "write")
+
+
+class CapturingSerializer(InstrumentedSerializer):
+    """Keeps every object serialized, with its kind"""
+    
+    def __init__(self):
+        super().__init__(keep_records=False)
+        self.captured = []
+    
+    def dumps_typed(self, obj):
+        self.captured.append((self._kind(obj), obj))
+        return super().dumps_typed(obj)
+
+
+def capture(sessions, topics, quizzes):
+    """Run the sessions; returns [(kind, obj)] of every serialized object"""
+    serde = CapturingSerializer()
+    app = create_healthbot_workflow(checkpointer=MemorySaver(serde=serde))
+    for i in range(sessions):
+        session = HealthBotSession(app, f"bench_serde_{i}")
+        session.start()
+        for t in range(topics):
+            session.respond(f"topic {t}")
+            session.respond("ready")
+            for q in range(quizzes):
+                session.respond("B")
+                if q < quizzes - 1:
+                    session.respond("1")
+            session.respond("2" if t < topics - 1 else "3")
+    return serde.captured
+
+
+def measure(serde, captured, repeat):
+    """Encode and decode every object; returns kind -> [calls, bytes, encode s, decode s]"""
+    totals = {kind: [0, 0, 0.0, 0.0] for kind in KINDS}
+    for kind, obj in captured:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            blob = serde.dumps_typed(obj)
+        encoded = time.perf_counter()
+        for _ in range(repeat):
+            serde.loads_typed(blob)
+        done = time.perf_counter()
+        total = totals[kind]
+        total[0] += 1
+        total[1] += len(blob[1])
+        total[2] += (encoded - start) / repeat
+        total[3] += (done - encoded) / repeat
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--topics", type=int, default=3)
+    parser.add_argument("--quizzes", type=int, default=3)
+    parser.add_argument("--results", type=int, default=10, help="Search results per topic")
+    parser.add_argument("--doc-chars", type=int, default=2000, help="Characters kept per search result")
+    parser.add_argument("--repeat", type=int, default=5, help="Encodes/decodes per object (timing)")
+    args = parser.parse_args()
+    
+    os.environ["HEALTHBOT_SEARCH_RESULTS"] = str(args.results)
+    os.environ["HEALTHBOT_SEARCH_DOC_CHARS"] = str(args.doc_chars)
+    install_fakes()
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    
+    captured = capture(args.sessions, args.topics, args.quizzes)
+    serializers = [
+        ("default (JsonPlus)", JsonPlusSerializer()),
+        ("compact", CompactSerializer()),
+        ("compact, no zlib", CompactSerializer(compress=False)),
+    ]
+    
+    print(f"Sessions: {args.sessions}  Topics: {args.topics}  Quizzes/topic: {args.quizzes}  "
+          f"Results: {args.results} x {args.doc_chars} chars  Objects: {len(captured)}\n")
+    print(f"{'serializer':<20} {'kind':<11} {'calls':>6} {'avg bytes':>10} {'enc us':>8} {'dec us':>8}")
+    
+    results = {}
+    for label, serde in serializers:
+        totals = measure(serde, captured, args.repeat)
+        results[label] = totals
+        for kind in KINDS:
+            calls, size, encode, decode = totals[kind]
+            if calls:
+                print(f"{label:<20} {kind:<11} {calls:>6} {size / calls:>10.0f} "
+                      f"{encode / calls * 1e6:>8.0f} {decode / calls * 1e6:>8.0f}")
+    
+    default = results["default (JsonPlus)"]["checkpoint"]
+    compact = results["compact"]["checkpoint"]
+    size_ratio = default[1] / compact[1]
+    encode_ratio = compact[2] / default[2]
+    decode_ratio = compact[3] / default[3]
+    print(f"\nBytes per checkpoint: {default[1] / default[0]:.0f} -> {compact[1] / compact[0]:.0f} "
+          f"({size_ratio:.1f}x smaller)")
+    print(f"Encode time: {encode_ratio:.2f}x, decode time: {decode_ratio:.2f}x the default serializer")
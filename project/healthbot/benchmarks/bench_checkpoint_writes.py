@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+HealthBot Checkpoint Write Benchmark
+Runs scripted sessions with an instrumented serializer and reports how many
+bytes checkpointing serializes per super-step, and how long it takes
+
+Usage:
+    python benchmarks/bench_checkpoint_writes.py --sessions 5 --topics 3 --quizzes 3
+
+"checkpoint" rows are the full per-step snapshots, "write" rows are what the
+nodes returned (pending writes); the latter is what delta-returning nodes
+shrink.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+
+import utils
+from fakes import install_fakes
+from langgraph.checkpoint.memory import MemorySaver
+from checkpointer import InstrumentedSerializer
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+
+def run_session(app, session_id, topics, quizzes):
+    """topics x (summary, quizzes questions), then exit"""
+    session = HealthBotSession(app, session_id)
+    session.start()
+    for t in range(topics):
+        session.respond(f"topic {t}")
+        session.respond("ready")
+        for q in range(quizzes):
+            session.respond("B")
+            if q < quizzes - 1:
+                session.respond("1")
+        session.respond("2" if t < topics - 1 else "3")
+
+
+def main(sessions, topics, quizzes):
+    install_fakes()
+    utils.print = lambda *args, **kwargs: None  # Silence node status lines
+    
+    serde = InstrumentedSerializer()
+    app = create_healthbot_workflow(checkpointer=MemorySaver(serde=serde))
+    
+    start = time.perf_counter()
+    for i in range(sessions):
+        run_session(app, f"bench_writes_{i}", topics, quizzes)
+    elapsed = time.perf_counter() - start
+    
+    stats = serde.stats()
+    steps = stats.get("checkpoint", {}).get("calls", 0)
+    print(f"Sessions: {sessions}  Topics: {topics}  Quizzes/topic: {quizzes}  ({elapsed:.2f}s)")
+    print(f"Super-steps checkpointed: {steps}\n")
+    print(f"{'kind':<11} {'calls':>7} {'total KB':>10} {'avg bytes':>10} {'ser. ms':>9}")
+    for kind in ("checkpoint", "metadata", "write", "total"):
+        if kind in stats:
+            s = stats[kind]
+            avg = s["bytes"] / s["calls"] if s["calls"] else 0
+            print(f"{kind:<11} {s['calls']:>7} {s['bytes'] / 1024:>10.1f} {avg:>10.0f} {s['seconds'] * 1000:>9.1f}")
+    
+    if steps:
+        print(f"\nBytes serialized per step:  {stats['total']['bytes'] / steps:.0f}")
+        print(f"Write bytes per step:       {stats.get('write', {}).get('bytes', 0) / steps:.0f}")
+        print(f"Serialization ms per step:  {stats['total']['seconds'] * 1000 / steps:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--topics", type=int, default=3)
+    parser.add_argument("--quizzes", type=int, default=3)
+    args = parser.parse_args()
+    
+    main(args.sessions, args.topics, args.quizzes)
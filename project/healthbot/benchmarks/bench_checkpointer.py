@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+HealthBot Checkpointer Benchmark
+Compares memory use of MemorySaver and the pruned SQLite checkpointer as the
+number of sessions and quiz turns per session grow
+
+Usage:
+    python benchmarks/bench_checkpointer.py --sessions 10 20 40 --turns 2 8
+
+"held KB" is the serialized checkpoint data the saver keeps in process
+memory; "disk KB" is the SQLite file size. RSS is the process's resident size
+after each run (it only grows, so compare runs in the same order).
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+
+import utils
+from fakes import install_fakes
+from langgraph.checkpoint.memory import MemorySaver
+from checkpointer import SQLiteCheckpointSaver
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+
+def run_sessions(app, sessions, turns):
+    """Each session: one topic, then `turns` quiz rounds, then exit"""
+    for i in range(sessions):
+        session = HealthBotSession(app, f"bench_ckpt_{i}")
+        session.start()
+        session.respond(f"topic {i}")
+        session.respond("ready")
+        for turn in range(turns):
+            session.respond("D")
+            session.respond("1" if turn < turns - 1 else "3")
+            if turn < turns - 1:
+                session.respond("B")
+                session.respond("1")
+
+
+def rss_kb():
+    """Resident set size of this process (Linux), or 0 if unavailable"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def memory_saver_bytes(saver):
+    """Serialized bytes a MemorySaver holds for checkpoints and writes"""
+    held = 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for (_, checkpoint), (_, metadata), _parent in checkpoints.values():
+                held += len(checkpoint) + len(metadata)
+    for writes in saver.writes.values():
+        held += sum(len(value) for _, _, (_, value) in writes.values())
+    return held
+
+
+def measure(make_saver, sessions, turns):
+    saver = make_saver()
+    app = create_healthbot_workflow(checkpointer=saver)
+    start = time.perf_counter()
+    run_sessions(app, sessions, turns)
+    elapsed = time.perf_counter() - start
+    
+    if isinstance(saver, MemorySaver):
+        checkpoints = sum(len(ns) for t in saver.storage.values() for ns in t.values())
+        held, disk = memory_saver_bytes(saver), 0
+    else:
+        stats = saver.stats()
+        checkpoints, held, disk = stats["checkpoints"], 0, stats["db_bytes"]
+        saver.close()
+    return {
+        "checkpoints": checkpoints,
+        "held_kb": held / 1024,
+        "disk_kb": disk / 1024,
+        "rss_kb": rss_kb(),
+        "seconds": elapsed,
+    }
+
+
+def main(session_counts, turn_counts, keep_last):
+    install_fakes()
+    utils.print = lambda *args, **kwargs: None  # Silence node status lines
+    tmpdir = tempfile.mkdtemp(prefix="healthbot_ckpt_")
+    
+    print(f"{'saver':<8} {'sessions':>8} {'turns':>5} {'checkpoints':>11} {'held KB':>9} {'disk KB':>8} {'RSS KB':>8} {'time':>7}")
+    for turns in turn_counts:
+        for sessions in session_counts:
+            path = os.path.join(tmpdir, f"ckpt_{sessions}_{turns}.sqlite")
+            savers = {
+                "memory": MemorySaver,
+                "sqlite": lambda: SQLiteCheckpointSaver(path, keep_last=keep_last, compaction_interval=0),
+            }
+            for name, make_saver in savers.items():
+                r = measure(make_saver, sessions, turns)
+                print(
+                    f"{name:<8} {sessions:>8} {turns:>5} {r['checkpoints']:>11} "
+                    f"{r['held_kb']:>9.0f} {r['disk_kb']:>8.0f} {r['rss_kb']:>8} {r['seconds']:>6.2f}s"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 20, 40])
+    parser.add_argument("--turns", type=int, nargs="+", default=[2, 8])
+    parser.add_argument("--keep-last", type=int, default=5)
+    args = parser.parse_args()
+    
+    main(args.sessions, args.turns, args.keep_last)
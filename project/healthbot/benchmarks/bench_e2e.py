@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+"""
+HealthBot End-to-End Benchmark
+Runs scripted patient sessions through create_healthbot_workflow with the
+fake chat model and fake search (no API keys, no keyboard) and reports
+per-node latency percentiles, sessions/second, checkpoint growth and peak RSS
+
+Usage:
+    python benchmarks/bench_e2e.py --sessions 20 --topics 3 --quizzes 2
+    python benchmarks/bench_e2e.py --mode async --concurrency 50 --llm-latency 0.05
+    python benchmarks/bench_e2e.py --save-baseline baseline.json
+    python benchmarks/bench_e2e.py --compare baseline.json --tolerance 0.2
+
+With --compare, exits with status 1 if sessions/second dropped, or node p95
+latency (beyond --min-ms), bytes per checkpoint or peak RSS rose, by more
+than the tolerance.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Measure the graph, not the caches
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+
+import utils
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.memory import MemorySaver
+from fakes import install_fakes
+from checkpointer import InstrumentedSerializer
+from workflow import create_healthbot_workflow, NODES
+from session import HealthBotSession
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Record wall time of every node run (interrupted runs counted apart)"""
+    
+    run_inline = True
+    
+    def __init__(self):
+        self.durations = {name: [] for name in NODES}
+        self.interrupts = {name: 0 for name in NODES}
+        self._starts = {}
+    
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, name=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node in self.durations and name == node:
+            self._starts[run_id] = (node, time.perf_counter())
+    
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self._starts.pop(run_id, None)
+        if started:
+            node, start = started
+            self.durations[node].append(time.perf_counter() - start)
+    
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        started = self._starts.pop(run_id, None)
+        if started:
+            self.interrupts[started[0]] += 1
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if platform.system() == "Darwin" else peak
+
+
+def script(topics, quizzes):
+    """Patient replies for one session: topics x quizzes, then exit"""
+    replies = []
+    for t in range(topics):
+        replies += [f"topic {t}", "ready"]
+        for q in range(quizzes):
+            replies.append("B")
+            if q < quizzes - 1:
+                replies += ["1"]
+        replies.append("2" if t < topics - 1 else "3")
+    return replies
+
+
+def with_callbacks(session, timer):
+    session.config = {**session.config, "callbacks": [timer]}
+    return session
+
+
+def run_sync(app, timer, sessions, replies):
+    for i in range(sessions):
+        session = with_callbacks(HealthBotSession(app, f"bench_e2e_{i}"), timer)
+        session.start()
+        for reply in replies:
+            session.respond(reply)
+
+
+async def run_async(app, timer, sessions, replies, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    
+    async def one(i):
+        async with limit:
+            session = with_callbacks(HealthBotSession(app, f"bench_e2e_async_{i}"), timer)
+            await session.astart()
+            for reply in replies:
+                await session.arespond(reply)
+    
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+
+
+def run_benchmark(args):
+    install_fakes(llm_latency=args.llm_latency, search_latency=args.search_latency)
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    
+    serde = InstrumentedSerializer()
+    app = create_healthbot_workflow(
+        async_mode=args.mode == "async", checkpointer=MemorySaver(serde=serde)
+    )
+    timer = NodeTimer()
+    replies = script(args.topics, args.quizzes)
+    
+    start = time.perf_counter()
+    if args.mode == "async":
+        asyncio.run(run_async(app, timer, args.sessions, replies, args.concurrency))
+    else:
+        run_sync(app, timer, args.sessions, replies)
+    elapsed = time.perf_counter() - start
+    
+    checkpoints = [r["bytes"] for r in serde.records if r["kind"] == "checkpoint"]
+    steps = len(checkpoints)
+    stats = serde.stats()
+    
+    return {
+        "config": {
+            "mode": args.mode,
+            "sessions": args.sessions,
+            "topics": args.topics,
+            "quizzes": args.quizzes,
+            "llm_latency": args.llm_latency,
+            "search_latency": args.search_latency,
+            "concurrency": args.concurrency,
+        },
+        "elapsed_seconds": elapsed,
+        "sessions_per_second": args.sessions / elapsed,
+        "nodes": {
+            node: {
+                "runs": len(values),
+                "interrupts": timer.interrupts[node],
+                "p50_ms": _ms(percentile(values, 50)),
+                "p95_ms": _ms(percentile(values, 95)),
+                "p99_ms": _ms(percentile(values, 99)),
+            }
+            for node, values in timer.durations.items()
+        },
+        "checkpoints": {
+            "steps": steps,
+            "bytes_per_checkpoint": sum(checkpoints) / steps if steps else 0,
+            "first_bytes": checkpoints[0] if checkpoints else 0,
+            "max_bytes": max(checkpoints) if checkpoints else 0,
+            "serialized_bytes_total": stats["total"]["bytes"],
+            "serialization_ms_per_step": stats["total"]["seconds"] * 1000 / steps if steps else 0,
+        },
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+def report(result):
+    config = result["config"]
+    print(
+        f"Mode: {config['mode']}  Sessions: {config['sessions']}  Topics: {config['topics']}  "
+        f"Quizzes/topic: {config['quizzes']}  LLM latency: {config['llm_latency']}s"
+    )
+    print(f"Wall time: {result['elapsed_seconds']:.2f}s  Sessions/second: {result['sessions_per_second']:.2f}\n")
+    
+    print(f"{'node':<22} {'runs':>6} {'paused':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for node, n in result["nodes"].items():
+        cells = [f"{n[k]:>8.2f}" if n[k] is not None else f"{'-':>8}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{node:<22} {n['runs']:>6} {n['interrupts']:>6} {' '.join(cells)}")
+    
+    c = result["checkpoints"]
+    print(f"\nCheckpoints: {c['steps']} steps, {c['bytes_per_checkpoint']:.0f} B avg "
+          f"(first {c['first_bytes']} B, max {c['max_bytes']} B), "
+          f"{c['serialization_ms_per_step']:.3f} ms serialization/step")
+    print(f"Peak RSS: {result['peak_rss_kb'] / 1024:.1f} MB")
+
+
+def compare(result, baseline, tolerance, min_ms=1.0):
+    """
+    List regressions against a baseline result
+    
+    Node latency changes smaller than min_ms are ignored: sub-millisecond
+    node times are dominated by timer and scheduler noise.
+    
+    Returns:
+        List of human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    
+    def check(label, current, previous, higher_is_better=False, floor=0.0):
+        if not current or not previous or abs(current - previous) < floor:
+            return
+        change = (current - previous) / previous
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{label}: {previous:.2f} -> {current:.2f} ({change:+.0%})")
+    
+    if result["config"] != baseline["config"]:
+        print("Warning: baseline was recorded with a different configuration")
+    
+    check("sessions/second", result["sessions_per_second"], baseline["sessions_per_second"], True)
+    for node, n in result["nodes"].items():
+        previous = baseline["nodes"].get(node, {})
+        check(f"{node} p95 ms", n["p95_ms"], previous.get("p95_ms"), floor=min_ms)
+    check(
+        "bytes/checkpoint",
+        result["checkpoints"]["bytes_per_checkpoint"],
+        baseline["checkpoints"]["bytes_per_checkpoint"],
+    )
+    check("peak RSS KB", result["peak_rss_kb"], baseline["peak_rss_kb"])
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--topics", type=int, default=3)
+    parser.add_argument("--quizzes", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=20, help="Async sessions in flight")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Ignore node p95 changes below this")
+    args = parser.parse_args()
+    
+    result = run_benchmark(args)
+    report(result)
+    
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance, args.min_ms)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+HealthBot Message History Benchmark
+Runs one long session over many topics and records the serialized checkpoint
+size and process RSS per topic, with unbounded and bounded message history
+
+Usage:
+    python benchmarks/bench_history.py --topics 100 --max-messages 40
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+
+import utils
+import history
+from fakes import install_fakes
+from checkpointer import SQLiteCheckpointSaver
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+
+def rss_kb():
+    """Resident set size of this process (Linux), or 0 if unavailable"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def run(topics, policy):
+    """Per-topic (checkpoint bytes, message count, RSS KB) for one session"""
+    history.set_history_policy(policy)
+    # Keep only the latest checkpoints so RSS reflects the state size
+    saver = SQLiteCheckpointSaver(":memory:", keep_last=2, compaction_interval=0)
+    app = create_healthbot_workflow(checkpointer=saver)
+    session = HealthBotSession(app, "bench_history")
+    
+    samples = []
+    session.start()
+    for i in range(topics):
+        session.respond(f"topic {i}")
+        session.respond("ready")
+        session.respond("B")
+        turn = session.respond("2" if i < topics - 1 else "3")
+        
+        saved = saver.get_tuple(session.config)
+        _, blob = saver.serde.dumps_typed(saved.checkpoint)
+        samples.append((len(blob), len(turn["state"]["messages"]), rss_kb()))
+    saver.close()
+    return samples
+
+
+def main(topics, max_messages, max_tokens):
+    install_fakes()
+    utils.print = lambda *args, **kwargs: None  # Silence node status lines
+    
+    policies = {
+        "unbounded": history.HistoryPolicy(),
+        "bounded": history.HistoryPolicy(max_messages=max_messages, max_tokens=max_tokens),
+    }
+    results = {}
+    for name, policy in policies.items():
+        start = time.perf_counter()
+        results[name] = run(topics, policy)
+        print(f"{name}: {time.perf_counter() - start:.1f}s")
+    
+    marks = sorted({0, topics // 4, topics // 2, 3 * topics // 4, topics - 1})
+    print(f"\n{'topic':>5} | {'unbounded bytes':>15} {'msgs':>5} {'RSS KB':>8} | {'bounded bytes':>13} {'msgs':>5} {'RSS KB':>8}")
+    for i in marks:
+        ub, um, ur = results["unbounded"][i]
+        bb, bm, br = results["bounded"][i]
+        print(f"{i + 1:>5} | {ub:>15} {um:>5} {ur:>8} | {bb:>13} {bm:>5} {br:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--topics", type=int, default=100)
+    parser.add_argument("--max-messages", type=int, default=40)
+    parser.add_argument("--max-tokens", type=int, default=0)
+    args = parser.parse_args()
+    
+    main(args.topics, args.max_messages, args.max_tokens)
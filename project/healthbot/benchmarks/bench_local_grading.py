@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+HealthBot Local Grading Benchmark
+Grades multiple-choice answers through the evaluate_answer node (local,
+against the quiz answer key) and free-text answers (LLM grader, fake model
+with configurable latency), and reports time per grade and the share of
+grades that skipped the LLM
+
+Usage:
+    python benchmarks/bench_local_grading.py --answers 200 --free-text 0.25 --llm-latency 0.05
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import utils
+from fakes import install_fakes, fake_completion
+from nodes import evaluate_answer, build_quiz_bank_prompt, parse_quiz_bank
+
+TOPIC = "diabetes"
+SUMMARY = fake_completion(f"Health Topic: {TOPIC}\nsummarize")
+
+
+def answer_states(count, free_text_share, seed=7):
+    """evaluate_answer inputs: quiz with answer key plus a patient answer"""
+    rng = random.Random(seed)
+    bank = parse_quiz_bank(fake_completion(build_quiz_bank_prompt(TOPIC, SUMMARY, count=count)))
+    states = []
+    for item in bank:
+        question, answer_key = item["question"], item["answer_key"]
+        if rng.random() < free_text_share:
+            answer = "Eating well and taking medicine as prescribed"
+        else:
+            answer = rng.choice(["A", "b", "(C)", "D)"])
+        states.append({
+            "health_topic": TOPIC,
+            "summary": SUMMARY,
+            "quiz_question": question,
+            "quiz_answer_key": answer_key,
+            "patient_answer": answer,
+            "token_usage": {},
+        })
+    return states
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--free-text", type=float, default=0.25, help="Share of free-text answers")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    
+    install_fakes(llm_latency=args.llm_latency)
+    utils.print = lambda *a, **k: None
+    
+    timings = {"local": [], "llm": []}
+    for state in answer_states(args.answers, args.free_text):
+        start = time.perf_counter()
+        update = evaluate_answer(state)
+        elapsed = time.perf_counter() - start
+        timings["local" if update["token_usage"]["local_grades"] else "llm"].append(elapsed)
+    
+    local, llm = timings["local"], timings["llm"]
+    print(f"Answers: {args.answers}  LLM latency: {args.llm_latency}s")
+    if local:
+        print(f"Local (multiple choice): {len(local):>4} grades, {sum(local) / len(local) * 1e6:8.1f} us avg")
+    if llm:
+        print(f"LLM (free text):         {len(llm):>4} grades, {sum(llm) / len(llm) * 1e3:8.1f} ms avg")
+    rate = len(local) / args.answers
+    print(f"Grades that skipped the LLM: {rate:.0%}")
+    print(f"Grading time: {sum(local) + sum(llm):.2f}s (all-LLM estimate "
+          f"{args.answers * (sum(llm) / len(llm) if llm else args.llm_latency):.2f}s)")
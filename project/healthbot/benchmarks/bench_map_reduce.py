@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+HealthBot Map-Reduce Summarization Benchmark
+Runs the summarize node on 5 to 50 full-length search results with a fake
+LLM whose latency grows with the prompt length, once with the single prompt
+and once with map-reduce (sync and async). Reports wall time, LLM calls and
+the largest prompt sent, against a model context limit.
+
+Usage:
+    python benchmarks/bench_map_reduce.py --docs 5,10,20,35,50 --doc-chars 4000
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Measure the LLM calls: no stored summaries, no speculative quiz call
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+os.environ["HEALTHBOT_TOPIC_INDEX"] = "off"
+
+import utils
+import llm_config
+from budget import estimate_text_tokens
+from fakes import FakeHealthChatModel, fake_search_response, _prompt_text
+from map_reduce import SINGLE, MAP_REDUCE
+from nodes import summarize_results, asummarize_results
+from tools import format_search_results
+
+# Prompt sizes of the calls made, in estimated tokens
+PROMPT_TOKENS = []
+
+
+class RecordingChatModel(FakeHealthChatModel):
+    """Fake chat model that records the size of every prompt"""
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        PROMPT_TOKENS.append(estimate_text_tokens(_prompt_text(messages)))
+        return super()._generate(messages, stop, run_manager, **kwargs)
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        PROMPT_TOKENS.append(estimate_text_tokens(_prompt_text(messages)))
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def install_llm(latency, token_latency):
+    llm = RecordingChatModel(latency=latency, token_latency=token_latency)
+    registry = llm_config.get_llm_registry()
+    for profile in list(registry.profiles):
+        registry.register(profile, llm)
+
+
+def search_results(count, doc_chars):
+    """Formatted results for count full-length pages"""
+    response = fake_search_response("asthma", count, include_raw_content=True)
+    return format_search_results(response, doc_chars=doc_chars)
+
+
+def run(mode, results, use_async):
+    """Summarize once; returns (seconds, LLM calls, largest prompt tokens)"""
+    os.environ["HEALTHBOT_SUMMARY_MODE"] = mode
+    state = {"health_topic": "asthma", "search_results": results, "messages": []}
+    PROMPT_TOKENS.clear()
+    start = time.perf_counter()
+    if use_async:
+        update = asyncio.run(asummarize_results(state))
+    else:
+        update = summarize_results(state)
+    seconds = time.perf_counter() - start
+    assert "excerpts straight from the sources" not in update["summary"]
+    return seconds, len(PROMPT_TOKENS), max(PROMPT_TOKENS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", default="5,10,20,35,50", type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--doc-chars", type=int, default=4000, help="Characters kept per search result")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.00002, help="Extra seconds per prompt word")
+    parser.add_argument("--context", type=int, default=8000, help="Model context limit (tokens)")
+    args = parser.parse_args()
+    
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    install_llm(args.latency, args.token_latency)
+    
+    print(f"Docs: {args.docs}  Chars per doc: {args.doc_chars}  LLM: {args.latency * 1000:.0f}ms "
+          f"+ {args.token_latency * 1e6:.0f}us/word  Context limit: {args.context} tokens\n")
+    print(f"{'docs':>5} {'mode':<16} {'seconds':>8} {'calls':>6} {'max prompt':>11}")
+    
+    results = {}
+    for count in args.docs:
+        docs = search_results(count, args.doc_chars)
+        for use_async in (False, True):
+            for mode in (SINGLE, MAP_REDUCE):
+                label = ("async " if use_async else "sync ") + mode
+                seconds, calls, largest = run(mode, docs, use_async)
+                results[(count, label)] = (seconds, largest)
+                flag = "  > context" if largest > args.context else ""
+                print(f"{count:>5} {label:<16} {seconds:>8.3f} {calls:>6} {largest:>11}{flag}")
+    
+    smallest, largest_count = min(args.docs), max(args.docs)
+    print()
+    for kind in ("sync", "async"):
+        for mode in (SINGLE, MAP_REDUCE):
+            label = f"{kind} {mode}"
+            growth = results[(largest_count, label)][0] / results[(smallest, label)][0]
+            biggest = max(results[(count, label)][1] for count in args.docs)
+            print(f"{label:<16} {smallest} -> {largest_count} docs: {growth:.2f}x latency, largest prompt {biggest} tokens")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+HealthBot Metrics Overhead Benchmark
+Runs the same scripted sessions with per-node metrics off and on (fake LLM
+and search, no API keys) and reports the added cost per node run, plus the
+direct cost of the node wrapper and of a recording hook with metrics off
+
+Usage:
+    python benchmarks/bench_metrics.py --sessions 30 --rounds 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Measure the graph, not the caches or speculative work
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+os.environ["HEALTHBOT_METRICS"] = "off"
+
+import utils
+from langgraph.checkpoint.memory import MemorySaver
+from fakes import install_fakes
+from metrics import NodeMetrics, record_cache
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+REPLIES = ["diabetes", "ready", "B", "1", "B", "2", "asthma", "ready", "B", "3"]
+
+
+def run_sessions(app, sessions, label):
+    start = time.perf_counter()
+    for i in range(sessions):
+        session = HealthBotSession(app, f"bench_metrics_{label}_{i}")
+        session.start()
+        for reply in REPLIES:
+            session.respond(reply)
+    return time.perf_counter() - start
+
+
+def wrapper_cost_us(metrics, calls=20_000):
+    """Added cost of one wrapped node call (aggregation + JSONL event)"""
+    def node(state):
+        record_cache("search_results", True)
+        return {}
+    
+    wrapped = metrics.wrap("bench_node", node)
+    state = {"session_id": "bench"}
+    timings = []
+    for func in (node, wrapped):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func(state)
+        timings.append((time.perf_counter() - start) / calls)
+    return (timings[1] - timings[0]) * 1e6
+
+
+def hook_cost_ns(calls=200_000):
+    """Cost of one recording hook outside an instrumented node (metrics off)"""
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        record_cache("search_results", True)
+    return (time.perf_counter_ns() - start) / calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    
+    install_fakes()
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    
+    log_path = os.path.join(tempfile.mkdtemp(), "metrics.jsonl")
+    metrics = NodeMetrics(log_path=log_path)
+    plain = create_healthbot_workflow(checkpointer=MemorySaver())
+    instrumented = create_healthbot_workflow(checkpointer=MemorySaver(), metrics=metrics)
+    
+    # Warm up both graphs, then alternate rounds so drift hits both equally
+    run_sessions(plain, 2, "warm_off")
+    run_sessions(instrumented, 2, "warm_on")
+    off, on = [], []
+    for r in range(args.rounds):
+        off.append(run_sessions(plain, args.sessions, f"off_{r}"))
+        on.append(run_sessions(instrumented, args.sessions, f"on_{r}"))
+    
+    sessions_run = args.rounds * args.sessions + 2
+    runs_per_round = sum(c["calls"] for c in metrics.node_metrics().values()) / sessions_run * args.sessions
+    off_median = statistics.median(off)
+    on_median = statistics.median(on)
+    wrapper_us = wrapper_cost_us(metrics)
+    
+    print(f"Sessions/round: {args.sessions}  Rounds: {args.rounds}  Node runs/round: {runs_per_round:.0f}")
+    print(f"Metrics off: {off_median * 1000:.1f} ms/round (median)")
+    print(f"Metrics on:  {on_median * 1000:.1f} ms/round (median, JSONL log enabled)")
+    print(f"End-to-end:  {(on_median / off_median - 1):+.1%} (includes run-to-run noise)")
+    print(f"Wrapper cost: {wrapper_us:.1f} us/node run")
+    print(f"Hook cost with metrics off: {hook_cost_ns():.0f} ns/call")
+    
+    with open(log_path) as f:
+        events = sum(1 for _ in f)
+    print(f"JSONL events: {events}")
+    print("\nPrometheus sample:")
+    print("\n".join(metrics.render_prometheus().splitlines()[:6]))
+    metrics.close()
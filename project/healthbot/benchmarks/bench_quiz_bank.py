@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+HealthBot Quiz Bank Benchmark
+Runs scripted sessions that ask for several questions per topic (fake LLM
+and search, no API keys), generating one question per LLM call and then a
+bank of questions per call, and reports quiz LLM calls and the wait after
+each "more questions" reply, and how many questions a session was asked
+twice.
+
+Usage:
+    python benchmarks/bench_quiz_bank.py --sessions 5 --questions 8 --bank-size 5 --latency 0.1
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Measure the bank itself: no caches, no background generation
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+
+import utils
+import nodes
+from langgraph.checkpoint.memory import MemorySaver
+from fakes import install_fakes
+from nodes import is_near_duplicate
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+
+def run_sessions(app, sessions, questions, label):
+    """
+    Run sessions asking `questions` questions on one topic
+    
+    Returns:
+        Tuple (quiz LLM calls per session, waits after "more questions",
+        sessions that repeated a question)
+    """
+    calls, waits, repeated = [], [], 0
+    for i in range(sessions):
+        session = HealthBotSession(app, f"bench_bank_{label}_{i}")
+        session.start()
+        session.respond("diabetes")
+        session.respond("ready")
+        for q in range(questions - 1):
+            session.respond("B")
+            start = time.perf_counter()
+            session.respond("1")  # More questions
+            waits.append(time.perf_counter() - start)
+        turn = session.respond("B")
+        
+        asked = turn["state"]["asked_questions"]
+        if any(is_near_duplicate(question, asked[:n]) for n, question in enumerate(asked)):
+            repeated += 1
+        calls.append(session.usage()["calls"] - 1)  # All but the summary (answers graded locally)
+        session.respond("3")
+    return calls, waits, repeated
+
+
+def describe(label, calls, waits, repeated):
+    print(
+        f"{label:<16} quiz calls/session {statistics.mean(calls):>4.1f}  "
+        f"wait avg {statistics.mean(waits) * 1000:>6.1f} ms  "
+        f"p95 {sorted(waits)[int(len(waits) * 0.95)] * 1000:>6.1f} ms  repeats {repeated}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=8, help="Questions asked per session")
+    parser.add_argument("--bank-size", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.1, help="Fake LLM latency (seconds)")
+    args = parser.parse_args()
+    
+    install_fakes(llm_latency=args.latency)
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    app = create_healthbot_workflow(checkpointer=MemorySaver())
+    
+    print(f"Sessions: {args.sessions}  Questions/session: {args.questions}  LLM latency: {args.latency}s\n")
+    nodes.QUIZ_BANK_SIZE = 1  # One question per call
+    single = run_sessions(app, args.sessions, args.questions, "single")
+    describe("one per call", *single)
+    
+    nodes.QUIZ_BANK_SIZE = args.bank_size
+    banked = run_sessions(app, args.sessions, args.questions, "bank")
+    describe(f"bank of {args.bank_size}", *banked)
+    
+    saved = 1 - statistics.mean(banked[0]) / statistics.mean(single[0])
+    print(f"\nQuiz LLM calls saved: {saved:.0%}")
+    print(f"Wait per 'more questions': {statistics.mean(single[1]) / statistics.mean(banked[1]):.1f}x shorter")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+"""
+HealthBot Resilience Benchmark
+Drives the upstream wrapper with injected faults and reports: success rate
+of a flaky upstream with and without retries, tail latency with and without
+hedged requests (sync and async), calls refused by an open circuit breaker
+and its recovery, and whole sessions finishing (from cached search results
+and without the LLM) while both upstreams are down
+
+Usage:
+    python benchmarks/bench_resilience.py --calls 300 --failure-rate 0.3
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Private cache dir; search results expire at once (only last_value can serve them)
+os.environ["HEALTHBOT_CACHE_DIR"] = tempfile.mkdtemp()
+os.environ["HEALTHBOT_SEARCH_CACHE_TTL"] = "0"
+os.environ["HEALTHBOT_SEARCH_CACHE_STALE_TTL"] = "0"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+os.environ["HEALTHBOT_RETRY_BACKOFF"] = "0.001"
+
+import utils
+import resilience
+from resilience import Upstream, UpstreamUnavailable, CircuitOpenError, CLOSED
+from fakes import install_fakes
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+# Latency profile for the hedging runs: mostly fast, a slow tail
+FAST, SLOW, SLOW_SHARE = 0.01, 0.25, 0.05
+
+
+def flaky(failure_rate, rng):
+    def call():
+        if rng.random() < failure_rate:
+            raise ConnectionError("injected failure")
+        return "ok"
+    return call
+
+
+def success_rate(retries, calls, failure_rate):
+    upstream = Upstream("flaky", retries=retries, backoff=0.0, failure_threshold=10 ** 6)
+    func = flaky(failure_rate, random.Random(1))
+    ok = 0
+    for _ in range(calls):
+        try:
+            upstream.call(func)
+            ok += 1
+        except UpstreamUnavailable:
+            pass
+    return ok / calls, upstream.stats()["retries"]
+
+
+def tail_latencies(hedge_percentile, calls, use_async):
+    """Per-call latencies of an upstream with a slow tail"""
+    upstream = Upstream("tail", timeout=5.0, retries=0, hedge_percentile=hedge_percentile)
+    rng = random.Random(2)
+    
+    def delay():
+        return SLOW if rng.random() < SLOW_SHARE else FAST
+    
+    def call():
+        time.sleep(delay())
+        return "ok"
+    
+    async def acall():
+        await asyncio.sleep(delay())
+        return "ok"
+    
+    async def arun():
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            await upstream.acall(acall)
+            samples.append(time.perf_counter() - start)
+        return samples
+    
+    if use_async:
+        samples = asyncio.run(arun())
+    else:
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            upstream.call(call)
+            samples.append(time.perf_counter() - start)
+    stats = upstream.stats()
+    return samples, stats["hedges"], stats["hedge_wins"]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def outage(calls):
+    """Calls into a dead upstream: how many reach it, and recovery afterwards"""
+    upstream = Upstream("outage", timeout=0.05, retries=1, backoff=0.0,
+                        failure_threshold=5, reset_timeout=0.2)
+    reached = 0
+    healthy = False
+    
+    def call():
+        nonlocal reached
+        reached += 1
+        if healthy:
+            return "fresh"
+        time.sleep(0.2)  # Hangs past the timeout
+    
+    served = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        served.append(upstream.call(call, fallback=lambda error: "cached"))
+    outage_seconds = time.perf_counter() - start
+    state_during = upstream.breaker.state
+    stats = upstream.stats()
+    
+    healthy = True
+    refused = False
+    try:
+        upstream.call(call)
+    except CircuitOpenError:
+        refused = True
+    time.sleep(0.25)
+    recovered = upstream.call(call) == "fresh" and upstream.breaker.state == CLOSED
+    return {
+        "reached": reached,
+        "served_cached": served.count("cached"),
+        "short_circuits": stats["short_circuits"],
+        "timeouts": stats["timeouts"],
+        "seconds": outage_seconds,
+        "state_during": state_during,
+        "refused_before_reset": refused,
+        "recovered": recovered,
+    }
+
+
+def run_session(app, thread_id):
+    session = HealthBotSession(app, thread_id)
+    session.start()
+    turn = None
+    for reply in ("asthma", "ready", "B", "3"):
+        turn = session.respond(reply)
+    return turn["state"]
+
+
+def degraded_sessions():
+    """A session with search and LLM up (fills the cache), then one with both down"""
+    fakes = install_fakes()
+    app = create_healthbot_workflow()
+    healthy = run_session(app, "resilience_up")
+    
+    fakes["llm"].failure_rate = 1.0
+    fakes["search"].failure_rate = 1.0
+    down = run_session(app, "resilience_down")
+    return healthy, down
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--failure-rate", type=float, default=0.3)
+    parser.add_argument("--hedge-percentile", type=float, default=0.9)
+    args = parser.parse_args()
+    
+    # 1. Flaky upstream
+    print(f"Flaky upstream ({args.failure_rate:.0%} of attempts fail, {args.calls} calls)")
+    for retries in (0, 1, 2):
+        rate, used = success_rate(retries, args.calls, args.failure_rate)
+        print(f"  retries={retries}: {rate:6.1%} succeeded ({used} retries)")
+    
+    # 2. Slow tail
+    tail_calls = max(100, args.calls // 2)
+    print(f"\nSlow tail ({SLOW_SHARE:.0%} of calls take {SLOW * 1000:.0f}ms, others {FAST * 1000:.0f}ms, {tail_calls} calls)")
+    for use_async in (False, True):
+        base, _, _ = tail_latencies(None, tail_calls, use_async)
+        hedged, hedges, wins = tail_latencies(args.hedge_percentile, tail_calls, use_async)
+        label = "async" if use_async else "sync "
+        print(f"  {label} no hedge: p50 {statistics.median(base) * 1000:6.1f}ms  p99 {percentile(base, 0.99) * 1000:6.1f}ms")
+        print(f"  {label} hedged:   p50 {statistics.median(hedged) * 1000:6.1f}ms  p99 {percentile(hedged, 0.99) * 1000:6.1f}ms"
+              f"  ({hedges} hedges, {hedges / tail_calls:.0%} extra requests, {wins} won)")
+    
+    # 3. Outage
+    report = outage(50)
+    print("\nOutage (upstream hangs past its 50ms timeout, 50 calls with a cached fallback)")
+    print(f"  attempts that reached the upstream: {report['reached']}")
+    print(f"  calls served from the fallback:     {report['served_cached']} ({report['short_circuits']} refused by the open circuit)")
+    print(f"  total time: {report['seconds']:.2f}s  circuit: {report['state_during']}")
+    print(f"  refused before reset: {report['refused_before_reset']}  recovered after reset: {report['recovered']}")
+    
+    # 4. Sessions with both upstreams down
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    healthy, down = degraded_sessions()
+    print("\nSessions with search and LLM down (after one healthy session)")
+    print(f"  search results served from cache: {down['search_results'] == healthy['search_results']}")
+    print(f"  summary from source excerpts:     {'excerpts straight from the sources' in (down['summary'] or '')}")
+    print(f"  grade given:                      {down.get('grade') is not None}")
+    print(f"  upstream stats: { {n: {k: s[k] for k in ('calls', 'failures', 'fallbacks', 'state')} for n, s in resilience.upstream_stats().items()} }")
+    
+    print()
+    for line in resilience.render_prometheus().splitlines():
+        if line.startswith(("healthbot_circuit_state{", "healthbot_circuit_opens_total{")):
+            print(line)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+HealthBot Search Client Benchmark
+Runs searches against a local HTTP stand-in for the Tavily search endpoint
+(fixed latency, counts TCP connections) with a new client per search, as
+before, and with the long-lived pooled clients through tools.py, sync and
+async, at 100+ concurrent searches. Reports throughput, latency percentiles
+and connections opened.
+
+Usage:
+    python benchmarks/bench_search_client.py --searches 1000 --concurrency 100,200 --latency 0.05
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Every search goes to the stand-in (no cache, no fan-out)
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SEARCH_FANOUT"] = "off"
+os.environ["TAVILY_API_KEY"] = "bench-key"
+
+import tools
+from fakes import SearchStandIn
+from search_client import TavilySearchClient, AsyncTavilySearchClient
+from tools import search_medical_information, asearch_medical_information, set_search_clients
+
+TOPICS = ["asthma", "diabetes", "hypertension", "migraine", "arthritis", "eczema", "gout", "anemia"]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def timed(func):
+    def run(i):
+        start = time.perf_counter()
+        func(i)
+        return time.perf_counter() - start
+    return run
+
+
+async def atimed(func, i, limit):
+    async with limit:
+        start = time.perf_counter()
+        await func(i)
+        return time.perf_counter() - start
+
+
+def per_call_client(url):
+    """Sync search with a new client (and connection) per search"""
+    def search(i):
+        client = TavilySearchClient("bench-key", url=url)
+        try:
+            client.search(tools.build_search_query(TOPICS[i % len(TOPICS)]))
+        finally:
+            client.close()
+    return search
+
+
+async def aper_call_client(url, i):
+    client = AsyncTavilySearchClient("bench-key", url=url)
+    try:
+        await client.search(tools.build_search_query(TOPICS[i % len(TOPICS)]))
+    finally:
+        await client.aclose()
+
+
+def run_sync(func, searches, concurrency):
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        samples = list(pool.map(timed(func), range(searches)))
+    return time.perf_counter() - start, samples
+
+
+def run_async(func, searches, concurrency):
+    async def main():
+        limit = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(atimed(func, i, limit) for i in range(searches)))
+        return time.perf_counter() - start, samples
+    return asyncio.run(main())
+
+
+def pooled_clients(url):
+    """Install fresh pooled clients (as tools.py builds them) pointed at the stand-in"""
+    client = TavilySearchClient("bench-key", url=url)
+    async_client = AsyncTavilySearchClient("bench-key", url=url)
+    set_search_clients(client, async_client)
+    return client, async_client
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--searches", type=int, default=1000)
+    parser.add_argument("--concurrency", default="100,200", type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in seconds per search")
+    args = parser.parse_args()
+    
+    stand_in = SearchStandIn(args.latency)
+    url = stand_in.start()
+    print(f"Stand-in: {url}  latency {args.latency * 1000:.0f}ms  searches per run: {args.searches}\n")
+    print(f"{'client':<26} {'conc':>5} {'searches/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'connections':>12}")
+    
+    results = {}
+    for concurrency in args.concurrency:
+        runs = [
+            ("sync new per search", lambda: run_sync(per_call_client(url), args.searches, concurrency)),
+            ("sync pooled", lambda: run_sync(
+                lambda i: search_medical_information(TOPICS[i % len(TOPICS)]), args.searches, concurrency)),
+            ("async new per search", lambda: run_async(
+                lambda i: aper_call_client(url, i), args.searches, concurrency)),
+            ("async pooled", lambda: run_async(
+                lambda i: asearch_medical_information(TOPICS[i % len(TOPICS)]), args.searches, concurrency)),
+        ]
+        for label, run in runs:
+            client, async_client = pooled_clients(url)
+            stand_in.reset()
+            seconds, samples = run()
+            throughput = args.searches / seconds
+            pooled = client if label == "sync pooled" else async_client
+            results[(label, concurrency)] = (throughput, stand_in.connections, pooled.stats())
+            print(f"{label:<26} {concurrency:>5} {throughput:>11.0f} {statistics.median(samples) * 1000:>8.1f} "
+                  f"{percentile(samples, 0.99) * 1000:>8.1f} {stand_in.connections:>12}")
+    
+    print()
+    for concurrency in args.concurrency:
+        for kind in ("sync", "async"):
+            throughput, connections, stats = results[(f"{kind} pooled", concurrency)]
+            baseline = results[(f"{kind} new per search", concurrency)][0]
+            print(f"{kind} pooled at {concurrency}: {throughput / baseline:.2f}x searches/s of a new client per search, "
+                  f"{connections} connections for {args.searches} searches "
+                  f"(reuse rate {stats['connection_reuse_rate']:.0%})")
+    stand_in.stop()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+HealthBot Search Fan-out Benchmark
+Compares one search per topic with a fan-out into aspect queries (symptoms,
+causes, treatment, prevention) run sequentially and concurrently, sync and
+async, against a fake search API with fixed latency whose aspect results
+overlap. Reports wall time per topic, API calls, distinct pages and the
+duplicates merged away.
+
+Usage:
+    python benchmarks/bench_search_fanout.py --topics 10 --latency 0.2 --workers 4
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Measure the API calls, not the cache
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+
+from tools import (
+    SEARCH_ASPECTS,
+    build_aspect_queries,
+    merge_search_results,
+    search_medical_information,
+    asearch_medical_information,
+    set_search_clients,
+)
+
+TOPICS = [
+    "asthma", "diabetes", "hypertension", "migraine", "arthritis", "eczema",
+    "gout", "anemia", "insomnia", "bronchitis", "psoriasis", "glaucoma",
+]
+
+
+def overlapping_response(query, max_results):
+    """Aspect-specific pages plus overview pages every aspect query also finds"""
+    query = query.replace(" patient education medical information", "")
+    aspect = next((a for a in SEARCH_ASPECTS if query.endswith(" " + a)), None)
+    topic = query[: -len(aspect) - 1] if aspect else query
+    slug = topic.replace(" ", "-")
+    shared = [
+        # The same pages under slightly different URLs
+        {"title": f"{topic.title()} Overview", "url": f"https://www.example.org/{slug}/overview/",
+         "content": f"Overview of {topic}. " * 20, "score": 0.9},
+        {"title": f"{topic.title()} Fact Sheet", "url": f"https://health.example.com/{slug}#facts",
+         "content": f"Facts about {topic}. " * 20, "score": 0.85},
+    ]
+    if aspect is None:
+        specific = [
+            {"title": f"{topic.title()} Guide {i}", "url": f"https://example.org/{slug}/guide-{i}",
+             "content": f"Guide {i} to {topic}. " * 20, "score": 0.8 - i * 0.05}
+            for i in range(1, max_results - 1)
+        ]
+    else:
+        specific = [
+            {"title": f"{topic.title()} {aspect.title()} {i}", "url": f"https://example.org/{slug}/{aspect}-{i}",
+             "content": f"{aspect.title()} of {topic}, part {i}. " * 20, "score": 0.8 - i * 0.05}
+            for i in range(1, max_results - 1)
+        ]
+    return {"query": query, "results": (shared + specific)[:max_results]}
+
+
+class SearchClient:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+    
+    def search(self, query, max_results=5, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return overlapping_response(query, max_results)
+
+
+class AsyncSearchClient(SearchClient):
+    async def search(self, query, max_results=5, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return overlapping_response(query, max_results)
+
+
+def use_workers(workers):
+    os.environ["HEALTHBOT_SEARCH_FANOUT_WORKERS"] = str(workers)
+
+
+def pages(output):
+    return output.count("   Source: ")
+
+
+def run(topics, latency, fanout, workers, use_async):
+    """Search each topic; returns (median seconds per topic, API calls, pages per topic)"""
+    use_workers(workers)
+    client = SearchClient(latency)
+    async_client = AsyncSearchClient(latency)
+    set_search_clients(client, async_client)
+    
+    seconds, counts = [], []
+    for topic in topics:
+        start = time.perf_counter()
+        if use_async:
+            output = asyncio.run(asearch_medical_information(topic, fanout=fanout))
+        else:
+            output = search_medical_information(topic, fanout=fanout)
+        seconds.append(time.perf_counter() - start)
+        counts.append(pages(output))
+    calls = async_client.calls if use_async else client.calls
+    return statistics.median(seconds), calls, statistics.mean(counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per search API call")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent aspect searches")
+    args = parser.parse_args()
+    
+    topics = (TOPICS * (args.topics // len(TOPICS) + 1))[: args.topics]
+    raw = len(SEARCH_ASPECTS) * 5  # Aspect queries x results per query
+    print(f"Topics: {len(topics)}  Search latency: {args.latency * 1000:.0f}ms  Aspects: {', '.join(SEARCH_ASPECTS)}\n")
+    print(f"{'mode':<28} {'s/topic':>8} {'calls':>6} {'pages':>6}")
+    
+    results = {}
+    for use_async in (False, True):
+        kind = "async" if use_async else "sync"
+        for label, fanout, workers in (
+            ("single query", False, 1),
+            ("fan-out sequential", True, 1),
+            (f"fan-out concurrent ({args.workers})", True, args.workers),
+        ):
+            seconds, calls, count = run(topics, args.latency, fanout, workers, use_async)
+            results[(kind, label)] = (seconds, count)
+            print(f"{kind + ' ' + label:<28} {seconds:>8.3f} {calls:>6} {count:>6.1f}")
+    
+    fanout_pages = results[("sync", "fan-out sequential")][1]
+    responses = [overlapping_response(q, 5) for q in build_aspect_queries(topics[0])]
+    distinct = len(merge_search_results(responses, max_results=raw)["results"])
+    print(f"\nFan-out: {raw} results per topic, {distinct} distinct after URL de-duplication, "
+          f"top {fanout_pages:.0f} kept")
+    
+    for kind in ("sync", "async"):
+        single = results[(kind, "single query")][0]
+        concurrent = results[(kind, f"fan-out concurrent ({args.workers})")][0]
+        sequential = results[(kind, "fan-out sequential")][0]
+        print(f"{kind}: concurrent fan-out {concurrent / single:.2f}x one search, "
+              f"sequential {sequential / single:.2f}x")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+HealthBot Server Load Generator
+Starts the multi-session server in a child process (fake LLM and search with
+configurable latency, no API keys), or targets a running one with --url, and
+drives scripted patient sessions at increasing concurrency over HTTP or
+WebSocket. Reports p50/p95/p99 turn latency per level and the most
+concurrent sessions one server process (one core) held within the latency
+target.
+
+Usage:
+    python benchmarks/bench_server_load.py --levels 1,25,50,100,200 --latency 0.2
+    python benchmarks/bench_server_load.py --url http://127.0.0.1:8080 --transport ws
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import aiohttp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add src to path
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+# Patient replies after the welcome turn: topic, ready, answer, more,
+# answer, exit
+REPLIES = ["diabetes", "ready", "B", "1", "C", "3"]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+# ----------------------------------------------------------------------
+# Server (child process)
+# ----------------------------------------------------------------------
+
+def serve(port, latency):
+    """Run the server with the fakes installed (blocks)"""
+    os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+    os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+    
+    import utils
+    from aiohttp import web
+    from fakes import install_fakes
+    from server import create_server_app
+    
+    install_fakes(llm_latency=latency, search_latency=latency)
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    web.run_app(create_server_app(), host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+def start_server(latency):
+    """Start the server in a child process; returns (process, base URL)"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port), "--latency", str(latency)]
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+
+# ----------------------------------------------------------------------
+# Clients
+# ----------------------------------------------------------------------
+
+async def http_session(client, url, thread_id, latencies):
+    """One scripted session over HTTP; appends each turn's latency"""
+    start = time.perf_counter()
+    async with client.post(f"{url}/sessions", json={"thread_id": thread_id}) as resp:
+        resp.raise_for_status()
+        await resp.json()
+    latencies.append(time.perf_counter() - start)
+    
+    for answer in REPLIES:
+        start = time.perf_counter()
+        async with client.post(f"{url}/sessions/{thread_id}/reply", json={"answer": answer}) as resp:
+            resp.raise_for_status()
+            turn = await resp.json()
+        latencies.append(time.perf_counter() - start)
+    return turn["done"]
+
+
+async def ws_session(client, url, thread_id, latencies):
+    """One scripted session over WebSocket; a turn ends with its 'turn' message"""
+    async with client.ws_connect(f"{url}/sessions/{thread_id}/ws") as ws:
+        async def next_turn():
+            while True:
+                message = await ws.receive_json()
+                if message["type"] == "turn":
+                    return message
+                if message["type"] == "error":
+                    raise RuntimeError(message["error"])
+        
+        start = time.perf_counter()
+        await next_turn()
+        latencies.append(time.perf_counter() - start)
+        
+        for answer in REPLIES:
+            start = time.perf_counter()
+            await ws.send_json({"answer": answer})
+            turn = await next_turn()
+            latencies.append(time.perf_counter() - start)
+    return turn["done"]
+
+
+async def run_level(url, transport, concurrency, label):
+    """
+    Run `concurrency` sessions at once
+    
+    Returns:
+        Tuple (turn latencies, failed sessions, wall seconds)
+    """
+    run_one = ws_session if transport == "ws" else http_session
+    latencies = []
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(run_one(client, url, f"load_{label}_{i}", latencies) for i in range(concurrency)),
+            return_exceptions=True,
+        )
+        wall = time.perf_counter() - start
+    failed = sum(1 for r in results if r is not True)
+    return latencies, failed, wall
+
+
+async def main(args):
+    process = None
+    url = args.url
+    if not url:
+        process, url = start_server(args.latency)
+    
+    try:
+        print(f"Server: {url}  Transport: {args.transport}  Turns/session: {len(REPLIES) + 1}")
+        print(f"{'sessions':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'turns/s':>8} {'failed':>6}")
+        
+        baseline_p95 = None
+        held = 0
+        run_id = int(time.time())
+        for concurrency in args.levels:
+            latencies, failed, wall = await run_level(
+                url, args.transport, concurrency, f"{run_id}_{concurrency}"
+            )
+            if not latencies:
+                print(f"{concurrency:>8} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {failed:>6}")
+                continue
+            p50, p95, p99 = (percentile(latencies, p) for p in (0.5, 0.95, 0.99))
+            print(
+                f"{concurrency:>8} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} {p99 * 1000:>8.1f} "
+                f"{len(latencies) / wall:>8.1f} {failed:>6}"
+            )
+            
+            baseline_p95 = baseline_p95 or p95
+            target = args.slo_ms / 1000 if args.slo_ms else baseline_p95 * args.slo_factor
+            if not failed and p95 <= target:
+                held = concurrency
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    
+    target_text = f"{args.slo_ms:.0f} ms" if args.slo_ms else f"{args.slo_factor}x the 1-session p95"
+    print(f"\nLatency target: p95 within {target_text}")
+    print(f"Max concurrent sessions per core: {held} (one event loop per server process)")
+    print(f"Client machine cores: {os.cpu_count()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", default="1,25,50,100,200",
+                        type=lambda s: [int(n) for n in s.split(",")],
+                        help="Concurrent sessions per level (start with 1 for the baseline)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM/search latency (seconds)")
+    parser.add_argument("--transport", choices=["http", "ws"], default="http")
+    parser.add_argument("--url", help="Running server to target instead of starting one")
+    parser.add_argument("--slo-ms", type=float, help="p95 turn latency target in ms")
+    parser.add_argument("--slo-factor", type=float, default=2.0,
+                        help="p95 target as a multiple of the first level's p95 (without --slo-ms)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args.serve, args.latency)
+        sys.exit(0)
+    
+    asyncio.run(main(args))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+HealthBot Speculative Quiz Benchmark
+Measures how long the patient waits for the quiz after typing "ready", with
+and without speculative quiz generation, for sync and async sessions
+
+Usage:
+    python benchmarks/bench_speculation.py --latency 0.5 --read-time 1.0
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Every session must generate: no cached searches or summaries
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+
+import utils
+import speculation
+from fakes import install_fakes
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+
+def set_speculation(enabled):
+    os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "on" if enabled else "off"
+    speculation._speculator = None  # Fresh counters per run
+
+
+def run_sync(app, sessions, read_time, label):
+    """Average seconds from 'ready' to the quiz being shown"""
+    waits = []
+    for i in range(sessions):
+        session = HealthBotSession(app, f"bench_spec_{label}_{i}")
+        session.start()
+        session.respond("asthma")
+        time.sleep(read_time)  # Patient reads the summary
+        start = time.perf_counter()
+        session.respond("ready")
+        waits.append(time.perf_counter() - start)
+        session.respond("D")
+        session.respond("3")
+    return sum(waits) / len(waits)
+
+
+async def run_async(app, sessions, read_time, label):
+    async def one(i):
+        session = HealthBotSession(app, f"bench_aspec_{label}_{i}")
+        await session.astart()
+        await session.arespond("asthma")
+        await asyncio.sleep(read_time)
+        start = time.perf_counter()
+        await session.arespond("ready")
+        wait = time.perf_counter() - start
+        await session.arespond("D")
+        await session.arespond("3")
+        return wait
+    
+    waits = await asyncio.gather(*(one(i) for i in range(sessions)))
+    return sum(waits) / len(waits)
+
+
+def main(sessions, latency, read_time):
+    install_fakes(llm_latency=latency, search_latency=0.0)
+    utils.print = lambda *args, **kwargs: None  # Silence node status lines
+    
+    sync_app = create_healthbot_workflow()
+    async_app = create_healthbot_workflow(async_mode=True)
+    results = {}
+    
+    for enabled in (False, True):
+        set_speculation(enabled)
+        label = "on" if enabled else "off"
+        results[("sync", label)] = run_sync(sync_app, sessions, read_time, label)
+        results[("async", label)] = asyncio.run(run_async(async_app, sessions, read_time, label))
+        stats = speculation._speculator.stats() if enabled else None
+    
+    print(f"Sessions: {sessions}  LLM latency: {latency:.2f}s  Read time: {read_time:.2f}s\n")
+    print(f"{'mode':<6} {'wait (off)':>11} {'wait (on)':>10}")
+    for mode in ("sync", "async"):
+        print(f"{mode:<6} {results[(mode, 'off')]:>10.3f}s {results[(mode, 'on')]:>9.3f}s")
+    
+    print("\nSpeculation stats:")
+    for name, value in stats.items():
+        print(f"  {name:<15} {value:.3f}" if isinstance(value, float) else f"  {name:<15} {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--read-time", type=float, default=1.0)
+    args = parser.parse_args()
+    
+    main(args.sessions, args.latency, args.read_time)
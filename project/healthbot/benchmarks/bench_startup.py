@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+HealthBot Cold Start Benchmark
+Measures, in fresh interpreters, the time to import the workflow and compile
+the graph (what a serverless worker pays before its first turn), lists the
+provider modules (langchain_openai, tavily, dotenv) imported before first
+use, and prints the import-time breakdown of one run
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 --budget 3.0
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from startup import profile_command, format_import_report
+
+# Modules that must only load on first use
+LAZY_MODULES = ("langchain_openai", "openai", "tavily", "dotenv")
+
+# Cold start measured in the child: import, compile, report as JSON
+CHILD = f"""
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {SRC_DIR!r})
+from workflow import get_workflow
+imported = time.perf_counter()
+get_workflow()
+compiled = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "compile": compiled - imported,
+    "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def cold_start():
+    """One cold start in a fresh interpreter; returns the child's report"""
+    env = dict(os.environ, HEALTHBOT_SEARCH_CACHE="off", HEALTHBOT_SUMMARY_CACHE="off")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=3.0, help="Cold start budget (seconds)")
+    args = parser.parse_args()
+    
+    runs = [cold_start() for _ in range(args.runs)]
+    imports = [r["import"] for r in runs]
+    compiles = [r["compile"] for r in runs]
+    totals = [r["import"] + r["compile"] for r in runs]
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    
+    print(f"Cold starts: {args.runs}")
+    print(f"Import workflow:  {statistics.median(imports):.3f}s median (max {max(imports):.3f}s)")
+    print(f"Compile graph:    {statistics.median(compiles):.3f}s median")
+    print(f"Cold start total: {statistics.median(totals):.3f}s median (budget {args.budget:.1f}s)")
+    print(f"Provider modules loaded at startup: {', '.join(loaded) or 'none'}")
+    
+    code, entries, wall = profile_command(["-c", CHILD], quiet=True)
+    print()
+    print(format_import_report(entries, wall))
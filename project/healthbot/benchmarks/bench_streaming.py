@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+HealthBot Streaming Benchmark
+Runs scripted sessions with token streaming on and reports time-to-first-token
+against total generation time for each LLM node
+
+Usage:
+    python benchmarks/bench_streaming.py --latency 1.0 --sessions 3
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Every session must generate: no cached searches or summaries
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+
+import utils
+from fakes import install_fakes
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+from streaming import StreamTimings
+
+# A hedged answer goes to the LLM grader, whose feedback is streamed
+SCRIPT = ["asthma", "ready", "I think D", "3"]
+
+
+def run_sync(app, sessions, timings):
+    for i in range(sessions):
+        session = HealthBotSession(app, f"bench_stream_{i}", on_token=lambda n, t: None)
+        session.timings = timings
+        session.start()
+        for answer in SCRIPT:
+            session.respond(answer)
+
+
+async def run_async(app, sessions, timings):
+    async def one(i):
+        session = HealthBotSession(app, f"bench_astream_{i}", on_token=lambda n, t: None)
+        session.timings = timings
+        await session.astart()
+        for answer in SCRIPT:
+            await session.arespond(answer)
+    
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+
+
+def report(label, timings):
+    print(f"\n{label}")
+    print(f"  {'node':<20} {'calls':>5} {'first token':>12} {'total':>8}")
+    for node, t in timings.summary().items():
+        print(f"  {node:<20} {t['calls']:>5} {t['ttft_avg']:>11.3f}s {t['total_avg']:>7.3f}s")
+
+
+def main(sessions, latency):
+    install_fakes(llm_latency=latency)
+    utils.print = lambda *args, **kwargs: None  # Silence node status lines
+    
+    sync_timings, async_timings = StreamTimings(), StreamTimings()
+    run_sync(create_healthbot_workflow(), sessions, sync_timings)
+    asyncio.run(run_async(create_healthbot_workflow(async_mode=True), sessions, async_timings))
+    
+    report("Sync (astream_events on its own loop)", sync_timings)
+    report("Async (astream_events)", async_timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=1.0)
+    args = parser.parse_args()
+    
+    main(args.sessions, args.latency)
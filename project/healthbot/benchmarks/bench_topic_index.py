@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+HealthBot Topic Index Benchmark
+Indexes search results for a small set of health topics, then asks for
+aliases of them ("high blood pressure", "HTN") and for unrelated topics, and
+reports correct matches, wrong matches and false matches per similarity
+threshold. Then runs sessions (fake LLM, corpus-backed fake search) with the
+index off and on and reports searches, summary LLM calls and the hit rate.
+
+Usage:
+    python benchmarks/bench_topic_index.py --thresholds 0.4,0.45,0.5,0.6,0.7
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Measure the index: no exact-key search cache or summary store, private cache dir
+os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+os.environ["HEALTHBOT_SUMMARY_CACHE"] = "off"
+os.environ["HEALTHBOT_SPECULATIVE_QUIZ"] = "off"
+os.environ["HEALTHBOT_CACHE_DIR"] = tempfile.mkdtemp()
+
+import utils
+import topic_index
+from langgraph.checkpoint.memory import MemorySaver
+from fakes import (
+    MEDICAL_CORPUS, TOPIC_ALIASES, UNRELATED_TOPICS, NEAR_MISS_TOPICS,
+    CorpusSearchClient, corpus_response, install_fakes,
+)
+from tools import format_search_results, set_search_clients
+from topic_index import TopicIndex
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+
+def corpus_results(topic):
+    """Formatted search results for a corpus topic (as the search node stores them)"""
+    return format_search_results(corpus_response(topic))
+
+
+def threshold_table(thresholds):
+    index = TopicIndex()
+    for topic in MEDICAL_CORPUS:
+        index.add(topic, corpus_results(topic))
+    
+    print(f"Indexed topics: {len(MEDICAL_CORPUS)}  Alias queries: {len(TOPIC_ALIASES)}  Unrelated queries: {len(UNRELATED_TOPICS)}\n")
+    print(f"{'threshold':>9} {'correct':>8} {'wrong':>6} {'false':>6}")
+    rows = {}
+    for threshold in thresholds:
+        correct = wrong = false = 0
+        for query, expected in TOPIC_ALIASES.items():
+            match = index.match(query, threshold)
+            if match is not None:
+                correct += match["topic"] == expected
+                wrong += match["topic"] != expected
+        for query in UNRELATED_TOPICS:
+            false += index.match(query, threshold) is not None
+        rows[threshold] = (correct, wrong, false)
+        print(f"{threshold:>9.2f} {correct:>4}/{len(TOPIC_ALIASES):<3} {wrong:>6} {false:>6}")
+    return rows
+
+
+def one_sided_matches(threshold):
+    """NEAR_MISS_TOPICS queries matched to the only (different) indexed topic"""
+    matched = []
+    for indexed, query in NEAR_MISS_TOPICS:
+        index = TopicIndex()
+        index.add(indexed, corpus_results(indexed))
+        match = index.match(query, threshold)
+        if match is not None:
+            matched.append(f"{query!r} -> {indexed!r} ({match['similarity']:.2f})")
+    return matched
+
+
+def run_sessions(queries, label):
+    """One session per query; returns (searches, LLM calls)"""
+    search = CorpusSearchClient()
+    set_search_clients(search, None)
+    app = create_healthbot_workflow(checkpointer=MemorySaver())
+    calls = 0
+    for i, query in enumerate(queries):
+        session = HealthBotSession(app, f"bench_topic_{label}_{i}")
+        session.start()
+        for reply in (query, "ready", "B", "3"):
+            session.respond(reply)
+        calls += session.usage()["calls"]
+    return search.calls, calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--thresholds", default="0.3,0.4,0.5,0.6,0.7",
+                        type=lambda s: [float(x) for x in s.split(",")])
+    args = parser.parse_args()
+    
+    rows = threshold_table(args.thresholds)
+    
+    install_fakes()
+    utils.print = lambda *a, **k: None  # Silence node status lines
+    
+    # Canonical topics first, then their aliases and unrelated topics
+    queries = list(MEDICAL_CORPUS) + list(TOPIC_ALIASES) + UNRELATED_TOPICS
+    os.environ["HEALTHBOT_TOPIC_INDEX"] = "off"
+    off = run_sessions(queries, "off")
+    os.environ["HEALTHBOT_TOPIC_INDEX"] = "on"
+    on = run_sessions(queries, "on")
+    stats = topic_index.get_topic_index().stats()
+    
+    print(f"\nSessions: {len(queries)} (default threshold {topic_index.DEFAULT_THRESHOLD})")
+    print(f"Index off: {off[0]} searches, {off[1]} LLM calls")
+    print(f"Index on:  {on[0]} searches, {on[1]} LLM calls")
+    print(f"Index hit rate: {stats['hit_rate']:.0%} ({stats['hits']}/{stats['lookups']}, {stats['entries']} entries)")
+    
+    default = topic_index.DEFAULT_THRESHOLD
+    if default not in rows:
+        print()
+        rows.update(threshold_table([default]))
+    one_sided = one_sided_matches(default)
+    print(f"One-sided near misses matched: {len(one_sided)}/{len(NEAR_MISS_TOPICS)}" +
+          (f" ({'; '.join(one_sided)})" if one_sided else ""))
@@ -2,43 +2,118 @@
 """
 HealthBot - Patient Education AI Agent
 Main execution script - runs workflow in fresh Python process
+
+Pass --stream to print summaries and grading feedback as they are
+generated (and per-node timings at the end), and --offline to run against the
+fake LLM and search client (no API keys needed).
+
+Set HEALTHBOT_CASSETTE=record to write every LLM call and search to a
+cassette file, or HEALTHBOT_CASSETTE=replay to serve them back with no
+network (see src/cassette.py).
+
+Pass --profile-startup to print startup phase timings and an import-time
+breakdown per package, then exit without starting a session.
 """
 
 import sys
 import os
-from dotenv import load_dotenv
 
 # Add src to path
 src_path = os.path.join(os.path.dirname(__file__), 'src')
 sys.path.insert(0, src_path)
 
-# Load environment - .env is at project root (up 2 levels from this file)
-env_file = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-load_dotenv(env_file)
+from startup import (
+    startup_phase,
+    importtime_enabled,
+    profile_command,
+    format_import_report,
+    format_phase_report,
+)
+
+profile_startup = "--profile-startup" in sys.argv
+if profile_startup and not importtime_enabled():
+    # Re-run this script under -X importtime and report on its imports
+    code, entries, wall = profile_command(sys.argv)
+    print()
+    print(format_import_report(entries, wall))
+    sys.exit(code)
 
-print(f"Loading .env from: {env_file}")
-print(f"File exists: {os.path.exists(env_file)}")
+# Load environment once - .env is at project root (up 2 levels from this file)
+with startup_phase("environment"):
+    from environment import ENV_PATH, load_environment
+    load_environment()
 
-# Verify credentials
-assert os.getenv('FOUNDRY_PROJECT_ENDPOINT'), "Missing FOUNDRY_PROJECT_ENDPOINT"
-assert os.getenv('FOUNDRY_API_KEY'), "Missing FOUNDRY_API_KEY"
-assert os.getenv('TAVILY_API_KEY'), "Missing TAVILY_API_KEY"
+print(f"Loading .env from: {ENV_PATH}")
+print(f"File exists: {os.path.exists(ENV_PATH)}")
+
+offline = "--offline" in sys.argv
+replay = os.getenv("HEALTHBOT_CASSETTE", "off").lower() == "replay"
+if offline:
+    # Keep fake search results out of the shared search cache
+    os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+
+# Verify credentials (a replayed cassette needs none)
+if not offline and not replay:
+    assert os.getenv('FOUNDRY_PROJECT_ENDPOINT'), "Missing FOUNDRY_PROJECT_ENDPOINT"
+    assert os.getenv('FOUNDRY_API_KEY'), "Missing FOUNDRY_API_KEY"
+    assert os.getenv('TAVILY_API_KEY'), "Missing TAVILY_API_KEY"
 
 print("✓ Environment loaded")
-print("✓ Credentials verified")
+if offline:
+    print("✓ Offline mode (fake LLM and search)")
+elif replay:
+    print("✓ Replay mode (recorded LLM and search calls)")
+else:
+    print("✓ Credentials verified")
 
 # Import workflow
-from workflow import create_healthbot_workflow, create_config, initialize_empty_state
+with startup_phase("imports"):
+    from workflow import get_workflow
+    from session import HealthBotSession
+    from nodes import DISPLAY_TITLES
+    from utils import display_text_to_user, ask_user_for_input, display_header, unstreamed_display
+    
+    if offline:
+        from fakes import install_fakes
+        install_fakes()
+    
+    from cassette import install_cassette_from_env
+    cassette = install_cassette_from_env()
 
 print("✓ Modules imported")
 
-# Create workflow
-app = create_healthbot_workflow()
+# Create workflow (compiled once per process)
+with startup_phase("compile workflow"):
+    app = get_workflow()
 print("✓ Workflow created")
 
+if profile_startup:
+    if not offline:
+        # Provider modules are imported on first use; count that here
+        with startup_phase("first LLM client"):
+            from llm_config import get_llm
+            get_llm("summarize")
+    print()
+    print(format_phase_report())
+    sys.exit(0)
+
 # Initialize
-config = create_config(thread_id="healthbot_session_cli")
-initial_state = initialize_empty_state()
+stream_tokens = "--stream" in sys.argv
+streamed = {}  # Node -> text streamed during the current turn
+
+def print_token(node, text):
+    """Print LLM tokens as they arrive, under the header of their display"""
+    if node not in streamed:
+        streamed[node] = ""
+        print(display_header(DISPLAY_TITLES[node]))
+    streamed[node] += text
+    print(text, end="", flush=True)
+
+session = HealthBotSession(
+    app,
+    thread_id="healthbot_session_cli",
+    on_token=print_token if stream_tokens else None,
+)
 
 # Run
 print("\n" + "="*80)
@@ -48,12 +123,28 @@ print("\nFollow the prompts to interact with HealthBot")
 print("Tips:")
 print("  - Enter health topics (e.g., 'diabetes', 'hypertension', 'heart disease')")
 print("  - Read the summary carefully before answering the quiz")
-print("  - Answer quiz questions in your own words")
+print("  - Answer open questions in your own words, multiple-choice ones with a letter")
 print("  - After grading, choose to: answer more questions, learn a new topic, or exit")
 print("\n" + "="*80 + "\n")
 
 try:
-    final_state = app.invoke(initial_state, config)
+    # The workflow pauses whenever it needs the patient; this loop is just
+    # one client of the session resume API
+    turn = session.start()
+    while not turn["done"]:
+        display = turn["display"]
+        if streamed:
+            # The header and streamed text are already on screen
+            for node, text in streamed.items():
+                display = unstreamed_display(display, DISPLAY_TITLES[node], text)
+            streamed.clear()
+            print()
+        if display:
+            display_text_to_user(display)
+        turn = session.respond(ask_user_for_input(turn["prompt"]))
+    
+    display_text_to_user(turn["display"])
+    final_state = turn["state"]
     
     print("\n" + "="*80)
     print("SESSION COMPLETE")
@@ -63,6 +154,18 @@ try:
     print(f"Final grade: {final_state.get('grade', 'N/A')}/100")
     print(f"Quiz count: {final_state.get('quiz_count', 0)}")
     
+    usage = session.usage()
+    print(f"LLM tokens: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion "
+          f"in {usage['calls']} calls (est. cost ${usage['cost']:.4f}, budget mode: {usage['mode']})")
+    if usage["grades"]:
+        print(f"Answers graded without the LLM: {usage['local_grades']}/{usage['grades']}")
+    
+    if session.timings:
+        print("\nStreaming timings (seconds):")
+        for node, t in session.timings.summary().items():
+            ttft = f"{t['ttft_avg']:.2f}" if t['ttft_avg'] is not None else "n/a"
+            print(f"  {node}: first token {ttft}, total {t['total_avg']:.2f} ({t['calls']} calls)")
+
 except Exception as e:
     print(f"\n❌ Error: {str(e)}")
     import traceback
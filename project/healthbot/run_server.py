@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+HealthBot - Multi-Session Server
+Compiles the async workflow once and serves many concurrent patient
+sessions over HTTP and WebSocket (see src/server.py for the endpoints)
+
+Usage:
+    python run_server.py [--host 127.0.0.1] [--port 8080] [--offline]
+
+Sessions are keyed by thread_id and resumed from the checkpointer; set
+HEALTHBOT_CHECKPOINTER=sqlite to keep them across restarts. --offline serves
+the fake LLM and search client (no API keys needed). HEALTHBOT_CASSETTE=record
+or replay records or replays LLM and search calls (see src/cassette.py).
+"""
+
+import sys
+import os
+import argparse
+
+# Add src to path
+src_path = os.path.join(os.path.dirname(__file__), 'src')
+sys.path.insert(0, src_path)
+
+# Load environment once - .env is at project root (up 2 levels from this file)
+from environment import load_environment
+load_environment()
+
+parser = argparse.ArgumentParser(description="HealthBot multi-session server")
+parser.add_argument("--host", default=os.getenv("HEALTHBOT_SERVER_HOST", "127.0.0.1"))
+parser.add_argument("--port", type=int, default=int(os.getenv("HEALTHBOT_SERVER_PORT", 8080)))
+parser.add_argument("--offline", action="store_true", help="Use the fake LLM and search client")
+args = parser.parse_args()
+
+replay = os.getenv("HEALTHBOT_CASSETTE", "off").lower() == "replay"
+if args.offline:
+    # Keep fake search results out of the shared search cache
+    os.environ["HEALTHBOT_SEARCH_CACHE"] = "off"
+elif not replay:
+    assert os.getenv('FOUNDRY_PROJECT_ENDPOINT'), "Missing FOUNDRY_PROJECT_ENDPOINT"
+    assert os.getenv('FOUNDRY_API_KEY'), "Missing FOUNDRY_API_KEY"
+    assert os.getenv('TAVILY_API_KEY'), "Missing TAVILY_API_KEY"
+
+from aiohttp import web
+from server import create_server_app
+
+if args.offline:
+    from fakes import install_fakes
+    install_fakes()
+
+from cassette import install_cassette_from_env
+install_cassette_from_env()
+
+print("✓ Environment loaded" + (" (offline: fake LLM and search)" if args.offline else ""))
+
+# One compiled graph for every session this process serves
+app = create_server_app()
+print("✓ Workflow compiled")
+
+web.run_app(app, host=args.host, port=args.port)
@@ -0,0 +1,133 @@
+"""
+HealthBot Batch Grading
+Grade a cohort of quiz answers in one call, using the same prompt and
+GRADE/EXPLANATION parser as the evaluate_answer node. Multiple-choice answers
+with an answer key are graded locally, like in the node.
+"""
+
+from llm_config import get_llm
+from nodes import build_grading_prompt, parse_grading_response, parse_choice, grade_choice
+
+# Grading requests in flight at once
+DEFAULT_MAX_CONCURRENCY = 16
+
+RECORD_FIELDS = ("topic", "summary", "question", "answer")
+
+
+def _normalize_record(record):
+    """Accept a dict or a (topic, summary, question, answer[, answer_key]) tuple"""
+    if isinstance(record, dict):
+        normalized = {field: record.get(field) for field in RECORD_FIELDS}
+        normalized["answer_key"] = record.get("answer_key")
+        return normalized
+    normalized = dict(zip(RECORD_FIELDS, record))
+    normalized["answer_key"] = record[len(RECORD_FIELDS)] if len(record) > len(RECORD_FIELDS) else None
+    return normalized
+
+
+def _prepare(records):
+    """
+    Build grading prompts for the valid free-text records
+    
+    Returns:
+        Tuple (results, prompts, positions): results is pre-filled with an
+        error entry for each invalid record and the grade of each
+        multiple-choice answer, and prompts[i] belongs to results[positions[i]]
+    """
+    results = []
+    prompts = []
+    positions = []
+    
+    for record in records:
+        record = _normalize_record(record)
+        if not all([record["answer"], record["question"], record["summary"]]):
+            results.append(_result(record, error="Missing required fields for evaluation"))
+            continue
+        choice = parse_choice(record["answer"], record["answer_key"])
+        if choice is not None:
+            grade, feedback = grade_choice(choice, record["answer_key"])
+            results.append(_result(record, grade, feedback, graded_by="local"))
+            continue
+        positions.append(len(results))
+        prompts.append(build_grading_prompt(
+            record["topic"], record["summary"], record["question"], record["answer"]
+        ))
+        results.append(_result(record, graded_by="llm"))
+    
+    return results, prompts, positions
+
+
+def _result(record, grade=None, feedback=None, error=None, graded_by=None):
+    return {**record, "grade": grade, "feedback": feedback, "error": error, "graded_by": graded_by}
+
+
+def _collect(results, positions, responses):
+    """Parse model responses into their result slots (errors stay per item)"""
+    for position, response in zip(positions, responses):
+        result = results[position]
+        if isinstance(response, Exception):
+            result["error"] = f"{type(response).__name__}: {response}"
+            continue
+        try:
+            result["grade"], result["feedback"] = parse_grading_response(response.content)
+        except Exception as e:
+            result["error"] = f"Error parsing grade: {str(e)}"
+    return results
+
+
+def grade_answers(records, max_concurrency=DEFAULT_MAX_CONCURRENCY, llm=None):
+    """
+    Grade many quiz answers with bounded concurrency
+    
+    Args:
+        records: Iterable of dicts (or tuples) with topic, summary, question,
+            answer and optionally answer_key (see nodes.parse_quiz_response)
+        max_concurrency: Maximum grading requests in flight
+        llm: Chat model to use (defaults to the "grade" profile client)
+    
+    Returns:
+        List of result dicts in input order, each the record plus grade,
+        feedback, error (None on success; grade/feedback None on error) and
+        graded_by ('local' for multiple-choice answers, 'llm' otherwise)
+    """
+    results, prompts, positions = _prepare(records)
+    if prompts:
+        llm = llm or get_llm("grade")
+        responses = llm.batch(
+            prompts, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        )
+        _collect(results, positions, responses)
+    return results
+
+
+async def agrade_answers(records, max_concurrency=DEFAULT_MAX_CONCURRENCY, llm=None):
+    """Async version of grade_answers()"""
+    results, prompts, positions = _prepare(records)
+    if prompts:
+        llm = llm or get_llm("grade")
+        responses = await llm.abatch(
+            prompts, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        )
+        _collect(results, positions, responses)
+    return results
+
+
+def summarize_grades(results):
+    """
+    Cohort summary of batch grading results
+    
+    Returns:
+        Dict with graded, failed, average_grade (None if nothing graded),
+        local_graded and local_rate (share of graded answers that skipped
+        the LLM)
+    """
+    graded = [r for r in results if r["error"] is None]
+    grades = [r["grade"] for r in graded]
+    local = sum(1 for r in graded if r["graded_by"] == "local")
+    return {
+        "graded": len(grades),
+        "failed": len(results) - len(grades),
+        "average_grade": sum(grades) / len(grades) if grades else None,
+        "local_graded": local,
+        "local_rate": local / len(grades) if grades else None,
+    }
@@ -0,0 +1,349 @@
+"""
+HealthBot Token Budget
+Per-session and per-day token accounting with a cost estimate, and budget
+modes that move the graph to cheaper paths as a budget runs out
+"""
+
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from cache import get_cache_path
+from history import CHARS_PER_TOKEN
+
+# Budget modes, from most to least expensive
+NORMAL = "normal"
+ECONOMY = "economy"      # Near a budget: shorter prompts and completions
+EXHAUSTED = "exhausted"  # Budget used up: cached or local results, no LLM call
+
+# Days of totals kept by the daily ledger, and how often each process
+# syncs its totals with the other processes sharing the cache file
+LEDGER_DAYS = 7
+LEDGER_SYNC_SECONDS = 1.0
+
+# Topics with their own totals in State.token_usage (oldest are dropped)
+TOKEN_USAGE_MAX_TOPICS = 20
+
+
+class BudgetPolicy:
+    """
+    Token budgets and prices
+    
+    session_tokens and daily_tokens bound prompt + completion tokens per
+    session and per UTC day across all sessions (of every process sharing
+    the cache directory, see DailyTokenLedger); None or 0 means no bound.
+    Once usage reaches economy_at (a fraction of a budget) the graph
+    switches to economy mode. Prices are per 1000 tokens and only feed the
+    cost estimate.
+    """
+    
+    def __init__(
+        self,
+        session_tokens=None,
+        daily_tokens=None,
+        economy_at=0.8,
+        prompt_cost_per_1k=0.0,
+        completion_cost_per_1k=0.0,
+    ):
+        self.session_tokens = session_tokens or None
+        self.daily_tokens = daily_tokens or None
+        self.economy_at = economy_at
+        self.prompt_cost_per_1k = prompt_cost_per_1k
+        self.completion_cost_per_1k = completion_cost_per_1k
+    
+    @classmethod
+    def from_env(cls):
+        """Policy from HEALTHBOT_SESSION_TOKEN_BUDGET, _DAILY_TOKEN_BUDGET etc."""
+        return cls(
+            session_tokens=int(os.getenv("HEALTHBOT_SESSION_TOKEN_BUDGET", 0)),
+            daily_tokens=int(os.getenv("HEALTHBOT_DAILY_TOKEN_BUDGET", 0)),
+            economy_at=float(os.getenv("HEALTHBOT_BUDGET_ECONOMY_AT", 0.8)),
+            prompt_cost_per_1k=float(os.getenv("HEALTHBOT_PROMPT_COST_PER_1K", 0)),
+            completion_cost_per_1k=float(os.getenv("HEALTHBOT_COMPLETION_COST_PER_1K", 0)),
+        )
+
+
+_policy = BudgetPolicy.from_env()
+
+
+def get_budget_policy():
+    """Return the process-wide budget policy"""
+    return _policy
+
+
+def set_budget_policy(policy):
+    """
+    Replace the process-wide budget policy
+    
+    Args:
+        policy: BudgetPolicy (BudgetPolicy() sets no budgets)
+    """
+    global _policy
+    _policy = policy
+
+
+class DailyTokenLedger:
+    """
+    Tokens used per UTC day by every session
+    
+    With a path, the totals are kept in that SQLite file (the cache file by
+    default), so they survive restarts and are shared by every process
+    using it, such as the workers of one server. Each process adds tokens in
+    memory and syncs with the file at most every sync_interval seconds, so
+    together the processes can overshoot a daily budget by about one
+    interval of spend. Without a path the totals are per process.
+    """
+    
+    def __init__(self, days=LEDGER_DAYS, path=None, sync_interval=LEDGER_SYNC_SECONDS):
+        """
+        Args:
+            days: Days of totals kept
+            path: SQLite file shared by the processes, or None (memory only)
+            sync_interval: Seconds between syncs with the file
+        """
+        self.days = days
+        self.path = path
+        self.sync_interval = sync_interval
+        self._totals = {}   # day -> tokens (as of the last sync plus pending)
+        self._pending = {}  # day -> tokens not written to the file yet
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_ledger (day TEXT PRIMARY KEY, tokens INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+            with self._lock:
+                self._sync()
+    
+    @staticmethod
+    def today():
+        return datetime.now(timezone.utc).date().isoformat()
+    
+    def _sync(self):
+        """Write pending tokens and read every process's totals (the caller holds the lock)"""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO token_ledger (day, tokens) VALUES (?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET tokens = tokens + excluded.tokens",
+                list(self._pending.items()),
+            )
+            self._conn.execute(
+                "DELETE FROM token_ledger WHERE day NOT IN "
+                "(SELECT day FROM token_ledger ORDER BY day DESC LIMIT ?)",
+                (self.days,),
+            )
+            self._totals = dict(self._conn.execute("SELECT day, tokens FROM token_ledger"))
+        self._pending.clear()
+        self._synced_at = time.monotonic()
+    
+    def _maybe_sync(self):
+        if self._conn is not None and time.monotonic() - self._synced_at >= self.sync_interval:
+            self._sync()
+    
+    def add(self, tokens, day=None):
+        """Add tokens to a day's total (today by default)"""
+        day = day or self.today()
+        with self._lock:
+            self._totals[day] = self._totals.get(day, 0) + tokens
+            if self._conn is not None:
+                self._pending[day] = self._pending.get(day, 0) + tokens
+            for old in sorted(self._totals)[:-self.days]:
+                del self._totals[old]
+            self._maybe_sync()
+    
+    def used(self, day=None):
+        """Tokens used on a day (today by default)"""
+        with self._lock:
+            self._maybe_sync()
+            return self._totals.get(day or self.today(), 0)
+    
+    def flush(self):
+        """Write pending tokens to the file now"""
+        with self._lock:
+            if self._conn is not None:
+                self._sync()
+    
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+            self._pending.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM token_ledger")
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_daily_ledger():
+    """
+    Return the process-wide daily token ledger, creating it on first use
+    
+    Kept in the cache SQLite file (shared by the processes using the same
+    HEALTHBOT_CACHE_DIR); HEALTHBOT_DAILY_LEDGER=memory keeps it per process.
+    """
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                memory = os.getenv("HEALTHBOT_DAILY_LEDGER", "").lower() == "memory"
+                _ledger = DailyTokenLedger(path=None if memory else get_cache_path())
+                atexit.register(_ledger.flush)
+    return _ledger
+
+
+# ----------------------------------------------------------------------
+# Accounting
+# ----------------------------------------------------------------------
+
+def estimate_text_tokens(text):
+    """Approximate token count of a text (no tokenizer)"""
+    return len(text or "") // CHARS_PER_TOKEN
+
+
+def response_usage(response, prompt=None):
+    """
+    Prompt and completion tokens of one chat model call
+    
+    Uses the provider's usage_metadata; falls back to estimating from the
+    prompt and response text when the provider reports none.
+    
+    Returns:
+        Tuple (prompt_tokens, completion_tokens)
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    return estimate_text_tokens(prompt), estimate_text_tokens(str(response.content))
+
+
+def usage_update(topic, prompt_tokens, completion_tokens):
+    """
+    State update that adds one LLM call to the session's token usage
+    
+    Also adds the tokens to today's total in the daily ledger.
+    
+    Args:
+        topic: Health topic the call was made for (per-topic totals)
+        prompt_tokens: Prompt tokens used
+        completion_tokens: Completion tokens used
+    
+    Returns:
+        Partial state update for State.token_usage (summed by its reducer)
+    """
+    get_daily_ledger().add(prompt_tokens + completion_tokens)
+    return session_usage_update(topic, prompt_tokens, completion_tokens)
+
+
+def session_usage_update(topic, prompt_tokens, completion_tokens):
+    """
+    Like usage_update, for a call already added to the daily ledger
+    
+    Background calls (speculation.py) charge the ledger when they finish and
+    the session when a node next collects them.
+    """
+    call = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "calls": 1}
+    return {"token_usage": {**call, "topics": {topic or "": dict(call)}}}
+
+
+def _sum_counts(left, right):
+    merged = dict(left or {})
+    for key, value in right.items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def merge_token_usage(left, right):
+    """
+    State.token_usage reducer: sum the counters
+    
+    Session totals cover the whole session; per-topic totals are kept for
+    the TOKEN_USAGE_MAX_TOPICS most recently used topics so the state stays
+    bounded over long sessions.
+    """
+    left = left or {}
+    right = dict(right or {})
+    right_topics = right.pop("topics", {})
+    
+    merged = _sum_counts({k: v for k, v in left.items() if k != "topics"}, right)
+    topics = dict(left.get("topics", {}))
+    for topic, counts in right_topics.items():
+        topics[topic] = _sum_counts(topics.pop(topic, None), counts)  # Most recent last
+    merged["topics"] = dict(list(topics.items())[-TOKEN_USAGE_MAX_TOPICS:])
+    return merged
+
+
+def session_tokens(state):
+    """Prompt + completion tokens used so far in a session"""
+    usage = state.get("token_usage") or {}
+    return usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+
+
+def budget_mode(state, policy=None):
+    """
+    Budget mode for a session's next LLM call
+    
+    Args:
+        state: Session state (reads token_usage)
+        policy: BudgetPolicy (defaults to the process-wide one)
+    
+    Returns:
+        NORMAL, ECONOMY or EXHAUSTED, whichever budget is closest to its limit
+    """
+    policy = policy or _policy
+    ratios = []
+    if policy.session_tokens:
+        ratios.append(session_tokens(state) / policy.session_tokens)
+    if policy.daily_tokens:
+        ratios.append(get_daily_ledger().used() / policy.daily_tokens)
+    
+    used = max(ratios, default=0.0)
+    if used >= 1.0:
+        return EXHAUSTED
+    if used >= policy.economy_at:
+        return ECONOMY
+    return NORMAL
+
+
+def estimate_cost(usage, policy=None):
+    """Cost of a token_usage dict (or one of its topics) at the policy's prices"""
+    policy = policy or _policy
+    return (
+        usage.get("prompt_tokens", 0) * policy.prompt_cost_per_1k
+        + usage.get("completion_tokens", 0) * policy.completion_cost_per_1k
+    ) / 1000
+
+
+def usage_report(state, policy=None):
+    """
+    Token and cost summary for a session
+    
+    Returns:
+        Dict with session totals (prompt_tokens, completion_tokens, calls,
+        cost), grades and the share graded without the LLM, per-topic totals,
+        tokens used today and the current mode
+    """
+    policy = policy or _policy
+    usage = state.get("token_usage") or {}
+    totals = {k: usage.get(k, 0) for k in ("prompt_tokens", "completion_tokens", "calls")}
+    grades = usage.get("grades", 0)
+    return {
+        **totals,
+        "cost": estimate_cost(totals, policy),
+        "grades": grades,
+        "local_grades": usage.get("local_grades", 0),
+        "local_grade_rate": usage.get("local_grades", 0) / grades if grades else None,
+        "topics": {
+            topic: {**counts, "cost": estimate_cost(counts, policy)}
+            for topic, counts in usage.get("topics", {}).items()
+        },
+        "daily_tokens": get_daily_ledger().used(),
+        "mode": budget_mode(state, policy),
+    }
@@ -0,0 +1,597 @@
+"""
+HealthBot Caches
+Two-tier (in-memory LRU + SQLite) cache with per-entry TTL and
+stale-while-revalidate refresh, used for Tavily search results and
+content-addressed patient-friendly summaries
+"""
+
+import os
+import re
+import json
+import hashlib
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import record_cache
+
+
+# Default cache location: project/healthbot/.cache/
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"
+)
+
+# Entry states returned by TieredCache.lookup()
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+# Summary store size bound (entries on disk; least recently used evicted)
+SUMMARY_STORE_MAX_ENTRIES = 1000
+SUMMARY_STORE_MEMORY_ENTRIES = 512  # Capped at the disk bound
+
+# Disk tier last_access updates are written in batches of this many keys
+TOUCH_BATCH = 64
+
+_summary_store = None
+_summary_store_lock = threading.Lock()
+
+
+def get_cache_dir():
+    """Return the cache directory (HEALTHBOT_CACHE_DIR or project default)"""
+    return os.getenv("HEALTHBOT_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+
+def get_cache_path(filename="healthbot_cache.sqlite"):
+    """Return the SQLite file used by the disk tier, creating its directory"""
+    cache_dir = get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, filename)
+
+
+def normalize_topic(topic):
+    """
+    Normalize a health topic for cache keys and tags
+    
+    Lowercases, collapses whitespace and strips surrounding punctuation so
+    "Diabetes", " diabetes " and "diabetes?" share one entry.
+    """
+    topic = re.sub(r"\s+", " ", (topic or "").strip().lower())
+    return topic.strip(" .,;:!?\"'")
+
+
+class TieredCache:
+    """
+    Key/value cache with an in-memory LRU tier over a SQLite disk tier
+    
+    - Entries carry their own TTL. Once expired they stay servable as
+      "stale" for another stale_ttl seconds while a background refresh runs
+      (stale-while-revalidate); after that they are treated as misses, but
+      stay on disk (until evicted) for last_value().
+    - Values must be JSON-serializable.
+    - An optional tag per entry (e.g. the topic) allows bulk invalidation.
+    - Hits in either tier count as an access for the disk tier's LRU
+      eviction; the last_access updates are written in batches.
+    - Safe to share between threads. The async methods answer memory hits
+      on the event loop and run SQLite work in worker threads.
+    """
+    
+    def __init__(
+        self,
+        name,
+        path=None,
+        max_memory_entries=256,
+        max_disk_entries=10000,
+        default_ttl=None,
+        stale_ttl=0,
+    ):
+        """
+        Args:
+            name: Cache name (used as the SQLite table name)
+            path: SQLite file path, or None for a memory-only cache
+            max_memory_entries: LRU size of the in-memory tier
+            max_disk_entries: Row limit of the disk tier (least recently used evicted)
+            default_ttl: Seconds an entry stays fresh (None = never expires)
+            stale_ttl: Extra seconds an expired entry may be served while refreshing
+        """
+        self.name = name
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        
+        self._memory = OrderedDict()  # key -> (value, expires_at, tag)
+        self._touched = {}  # key -> last access not yet written to disk
+        self._lock = threading.RLock()
+        self._refreshing = set()
+        self._refresh_pool = None
+        self._refresh_tasks = set()  # Keeps async refresh tasks referenced
+        self._conn = None
+        
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+        
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.name} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, tag TEXT, "
+                "created_at REAL NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.name}_tag ON {self.name} (tag)"
+            )
+            self._conn.commit()
+    
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    
+    def _state(self, expires_at, now):
+        if expires_at is None or now < expires_at:
+            return FRESH
+        if now < expires_at + self.stale_ttl:
+            return STALE
+        return MISS
+    
+    def _remember(self, key, value, expires_at, tag):
+        """Put an entry in the memory tier, evicting the least recently used"""
+        self._memory[key] = (value, expires_at, tag)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+    
+    def _touch(self, key, now):
+        """Record an access to key for the disk tier (written by _flush_touches)"""
+        if self._conn is not None:
+            self._touched[key] = now
+    
+    def _touches_full(self):
+        return len(self._touched) >= TOUCH_BATCH
+    
+    def _flush_touches(self):
+        """Write pending last_access updates (the caller commits)"""
+        if self._touched:
+            self._conn.executemany(
+                f"UPDATE {self.name} SET last_access = ? WHERE key = ?",
+                [(at, key) for key, at in self._touched.items()],
+            )
+            self._touched.clear()
+    
+    def _write_touches(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+    
+    def _memory_lookup(self, key, now):
+        """Memory tier part of lookup (no I/O); None when the disk must be checked"""
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        value, expires_at, tag = entry
+        state = self._state(expires_at, now)
+        if state == MISS:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        self._touch(key, now)
+        self._counters["stale_hits" if state == STALE else "memory_hits"] += 1
+        record_cache(self.name, True)
+        return value, state
+    
+    def _prune_disk(self):
+        # Evict by up-to-date access times
+        self._flush_touches()
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.name} WHERE key IN ("
+                f"SELECT key FROM {self.name} ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            self._counters["evictions"] += excess
+    
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    
+    def lookup(self, key):
+        """
+        Look up a key in memory, then on disk
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Tuple (value, state) where state is 'fresh', 'stale' or 'miss'
+        """
+        now = time.time()
+        with self._lock:
+            hit = self._memory_lookup(key, now)
+            if hit is not None:
+                if self._touches_full():
+                    self._write_touches()
+                return hit
+            
+            if self._conn is not None:
+                row = self._conn.execute(
+                    f"SELECT value, expires_at, tag FROM {self.name} WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None:
+                    state = self._state(row[1], now)
+                    if state != MISS:
+                        value = json.loads(row[0])
+                        self._touch(key, now)
+                        if self._touches_full():
+                            self._write_touches()
+                        self._remember(key, value, row[1], row[2])
+                        self._counters["stale_hits" if state == STALE else "disk_hits"] += 1
+                        record_cache(self.name, True)
+                        return value, state
+            
+            self._counters["misses"] += 1
+            record_cache(self.name, False)
+            return None, MISS
+    
+    async def alookup(self, key):
+        """
+        Async version of lookup
+        
+        A memory hit is answered on the event loop. Disk lookups, and
+        lookups that would have to wait for another thread's disk I/O to
+        release the lock, run in a worker thread so the loop keeps serving
+        other sessions meanwhile.
+        """
+        if self._conn is None:
+            return self.lookup(key)
+        if self._lock.acquire(blocking=False):
+            try:
+                hit = self._memory_lookup(key, time.time())
+                flush = hit is not None and self._touches_full()
+            finally:
+                self._lock.release()
+            if hit is not None:
+                if flush:
+                    await asyncio.to_thread(self._write_touches)
+                return hit
+        return await asyncio.to_thread(self.lookup, key)
+    
+    def get(self, key, default=None):
+        """Return a fresh or stale value, or default on a miss"""
+        value, state = self.lookup(key)
+        return default if state == MISS else value
+    
+    async def aget(self, key, default=None):
+        """Async version of get"""
+        value, state = await self.alookup(key)
+        return default if state == MISS else value
+    
+    def last_value(self, key, default=None):
+        """
+        Return the last stored value for a key, however old
+        
+        For use when the source is unavailable (see resilience.py); not
+        counted as a hit or miss.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                return entry[0]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    f"SELECT value FROM {self.name} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    return json.loads(row[0])
+        return default
+    
+    def set(self, key, value, ttl=None, tag=None):
+        """
+        Store a value in both tiers
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Seconds the entry stays fresh (defaults to default_ttl)
+            tag: Optional tag for invalidate_tag()
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        
+        with self._lock:
+            self._remember(key, value, expires_at, tag)
+            if self._conn is not None:
+                self._touched.pop(key, None)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.name} "
+                    "(key, value, tag, created_at, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, json.dumps(value), tag, now, expires_at, now),
+                )
+                if self.max_disk_entries:
+                    self._prune_disk()
+                self._conn.commit()
+            self._counters["sets"] += 1
+    
+    async def aset(self, key, value, ttl=None, tag=None):
+        """Async version of set; the disk write runs in a worker thread"""
+        if self._conn is None:
+            self.set(key, value, ttl=ttl, tag=tag)
+        else:
+            await asyncio.to_thread(self.set, key, value, ttl, tag)
+    
+    def get_or_compute(self, key, compute, ttl=None, tag=None, cacheable=None):
+        """
+        Return the cached value, computing and storing it on a miss
+        
+        A stale entry is returned immediately and refreshed in the background.
+        
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+            ttl: Entry TTL in seconds (defaults to default_ttl)
+            tag: Optional tag for invalidate_tag()
+            cacheable: Optional predicate; values failing it are not stored
+        
+        Returns:
+            Cached or freshly computed value
+        """
+        value, state = self.lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self._schedule_refresh(key, compute, ttl, tag, cacheable)
+            return value
+        
+        value = compute()
+        if cacheable is None or cacheable(value):
+            self.set(key, value, ttl=ttl, tag=tag)
+        return value
+    
+    async def aget_or_compute(self, key, acompute, ttl=None, tag=None, cacheable=None):
+        """
+        Async version of get_or_compute
+        
+        Args:
+            key: Cache key
+            acompute: Zero-argument callable returning an awaitable value
+            ttl: Entry TTL in seconds (defaults to default_ttl)
+            tag: Optional tag for invalidate_tag()
+            cacheable: Optional predicate; values failing it are not stored
+        
+        Returns:
+            Cached or freshly computed value
+        """
+        value, state = await self.alookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self._schedule_arefresh(key, acompute, ttl, tag, cacheable)
+            return value
+        
+        value = await acompute()
+        if cacheable is None or cacheable(value):
+            await self.aset(key, value, ttl=ttl, tag=tag)
+        return value
+    
+    def _schedule_arefresh(self, key, acompute, ttl, tag, cacheable):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        
+        async def refresh():
+            try:
+                value = await acompute()
+                if cacheable is None or cacheable(value):
+                    await self.aset(key, value, ttl=ttl, tag=tag)
+                self._counters["refreshes"] += 1
+            except Exception:
+                self._counters["refresh_errors"] += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+    
+    def _schedule_refresh(self, key, compute, ttl, tag, cacheable):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix=f"{self.name}-refresh"
+                )
+        
+        def refresh():
+            try:
+                value = compute()
+                if cacheable is None or cacheable(value):
+                    self.set(key, value, ttl=ttl, tag=tag)
+                self._counters["refreshes"] += 1
+            except Exception:
+                # Keep serving the stale entry; the next lookup retries
+                self._counters["refresh_errors"] += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        
+        self._refresh_pool.submit(refresh)
+    
+    def invalidate(self, key):
+        """Remove a single key from both tiers"""
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+                self._conn.commit()
+    
+    def invalidate_tag(self, tag, subtags=False):
+        """
+        Remove every entry stored with the given tag
+        
+        Args:
+            tag: Tag to remove
+            subtags: Also remove entries tagged "<tag>|..." (see summary_tag)
+        
+        Returns:
+            Number of entries removed
+        """
+        prefix = f"{tag}|"
+        
+        def tagged(entry_tag):
+            return entry_tag == tag or (subtags and (entry_tag or "").startswith(prefix))
+        
+        with self._lock:
+            keys = [k for k, entry in self._memory.items() if tagged(entry[2])]
+            for k in keys:
+                del self._memory[k]
+            removed = len(keys)
+            if self._conn is not None:
+                if subtags:
+                    cursor = self._conn.execute(
+                        f"DELETE FROM {self.name} WHERE tag = ? OR substr(tag, 1, ?) = ?",
+                        (tag, len(prefix), prefix),
+                    )
+                else:
+                    cursor = self._conn.execute(
+                        f"DELETE FROM {self.name} WHERE tag = ?", (tag,)
+                    )
+                self._conn.commit()
+                removed = max(removed, cursor.rowcount)
+            return removed
+    
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._conn is not None:
+                self._conn.execute(f"DELETE FROM {self.name}")
+                self._conn.commit()
+    
+    def stats(self):
+        """
+        Report hit/miss counters and tier sizes
+        
+        Returns:
+            Dict of counters plus memory_entries, disk_entries and hit_rate
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = 0
+            if self._conn is not None:
+                stats["disk_entries"] = self._conn.execute(
+                    f"SELECT COUNT(*) FROM {self.name}"
+                ).fetchone()[0]
+        
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["stale_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = (hits / lookups) if lookups else 0.0
+        return stats
+
+
+# ============================================================================
+# Content-addressed summary store
+# ============================================================================
+
+def get_summary_store():
+    """
+    Return the process-wide summary store, creating it on first use
+    
+    Summaries never expire (they are fully determined by their key); the
+    store is bounded by HEALTHBOT_SUMMARY_CACHE_MAX_ENTRIES and can be
+    disabled with HEALTHBOT_SUMMARY_CACHE=off.
+    
+    Returns:
+        TieredCache, or None when the store is disabled
+    """
+    global _summary_store
+    
+    if os.getenv("HEALTHBOT_SUMMARY_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    
+    if _summary_store is None:
+        with _summary_store_lock:
+            if _summary_store is None:
+                max_entries = int(os.getenv(
+                    "HEALTHBOT_SUMMARY_CACHE_MAX_ENTRIES", SUMMARY_STORE_MAX_ENTRIES
+                ))
+                _summary_store = TieredCache(
+                    "summaries",
+                    path=get_cache_path(),
+                    # The memory tier never holds more than the configured bound
+                    max_memory_entries=(
+                        min(SUMMARY_STORE_MEMORY_ENTRIES, max_entries) if max_entries > 0
+                        else SUMMARY_STORE_MEMORY_ENTRIES
+                    ),
+                    max_disk_entries=max_entries,
+                )
+    return _summary_store
+
+
+def summary_cache_key(topic, search_results, prompt_version, model):
+    """
+    Content address of a summary
+    
+    Args:
+        topic: Health topic (normalized before hashing)
+        search_results: Formatted search results fed to the prompt
+        prompt_version: Hash of the summarization prompt template
+        model: Model name the summary was generated with
+    
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        [normalize_topic(topic), search_results, prompt_version, model],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def summary_tag(topic, search_results):
+    """
+    Tag of a stored summary: the normalized topic and a hash of the search
+    results it was generated from ("topic|<hash>"), so offline tools can pair
+    summaries with the exact result set (see topic_index.cached_topic_entries)
+    """
+    digest = hashlib.sha256((search_results or "").encode("utf-8")).hexdigest()[:16]
+    return f"{normalize_topic(topic)}|{digest}"
+
+
+def invalidate_summaries(topic):
+    """
+    Drop every stored summary for a topic
+    
+    Args:
+        topic: Health topic (any casing/spacing)
+    
+    Returns:
+        Number of summaries removed
+    """
+    store = get_summary_store()
+    if store is None:
+        return 0
+    return store.invalidate_tag(normalize_topic(topic), subtags=True)
@@ -0,0 +1,389 @@
+"""
+HealthBot Cassettes
+Record every LLM call and search request made by the nodes and tools to a
+compact cassette file, and replay them later with no network (with the
+recorded latency, or none), to profile the graph on real traffic for free
+"""
+
+import os
+import gzip
+import json
+import time
+import atexit
+import asyncio
+import hashlib
+import threading
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import llm_config
+import tools
+from cache import get_cache_path
+
+# Modes (HEALTHBOT_CASSETTE)
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+# Replay latency (HEALTHBOT_CASSETTE_LATENCY)
+ORIGINAL = "original"  # Sleep as long as the recorded call took
+ZERO = "zero"          # Answer at once (measures the graph's own overhead)
+
+CASSETTE_FORMAT = 1
+DEFAULT_CASSETTE_FILE = "healthbot.cassette.gz"
+
+# Entry kinds
+LLM = "llm"
+SEARCH = "search"
+
+
+class CassetteMiss(KeyError):
+    """A replayed call that is not on the cassette (not retried, see resilience.is_retryable)"""
+
+
+def _scalars(kwargs):
+    """Call options that change the response (bound max_tokens, stop, ...)"""
+    return {k: v for k, v in sorted(kwargs.items()) if isinstance(v, (str, int, float, bool, type(None), list))}
+
+
+def llm_key(messages, stop=None, **kwargs):
+    """Cassette key of a chat model call: prompt messages plus call options"""
+    payload = {
+        "messages": [[m.type, m.content] for m in messages],
+        "stop": stop,
+        "options": _scalars(kwargs),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:24]
+
+
+def search_key(query, **kwargs):
+    """Cassette key of a search request: query plus request options"""
+    payload = {"query": query, "options": _scalars(kwargs)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+
+def _message_record(message):
+    """JSON-safe fields of a chat model response"""
+    metadata = {
+        k: v for k, v in (message.response_metadata or {}).items()
+        if k in ("model_name", "finish_reason", "system_fingerprint")
+    }
+    return {"content": message.content, "usage": message.usage_metadata, "metadata": metadata}
+
+
+class Cassette:
+    """
+    Recorded LLM calls and search requests
+    
+    The file is gzip-compressed JSON lines: a header, then one entry per
+    call with its kind, key (hash of the request), latency, time to first
+    token (streamed LLM calls) and response. Requests are stored only as
+    hashes, so a cassette holds no prompts.
+    
+    Calls with the same key are replayed in recorded order; once they run
+    out the last response is repeated. Thread-safe.
+    """
+    
+    def __init__(self, path, mode=REPLAY, latency=ORIGINAL):
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._entries = {}  # (kind, key) -> [entry, ...]
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._file = None
+        # Calls recorded or replayed, in total and per kind
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0, LLM: 0, SEARCH: 0}
+        
+        if mode == REPLAY:
+            self._load()
+        elif mode == RECORD:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+            self._file.write(json.dumps({"cassette": CASSETTE_FORMAT, "created": time.time()}) + "\n")
+            atexit.register(self.close)
+    
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("cassette") != CASSETTE_FORMAT:
+                raise ValueError(f"Unsupported cassette format in {self.path}: {header}")
+            for line in f:
+                entry = json.loads(line)
+                self._entries.setdefault((entry["kind"], entry["key"]), []).append(entry)
+    
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+    
+    def record(self, kind, key, response, seconds, first_token=None):
+        entry = {"kind": kind, "key": key, "seconds": round(seconds, 4), "response": response}
+        if first_token is not None:
+            entry["first_token"] = round(first_token, 4)
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._entries.setdefault((kind, key), []).append(entry)
+            self.stats["recorded"] += 1
+            self.stats[kind] += 1
+            if self._file is not None:
+                self._file.write(line)
+    
+    def lookup(self, kind, key):
+        """
+        Next recorded entry for a request
+        
+        Raises:
+            CassetteMiss: The request was not recorded
+        """
+        with self._lock:
+            entries = self._entries.get((kind, key))
+            if not entries:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"{kind} request {key} is not on cassette {self.path}")
+            cursor = self._cursors.get((kind, key), 0)
+            self._cursors[(kind, key)] = cursor + 1
+            self.stats["replayed"] += 1
+            self.stats[kind] += 1
+            return entries[min(cursor, len(entries) - 1)]
+    
+    def delay(self, seconds):
+        """Seconds to wait when replaying a call that took this long"""
+        return seconds if self.latency == ORIGINAL else 0.0
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CassetteChatModel(BaseChatModel):
+    """
+    Chat model that records another model's calls, or replays them
+    
+    Record mode (inner set) calls the inner model's generate/stream methods
+    directly, so callbacks and token streaming see a single model run.
+    Replay mode (no inner) answers from the cassette, streaming the recorded
+    text in word chunks.
+    """
+    
+    cassette: Any
+    inner: Optional[BaseChatModel] = None
+    model_name: str = "cassette"  # Recorded model's name (summary cache keys)
+    
+    @property
+    def _llm_type(self) -> str:
+        return "healthbot-cassette"
+    
+    # ------------------------------------------------------------------
+    # Replay
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _replayed(entry):
+        response = entry["response"]
+        return AIMessage(
+            content=response["content"],
+            usage_metadata=response.get("usage"),
+            response_metadata=response.get("metadata") or {},
+        )
+    
+    @staticmethod
+    def _chunks(entry):
+        """Recorded text as word chunks; usage rides on the last one"""
+        response = entry["response"]
+        words = response["content"].split(" ")
+        chunks = [AIMessageChunk(content=w if i == len(words) - 1 else w + " ") for i, w in enumerate(words)]
+        chunks.append(AIMessageChunk(content="", usage_metadata=response.get("usage")))
+        return chunks
+    
+    def _stream_delays(self, entry, count):
+        """(before first chunk, between chunks) for a replayed stream"""
+        total = self.cassette.delay(entry["seconds"])
+        first = min(total, self.cassette.delay(entry.get("first_token", entry["seconds"])))
+        return first, (total - first) / max(1, count - 1)
+    
+    # ------------------------------------------------------------------
+    # BaseChatModel
+    # ------------------------------------------------------------------
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = llm_key(messages, stop, **kwargs)
+        if self.inner is None:
+            entry = self.cassette.lookup(LLM, key)
+            time.sleep(self.cassette.delay(entry["seconds"]))
+            return ChatResult(generations=[ChatGeneration(message=self._replayed(entry))])
+        
+        start = time.perf_counter()
+        result = self.inner._generate(messages, stop=stop, **kwargs)
+        self.cassette.record(LLM, key, _message_record(result.generations[0].message), time.perf_counter() - start)
+        return result
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = llm_key(messages, stop, **kwargs)
+        if self.inner is None:
+            entry = self.cassette.lookup(LLM, key)
+            await asyncio.sleep(self.cassette.delay(entry["seconds"]))
+            return ChatResult(generations=[ChatGeneration(message=self._replayed(entry))])
+        
+        start = time.perf_counter()
+        result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+        self.cassette.record(LLM, key, _message_record(result.generations[0].message), time.perf_counter() - start)
+        return result
+    
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        key = llm_key(messages, stop, **kwargs)
+        if self.inner is None:
+            entry = self.cassette.lookup(LLM, key)
+            chunks = self._chunks(entry)
+            first, between = self._stream_delays(entry, len(chunks))
+            for i, message in enumerate(chunks):
+                time.sleep(first if i == 0 else between)
+                chunk = ChatGenerationChunk(message=message)
+                if run_manager and message.content:
+                    run_manager.on_llm_new_token(message.content, chunk=chunk)
+                yield chunk
+            return
+        
+        start = time.perf_counter()
+        first_token, merged = None, None
+        for chunk in self.inner._stream(messages, stop=stop, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            merged = chunk if merged is None else merged + chunk
+            if run_manager and chunk.text:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        if merged is not None:
+            self.cassette.record(LLM, key, _message_record(merged.message), time.perf_counter() - start, first_token)
+    
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        key = llm_key(messages, stop, **kwargs)
+        if self.inner is None:
+            entry = self.cassette.lookup(LLM, key)
+            chunks = self._chunks(entry)
+            first, between = self._stream_delays(entry, len(chunks))
+            for i, message in enumerate(chunks):
+                await asyncio.sleep(first if i == 0 else between)
+                chunk = ChatGenerationChunk(message=message)
+                if run_manager and message.content:
+                    await run_manager.on_llm_new_token(message.content, chunk=chunk)
+                yield chunk
+            return
+        
+        start = time.perf_counter()
+        first_token, merged = None, None
+        async for chunk in self.inner._astream(messages, stop=stop, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            merged = chunk if merged is None else merged + chunk
+            if run_manager and chunk.text:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        if merged is not None:
+            self.cassette.record(LLM, key, _message_record(merged.message), time.perf_counter() - start, first_token)
+
+
+class CassetteSearchClient:
+    """Tavily-compatible sync search client that records another client, or replays"""
+    
+    def __init__(self, cassette, inner=None):
+        self.cassette = cassette
+        self.inner = inner
+    
+    def search(self, query, max_results=5, **kwargs):
+        key = search_key(query, max_results=max_results, **kwargs)
+        if self.inner is None:
+            entry = self.cassette.lookup(SEARCH, key)
+            time.sleep(self.cassette.delay(entry["seconds"]))
+            return entry["response"]
+        
+        start = time.perf_counter()
+        response = self.inner.search(query, max_results=max_results, **kwargs)
+        self.cassette.record(SEARCH, key, response, time.perf_counter() - start)
+        return response
+
+
+class AsyncCassetteSearchClient(CassetteSearchClient):
+    """Async counterpart of CassetteSearchClient"""
+    
+    async def search(self, query, max_results=5, **kwargs):
+        key = search_key(query, max_results=max_results, **kwargs)
+        if self.inner is None:
+            entry = self.cassette.lookup(SEARCH, key)
+            await asyncio.sleep(self.cassette.delay(entry["seconds"]))
+            return entry["response"]
+        
+        start = time.perf_counter()
+        response = await self.inner.search(query, max_results=max_results, **kwargs)
+        self.cassette.record(SEARCH, key, response, time.perf_counter() - start)
+        return response
+
+
+def install_cassette(mode, path=None, latency=ORIGINAL):
+    """
+    Route every LLM profile and both search paths through a cassette
+    
+    In record mode the current clients (real ones, built here, or fakes
+    installed earlier) are wrapped; in replay mode no client is built and no
+    credentials are needed.
+    
+    Args:
+        mode: RECORD or REPLAY
+        path: Cassette file (defaults to HEALTHBOT_CASSETTE_PATH, then the
+            cache directory)
+        latency: Replay latency, ORIGINAL or ZERO
+    
+    Returns:
+        The Cassette
+    """
+    if mode not in (RECORD, REPLAY):
+        raise ValueError(f"Unknown cassette mode: {mode}")
+    path = path or os.getenv("HEALTHBOT_CASSETTE_PATH") or get_cache_path(DEFAULT_CASSETTE_FILE)
+    cassette = Cassette(path, mode, latency)
+    
+    registry = llm_config.get_llm_registry()
+    for profile in list(registry.profiles):
+        inner = registry.get(profile) if mode == RECORD else None
+        name = getattr(inner, "model_name", None) or getattr(inner, "model", None) or "cassette"
+        registry.register(profile, CassetteChatModel(cassette=cassette, inner=inner, model_name=name))
+    
+    if mode == RECORD:
+        search, async_search = tools._get_sync_search_client(), tools._get_async_search_client()
+    else:
+        search = async_search = None
+    tools.set_search_clients(
+        CassetteSearchClient(cassette, search),
+        AsyncCassetteSearchClient(cassette, async_search),
+    )
+    return cassette
+
+
+def install_cassette_from_env():
+    """
+    Install a cassette when HEALTHBOT_CASSETTE is 'record' or 'replay'
+    
+    Uses HEALTHBOT_CASSETTE_PATH and HEALTHBOT_CASSETTE_LATENCY (original or
+    zero).
+    
+    Returns:
+        The Cassette, or None when off
+    """
+    mode = os.getenv("HEALTHBOT_CASSETTE", OFF).lower()
+    if mode == OFF:
+        return None
+    return install_cassette(mode, latency=os.getenv("HEALTHBOT_CASSETTE_LATENCY", ORIGINAL).lower())
@@ -0,0 +1,216 @@
+"""
+HealthBot Checkpoint Serializer
+Compact binary serializer for checkpoints: msgpack, with messages reduced to
+their class, content and non-empty fields, and every long string (search
+results, summaries, message text, channel versions) stored once per blob in
+a string table that is zlib-compressed as a whole. Blobs written by the
+default serializer stay readable, so a saver can switch serializers without
+losing sessions.
+"""
+
+import os
+import zlib
+import importlib
+import threading
+from functools import partial
+
+import msgpack
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.serde.jsonplus import (
+    JsonPlusSerializer,
+    _msgpack_default,
+    _msgpack_ext_hook,
+)
+
+# Type stored next to every blob (see SerializerProtocol.dumps_typed)
+COMPACT_TYPE = "healthbot-compact-1"
+
+INTERN_MIN_CHARS = 16      # Shorter strings are written inline
+COMPRESS_MIN_BYTES = 512   # Smaller string tables are not compressed
+COMPRESS_MIN_SAVING = 0.1  # Keep the compressed table only if it saves this much
+COMPRESS_LEVEL = 6
+
+# msgpack extension codes (JsonPlusSerializer uses the ones below 16)
+EXT_REF = 16      # Index into the blob's string table
+EXT_MESSAGE = 17  # [class, content, non-empty fields]
+EXT_ZLIB = 18     # Compressed string table
+
+# Objects other than messages are packed like JsonPlusSerializer packs them
+_pack = partial(msgpack.packb, default=_msgpack_default)
+
+_message_classes = {}
+_refs = []  # index -> EXT_REF ExtType, shared by every blob
+_refs_lock = threading.Lock()
+
+
+def _ref(index):
+    if index >= len(_refs):
+        with _refs_lock:
+            while len(_refs) <= index:
+                i = len(_refs)
+                width = 1 if i < 0x100 else 2 if i < 0x10000 else 4
+                _refs.append(msgpack.ExtType(EXT_REF, i.to_bytes(width, "big")))
+    return _refs[index]
+
+
+def _is_empty(value):
+    """Message fields are left out when empty (every field defaults to one of these)"""
+    # Identity and type checks: 0 and 0.0 compare equal to False but are values
+    return value is None or value is False or (isinstance(value, (str, dict, list)) and not value)
+
+
+def _message_class(name):
+    """Message class from its "module:qualname" reference"""
+    cls = _message_classes.get(name)
+    if cls is None:
+        module, qualname = name.split(":")
+        cls = _message_classes[name] = getattr(importlib.import_module(module), qualname)
+    return cls
+
+
+class _Encoder:
+    """One blob's string table, built while its object is walked"""
+    
+    def __init__(self, intern_min_chars):
+        self.intern_min_chars = intern_min_chars
+        self.strings = []
+        self._index = {}
+    
+    def ref(self, text):
+        index = self._index.get(text)
+        if index is None:
+            index = self._index[text] = len(self.strings)
+            self.strings.append(text)
+        return _ref(index)
+    
+    def walk(self, obj):
+        """Copy of obj with long strings replaced by references and messages packed"""
+        if isinstance(obj, str):
+            return self.ref(obj) if len(obj) >= self.intern_min_chars else obj
+        if isinstance(obj, dict):
+            return {(self.walk(k) if isinstance(k, str) else k): self.walk(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self.walk(v) for v in obj]
+        if isinstance(obj, BaseMessage):
+            return self.message(obj)
+        return obj
+    
+    def message(self, message):
+        cls = type(message)
+        # The field values themselves (walk() copies them), cheaper than dict()
+        fields = {
+            k: v for k, v in vars(message).items()
+            if k not in ("content", "type") and not _is_empty(v)
+        }
+        return msgpack.ExtType(EXT_MESSAGE, _pack([
+            self.ref(f"{cls.__module__}:{cls.__qualname__}"),
+            self.walk(message.content),
+            self.walk(fields),
+        ]))
+
+
+class _Decoder:
+    """ext_hook resolving one blob's string references and messages"""
+    
+    def __init__(self):
+        self.strings = []
+    
+    def __call__(self, code, data):
+        if code == EXT_REF:
+            return self.strings[int.from_bytes(data, "big")]
+        if code == EXT_ZLIB:
+            return msgpack.unpackb(zlib.decompress(data))
+        if code == EXT_MESSAGE:
+            name, content, fields = msgpack.unpackb(data, ext_hook=self, strict_map_key=False)
+            return _message_class(name)(content=content, **fields)
+        return _msgpack_ext_hook(code, data)
+
+
+class CompactSerializer:
+    """
+    LangGraph serializer writing compact checkpoints
+    
+    A blob is two msgpack objects: the string table (every string of at
+    least intern_min_chars, once) and the value, which refers to table
+    entries by index. Messages are packed as their class, content and
+    non-empty fields instead of a full field dump. The table holds the large
+    text fields, so it is what gets compressed: as one zlib stream, text
+    shared between fields compresses together. Interning is per blob, so
+    every checkpoint stays self-contained and can be pruned on its own.
+    
+    Bytes, and strings msgpack cannot encode, go to JsonPlusSerializer, and
+    blobs of any other type are read by it.
+    """
+    
+    def __init__(self, compress=True, intern_min_chars=INTERN_MIN_CHARS,
+                 compress_min_bytes=COMPRESS_MIN_BYTES, compress_level=COMPRESS_LEVEL):
+        """
+        Args:
+            compress: zlib-compress string tables of at least
+                compress_min_bytes
+            intern_min_chars: Shortest string stored in the string table
+            compress_min_bytes: Smallest string table compressed
+            compress_level: zlib level (1 fastest, 9 smallest)
+        """
+        self.compress = compress
+        self.intern_min_chars = intern_min_chars
+        self.compress_min_bytes = compress_min_bytes
+        self.compress_level = compress_level
+        self.fallback = JsonPlusSerializer()
+    
+    def _table(self, strings):
+        table = _pack(strings)
+        if not self.compress or len(table) < self.compress_min_bytes:
+            return table
+        packed = zlib.compress(table, self.compress_level)
+        if len(packed) > len(table) * (1 - COMPRESS_MIN_SAVING):
+            return table
+        return _pack(msgpack.ExtType(EXT_ZLIB, packed))
+    
+    def dumps(self, obj):
+        return self.fallback.dumps(obj)
+    
+    def loads(self, data):
+        return self.fallback.loads(data)
+    
+    def dumps_typed(self, obj):
+        if isinstance(obj, (bytes, bytearray)):
+            return self.fallback.dumps_typed(obj)
+        encoder = _Encoder(self.intern_min_chars)
+        try:
+            value = _pack(encoder.walk(obj))
+            table = self._table(encoder.strings)
+        except UnicodeEncodeError:
+            return self.fallback.dumps_typed(obj)
+        return COMPACT_TYPE, table + value
+    
+    def loads_typed(self, data):
+        type_, blob = data
+        if type_ != COMPACT_TYPE:
+            return self.fallback.loads_typed(data)
+        decoder = _Decoder()
+        unpacker = msgpack.Unpacker(ext_hook=decoder, strict_map_key=False, max_buffer_size=len(blob))
+        unpacker.feed(blob)
+        decoder.strings = unpacker.unpack()
+        return unpacker.unpack()
+
+
+def create_serializer(kind=None):
+    """
+    Build the checkpoint serializer selected by HEALTHBOT_CHECKPOINT_SERDE
+    
+    Args:
+        kind: "default" (the saver's JsonPlusSerializer) or "compact"; read
+            from HEALTHBOT_CHECKPOINT_SERDE when not given. Compression of
+            large text fields is on unless HEALTHBOT_CHECKPOINT_COMPRESS=off.
+    
+    Returns:
+        Serializer, or None for the default
+    """
+    kind = (kind or os.getenv("HEALTHBOT_CHECKPOINT_SERDE", "default")).lower()
+    if kind == "default":
+        return None
+    if kind == "compact":
+        compress = os.getenv("HEALTHBOT_CHECKPOINT_COMPRESS", "on").lower() not in ("off", "0", "false")
+        return CompactSerializer(compress=compress)
+    raise ValueError(f"Unknown checkpoint serializer '{kind}' (expected 'default' or 'compact')")
@@ -0,0 +1,584 @@
+"""
+HealthBot Checkpointer
+Durable SQLite checkpoint saver with per-thread retention, idle-thread
+eviction and background compaction
+"""
+
+import os
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from functools import partial
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.serde.types import TASKS
+
+from cache import get_cache_path
+from checkpoint_serde import create_serializer
+
+# Checkpoints kept per thread (the latest one's parent is needed for resumes)
+DEFAULT_KEEP_LAST = 5
+MIN_KEEP_LAST = 2
+
+# Threads untouched this long are deleted by compaction (None = never)
+DEFAULT_THREAD_TTL = 7 * 24 * 3600
+
+# Seconds between background compaction passes
+DEFAULT_COMPACTION_INTERVAL = 300.0
+
+
+class InstrumentedSerializer:
+    """
+    Serializer wrapper that measures what checkpointing writes
+    
+    Wraps a LangGraph serializer (JsonPlusSerializer by default) and records,
+    for every dumps_typed() call, the serialized size and the time taken.
+    Calls are classified as "checkpoint" (a full snapshot of all channels,
+    one per super-step), "metadata" or "write" (one task's channel writes),
+    and each checkpoint record is tagged with the step from the metadata
+    serialized right after it.
+    """
+    
+    def __init__(self, serde=None, keep_records=True):
+        """
+        Args:
+            serde: Serializer to wrap
+            keep_records: Keep one record per call (totals are always kept)
+        """
+        self.serde = serde or JsonPlusSerializer()
+        self.keep_records = keep_records
+        self.records = []
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._last_checkpoint = threading.local()
+    
+    def _kind(self, obj):
+        if isinstance(obj, dict) and "channel_values" in obj:
+            return "checkpoint"
+        if isinstance(obj, dict) and "step" in obj and "source" in obj:
+            return "metadata"
+        return "write"
+    
+    def dumps(self, obj):
+        return self.serde.dumps(obj)
+    
+    def loads(self, data):
+        return self.serde.loads(data)
+    
+    def loads_typed(self, data):
+        return self.serde.loads_typed(data)
+    
+    def dumps_typed(self, obj):
+        start = time.perf_counter()
+        result = self.serde.dumps_typed(obj)
+        elapsed = time.perf_counter() - start
+        kind = self._kind(obj)
+        size = len(result[1]) if result[1] is not None else 0
+        
+        with self._lock:
+            calls, total_bytes, seconds = self._totals.get(kind, (0, 0, 0.0))
+            self._totals[kind] = (calls + 1, total_bytes + size, seconds + elapsed)
+            if self.keep_records:
+                record = {"kind": kind, "bytes": size, "seconds": elapsed, "step": None}
+                self.records.append(record)
+                if kind == "checkpoint":
+                    self._last_checkpoint.record = record
+                elif kind == "metadata":
+                    pending = getattr(self._last_checkpoint, "record", None)
+                    if pending is not None:
+                        pending["step"] = obj.get("step")
+                        self._last_checkpoint.record = None
+        return result
+    
+    def stats(self):
+        """
+        Totals per kind
+        
+        Returns:
+            Dict of kind -> {calls, bytes, seconds, avg_bytes}, plus "total"
+        """
+        with self._lock:
+            totals = dict(self._totals)
+        stats = {}
+        for kind, (calls, total_bytes, seconds) in totals.items():
+            stats[kind] = {
+                "calls": calls,
+                "bytes": total_bytes,
+                "seconds": seconds,
+                "avg_bytes": total_bytes / calls if calls else 0,
+            }
+        stats["total"] = {
+            "calls": sum(v["calls"] for v in stats.values()),
+            "bytes": sum(v["bytes"] for v in stats.values()),
+            "seconds": sum(v["seconds"] for v in stats.values()),
+        }
+        return stats
+    
+    def reset(self):
+        """Clear records and totals"""
+        with self._lock:
+            self.records = []
+            self._totals = {}
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpoint saver backed by one SQLite file
+    
+    Sessions survive restarts and are shared by every process using the same
+    file. Storage stays bounded:
+    - only the last keep_last checkpoints (and their pending writes) are kept
+      per thread; older ones are deleted as new ones are saved
+    - threads with no new checkpoint for thread_ttl seconds are evicted by
+      compaction, which runs in a background thread every
+      compaction_interval seconds (or on demand with compact())
+    
+    Use ":memory:" as the path for a process-local database.
+    """
+    
+    def __init__(
+        self,
+        path=None,
+        keep_last=DEFAULT_KEEP_LAST,
+        thread_ttl=DEFAULT_THREAD_TTL,
+        compaction_interval=DEFAULT_COMPACTION_INTERVAL,
+        serde=None,
+    ):
+        """
+        Args:
+            path: SQLite file (defaults to checkpoints.sqlite in the cache dir)
+            keep_last: Checkpoints kept per thread (None keeps all, minimum 2)
+            thread_ttl: Seconds of inactivity before a thread is evicted
+            compaction_interval: Seconds between background compactions
+                (None or 0 disables the background thread)
+            serde: LangGraph serializer (defaults to JsonPlusSerializer)
+        """
+        super().__init__(serde=serde)
+        if keep_last is not None and keep_last < MIN_KEEP_LAST:
+            raise ValueError(f"keep_last must be at least {MIN_KEEP_LAST}")
+        
+        self.path = path or get_cache_path("checkpoints.sqlite")
+        self.keep_last = keep_last
+        self.thread_ttl = thread_ttl
+        self.compaction_interval = compaction_interval
+        
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._compactor = None
+        self._counters = {"puts": 0, "pruned": 0, "evicted_threads": 0, "compactions": 0}
+        
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # Lets compaction return freed pages to the OS (new files only)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT,
+                value BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                last_access REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+    
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    
+    def _pending_writes(self, thread_id, checkpoint_ns, checkpoint_id):
+        rows = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in rows]
+    
+    def _pending_sends(self, thread_id, checkpoint_ns, parent_checkpoint_id):
+        if not parent_checkpoint_id:
+            return []
+        rows = self._conn.execute(
+            "SELECT type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? AND channel = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, parent_checkpoint_id, TASKS),
+        ).fetchall()
+        return [self.serde.loads_typed((t, v)) for t, v in rows]
+    
+    def _tuple(self, row, metadata=None):
+        """Build a CheckpointTuple from a checkpoints row"""
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, c_type, c_blob, m_type, m_blob = row
+        checkpoint = self.serde.loads_typed((c_type, c_blob))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "pending_sends": self._pending_sends(thread_id, checkpoint_ns, parent_id),
+            },
+            metadata=metadata if metadata is not None else self.serde.loads_typed((m_type, m_blob)),
+            parent_config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_id,
+                }
+            }
+            if parent_id
+            else None,
+            pending_writes=self._pending_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+    
+    def _prune_thread(self, thread_id, checkpoint_ns):
+        """Delete all but the newest keep_last checkpoints of a thread"""
+        if self.keep_last is None:
+            return 0
+        cutoff = self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last - 1),
+        ).fetchone()
+        if cutoff is None:
+            return 0
+        params = (thread_id, checkpoint_ns, cutoff[0])
+        deleted = self._conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            params,
+        ).rowcount
+        self._conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            params,
+        )
+        return deleted
+    
+    def _ensure_compactor(self):
+        if self._compactor is not None or not self.compaction_interval:
+            return
+        with self._lock:
+            if self._compactor is None:
+                self._compactor = threading.Thread(
+                    target=self._compaction_loop, name="checkpoint-compaction", daemon=True
+                )
+                self._compactor.start()
+    
+    def _compaction_loop(self):
+        while not self._stop.wait(self.compaction_interval):
+            try:
+                self.compact()
+            except sqlite3.Error:
+                pass  # Try again next interval
+    
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver API
+    # ------------------------------------------------------------------
+    
+    def get_tuple(self, config):
+        """Return the requested (or latest) checkpoint of a thread, or None"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        
+        columns = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints "
+        )
+        with self._lock:
+            if checkpoint_id:
+                row = self._conn.execute(
+                    columns + "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    columns + "WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            saved = self._tuple(row)
+        
+        if checkpoint_id:
+            # Keep the caller's config, like MemorySaver
+            saved = saved._replace(config=config)
+        return saved
+    
+    def list(self, config, *, filter=None, before=None, limit=None):
+        """List checkpoints newest first, optionally filtered by metadata"""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+        
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            metadata = self.serde.loads_typed((row[6], row[7]))
+            if filter and not all(metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                saved = self._tuple(row, metadata)
+            yield saved
+    
+    def put(self, config, checkpoint, metadata, new_versions):
+        """Save a checkpoint and prune the thread to its newest keep_last"""
+        c = checkpoint.copy()
+        c.pop("pending_sends", None)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        c_type, c_blob = self.serde.dumps_typed(c)
+        m_type, m_blob = self.serde.dumps_typed(metadata)
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    c_type,
+                    c_blob,
+                    m_type,
+                    m_blob,
+                ),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time())
+            )
+            self._counters["puts"] += 1
+            self._counters["pruned"] += self._prune_thread(thread_id, checkpoint_ns)
+            self._conn.commit()
+        
+        self._ensure_compactor()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+    
+    def put_writes(self, config, writes, task_id):
+        """Save the pending writes of one task against a checkpoint"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            v_type, v_blob = self.serde.dumps_typed(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, v_type, v_blob,
+            ))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+    
+    async def aget_tuple(self, config):
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+    
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        loop = asyncio.get_running_loop()
+        items = await loop.run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+    
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.put, config, checkpoint, metadata, new_versions
+        )
+    
+    async def aput_writes(self, config, writes, task_id):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.put_writes, config, writes, task_id)
+        )
+    
+    def get_next_version(self, current, channel):
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+    
+    # ------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------
+    
+    def delete_thread(self, thread_id):
+        """Delete every checkpoint and write of a thread"""
+        with self._lock:
+            for table in ("checkpoints", "writes", "threads"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+    
+    def compact(self):
+        """
+        Run one compaction pass
+        
+        Evicts threads idle for longer than thread_ttl, re-applies keep_last
+        to every thread, drops writes whose checkpoint is gone, releases free
+        pages and truncates the write-ahead log.
+        
+        Returns:
+            Dict with evicted_threads and pruned checkpoint counts
+        """
+        with self._lock:
+            evicted = 0
+            if self.thread_ttl is not None:
+                cutoff = time.time() - self.thread_ttl
+                idle = [r[0] for r in self._conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_access < ?", (cutoff,)
+                )]
+                for thread_id in idle:
+                    for table in ("checkpoints", "writes", "threads"):
+                        self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                evicted = len(idle)
+            
+            pruned = 0
+            for thread_id, checkpoint_ns in self._conn.execute(
+                "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints"
+            ).fetchall():
+                pruned += self._prune_thread(thread_id, checkpoint_ns)
+            
+            self._conn.execute(
+                "DELETE FROM writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints c "
+                "WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns "
+                "AND c.checkpoint_id = writes.checkpoint_id)"
+            )
+            self._conn.commit()
+            self._conn.execute("PRAGMA incremental_vacuum")
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            
+            self._counters["evicted_threads"] += evicted
+            self._counters["pruned"] += pruned
+            self._counters["compactions"] += 1
+        return {"evicted_threads": evicted, "pruned": pruned}
+    
+    def stats(self):
+        """
+        Storage and retention counters
+        
+        Returns:
+            Dict with threads, checkpoints, writes, db_bytes and the puts,
+            pruned, evicted_threads and compactions counters
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            for table in ("threads", "checkpoints", "writes"):
+                stats[table] = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            stats["db_bytes"] = page_count * page_size
+        return stats
+    
+    def close(self):
+        """Stop background compaction and close the database"""
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5)
+            self._compactor = None
+        with self._lock:
+            self._conn.close()
+
+
+def create_checkpointer(kind=None):
+    """
+    Build the checkpointer selected by HEALTHBOT_CHECKPOINTER
+    
+    Args:
+        kind: "memory" (default, in-process MemorySaver) or "sqlite"; read
+            from HEALTHBOT_CHECKPOINTER when not given. The SQLite saver is
+            configured by HEALTHBOT_CHECKPOINT_PATH, _KEEP_LAST, _THREAD_TTL
+            and _COMPACTION_INTERVAL. HEALTHBOT_CHECKPOINT_SERDE=compact
+            selects the CompactSerializer (see checkpoint_serde.py). With
+            HEALTHBOT_CHECKPOINT_STATS=on the saver's serializer is wrapped
+            in an InstrumentedSerializer (app.checkpointer.serde.stats()).
+    
+    Returns:
+        Checkpoint saver instance
+    """
+    kind = (kind or os.getenv("HEALTHBOT_CHECKPOINTER", "memory")).lower()
+    serde = create_serializer()
+    if os.getenv("HEALTHBOT_CHECKPOINT_STATS", "off").lower() in ("on", "1", "true"):
+        serde = InstrumentedSerializer(serde=serde, keep_records=False)
+    
+    if kind == "memory":
+        return MemorySaver(serde=serde)
+    if kind == "sqlite":
+        return SQLiteCheckpointSaver(
+            path=os.getenv("HEALTHBOT_CHECKPOINT_PATH") or None,
+            keep_last=int(os.getenv("HEALTHBOT_CHECKPOINT_KEEP_LAST", DEFAULT_KEEP_LAST)),
+            thread_ttl=float(os.getenv("HEALTHBOT_CHECKPOINT_THREAD_TTL", DEFAULT_THREAD_TTL)),
+            compaction_interval=float(os.getenv(
+                "HEALTHBOT_CHECKPOINT_COMPACTION_INTERVAL", DEFAULT_COMPACTION_INTERVAL
+            )),
+            serde=serde,
+        )
+    raise ValueError(f"Unknown checkpointer '{kind}' (expected 'memory' or 'sqlite')")
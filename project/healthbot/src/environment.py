@@ -0,0 +1,57 @@
+"""
+HealthBot Environment
+Loads the project .env once per process (shared by the entry points,
+llm_config and tools)
+"""
+
+import os
+import threading
+
+# project/.env (two levels up from src/)
+ENV_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".env")
+)
+
+# Fallback used when the path cannot be resolved (e.g. some Jupyter setups)
+FALLBACK_ENV_PATH = r"c:\Training\Udacity\AI_Agents_LangGraph\project\.env"
+
+_loaded_from = None
+_load_lock = threading.Lock()
+_attempted = False
+
+
+def load_environment(env_path=None):
+    """
+    Load the project .env into os.environ, once per process
+    
+    Later calls return immediately. Nothing is loaded when ENV_ALREADY_LOADED
+    is set (the caller has set up the environment itself).
+    
+    Args:
+        env_path: .env file to load on the first call (defaults to project/.env)
+    
+    Returns:
+        Path of the loaded file, or None if none was loaded
+    """
+    global _loaded_from, _attempted
+    
+    if _attempted:
+        return _loaded_from
+    
+    with _load_lock:
+        if _attempted:
+            return _loaded_from
+        _attempted = True
+        
+        if os.getenv("ENV_ALREADY_LOADED"):
+            return None
+        
+        from dotenv import load_dotenv  # Only needed on the first call
+        
+        for path in (env_path or ENV_PATH, FALLBACK_ENV_PATH):
+            if os.path.exists(path):
+                load_dotenv(path)
+                _loaded_from = path
+                break
+        return _loaded_from
+
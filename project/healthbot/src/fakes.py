@@ -0,0 +1,524 @@
+"""
+HealthBot Fakes
+Deterministic stand-ins for the chat model and Tavily search, with
+configurable latency and failure rate, for offline runs and benchmarks (no
+API keys needed)
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import multiprocessing
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import llm_config
+import tools
+
+# Points the fake quiz bank asks about, in order; every fourth question is open
+QUIZ_ASPECTS = (
+    "symptom", "cause", "treatment", "prevention",
+    "risk factor", "complication", "test", "lifestyle change",
+)
+
+
+def _prompt_text(messages):
+    return "\n".join(str(m.content) for m in messages)
+
+
+def _topic_from_prompt(text):
+    for line in text.splitlines():
+        if line.startswith("Health Topic:"):
+            return line.replace("Health Topic:", "").strip()
+    return "this condition"
+
+
+def _maybe_fail(failure_rate):
+    if failure_rate and random.random() < failure_rate:
+        raise ConnectionError("Fake upstream failure")
+
+
+def fake_completion(prompt):
+    """
+    Deterministic completion for a HealthBot prompt
+    
+    Recognizes the grading, quiz, map-reduce and summarization prompts and
+    answers in the format each node parses. The same prompt always gives the same text.
+    
+    Args:
+        prompt: Full prompt text
+    
+    Returns:
+        Completion text
+    """
+    topic = _topic_from_prompt(prompt)
+    digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+    
+    if "GRADE:" in prompt:
+        grade = 60 + digest % 41
+        return (
+            f"GRADE: {grade}\n"
+            f"EXPLANATION: Your answer covers the main idea about {topic}. "
+            f"The summary notes that {topic} can be managed with treatment and "
+            f"regular check-ups."
+        )
+    
+    if "Quiz Questions:" in prompt:
+        # Quiz bank: new questions continue after the ones already asked
+        count = int(re.search(r"Create (\d+) DIFFERENT", prompt).group(1))
+        offset = len(re.findall(r"^- ", prompt, flags=re.MULTILINE))
+        questions = []
+        for i in range(offset, offset + count):
+            aspect = QUIZ_ASPECTS[i % len(QUIZ_ASPECTS)]
+            if i % 4 == 3:
+                questions.append(f"In your own words, what is one {aspect} of {topic} (point {i + 1})?")
+                continue
+            questions.append(
+                f"Which of the following is a common {aspect} related to {topic} (point {i + 1})?\n"
+                f"A) Option about {aspect} one\n"
+                f"B) Option about {aspect} two\n"
+                f"C) Option about {aspect} three\n"
+                f"D) All of the above\n"
+                f"ANSWER: {'ABCD'[(digest >> i) % 4]}\n"
+                f"CITATION: Treatment for {topic} often combines medicine and healthy habits."
+            )
+        return "\n---\n".join(questions)
+    
+    if "quiz" in prompt.lower():
+        aspect = ["symptom", "cause", "treatment", "prevention"][digest % 4]
+        return (
+            f"Which of the following is a common {aspect} related to {topic}?\n"
+            f"A) Option about {aspect} one\n"
+            f"B) Option about {aspect} two\n"
+            f"C) Option about {aspect} three\n"
+            f"D) All of the above\n"
+            f"ANSWER: {'ABCD'[digest // 4 % 4]}\n"
+            f"CITATION: Treatment for {topic} often combines medicine and healthy habits."
+        )
+    
+    if prompt.rstrip().endswith("Facts:"):
+        # Map-reduce fact list: one cited bullet per source (see map_reduce.py)
+        sources = re.findall(r"^(\d+)\. ", prompt, flags=re.MULTILINE)
+        sources = sources or re.findall(r"\[(\d+)\]", prompt)
+        return "\n".join(
+            f"- Source {n} describes a {QUIZ_ASPECTS[int(n) % len(QUIZ_ASPECTS)]} of {topic} [{n}]"
+            for n in dict.fromkeys(sources)
+        )
+    
+    cited = " ".join(f"[{n}]" for n in dict.fromkeys(re.findall(r"^\[(\d+)\] ", prompt, flags=re.MULTILINE)))
+    sentences = [
+        f"{topic.capitalize()} is a health condition that many people live with.",
+        f"Common symptoms of {topic} can include tiredness and discomfort.",
+        f"Causes of {topic} include genetics, lifestyle and environment.",
+        f"Treatment for {topic} often combines medicine and healthy habits.",
+        "Talk with your doctor about what is right for you (Source: example.org).",
+    ]
+    if cited:
+        sentences.append(f"Sources: {cited}")
+    return " ".join(sentences)
+
+
+class FakeHealthChatModel(BaseChatModel):
+    """
+    Chat model returning fake_completion() after a fixed latency
+    
+    Supports invoke/ainvoke, batch/abatch and token streaming, and reports
+    usage_metadata (word counts) like a real provider. With failure_rate set,
+    that share of calls raises ConnectionError instead; with token_latency
+    set, longer prompts take longer (like prompt processing).
+    """
+    
+    latency: float = 0.0          # Seconds per call
+    token_latency: float = 0.0    # Extra seconds per prompt token (word)
+    failure_rate: float = 0.0     # Share of calls that fail
+    model_name: str = "fake-healthbot"
+    
+    @property
+    def _llm_type(self) -> str:
+        return "fake-healthbot"
+    
+    def _delay(self, prompt):
+        return self.latency + self.token_latency * len(prompt.split())
+    
+    def _message(self, text, prompt):
+        input_tokens = len(prompt.split())
+        output_tokens = len(text.split())
+        return AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = _prompt_text(messages)
+        if self._delay(prompt):
+            time.sleep(self._delay(prompt))
+        _maybe_fail(self.failure_rate)
+        message = self._message(fake_completion(prompt), prompt)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = _prompt_text(messages)
+        if self._delay(prompt):
+            await asyncio.sleep(self._delay(prompt))
+        _maybe_fail(self.failure_rate)
+        message = self._message(fake_completion(prompt), prompt)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    def _words(self, messages):
+        words = fake_completion(_prompt_text(messages)).split(" ")
+        return [w if i == len(words) - 1 else w + " " for i, w in enumerate(words)]
+    
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        _maybe_fail(self.failure_rate)
+        words = self._words(messages)
+        delay = self._delay(_prompt_text(messages))
+        for word in words:
+            if delay:
+                time.sleep(delay / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+    
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        _maybe_fail(self.failure_rate)
+        words = self._words(messages)
+        delay = self._delay(_prompt_text(messages))
+        for word in words:
+            if delay:
+                await asyncio.sleep(delay / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+
+def fake_search_response(query, max_results=5, include_raw_content=False):
+    """Deterministic Tavily-shaped response for a query (raw_content is a ~4,000 character page)"""
+    topic = query.replace(" patient education medical information", "")
+    results = [
+        {
+            "title": f"{topic.title()} - Patient Guide {i}",
+            "url": f"https://example.org/{topic.replace(' ', '-')}/{i}",
+            "content": f"Overview {i} of {topic}: symptoms, causes and treatment options. " * 4,
+            "score": round(1.0 - i * 0.05, 2),
+        }
+        for i in range(1, max_results + 1)
+    ]
+    if include_raw_content:
+        for i, result in enumerate(results, 1):
+            result["raw_content"] = "\n\n".join(
+                f"{aspect.capitalize()}s of {topic}\n"
+                + f"Page {i} explains the {aspect}s of {topic} in plain words for patients. " * 6
+                for aspect in QUIZ_ASPECTS
+            )
+    return {"query": query, "results": results}
+
+
+class FakeSearchClient:
+    """Tavily-compatible sync search client with fixed latency"""
+    
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+    
+    def search(self, query, max_results=5, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        _maybe_fail(self.failure_rate)
+        return fake_search_response(query, max_results, kwargs.get("include_raw_content", False))
+
+
+class AsyncFakeSearchClient:
+    """Tavily-compatible async search client with fixed latency"""
+    
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+    
+    async def search(self, query, max_results=5, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        _maybe_fail(self.failure_rate)
+        return fake_search_response(query, max_results, kwargs.get("include_raw_content", False))
+
+
+# Topic -> result snippets (title, content), phrased like patient education
+# pages, for CorpusSearchClient and the topic index benchmark and tests
+MEDICAL_CORPUS = {
+    "hypertension": [
+        ("High Blood Pressure (Hypertension) - Symptoms and Causes",
+         "High blood pressure, also called hypertension or HTN, is when the force of blood against artery walls stays too high. Blood pressure readings of 130/80 or higher are elevated."),
+        ("Hypertension: Treatment and Lifestyle",
+         "Hypertension is treated with lifestyle changes such as less salt and more exercise, and medicines like ACE inhibitors and diuretics to lower blood pressure."),
+        ("What is HTN?",
+         "HTN is the medical abbreviation for hypertension. Untreated high blood pressure raises the risk of heart attack, stroke and kidney disease."),
+    ],
+    "hypotension": [
+        ("Low Blood Pressure (Hypotension)",
+         "Low blood pressure, or hypotension, is a reading below 90/60. It can cause dizziness and fainting, especially when standing up quickly."),
+        ("Hypotension: Causes",
+         "Dehydration, some medicines and heart problems can cause hypotension. Drinking more fluids and rising slowly can help."),
+    ],
+    "type 2 diabetes": [
+        ("Type 2 Diabetes - Symptoms and Causes",
+         "Type 2 diabetes, sometimes called adult-onset diabetes, is a condition where the body does not use insulin well and blood sugar (glucose) stays high."),
+        ("Managing Type 2 Diabetes",
+         "Healthy eating, physical activity, weight loss and medicines such as metformin help control blood sugar in type 2 diabetes (T2D)."),
+    ],
+    "type 1 diabetes": [
+        ("Type 1 Diabetes",
+         "Type 1 diabetes is an autoimmune condition where the pancreas makes little or no insulin. It often starts in children and young adults, formerly called juvenile diabetes."),
+        ("Living with Type 1 Diabetes",
+         "People with type 1 diabetes need insulin injections or an insulin pump and check blood glucose several times a day."),
+    ],
+    "asthma": [
+        ("Asthma - Symptoms and Triggers",
+         "Asthma is a lung condition where the airways narrow and swell, causing wheezing, coughing and shortness of breath. Triggers include pollen, smoke and exercise."),
+        ("Asthma Inhalers",
+         "Quick-relief inhalers open the airways during an asthma attack; controller inhalers with steroids reduce airway inflammation over time."),
+    ],
+    "copd": [
+        ("COPD (Chronic Obstructive Pulmonary Disease)",
+         "Chronic obstructive pulmonary disease, or COPD, is a long-term lung disease that makes it hard to breathe. It includes emphysema and chronic bronchitis and is mostly caused by smoking."),
+        ("COPD Treatment",
+         "Quitting smoking, inhalers, pulmonary rehabilitation and oxygen therapy help people with COPD breathe easier."),
+    ],
+    "heart attack": [
+        ("Heart Attack (Myocardial Infarction)",
+         "A heart attack, or myocardial infarction, happens when blood flow to part of the heart muscle is blocked, usually by a clot in a coronary artery."),
+        ("Heart Attack Warning Signs",
+         "Chest pain or pressure, shortness of breath and pain in the arm or jaw are warning signs of a heart attack. Call emergency services right away."),
+    ],
+    "heart failure": [
+        ("Heart Failure",
+         "Heart failure means the heart muscle does not pump blood as well as it should. It causes tiredness, swollen legs and shortness of breath."),
+        ("Congestive Heart Failure Treatment",
+         "Congestive heart failure is managed with medicines such as diuretics and beta blockers, a low-salt diet and daily weight checks."),
+    ],
+    "stroke": [
+        ("Stroke - Symptoms and Causes",
+         "A stroke happens when blood supply to part of the brain is interrupted. A stroke is also called a cerebrovascular accident (CVA) or brain attack."),
+        ("Stroke Warning Signs: BE FAST",
+         "Balance loss, eye changes, face drooping, arm weakness and speech difficulty mean it is time to call emergency services."),
+    ],
+    "gerd": [
+        ("GERD (Gastroesophageal Reflux Disease)",
+         "Gastroesophageal reflux disease, or GERD, is when stomach acid often flows back into the esophagus. Frequent acid reflux and heartburn are the main symptoms."),
+        ("Heartburn and Acid Reflux Relief",
+         "Smaller meals, not lying down after eating and antacids or acid-reducing medicines can ease heartburn caused by acid reflux."),
+    ],
+    "osteoporosis": [
+        ("Osteoporosis",
+         "Osteoporosis is a disease that makes bones weak and brittle, so they break more easily. It is common in older women after menopause."),
+        ("Preventing Osteoporosis",
+         "Calcium, vitamin D, weight-bearing exercise and bone density tests help prevent fractures from brittle bones."),
+    ],
+    "migraine": [
+        ("Migraine Headaches",
+         "A migraine is a headache that causes severe throbbing pain, usually on one side of the head, often with nausea and sensitivity to light."),
+        ("Migraine Triggers and Treatment",
+         "Stress, skipped meals and poor sleep can trigger migraines. Pain relievers and triptans treat migraine attacks."),
+    ],
+    "depression": [
+        ("Depression (Major Depressive Disorder)",
+         "Depression, or major depressive disorder, is a common mood disorder that causes lasting sadness and loss of interest in daily activities."),
+        ("Treating Depression",
+         "Talk therapy, antidepressant medicines and regular exercise help many people recover from depression."),
+    ],
+}
+
+# Query -> corpus topic it means
+TOPIC_ALIASES = {
+    "high blood pressure": "hypertension",
+    "HTN": "hypertension",
+    "elevated blood pressure": "hypertension",
+    "Hypertension": "hypertension",
+    "low blood pressure": "hypotension",
+    "adult onset diabetes": "type 2 diabetes",
+    "T2D": "type 2 diabetes",
+    "juvenile diabetes": "type 1 diabetes",
+    "chronic obstructive pulmonary disease": "copd",
+    "emphysema": "copd",
+    "myocardial infarction": "heart attack",
+    "congestive heart failure": "heart failure",
+    "cerebrovascular accident": "stroke",
+    "acid reflux": "gerd",
+    "gastroesophageal reflux disease": "gerd",
+    "brittle bones": "osteoporosis",
+    "migraine headaches": "migraine",
+    "major depressive disorder": "depression",
+}
+
+# Topics that are not in the corpus and must not match any of it: other
+# conditions, and risk factors, drugs, measurements and broader conditions
+# the corpus pages mention
+UNRELATED_TOPICS = [
+    "kidney stones", "lupus", "anemia", "gout", "eczema", "high cholesterol",
+    "sleep apnea", "gestational diabetes", "pneumonia", "back pain",
+    "heart murmur", "food allergy", "smoking", "insulin", "blood sugar",
+    "diabetes", "blood pressure", "heart",
+]
+
+# (indexed topic, query): a different condition sharing most words, or a
+# risk factor, drug or broader condition the indexed pages mention. With only
+# the first indexed, the query must not match it
+NEAR_MISS_TOPICS = [
+    ("type 2 diabetes", "type 1 diabetes"),
+    ("type 1 diabetes", "type 2 diabetes"),
+    ("type 1 diabetes", "diabetes"),
+    ("type 1 diabetes", "insulin"),
+    ("type 2 diabetes", "blood sugar"),
+    ("copd", "smoking"),
+    ("hypertension", "stroke"),
+]
+
+
+def corpus_response(topic):
+    """Tavily-shaped response with the corpus pages of a corpus topic"""
+    return {"query": topic, "results": [
+        {"title": title, "url": f"https://example.org/{topic.replace(' ', '-')}/{i}", "content": content}
+        for i, (title, content) in enumerate(MEDICAL_CORPUS[topic], 1)
+    ]}
+
+
+class CorpusSearchClient(FakeSearchClient):
+    """Fake search returning the corpus pages for a corpus topic (fake_search_response otherwise)"""
+    
+    def search(self, query, max_results=5, **kwargs):
+        topic = query.replace(" patient education medical information", "").strip().lower()
+        if topic in MEDICAL_CORPUS:
+            self.calls += 1
+            return corpus_response(topic)
+        return super().search(query, max_results, **kwargs)
+
+
+class SearchStandIn:
+    """
+    Keep-alive HTTP/1.1 server answering POST /search like Tavily
+    
+    Runs in its own process, so it does not compete with the clients for the
+    GIL; connection and request counts are shared values. set_status() makes
+    it answer every request with an error status instead.
+    """
+    
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._connections = multiprocessing.Value("i", 0)
+        self._requests = multiprocessing.Value("i", 0)
+        self._status = multiprocessing.Value("i", 200)
+        self._process = None
+        self.port = None
+    
+    @property
+    def connections(self):
+        return self._connections.value
+    
+    @property
+    def requests(self):
+        return self._requests.value
+    
+    def set_status(self, status):
+        """Answer later requests with this HTTP status (200 = search results)"""
+        self._status.value = status
+    
+    async def _handle(self, reader, writer):
+        with self._connections.get_lock():
+            self._connections.value += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(re.search(rb"(?i)content-length: *(\d+)", head).group(1))
+                body = json.loads(await reader.readexactly(length))
+                with self._requests.get_lock():
+                    self._requests.value += 1
+                await asyncio.sleep(self.latency)
+                status = self._status.value
+                if status == 200:
+                    payload = json.dumps(fake_search_response(body["query"], body["max_results"])).encode()
+                else:
+                    payload = json.dumps({"detail": {"error": "stand-in error"}}).encode()
+                writer.write(
+                    b"HTTP/1.1 %d Stand-in\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n" % (status, len(payload)) + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client closed the connection
+        finally:
+            writer.close()
+    
+    def _serve(self, ready):
+        async def main():
+            server = await asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=2048)
+            ready.send(server.sockets[0].getsockname()[1])
+            await server.serve_forever()
+        asyncio.run(main())
+    
+    def start(self):
+        """Start the server process; returns the search URL"""
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(target=self._serve, args=(sender,), daemon=True)
+        self._process.start()
+        self.port = receiver.recv()
+        return f"http://127.0.0.1:{self.port}/search"
+    
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+    
+    def reset(self):
+        self._connections.value = self._requests.value = 0
+        self._status.value = 200
+
+
+def install_fakes(llm_latency=0.0, search_latency=0.0, failure_rate=0.0):
+    """
+    Route every LLM profile and both search paths to the fakes
+    
+    Args:
+        llm_latency: Seconds per fake LLM call
+        search_latency: Seconds per fake search call
+        failure_rate: Share of LLM and search calls that fail
+    
+    Returns:
+        Dict with the installed 'llm', 'search' and 'async_search' fakes
+    """
+    llm = FakeHealthChatModel(latency=llm_latency, failure_rate=failure_rate)
+    registry = llm_config.get_llm_registry()
+    for profile in list(registry.profiles):
+        registry.register(profile, llm)
+    
+    search = FakeSearchClient(latency=search_latency, failure_rate=failure_rate)
+    async_search = AsyncFakeSearchClient(latency=search_latency, failure_rate=failure_rate)
+    tools.set_search_clients(search, async_search)
+    
+    return {"llm": llm, "search": search, "async_search": async_search}
@@ -0,0 +1,153 @@
+"""
+HealthBot Message History
+Bounded reducer for State.messages: keep the last K messages and/or a token
+budget, folding older turns into one running summary message
+"""
+
+import os
+import re
+
+from langchain_core.messages import SystemMessage
+from langgraph.graph.message import add_messages
+
+SUMMARY_MESSAGE_ID = "healthbot-history-summary"
+
+# Topics listed in the running summary (oldest are dropped beyond this)
+SUMMARY_MAX_TOPICS = 20
+
+# Rough tokens-per-character ratio for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_TOPIC_PATTERN = re.compile(r"^I want to learn about: (.+)$")
+_GRADE_PATTERN = re.compile(r"^Grade: (\d+)/100")
+
+
+class HistoryPolicy:
+    """
+    How much of State.messages to keep
+    
+    max_messages and max_tokens bound the kept (non-summary) messages; None
+    or 0 means no bound. With fold=True the dropped messages are folded into
+    a single system message at the start of the history that lists the topics
+    covered and their grades, so the session keeps its context.
+    """
+    
+    def __init__(self, max_messages=None, max_tokens=None, fold=True):
+        self.max_messages = max_messages or None
+        self.max_tokens = max_tokens or None
+        self.fold = fold
+    
+    @classmethod
+    def from_env(cls):
+        """Policy from HEALTHBOT_HISTORY_MAX_MESSAGES/_MAX_TOKENS/_FOLD"""
+        return cls(
+            max_messages=int(os.getenv("HEALTHBOT_HISTORY_MAX_MESSAGES", 40)),
+            max_tokens=int(os.getenv("HEALTHBOT_HISTORY_MAX_TOKENS", 0)),
+            fold=os.getenv("HEALTHBOT_HISTORY_FOLD", "on").lower() not in ("off", "0", "false"),
+        )
+    
+    @property
+    def bounded(self):
+        return bool(self.max_messages or self.max_tokens)
+
+
+_policy = HistoryPolicy.from_env()
+
+
+def get_history_policy():
+    """Return the process-wide history policy"""
+    return _policy
+
+
+def set_history_policy(policy):
+    """
+    Replace the process-wide history policy
+    
+    Args:
+        policy: HistoryPolicy (HistoryPolicy() keeps everything)
+    """
+    global _policy
+    _policy = policy
+
+
+def estimate_tokens(message):
+    """Approximate token count of one message"""
+    return len(str(message.content)) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def _split_kept(messages, policy):
+    """Index of the first message kept under the policy"""
+    start = len(messages)
+    tokens = 0
+    while start > 0:
+        if policy.max_messages and len(messages) - start >= policy.max_messages:
+            break
+        cost = estimate_tokens(messages[start - 1])
+        if policy.max_tokens and tokens + cost > policy.max_tokens and start < len(messages):
+            break
+        tokens += cost
+        start -= 1
+    return start
+
+
+def _fold(summary, dropped):
+    """
+    Fold dropped messages into the running summary message
+    
+    The summary's additional_kwargs hold the structured history (folded
+    message count and [topic, grades] pairs); its content is rendered from it.
+    """
+    history = dict(summary.additional_kwargs.get("history", {})) if summary else {}
+    folded = history.get("folded", 0) + len(dropped)
+    topics = [list(t) for t in history.get("topics", [])]
+    
+    for message in dropped:
+        content = str(message.content)
+        if match := _TOPIC_PATTERN.match(content):
+            topics.append([match.group(1), []])
+        elif (match := _GRADE_PATTERN.match(content)) and topics:
+            topics[-1][1].append(int(match.group(1)))
+    topics = topics[-SUMMARY_MAX_TOPICS:]
+    
+    lines = [f"Earlier in this session ({folded} messages condensed):"]
+    for topic, grades in topics:
+        graded = f" - quiz grades: {', '.join(map(str, grades))}" if grades else ""
+        lines.append(f"- Learned about {topic}{graded}")
+    
+    return SystemMessage(
+        content="\n".join(lines),
+        id=SUMMARY_MESSAGE_ID,
+        additional_kwargs={"history": {"folded": folded, "topics": topics}},
+    )
+
+
+def bounded_messages(left, right):
+    """
+    State.messages reducer: add_messages, then apply the history policy
+    
+    Args:
+        left: Current messages
+        right: Messages returned by a node (new ones are appended, ones
+            with an existing id replace it)
+    
+    Returns:
+        Merged messages, trimmed per get_history_policy()
+    """
+    merged = add_messages(left, right)
+    policy = _policy
+    if not policy.bounded:
+        return merged
+    
+    summary = None
+    if merged and merged[0].id == SUMMARY_MESSAGE_ID:
+        summary, merged = merged[0], merged[1:]
+    
+    start = _split_kept(merged, policy)
+    if start == 0:
+        return ([summary] if summary else []) + merged
+    
+    kept = merged[start:]
+    if not policy.fold:
+        return kept
+    return [_fold(summary, merged[:start])] + kept
@@ -4,51 +4,96 @@ Uses Azure Foundry endpoint from root .env file
 """
 
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+import asyncio
+import threading
+
+from environment import load_environment
+from resilience import get_upstream
+
+# Provider clients (langchain_openai, httpx) are imported on first use, so
+# importing the workflow does not pay for them
 
-# Load environment variables from root .env
-# (The notebook will be in project/healthbot/notebooks/, so we go up 3 levels)
 def load_env_from_root():
-    """Load .env from project root (2 levels up from this file)"""
-    try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        healthbot_dir = os.path.dirname(current_dir)  # healthbot/
-        project_dir = os.path.dirname(healthbot_dir)  # project/
+    """Load .env from project root (once per process, see environment.py)"""
+    return load_environment() is not None
+
+# Per-node model/temperature profiles. "model" is optional and falls back to
+# the deployment picked from the environment (OpenAI or Azure Foundry).
+LLM_PROFILES = {
+    "default": {"temperature": 0.7},
+    "summarize": {"temperature": 0.7, "max_tokens": 2000},
+    "quiz": {"temperature": 0.7, "max_tokens": 1000},
+    "grade": {"temperature": 0.0, "max_tokens": 1000},
+}
+
+# HTTP connection pool shared by every client in the registry
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection is kept open
+
+_LoopAsyncClient = None  # httpx.AsyncClient subclass, defined on first use
+
+
+def _loop_async_client_class():
+    """Return LoopAsyncClient (defined here so httpx is imported on first use)"""
+    global _LoopAsyncClient
+    if _LoopAsyncClient is None:
+        import httpx
         
-        env_path = os.path.join(project_dir, ".env")
-        if os.path.exists(env_path):
-            load_dotenv(env_path)
-            return True
-    except:
-        # If file resolution fails (e.g., in Jupyter), try absolute path
-        try:
-            env_path = r"c:\Training\Udacity\AI_Agents_LangGraph\project\.env"
-            if os.path.exists(env_path):
-                load_dotenv(env_path)
-                return True
-        except:
-            pass
-    return False
+        class LoopAsyncClient(httpx.AsyncClient):
+            """
+            AsyncClient handed to the chat models: it builds requests but
+            sends each one through the running event loop's own client in
+            the registry, as httpx pools cannot be shared between loops
+            """
+            
+            def __init__(self, registry):
+                super().__init__()
+                self._registry = registry
+            
+            async def send(self, request, **kwargs):
+                client = await self._registry._loop_async_client()
+                return await client.send(request, **kwargs)
+        
+        _LoopAsyncClient = LoopAsyncClient
+    return _LoopAsyncClient
 
-def initialize_llm():
+
+def _build_chat_model(profile_settings, http_client=None, http_async_client=None):
     """
-    Initialize ChatOpenAI using credentials from environment
-    Handles both CLI and notebook execution contexts
+    Build a ChatOpenAI client from environment credentials
+    
+    Args:
+        profile_settings: Profile overrides (temperature, max_tokens, model)
+        http_client: Shared httpx.Client for sync calls
+        http_async_client: httpx.AsyncClient for async calls (the
+            registry's, which sends on the running loop's own pool)
+        
+    Returns:
+        ChatOpenAI instance
     """
+    from langchain_openai import ChatOpenAI
+    
+    settings = dict(profile_settings)
+    model = settings.pop("model", None)
     
-    # Try to load .env if not already loaded
-    if not os.getenv('ENV_ALREADY_LOADED'):
-        # Try relative path first
-        if not load_env_from_root():
-            # If that fails, assume we're in a notebook with pre-loaded env
-            pass
+    # Requests end at the "llm" upstream timeout, so an attempt it abandons
+    # does not keep its thread until the provider's default 10 minutes
+    upstream = get_upstream("llm")
+    if upstream is not None and upstream.timeout:
+        settings.setdefault("timeout", upstream.timeout)
     
     # Check if we have OpenAI credentials (notebook default)
     openai_key = os.getenv("OPENAI_API_KEY")
     if openai_key:
         # Use OpenAI (notebook or CLI with OpenAI fallback)
-        return ChatOpenAI(model="gpt-3.5-turbo")
+        return ChatOpenAI(
+            model=model or "gpt-3.5-turbo",
+            http_client=http_client,
+            http_async_client=http_async_client,
+            stream_usage=True,  # Keep token usage when tokens are streamed
+            **settings
+        )
     
     # Fall back to Azure Foundry
     api_base = os.getenv("FOUNDRY_PROJECT_ENDPOINT")
@@ -60,7 +105,11 @@ def initialize_llm():
             api_key=api_key,
             api_version="2024-08-01-preview",
             base_url=api_base,
-            model=deployment_name
+            model=model or deployment_name,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            stream_usage=True,  # Keep token usage when tokens are streamed
+            **settings
         )
     
     # If we got here, we're missing credentials
@@ -70,6 +119,228 @@ def initialize_llm():
     )
 
 
+class LLMClientRegistry:
+    """
+    Process-wide registry of pooled LLM clients
+    
+    Each profile in LLM_PROFILES is built once on first use and shared by
+    every node, thread and event loop afterwards. All clients share one
+    keep-alive HTTP connection pool for sync calls and one per event loop
+    for async calls (pooled connections belong to the loop that opened
+    them), so repeated node runs reuse open TLS connections instead of
+    opening new ones. A loop's pool is closed when the loop shuts down
+    through asyncio.run (see _close_with_loop).
+    
+    Lookups of already-built clients take no lock, so get() is safe to call
+    from async nodes; construction is guarded by a threading lock.
+    """
+    
+    def __init__(self, profiles=None):
+        self.profiles = dict(profiles or LLM_PROFILES)
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._env_loaded = False
+        self._http_client = None
+        self._http_async_client = None  # LoopAsyncClient given to the models
+        self._async_clients = {}  # loop -> (httpx.AsyncClient, closer)
+        
+        # Pool statistics
+        self._lookups = 0
+        self._builds = 0
+        self._http_requests = 0
+        self._connections_opened = 0
+    
+    # ------------------------------------------------------------------
+    # HTTP pool
+    # ------------------------------------------------------------------
+    
+    def _limits(self):
+        import httpx
+        return httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+    
+    def _trace(self, event_name, info):
+        """httpcore trace hook: count freshly opened TCP connections"""
+        if event_name == "connection.connect_tcp.complete":
+            self._connections_opened += 1
+    
+    async def _atrace(self, event_name, info):
+        self._trace(event_name, info)
+    
+    def _on_request(self, request):
+        self._http_requests += 1
+        request.extensions["trace"] = self._trace
+    
+    async def _on_arequest(self, request):
+        self._http_requests += 1
+        request.extensions["trace"] = self._atrace
+    
+    def _ensure_http_clients(self):
+        import httpx
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=self._limits(),
+                event_hooks={"request": [self._on_request]},
+            )
+        if self._http_async_client is None:
+            self._http_async_client = _loop_async_client_class()(self)
+    
+    async def _loop_async_client(self):
+        """The running loop's async HTTP client, created on first use"""
+        import httpx
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is not None and not entry[0].is_closed:
+            return entry[0]
+        
+        client = httpx.AsyncClient(
+            limits=self._limits(),
+            event_hooks={"request": [self._on_arequest]},
+        )
+        closer = self._close_with_loop(loop, client)
+        await closer.__anext__()
+        self._async_clients[loop] = (client, closer)
+        return client
+    
+    async def _close_with_loop(self, loop, client):
+        """
+        Async generator left open for the loop's lifetime: the loop's
+        shutdown_asyncgens() (run by asyncio.run) finalizes it, which closes
+        the client on its own loop
+        """
+        try:
+            yield
+        finally:
+            if self._async_clients.get(loop, (None,))[0] is client:
+                del self._async_clients[loop]
+            await client.aclose()
+    
+    # ------------------------------------------------------------------
+    # Client lookup
+    # ------------------------------------------------------------------
+    
+    def get(self, profile="default"):
+        """
+        Return the shared client for a profile, building it on first use
+        
+        Args:
+            profile: Name of a profile in the registry
+            
+        Returns:
+            Chat model instance
+        """
+        self._lookups += 1
+        client = self._clients.get(profile)
+        if client is not None:
+            return client
+        
+        with self._lock:
+            # Another thread may have built it while we waited
+            client = self._clients.get(profile)
+            if client is not None:
+                return client
+            
+            if profile not in self.profiles:
+                raise ValueError(f"Unknown LLM profile: {profile}")
+            
+            if not self._env_loaded:
+                load_environment()
+                self._env_loaded = True
+            
+            self._ensure_http_clients()
+            client = _build_chat_model(
+                self.profiles[profile],
+                http_client=self._http_client,
+                http_async_client=self._http_async_client,
+            )
+            self._builds += 1
+            self._clients[profile] = client
+            return client
+    
+    def register(self, profile, client):
+        """
+        Install a pre-built client for a profile (e.g. a fake model)
+        
+        Args:
+            profile: Profile name
+            client: Chat model instance to serve for that profile
+        """
+        with self._lock:
+            self.profiles.setdefault(profile, {})
+            self._clients[profile] = client
+    
+    def stats(self):
+        """
+        Report registry and connection pool statistics
+        
+        Returns:
+            Dict with client counts, open connections and reuse rate
+        """
+        open_connections = 0
+        async_clients = [client for client, _closer in list(self._async_clients.values())]
+        for http_client in [self._http_client] + async_clients:
+            pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+            if pool is not None:
+                open_connections += len(pool.connections)
+        
+        requests = self._http_requests
+        reused = max(0, requests - self._connections_opened)
+        
+        return {
+            "clients": len(self._clients),
+            "profiles": sorted(self._clients),
+            "client_lookups": self._lookups,
+            "client_builds": self._builds,
+            "http_requests": requests,
+            "connections_opened": self._connections_opened,
+            "open_connections": open_connections,
+            "connection_reuse_rate": (reused / requests) if requests else 0.0,
+        }
+    
+    def close(self):
+        """Drop all clients and close the shared connection pools"""
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            # Async pools are closed by their own loops (closing one needs
+            # the loop it was used on)
+            self._http_async_client = None
+
+
+_registry = LLMClientRegistry()
+
+
+def get_llm_registry():
+    """Return the process-wide LLM client registry"""
+    return _registry
+
+
+def get_llm(profile="default"):
+    """
+    Get the shared, pooled LLM client for a node profile
+    
+    Args:
+        profile: 'summarize', 'quiz', 'grade' or 'default'
+        
+    Returns:
+        Chat model instance
+    """
+    return _registry.get(profile)
+
+
+def initialize_llm():
+    """
+    Initialize ChatOpenAI using credentials from environment
+    Handles both CLI and notebook execution contexts
+    
+    Returns the pooled default client; prefer get_llm(profile) in nodes.
+    """
+    return get_llm("default")
 
 
 def verify_tavily_api_key():
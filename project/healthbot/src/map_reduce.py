@@ -0,0 +1,353 @@
+"""
+HealthBot Map-Reduce Summarization
+Summarize large search result sets (20-50 full documents): the documents are
+split into chunks that each fit a prompt, the chunks are condensed into cited
+fact lists in parallel (map), and one call writes the patient-friendly
+summary from the fact lists (reduce). Used by summarize_results when the
+single summarization prompt would be too large.
+"""
+
+import os
+import re
+import asyncio
+import hashlib
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from budget import estimate_text_tokens
+from history import CHARS_PER_TOKEN
+from resilience import UpstreamUnavailable, call_upstream, acall_upstream
+from streaming import NO_STREAM_TAG
+
+# Summary modes (HEALTHBOT_SUMMARY_MODE)
+AUTO = "auto"              # Map-reduce only when the single prompt is too large
+SINGLE = "single"          # Always one prompt (the original behavior)
+MAP_REDUCE = "map_reduce"  # Always map-reduce
+
+MAX_SINGLE_PROMPT_TOKENS = 6000  # Larger single prompts switch to map-reduce (auto)
+MAP_CHUNK_TOKENS = 4000          # Source text per map prompt
+REDUCE_MAX_TOKENS = 6000         # Fact lists per reduce prompt (collapsed above this)
+MAP_CONCURRENCY = 16             # Map calls in flight at once
+MAX_COLLAPSE_ROUNDS = 3
+
+MAP_PROMPT = """
+You are extracting facts for a patient education summary.
+
+Health Topic: {topic}
+
+Sources (numbered):
+{sources}
+
+List the key facts these sources give about {topic}: what it is, symptoms,
+causes, treatment, prevention and when to see a doctor. Write short bullet
+points in plain language and end each one with the number(s) of the source(s)
+it comes from, like [3] or [2][5]. Skip anything not about {topic}.
+
+Facts:
+"""
+
+COLLAPSE_PROMPT = """
+You are merging fact lists for a patient education summary.
+
+Health Topic: {topic}
+
+Fact lists:
+{notes}
+
+Merge these into one list of short bullet points without repeats. Keep the
+source numbers in brackets, like [3], on every bullet.
+
+Facts:
+"""
+
+REDUCE_PROMPT = """
+You are a healthcare educator. Your task is to create a simple, patient-friendly
+explanation of medical information.
+
+Health Topic: {topic}
+
+Facts gathered from {source_count} sources (source numbers in brackets):
+{notes}
+
+Sources:
+{source_list}
+
+Please create a clear summary that:
+1. Explains the condition in simple language (8th grade reading level)
+2. Covers: what it is, symptoms, causes, and treatment options
+3. Is 300-400 words maximum
+4. Cites the sources by number, like [3], after the sentences they support,
+   and ends with a "Sources:" list of the numbers and URLs you cited
+5. Avoids medical jargon or explains it clearly
+
+Patient-Friendly Summary:
+"""
+
+# Part of the summary cache key (see nodes._lookup_summary)
+MAP_REDUCE_PROMPT_VERSION = hashlib.sha256(
+    (MAP_PROMPT + COLLAPSE_PROMPT + REDUCE_PROMPT).encode("utf-8")
+).hexdigest()[:16]
+
+_map_pool = None
+_map_pool_lock = threading.Lock()
+
+# One formatted search result (see tools.format_search_results)
+_DOCUMENT_START = re.compile(r"\n(?=\d+\. [^\n]*\n   Source: )")
+_DOCUMENT = re.compile(r"^(\d+)\. ([^\n]*)\n   Source: ([^\n]*)\n?(.*)$", re.DOTALL)
+
+
+def summary_mode():
+    """Summary mode from HEALTHBOT_SUMMARY_MODE (auto, single or map_reduce)"""
+    mode = os.getenv("HEALTHBOT_SUMMARY_MODE", AUTO).lower()
+    return mode if mode in (AUTO, SINGLE, MAP_REDUCE) else AUTO
+
+
+def split_documents(search_results):
+    """
+    Split formatted search results into documents
+    
+    Returns:
+        List of dicts with number, title, url and text (the whole formatted
+        entry, so chunks keep the original numbering)
+    """
+    documents = []
+    for block in _DOCUMENT_START.split(search_results):
+        block = block.strip("\n")
+        match = _DOCUMENT.match(block)
+        if match:
+            documents.append({
+                "number": int(match.group(1)),
+                "title": match.group(2).strip(),
+                "url": match.group(3).strip(),
+                "text": block,
+            })
+    return documents
+
+
+def use_map_reduce(single_prompt, search_results, mode=None):
+    """
+    Whether to summarize with map-reduce
+    
+    Args:
+        single_prompt: The single summarization prompt that would be sent
+        search_results: Formatted search results
+        mode: Summary mode (defaults to HEALTHBOT_SUMMARY_MODE)
+    """
+    mode = mode or summary_mode()
+    if mode == SINGLE:
+        return False
+    if len(split_documents(search_results)) < 2:
+        return False
+    if mode == MAP_REDUCE:
+        return True
+    limit = int(os.getenv("HEALTHBOT_SUMMARY_MAX_PROMPT_TOKENS", MAX_SINGLE_PROMPT_TOKENS))
+    return estimate_text_tokens(single_prompt) > limit
+
+
+def chunk_texts(texts, max_tokens):
+    """
+    Group texts in order into chunks of at most max_tokens (estimated)
+    
+    A text longer than max_tokens is cut to fit a chunk on its own.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current, size = [], [], 0
+    for text in texts:
+        text = text[:max_chars]
+        tokens = estimate_text_tokens(text)
+        if current and size + tokens > max_tokens:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_map_prompts(topic, search_results, chunk_tokens=None):
+    """Map prompts, one per chunk of documents"""
+    chunk_tokens = chunk_tokens or int(os.getenv("HEALTHBOT_MAP_CHUNK_TOKENS", MAP_CHUNK_TOKENS))
+    texts = [doc["text"] for doc in split_documents(search_results)]
+    return [
+        MAP_PROMPT.format(topic=topic, sources="\n\n".join(chunk))
+        for chunk in chunk_texts(texts, chunk_tokens)
+    ]
+
+
+def build_reduce_prompt(topic, search_results, notes):
+    """Reduce prompt: the fact lists plus the numbered source list"""
+    documents = split_documents(search_results)
+    source_list = "\n".join(f"[{doc['number']}] {doc['title']} - {doc['url']}" for doc in documents)
+    return REDUCE_PROMPT.format(
+        topic=topic,
+        source_count=len(documents),
+        notes="\n\n".join(notes),
+        source_list=source_list,
+    )
+
+
+def _reduce_limit():
+    return int(os.getenv("HEALTHBOT_REDUCE_MAX_TOKENS", REDUCE_MAX_TOKENS))
+
+
+def _collapse_prompts(topic, notes):
+    """Collapse prompts when the fact lists are too large for one reduce prompt"""
+    limit = _reduce_limit()
+    if estimate_text_tokens("\n\n".join(notes)) <= limit:
+        return []
+    return [
+        COLLAPSE_PROMPT.format(topic=topic, notes="\n\n".join(chunk))
+        for chunk in chunk_texts(notes, limit // 2)
+    ]
+
+
+def fit_notes(notes, max_tokens=None):
+    """
+    Keep fact lists, in order, up to max_tokens (estimated) for the reduce prompt
+    
+    Used when the collapse rounds could not shrink the notes enough. Notes
+    follow the ranked order of the documents, so the top-ranked sources are
+    kept and the list that crosses the limit is cut after its last whole
+    bullet (mid-bullet only when nothing else would be left).
+    """
+    max_chars = (max_tokens or _reduce_limit()) * CHARS_PER_TOKEN
+    kept, size = [], 0
+    for note in notes:
+        room = max_chars - size
+        if len(note) > room:
+            # Whole bullets only (a bullet ending right at the limit fits)
+            cut = note[:max(room + 1, 0)]
+            cut = cut[:cut.rfind("\n")] if "\n" in cut else ("" if kept else note[:room])
+            if cut:
+                kept.append(cut)
+            break
+        kept.append(note)
+        size += len(note) + 2  # The blank line joining notes
+    return kept
+
+
+def _concurrency():
+    return int(os.getenv("HEALTHBOT_MAP_CONCURRENCY", MAP_CONCURRENCY))
+
+
+def _skip(error):
+    return None
+
+
+def _notes(prompts, responses, calls):
+    """Keep the successful map/collapse responses; record every call made"""
+    notes = []
+    for prompt, response in zip(prompts, responses):
+        if response is not None and not isinstance(response, Exception):
+            calls.append((prompt, response))
+            notes.append(response.content.strip())
+    return notes
+
+
+def _get_map_pool():
+    global _map_pool
+    if _map_pool is None:
+        with _map_pool_lock:
+            if _map_pool is None:
+                _map_pool = ThreadPoolExecutor(_concurrency(), thread_name_prefix="healthbot-map")
+    return _map_pool
+
+
+def _map_call(hidden, prompt):
+    """One map/collapse call through the "llm" upstream (None once it gives up)"""
+    return call_upstream("llm", lambda: hidden.invoke(prompt), fallback=_skip)
+
+
+async def _amap_call(hidden, prompt, limit):
+    """Async counterpart of _map_call, bounded by a semaphore"""
+    async with limit:
+        return await acall_upstream("llm", lambda: hidden.ainvoke(prompt), fallback=_skip)
+
+
+def _map(llm, prompts, calls):
+    """
+    Run prompts in parallel, hidden from the token stream
+    
+    Every call goes through the "llm" upstream (timeout, retries, circuit
+    breaker); at most HEALTHBOT_MAP_CONCURRENCY run at once, shared by all
+    sessions of the process.
+    """
+    if not prompts:
+        return []
+    hidden = llm.with_config(tags=[NO_STREAM_TAG])
+    pool = _get_map_pool()
+    futures = [pool.submit(contextvars.copy_context().run, _map_call, hidden, prompt) for prompt in prompts]
+    return _notes(prompts, [future.result() for future in futures], calls)
+
+
+async def _amap(llm, prompts, calls):
+    """Async version of _map (bounded per summary by a semaphore)"""
+    if not prompts:
+        return []
+    hidden = llm.with_config(tags=[NO_STREAM_TAG])
+    limit = asyncio.Semaphore(_concurrency())
+    responses = await asyncio.gather(*(_amap_call(hidden, prompt, limit) for prompt in prompts))
+    return _notes(prompts, responses, calls)
+
+
+def map_reduce_summarize(llm, topic, search_results, fallback=_skip):
+    """
+    Summarize search results with map-reduce
+    
+    Map calls run in parallel (HEALTHBOT_MAP_CONCURRENCY at once), so the
+    wall time is about one map call plus the reduce call however many
+    documents there are. Each goes through the "llm" upstream; a chunk
+    whose map call keeps failing is left out. Fact lists still too large
+    for the reduce prompt after MAX_COLLAPSE_ROUNDS are cut to
+    HEALTHBOT_REDUCE_MAX_TOKENS (see fit_notes).
+    
+    Args:
+        llm: Chat model (the "summarize" profile client)
+        topic: Health topic
+        search_results: Formatted search results
+        fallback: Called with the error when the reduce call or every map
+            call fails (see resilience.Upstream.call)
+    
+    Returns:
+        Tuple (response, calls): the reduce response (None when the LLM is
+        unavailable) and the (prompt, response) pairs of every map and
+        collapse call, for token accounting
+    """
+    calls = []
+    notes = _map(llm, build_map_prompts(topic, search_results), calls)
+    for _round in range(MAX_COLLAPSE_ROUNDS):
+        prompts = _collapse_prompts(topic, notes)
+        if not prompts:
+            break
+        notes = _map(llm, prompts, calls) or notes
+    if not notes:
+        return fallback(UpstreamUnavailable("llm failed on every map call")), calls
+    notes = fit_notes(notes)
+    
+    prompt = build_reduce_prompt(topic, search_results, notes)
+    response = call_upstream("llm", lambda: llm.invoke(prompt), fallback=fallback)
+    if response is not None:
+        calls.append((prompt, response))
+    return response, calls
+
+
+async def amap_reduce_summarize(llm, topic, search_results, fallback=_skip):
+    """Async version of map_reduce_summarize"""
+    calls = []
+    notes = await _amap(llm, build_map_prompts(topic, search_results), calls)
+    for _round in range(MAX_COLLAPSE_ROUNDS):
+        prompts = _collapse_prompts(topic, notes)
+        if not prompts:
+            break
+        notes = await _amap(llm, prompts, calls) or notes
+    if not notes:
+        return fallback(UpstreamUnavailable("llm failed on every map call")), calls
+    notes = fit_notes(notes)
+    
+    prompt = build_reduce_prompt(topic, search_results, notes)
+    response = await acall_upstream("llm", lambda: llm.ainvoke(prompt), fallback=fallback)
+    if response is not None:
+        calls.append((prompt, response))
+    return response, calls
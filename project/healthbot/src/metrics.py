@@ -0,0 +1,302 @@
+"""
+HealthBot Metrics
+Per-node wall time, LLM tokens, search time, cache hits and errors, exposed
+as Prometheus text and as a JSONL event log
+"""
+
+import os
+import json
+import time
+import inspect
+import functools
+import threading
+import contextvars
+from collections import OrderedDict
+
+from langgraph.errors import GraphInterrupt
+
+# Prometheus histogram buckets for node wall time (seconds)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Sessions kept for per-session lookups (least recently active are dropped)
+MAX_SESSIONS = 1000
+
+# The node run currently executing in this thread/task (None outside nodes,
+# which makes every record_* call a cheap no-op)
+_current_run = contextvars.ContextVar("healthbot_node_run", default=None)
+
+
+def _new_counters():
+    return {
+        "calls": 0,
+        "errors": 0,
+        "interrupts": 0,
+        "seconds": 0.0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "search_calls": 0,
+        "search_seconds": 0.0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+    }
+
+
+def _add(counters, run):
+    counters["calls"] += 1
+    counters["errors"] += run["status"] == "error"
+    counters["interrupts"] += run["status"] == "interrupt"
+    for key in ("seconds", "prompt_tokens", "completion_tokens", "search_calls", "search_seconds"):
+        counters[key] += run[key]
+    for hits, misses in run["cache"].values():
+        counters["cache_hits"] += hits
+        counters["cache_misses"] += misses
+
+
+class NodeMetrics:
+    """
+    Collector for node runs
+    
+    Aggregates every run per node (and per session), keeps a duration
+    histogram and per-cache hit/miss counts per node, and optionally appends
+    one JSON event per run to a log file.
+    """
+    
+    def __init__(self, log_path=None, max_sessions=MAX_SESSIONS):
+        """
+        Args:
+            log_path: JSONL file to append one event per node run to
+            max_sessions: Sessions kept for session_metrics()
+        """
+        self.log_path = log_path
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._histograms = {}
+        self._caches = {}  # (node, cache) -> [hits, misses]
+        self._sessions = OrderedDict()
+        self._log = open(log_path, "a", buffering=1) if log_path else None
+    
+    # ------------------------------------------------------------------
+    # Node wrapping
+    # ------------------------------------------------------------------
+    
+    def _begin(self, node, state):
+        run = {
+            "node": node,
+            "session_id": state.get("session_id") if isinstance(state, dict) else None,
+            "status": "ok",
+            "error": None,
+            "seconds": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "search_calls": 0,
+            "search_seconds": 0.0,
+            "cache": {},  # cache name -> [hits, misses]
+        }
+        return run, _current_run.set(run)
+    
+    def _fail(self, run, error):
+        if isinstance(error, GraphInterrupt):
+            run["status"] = "interrupt"
+        else:
+            run["status"] = "error"
+            run["error"] = f"{type(error).__name__}: {error}"
+    
+    def _end(self, run, token, start):
+        run["seconds"] = time.perf_counter() - start
+        _current_run.reset(token)
+        self.record_run(run)
+    
+    def wrap(self, node, func):
+        """
+        Wrap a node function so each run is recorded
+        
+        Args:
+            node: Node name used as the metrics label
+            func: Sync or async node function
+        
+        Returns:
+            Wrapped function of the same kind
+        """
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(state):
+                run, token = self._begin(node, state)
+                start = time.perf_counter()
+                try:
+                    return await func(state)
+                except BaseException as e:
+                    self._fail(run, e)
+                    raise
+                finally:
+                    self._end(run, token, start)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(state):
+            run, token = self._begin(node, state)
+            start = time.perf_counter()
+            try:
+                return func(state)
+            except BaseException as e:
+                self._fail(run, e)
+                raise
+            finally:
+                self._end(run, token, start)
+        return wrapper
+    
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+    
+    def record_run(self, run):
+        """Add one finished node run to the aggregates and the event log"""
+        node = run["node"]
+        with self._lock:
+            _add(self._nodes.setdefault(node, _new_counters()), run)
+            
+            buckets = self._histograms.setdefault(node, [0] * len(DURATION_BUCKETS))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if run["seconds"] <= bound:
+                    buckets[i] += 1
+            
+            for cache, (hits, misses) in run["cache"].items():
+                counts = self._caches.setdefault((node, cache), [0, 0])
+                counts[0] += hits
+                counts[1] += misses
+            
+            session_id = run["session_id"]
+            if session_id:
+                session = self._sessions.pop(session_id, None) or {}
+                _add(session.setdefault(node, _new_counters()), run)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            
+            if self._log is not None:
+                self._log.write(json.dumps({"ts": time.time(), **run}) + "\n")
+    
+    def node_metrics(self):
+        """Return per-node counters (copy)"""
+        with self._lock:
+            return {node: dict(c) for node, c in self._nodes.items()}
+    
+    def session_metrics(self, session_id):
+        """Return per-node counters for one session (empty if unknown)"""
+        with self._lock:
+            session = self._sessions.get(session_id, {})
+            return {node: dict(c) for node, c in session.items()}
+    
+    def render_prometheus(self):
+        """
+        Render the aggregates in Prometheus text exposition format
+        
+        Returns:
+            Metrics text (serve it at /metrics or write it for a textfile
+            collector)
+        """
+        with self._lock:
+            nodes = {node: dict(c) for node, c in self._nodes.items()}
+            histograms = {node: list(b) for node, b in self._histograms.items()}
+            caches = {key: list(v) for key, v in self._caches.items()}
+        
+        lines = []
+        
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+        
+        family("healthbot_node_runs_total", "counter", "Node runs by outcome")
+        for node, c in nodes.items():
+            ok = c["calls"] - c["errors"] - c["interrupts"]
+            for status, value in (("ok", ok), ("interrupt", c["interrupts"]), ("error", c["errors"])):
+                lines.append(f'healthbot_node_runs_total{{node="{node}",status="{status}"}} {value}')
+        
+        family("healthbot_node_duration_seconds", "histogram", "Node wall time")
+        for node, c in nodes.items():
+            for bound, count in zip(DURATION_BUCKETS, histograms.get(node, [])):
+                lines.append(f'healthbot_node_duration_seconds_bucket{{node="{node}",le="{bound}"}} {count}')
+            lines.append(f'healthbot_node_duration_seconds_bucket{{node="{node}",le="+Inf"}} {c["calls"]}')
+            lines.append(f'healthbot_node_duration_seconds_sum{{node="{node}"}} {c["seconds"]:.6f}')
+            lines.append(f'healthbot_node_duration_seconds_count{{node="{node}"}} {c["calls"]}')
+        
+        family("healthbot_llm_tokens_total", "counter", "LLM tokens used by node runs")
+        for node, c in nodes.items():
+            lines.append(f'healthbot_llm_tokens_total{{node="{node}",type="prompt"}} {c["prompt_tokens"]}')
+            lines.append(f'healthbot_llm_tokens_total{{node="{node}",type="completion"}} {c["completion_tokens"]}')
+        
+        family("healthbot_search_seconds_total", "counter", "Time spent in search API calls")
+        for node, c in nodes.items():
+            if c["search_calls"]:
+                lines.append(f'healthbot_search_seconds_total{{node="{node}"}} {c["search_seconds"]:.6f}')
+        
+        family("healthbot_cache_lookups_total", "counter", "Cache lookups by node, cache and result")
+        for (node, cache), (hits, misses) in caches.items():
+            lines.append(f'healthbot_cache_lookups_total{{node="{node}",cache="{cache}",result="hit"}} {hits}')
+            lines.append(f'healthbot_cache_lookups_total{{node="{node}",cache="{cache}",result="miss"}} {misses}')
+        
+        return "\n".join(lines) + "\n"
+    
+    def close(self):
+        """Close the event log"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+# ----------------------------------------------------------------------
+# Recording hooks (no-ops outside an instrumented node run)
+# ----------------------------------------------------------------------
+
+def record_llm_usage(response):
+    """Add a chat model response's token usage to the current node run"""
+    run = _current_run.get()
+    if run is None:
+        return
+    usage = getattr(response, "usage_metadata", None) or {}
+    run["prompt_tokens"] += usage.get("input_tokens", 0)
+    run["completion_tokens"] += usage.get("output_tokens", 0)
+
+
+def record_search(seconds):
+    """Add one search API call to the current node run"""
+    run = _current_run.get()
+    if run is None:
+        return
+    run["search_calls"] += 1
+    run["search_seconds"] += seconds
+
+
+def record_cache(cache, hit):
+    """Add one cache lookup (hit or miss) to the current node run"""
+    run = _current_run.get()
+    if run is None:
+        return
+    counts = run["cache"].setdefault(cache, [0, 0])
+    counts[0 if hit else 1] += 1
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Return the process-wide collector, creating it on first use
+    
+    Enabled with HEALTHBOT_METRICS=on; HEALTHBOT_METRICS_LOG names the JSONL
+    event log (no log by default).
+    
+    Returns:
+        NodeMetrics, or None when metrics are disabled
+    """
+    global _metrics
+    
+    if os.getenv("HEALTHBOT_METRICS", "off").lower() not in ("on", "1", "true"):
+        return None
+    
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = NodeMetrics(log_path=os.getenv("HEALTHBOT_METRICS_LOG") or None)
+    return _metrics
@@ -1,19 +1,883 @@
 """
 HealthBot Workflow Nodes
 8 core conversation nodes for the HealthBot workflow
+
+Each node has a synchronous version and an async version (a-prefixed, e.g.
+asummarize_results) that awaits the LLM and search instead of blocking, so
+many sessions can share one event loop.
+
+Nodes that need the patient (ask_for_topic, present_summary, present_quiz,
+ask_continue) never block on input: they pause the graph with an interrupt
+and are re-run with the reply once the client resumes the session.
+
+Nodes never modify the incoming state. They return only the fields they
+change; new messages are appended by the messages reducer.
+"""
+
+import os
+import re
+import hashlib
+from langchain_core.messages import AIMessage, HumanMessage
+from state import State, new_topic_update
+from utils import (
+    display_text_to_user,
+    request_patient_input,
+    validate_non_empty_input,
+    validate_topic_length,
+    separator,
+    display_header,
+)
+from tools import search_medical_information, asearch_medical_information, NO_SEARCH_RESULTS
+from llm_config import get_llm
+from cache import get_summary_store, summary_cache_key, summary_tag, normalize_topic
+from speculation import get_quiz_speculator
+from resilience import call_upstream, acall_upstream
+from topic_index import get_topic_index
+from map_reduce import (
+    MAP_REDUCE_PROMPT_VERSION,
+    use_map_reduce,
+    map_reduce_summarize,
+    amap_reduce_summarize,
+)
+from metrics import record_llm_usage
+from budget import (
+    NORMAL,
+    ECONOMY,
+    EXHAUSTED,
+    budget_mode,
+    response_usage,
+    usage_update,
+    session_usage_update,
+    merge_token_usage,
+)
+
+
+# ============================================================================
+# Prompt templates
+# ============================================================================
+
+SUMMARIZATION_PROMPT = """
+You are a healthcare educator. Your task is to create a simple, patient-friendly 
+explanation of medical information.
+
+Health Topic: {topic}
+
+Medical Information (from web search):
+{search_results}
+
+Please create a clear summary that:
+1. Explains the condition in simple language (8th grade reading level)
+2. Covers: what it is, symptoms, causes, and treatment options
+3. Is 300-400 words maximum
+4. Includes citations or references to the sources
+5. Avoids medical jargon or explains it clearly
+
+Patient-Friendly Summary:
+"""
+
+# Changes automatically whenever the template text changes, which in turn
+# changes every summary cache key
+SUMMARIZATION_PROMPT_VERSION = hashlib.sha256(
+    SUMMARIZATION_PROMPT.encode("utf-8")
+).hexdigest()[:16]
+
+# Used near a token budget: fewer search results in, a shorter summary out
+BRIEF_SUMMARIZATION_PROMPT = """
+You are a healthcare educator. Write a short, patient-friendly explanation of
+the medical information below.
+
+Health Topic: {topic}
+
+Medical Information (from web search):
+{search_results}
+
+Keep it to 120-150 words in simple language (8th grade reading level): what
+it is, main symptoms, causes and treatment options. Name the sources you used.
+
+Patient-Friendly Summary:
+"""
+
+BRIEF_SUMMARIZATION_PROMPT_VERSION = hashlib.sha256(
+    BRIEF_SUMMARIZATION_PROMPT.encode("utf-8")
+).hexdigest()[:16]
+
+QUIZ_BANK_PROMPT = """
+You are a healthcare educator creating a short quiz to test patient understanding.
+
+Health Topic: {topic}
+
+Patient-Friendly Summary:
+{summary}
+
+Create {count} DIFFERENT quiz questions, each testing a different key point from the summary.
+
+Each question should:
+1. Be clear and simple (8th grade reading level)
+2. Test understanding, not memorization
+3. Be answerable based on the summary
+4. Be relevant to patient education{asked_instruction}
+
+Format each question as ONLY the question (no numbering). Questions may be open
+(answered in the patient's own words) or multiple choice with options A, B, C, D,
+each on its own line. End each multiple-choice question with the answer key and
+the sentence from the summary that supports it:
+ANSWER: [letter]
+CITATION: [sentence from the summary]
+Open questions have no answer key.
+
+Separate the questions with a line containing only ---
+
+Quiz Questions:
+"""
+
+GRADING_PROMPT = """
+You are a healthcare educator grading a patient's quiz answer.
+
+Health Topic: {topic}
+
+Medical Summary:
+{summary}
+
+Quiz Question:
+{question}
+
+Patient's Answer:
+{answer}
+
+Please grade this answer on a scale of 0-100 points. Consider:
+- Is the answer correct/accurate?
+- Does it show understanding of key concepts?
+- Is it partially correct?
+
+Provide:
+1. A numeric grade (0-100)
+2. An explanation of the grade (2-3 sentences)
+3. One or two citations/references from the summary that support the correct answer
+
+Format your response exactly as:
+GRADE: [number]
+EXPLANATION: [your explanation with citations from the summary]
+
+Example format:
+GRADE: 85
+EXPLANATION: Good understanding! You correctly identified [concept]. The summary notes that [citation from summary]. Consider also that [another point].
+"""
+
+# Asked in turn when the token budget is used up or the LLM is unavailable
+# (no LLM call)
+FALLBACK_QUESTIONS = [
+    "In your own words, what is {topic} and what are its main symptoms?",
+    "According to the summary, what are the main treatment options for {topic}?",
+    "What is one cause or risk factor of {topic} mentioned in the summary?",
+]
+
+GREETING = """
+    ================================================================================
+    Welcome to HealthBot - Your Personal Health Education Assistant
+    ================================================================================
+    
+    I'm here to help you learn about health topics and medical conditions in 
+    simple, easy-to-understand language.
+    
+    """
+
+# Why a summary, question or grade was made without the LLM
+BUDGET_REASON = "this session's token budget has been used up"
+UNAVAILABLE_REASON = "the AI service is not responding right now"
+
+GOODBYE = "\nThank you for using HealthBot! Stay informed, stay healthy.\n"
+
+TOPIC_PROMPT = "What health topic or medical condition would you like to learn about? "
+READY_PROMPT = "Have you finished reading? Type 'ready' to proceed to the comprehension check: "
+ANSWER_PROMPT = "Please enter your answer: "
+CONTINUE_PROMPT = """
+What would you like to do next?
+  (1) Another quiz question on this topic
+  (2) Learn about a new health topic
+  (3) Exit the session
+
+Enter your choice (1, 2, or 3): """
+
+CONTINUE_CHOICES = {
+    '1': 'more_questions',
+    '2': 'new_topic',
+    '3': 'exit',
+    'more_questions': 'more_questions',
+    'new_topic': 'new_topic',
+    'exit': 'exit',
+}
+
+
+# ============================================================================
+# Shared helpers (used by both sync and async nodes)
+# ============================================================================
+
+# Quiz bank: questions generated per call, and the remaining count at which
+# the next bank is generated in the background
+QUIZ_BANK_SIZE = int(os.getenv("HEALTHBOT_QUIZ_BANK_SIZE", 5))
+QUIZ_BANK_LOW = int(os.getenv("HEALTHBOT_QUIZ_BANK_LOW", 1))
+ASKED_QUESTIONS_KEPT = 50     # Asked questions remembered per topic
+DUPLICATE_SIMILARITY = 0.75   # Word overlap (Jaccard) at which questions count as repeats
+
+# Cheaper paths near a token budget (see budget.py)
+ECONOMY_MAX_TOKENS = {"summarize": 400, "quiz": 600, "grade": 250}
+ECONOMY_SEARCH_RESULTS = 3    # Search results sent to the brief summary prompt
+ECONOMY_SUMMARY_CHARS = 1200  # Summary excerpt sent with quiz and grading prompts
+
+
+def _model_name(llm):
+    """Best-effort model identifier for cache keys"""
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+def _bounded(llm, profile, mode):
+    """Cap the completion length of a call in economy mode"""
+    if mode == ECONOMY:
+        return llm.bind(max_tokens=ECONOMY_MAX_TOKENS[profile])
+    return llm
+
+
+def _no_response(error):
+    """LLM fallback: the node continues without the model (see resilience.py)"""
+    display_text_to_user(f"The AI service is not responding ({error}); continuing without it.")
+    return None
+
+
+def _account(state, response, prompt, update):
+    """Add one LLM call's token usage to a node update (and to metrics)"""
+    record_llm_usage(response)
+    usage = usage_update(state.get("health_topic"), *response_usage(response, prompt))
+    update["token_usage"] = merge_token_usage(update.get("token_usage"), usage["token_usage"])
+    return update
+
+
+def _account_calls(state, calls, update):
+    """Add the token usage of several LLM calls (map-reduce) to a node update"""
+    for prompt, response in calls:
+        _account(state, response, prompt, update)
+    return update
+
+
+def _excerpt(summary, limit=ECONOMY_SUMMARY_CHARS):
+    """Leading part of a summary, cut at a sentence boundary"""
+    if len(summary) <= limit:
+        return summary
+    cut = summary[:limit]
+    return cut[:cut.rfind(". ") + 1] or cut
+
+
+def build_summarization_prompt(topic, search_results, mode=NORMAL):
+    """
+    Build the summarization prompt
+    
+    Args:
+        topic: Health topic
+        search_results: Formatted search results
+        mode: Budget mode; outside NORMAL the brief prompt is used with only
+            the first few search results
+    
+    Returns:
+        Prompt string
+    """
+    if mode == NORMAL:
+        return SUMMARIZATION_PROMPT.format(topic=topic, search_results=search_results)
+    
+    # Results are numbered "\n1. Title" ... by tools.format_search_results
+    marker = f"\n{ECONOMY_SEARCH_RESULTS + 1}. "
+    trimmed = search_results.split(marker)[0]
+    return BRIEF_SUMMARIZATION_PROMPT.format(topic=topic, search_results=trimmed)
+
+
+def _source_summary(topic, search_results, reason=BUDGET_REASON):
+    """Summary shown without an LLM call (token budget used up, LLM unavailable)"""
+    return (
+        f"Here is what we found about {topic}. These are excerpts straight from "
+        f"the sources ({reason}):\n"
+        f"{search_results}"
+    )
+
+
+def _fallback_question(topic, quiz_count):
+    """Quiz question asked without an LLM call once the token budget is used up"""
+    return FALLBACK_QUESTIONS[(quiz_count - 1) % len(FALLBACK_QUESTIONS)].format(topic=topic)
+
+
+def _local_grade(answer, summary, reason=BUDGET_REASON):
+    """
+    Grade an answer without an LLM call (token budget used up, LLM unavailable)
+    
+    Scores the share of the answer's content words found in the summary.
+    
+    Returns:
+        Tuple (grade, feedback)
+    """
+    words = {w for w in re.findall(r"[a-z]+", answer.lower()) if len(w) > 3}
+    summary_words = set(re.findall(r"[a-z]+", summary.lower()))
+    matched = len(words & summary_words)
+    grade = round(100 * matched / len(words)) if words else 0
+    feedback = (
+        f"Checked against the summary without the AI grader ({reason}): "
+        f"{matched} of {len(words)} key words in "
+        f"your answer appear in the summary. Re-read the summary to compare your "
+        f"answer with it."
+    )
+    return grade, feedback
+
+
+def build_quiz_bank_prompt(topic, summary, asked=(), count=None):
+    """
+    Build the prompt that generates a bank of quiz questions
+    
+    Args:
+        topic: Health topic
+        summary: Patient-friendly summary
+        asked: Questions already asked on this topic (to avoid repeating)
+        count: Number of questions (QUIZ_BANK_SIZE by default)
+    
+    Returns:
+        Prompt string
+    """
+    asked_instruction = ""
+    if asked:
+        listed = "\n".join(f"- {question}" for question in asked)
+        asked_instruction = f"\n\nThe patient has already answered these questions, so do not repeat them:\n{listed}"
+    
+    return QUIZ_BANK_PROMPT.format(
+        topic=topic,
+        summary=summary,
+        count=count or QUIZ_BANK_SIZE,
+        asked_instruction=asked_instruction,
+    )
+
+
+def build_grading_prompt(topic, summary, question, answer):
+    """
+    Build the grading prompt for one patient answer
+    
+    Args:
+        topic: Health topic
+        summary: Patient-friendly summary (source of citations)
+        question: Quiz question
+        answer: Patient's answer
+    
+    Returns:
+        Prompt string
+    """
+    return GRADING_PROMPT.format(
+        topic=topic, summary=summary, question=question, answer=answer
+    )
+
+
+def parse_grading_response(grading_result):
+    """
+    Parse a GRADE/EXPLANATION grading response
+    
+    Args:
+        grading_result: Raw LLM response text
+    
+    Returns:
+        Tuple (grade, feedback) with grade clamped to 0-100
+    """
+    lines = grading_result.strip().split('\n')
+    grade = 0
+    feedback = ""
+    
+    for i, line in enumerate(lines):
+        if line.startswith("GRADE:"):
+            try:
+                grade_str = line.replace("GRADE:", "").strip()
+                grade = int(''.join(filter(str.isdigit, grade_str)))
+                grade = min(100, max(0, grade))  # Clamp 0-100
+            except ValueError:
+                grade = 70  # Default if parsing fails
+        elif line.startswith("EXPLANATION:"):
+            feedback = line.replace("EXPLANATION:", "").strip()
+            # Append any remaining lines
+            if i + 1 < len(lines):
+                feedback += "\n" + "\n".join(lines[i+1:])
+            break
+    
+    return grade, feedback
+
+
+_OPTION_PATTERN = re.compile(r"^\(?([A-D])[\).:]\s*(.+)$")
+_KEY_PATTERN = re.compile(r"^(ANSWER|CITATION):\s*(.*)$", re.IGNORECASE)
+_CHOICE_PATTERN = re.compile(r"^\(?([A-Da-d])(?:[\).:]\s*(.*))?$")
+
+
+def parse_quiz_response(quiz_text):
+    """
+    Split a quiz completion into the question and its answer key
+    
+    Args:
+        quiz_text: Raw LLM response text
+    
+    Returns:
+        Tuple (question, answer_key). question is the text to show (without
+        the ANSWER/CITATION lines); answer_key is a dict with answer (letter),
+        options (letter -> text) and citation for a multiple-choice question
+        with a usable key, otherwise None.
+    """
+    question_lines = []
+    options = {}
+    key = {}
+    
+    for line in quiz_text.strip().split('\n'):
+        stripped = line.strip()
+        if match := _KEY_PATTERN.match(stripped):
+            key[match.group(1).upper()] = match.group(2).strip()
+            continue
+        if match := _OPTION_PATTERN.match(stripped):
+            options[match.group(1)] = match.group(2).strip()
+        question_lines.append(line)
+    
+    question = "\n".join(question_lines).strip()
+    answer = key.get("ANSWER", "").strip("()[]. ").upper()[:1]
+    if answer not in options:
+        return question, None
+    return question, {"answer": answer, "options": options, "citation": key.get("CITATION", "")}
+
+
+def parse_quiz_bank(bank_text):
+    """
+    Split a quiz bank completion into questions
+    
+    Args:
+        bank_text: Raw LLM response text (questions separated by --- lines)
+    
+    Returns:
+        List of {"question", "answer_key"} dicts (see parse_quiz_response)
+    """
+    chunks = re.split(r"^\s*-{3,}\s*$", bank_text, flags=re.MULTILINE)
+    bank = []
+    for chunk in chunks:
+        question, answer_key = parse_quiz_response(chunk)
+        if question:
+            bank.append({"question": question, "answer_key": answer_key})
+    return bank
+
+
+_STOPWORDS = frozenset(
+    "the and for are was were what which who why how does did can could would should "
+    "that this these those with from about into your you one following true best most "
+    "when where their they them its has have had not".split()
+)
+
+
+def question_stem(question):
+    """First line of a question (without its options), used to spot repeats"""
+    return question.strip().split("\n")[0].strip()
+
+
+def _question_words(question):
+    return {
+        w for w in re.findall(r"[a-z]+", question_stem(question).lower())
+        if len(w) > 2 and w not in _STOPWORDS
+    }
+
+
+def is_near_duplicate(question, asked, threshold=DUPLICATE_SIMILARITY):
+    """
+    Whether a question repeats one already asked
+    
+    Args:
+        question: Candidate question
+        asked: Question stems already asked on the topic
+        threshold: Word overlap (Jaccard) at which two questions match
+    
+    Returns:
+        True if the candidate's stem overlaps an asked one by threshold or more
+    """
+    words = _question_words(question)
+    if not words:
+        return False
+    for previous in asked:
+        other = _question_words(previous)
+        if other and len(words & other) / len(words | other) >= threshold:
+            return True
+    return False
+
+
+def _take_from_bank(bank, asked):
+    """
+    Next question from a bank that is not a repeat
+    
+    Returns:
+        Tuple (item, remaining bank); item is None when every question left
+        repeats an asked one
+    """
+    for i, item in enumerate(bank):
+        if not is_near_duplicate(item["question"], asked):
+            return item, bank[i + 1:]
+    return None, []
+
+
+def _fresh_bank(bank_text, asked):
+    """Next question and remaining bank from a newly generated bank"""
+    bank = parse_quiz_bank(bank_text)
+    item, remaining = _take_from_bank(bank, asked)
+    if item is None and bank:
+        # Nothing new left to ask: repeat a question rather than fail
+        item, remaining = bank[0], bank[1:]
+    return item, remaining
+
+
+def parse_choice(answer, answer_key):
+    """
+    Option the patient picked on a multiple-choice question
+    
+    Accepts a letter ("B", "b)", "(B)"), a letter with the option text
+    ("B) Insulin") or the option text alone.
+    
+    Args:
+        answer: Patient's answer
+        answer_key: Answer key from parse_quiz_response (or None)
+    
+    Returns:
+        Option letter, or None for a free-text answer (grade with the LLM)
+    """
+    if not answer_key:
+        return None
+    options = answer_key["options"]
+    text = answer.strip()
+    
+    if match := _CHOICE_PATTERN.match(text):
+        letter, rest = match.group(1).upper(), match.group(2)
+        if letter in options and (not rest or rest.casefold() == options[letter].casefold()):
+            return letter
+    for letter, option in options.items():
+        if text.casefold() == option.casefold():
+            return letter
+    return None
+
+
+def grade_choice(choice, answer_key):
+    """
+    Grade a multiple-choice answer against the answer key (no LLM call)
+    
+    Args:
+        choice: Option letter from parse_choice
+        answer_key: Answer key from parse_quiz_response
+    
+    Returns:
+        Tuple (grade, feedback) in the same form as parse_grading_response
+    """
+    correct = answer_key["answer"]
+    options = answer_key["options"]
+    if choice == correct:
+        grade = 100
+        feedback = f"Correct! {correct}) {options[correct]} is the right answer."
+    else:
+        grade = 0
+        feedback = (
+            f"Not quite. You chose {choice}) {options[choice]}, but the correct "
+            f"answer is {correct}) {options[correct]}."
+        )
+    citation = answer_key.get("citation")
+    if citation:
+        feedback += f' The summary notes: "{citation}"'
+    return grade, feedback
+
+
+def _record_topic(topic):
+    return {
+        "health_topic": topic,
+        "patient_input": None,
+        "messages": [
+            HumanMessage(content=f"I want to learn about: {topic}"),
+            AIMessage(content=f"Great! Let me find information about {topic} for you..."),
+        ],
+    }
+
+
+def _record_search_results(topic, results, topic_match=None):
+    return {
+        "search_results": results,
+        "topic_match": topic_match,
+        "messages": [AIMessage(content=f"Found information about {topic}. Now creating a summary...")],
+    }
+
+
+def _indexed_results(topic):
+    """
+    Search results of a cached topic similar to this one
+    
+    Returns:
+        Tuple (index, update); index is None when the topic index is disabled
+        and update is None when no cached topic is similar enough
+    """
+    index = get_topic_index()
+    if index is None:
+        return None, None
+    match = index.match(topic)
+    if match is None:
+        return index, None
+    if match["topic"] != normalize_topic(topic):
+        display_text_to_user(f"Using saved information about '{match['topic']}' for '{topic}'")
+    return index, _record_search_results(topic, match["search_results"], match["topic"])
+
+
+def _index_results(index, topic, results):
+    if index is not None and results != NO_SEARCH_RESULTS:
+        index.add(topic, results)
+
+
+def _indexed_summary(state, search_results):
+    """Summary stored with the matched topic's search results, if any"""
+    topic_match = state.get("topic_match")
+    index = get_topic_index()
+    if index is None or not topic_match:
+        return None
+    entry = index.get(topic_match)
+    if entry is None or entry["search_results"] != search_results:
+        return None
+    return entry["summary"]
+
+
+def _index_summary(state, topic, search_results, summary):
+    index = get_topic_index()
+    if index is not None:
+        index.set_summary(state.get("topic_match") or topic, search_results, summary)
+
+
+def _lookup_summary(topic, search_results, llm, mode=NORMAL, map_reduce=False):
+    """
+    Look up a stored summary for these exact inputs
+    
+    Outside NORMAL budget mode a stored full summary is still preferred,
+    then a stored brief one. Map-reduce summaries are stored under their own
+    prompt version.
+    
+    Returns:
+        Tuple (store, cache_key, cached_summary); store is None when disabled
+        and cache_key is the key for the prompt used in this mode
+    """
+    store = get_summary_store()
+    if store is None:
+        return None, None, None
+    for cache_key in _summary_keys(topic, search_results, llm, mode, map_reduce):
+        cached_summary = store.get(cache_key)
+        if cached_summary is not None:
+            break
+    return store, cache_key, cached_summary
+
+
+async def _alookup_summary(topic, search_results, llm, mode=NORMAL, map_reduce=False):
+    """Async version of _lookup_summary (disk reads off the event loop)"""
+    store = get_summary_store()
+    if store is None:
+        return None, None, None
+    for cache_key in _summary_keys(topic, search_results, llm, mode, map_reduce):
+        cached_summary = await store.aget(cache_key)
+        if cached_summary is not None:
+            break
+    return store, cache_key, cached_summary
+
+
+def _summary_keys(topic, search_results, llm, mode, map_reduce):
+    """Summary store keys to try, in order of preference"""
+    versions = [MAP_REDUCE_PROMPT_VERSION if map_reduce else SUMMARIZATION_PROMPT_VERSION]
+    if mode != NORMAL:
+        versions.append(BRIEF_SUMMARIZATION_PROMPT_VERSION)
+    return [summary_cache_key(topic, search_results, version, _model_name(llm)) for version in versions]
+
+
+def _record_summary(summary):
+    return {
+        "summary": summary,
+        "messages": [AIMessage(content="Summary created successfully.")],
+    }
+
+
+def _next_bank_prompt(state):
+    """
+    Speculator and prompt for this session's next quiz bank
+    
+    Returns:
+        Tuple (speculator, session_id, prompt); speculator is None when
+        speculation is disabled or the session has no id
+    """
+    speculator = get_quiz_speculator()
+    session_id = state.get("session_id")
+    if speculator is None or not session_id:
+        return None, None, None
+    prompt = build_quiz_bank_prompt(
+        state.get("health_topic", ""), state.get("summary", ""), state.get("asked_questions") or []
+    )
+    return speculator, session_id, prompt
+
+
+def _speculate_quiz(state, update):
+    """Generate the topic's next quiz bank in the background"""
+    if budget_mode(state) != NORMAL:
+        return update  # Near a budget, only spend tokens on questions asked for
+    merged = {**state, **update}
+    speculator, session_id, prompt = _next_bank_prompt(merged)
+    if speculator is not None:
+        speculator.start(session_id, prompt, get_llm("quiz"), merged.get("health_topic"))
+        update["quiz_bank_refill_at"] = len(merged.get("asked_questions") or [])
+    return update
+
+
+def _aspeculate_quiz(state, update):
+    """Async version of _speculate_quiz (schedules a task on the running loop)"""
+    if budget_mode(state) != NORMAL:
+        return update
+    merged = {**state, **update}
+    speculator, session_id, prompt = _next_bank_prompt(merged)
+    if speculator is not None:
+        speculator.astart(session_id, prompt, get_llm("quiz"), merged.get("health_topic"))
+        update["quiz_bank_refill_at"] = len(merged.get("asked_questions") or [])
+    return update
+
+
+def _bank_is_low(state, update):
+    """Whether to start refilling the bank (and no refill is pending)"""
+    merged = {**state, **update}
+    return len(merged["quiz_bank"]) <= QUIZ_BANK_LOW and merged.get("quiz_bank_refill_at") is None
+
+
+def _bank_prompts(state, mode):
+    """
+    Prompts for generating a bank when the current one has run out
+    
+    Returns:
+        Tuple (prompt, refill_prompt): prompt for a call made now, and the
+        prompt the pending background refill was started with (None if none)
+    """
+    topic = state.get("health_topic", "")
+    summary = state.get("summary", "")
+    asked = state.get("asked_questions") or []
+    
+    refill_at = state.get("quiz_bank_refill_at")
+    refill_prompt = None
+    if refill_at is not None:
+        refill_prompt = build_quiz_bank_prompt(topic, summary, asked[:refill_at])
+    
+    if mode == ECONOMY:
+        summary = _excerpt(summary)
+    return build_quiz_bank_prompt(topic, summary, asked), refill_prompt
+
+
+# Titles of the displays that streamed node text is shown in, so a client
+# printing tokens as they arrive can open the display first
+DISPLAY_TITLES = {
+    "summarize_results": "HEALTH INFORMATION SUMMARY",
+    "evaluate_answer": "YOUR QUIZ RESULTS",
+}
+
+
+def _summary_display(summary):
+    return display_header(DISPLAY_TITLES["summarize_results"]) + f"""
+{summary}
+
+{separator('=', 80)}
+"""
+
+
+def _record_ready():
+    return {
+        "patient_input": None,
+        "messages": [
+            HumanMessage(content="I've finished reading and I'm ready for the quiz"),
+            AIMessage(content="Great! Let me create a quiz question to check your understanding."),
+        ],
+    }
+
+
+def _record_quiz(item, bank, asked, quiz_count):
+    quiz_question = item["question"]
+    question_label = f"(Question {quiz_count})" if quiz_count > 1 else ""
+    return {
+        "quiz_question": quiz_question,
+        "quiz_answer_key": item["answer_key"],
+        "quiz_bank": bank,
+        "asked_questions": (asked + [question_stem(quiz_question)])[-ASKED_QUESTIONS_KEPT:],
+        "quiz_count": quiz_count,
+        "messages": [AIMessage(content=f"Quiz {question_label}: {quiz_question}")],
+    }
+
+
+def _speculation_usage(state, update):
+    """
+    Add the session's finished speculative calls, used or discarded, to a
+    node update (their tokens are already in the daily ledger)
+    """
+    speculator = get_quiz_speculator()
+    if speculator is None or not state.get("session_id"):
+        return update
+    for topic, prompt_tokens, completion_tokens in speculator.collect_usage(state["session_id"]):
+        usage = session_usage_update(topic, prompt_tokens, completion_tokens)
+        update["token_usage"] = merge_token_usage(update.get("token_usage"), usage["token_usage"])
+    return update
+
+
+def _quiz_display(quiz_question, quiz_count):
+    return f"""
+{separator('=', 80)}
+COMPREHENSION CHECK QUIZ - Question {quiz_count}
+{separator('=', 80)}
+
+{quiz_question}
+
+{separator('=', 80)}
 """
 
-from langchain_core.messages import AIMessage, HumanMessage
-from state import State, reset_for_new_topic
-from utils import (
-    display_text_to_user,
-    ask_user_for_input,
-    validate_non_empty_input,
-    validate_topic_length,
-    separator,
-)
-from tools import search_medical_information
-from llm_config import initialize_llm
+
+def _record_answer(answer):
+    return {
+        "patient_answer": answer,
+        "patient_input": None,
+        "messages": [HumanMessage(content=f"My answer: {answer}")],
+    }
+
+
+def _record_grade(grade, feedback, local=False):
+    return {
+        "grade": grade,
+        "feedback": feedback,
+        # Counts how many grades skipped the LLM grader
+        "token_usage": {"grades": 1, "local_grades": int(local)},
+        "messages": [AIMessage(content=f"Grade: {grade}/100\n\n{feedback}")],
+    }
+
+
+def _results_display(grade, feedback):
+    return display_header(DISPLAY_TITLES["evaluate_answer"]) + f"""
+Grade: {grade}/100
+
+{feedback}
+
+{separator('=', 80)}
+"""
+
+
+def _record_choice(state, choice):
+    """Update for the patient's continue choice (resets the topic on new_topic)"""
+    # Leaving the topic makes any speculative quiz for it useless
+    speculator = get_quiz_speculator()
+    if speculator is not None and choice != 'more_questions' and state.get("session_id"):
+        speculator.discard(state["session_id"])
+    
+    if choice == 'more_questions':
+        messages = [
+            HumanMessage(content="I'd like another quiz question on this topic"),
+            AIMessage(content="Great! Let me create another quiz question about this topic..."),
+        ]
+        update = {}
+    elif choice == 'new_topic':
+        messages = [HumanMessage(content="I'd like to learn about another topic")]
+        # Reset topic fields but keep session continuity (messages, session_id)
+        update = new_topic_update()
+    else:  # exit
+        messages = [
+            HumanMessage(content="I'm done learning. Thank you!"),
+            AIMessage(content=GOODBYE),
+        ]
+        update = {}
+    
+    update.update({"should_continue": choice, "patient_input": None, "messages": messages})
+    return _speculation_usage(state, update)
 
 
 # ============================================================================
@@ -24,41 +888,28 @@ def ask_for_topic(state: State) -> State:
     """
     NODE 1: Greet patient and ask what health topic they want to learn about
     
+    Pauses for the patient's reply (interrupt) and re-asks on invalid input.
+    
     Output:
     - health_topic: Set with user's topic
-    - messages: Updated with greeting and patient input
-    """
-    
-    greeting = """
-    ================================================================================
-    Welcome to HealthBot - Your Personal Health Education Assistant
-    ================================================================================
-    
-    I'm here to help you learn about health topics and medical conditions in 
-    simple, easy-to-understand language.
-    
+    - messages: Patient's topic and acknowledgment appended
     """
     
-    display_text_to_user(greeting)
-    
-    # Ask for health topic
-    prompt = "What health topic or medical condition would you like to learn about? "
+    topic = request_patient_input(state, TOPIC_PROMPT, display=GREETING)
     
     try:
-        topic = ask_user_for_input(prompt)
         validate_non_empty_input(topic, "Health topic")
         validate_topic_length(topic)
     except ValueError as e:
-        display_text_to_user(f"Error: {str(e)}")
-        # Retry recursively (in production, add retry limit)
-        return ask_for_topic(state)
-    
-    # Update state
-    state["health_topic"] = topic
-    state["messages"].append(HumanMessage(content=f"I want to learn about: {topic}"))
-    state["messages"].append(AIMessage(content=f"Great! Let me find information about {topic} for you..."))
+        # Ask again: the graph stays paused on this node
+        request_patient_input({}, TOPIC_PROMPT, display=f"Error: {str(e)}")
     
-    return state
+    return _record_topic(topic)
+
+
+async def aask_for_topic(state: State) -> State:
+    """NODE 1 (async): see ask_for_topic"""
+    return ask_for_topic(state)
 
 
 # ============================================================================
@@ -69,12 +920,16 @@ def search_medical_info(state: State) -> State:
     """
     NODE 2: Search Tavily for relevant medical information
     
+    Results of a similar topic already in the topic index are reused
+    without searching (see topic_index.py).
+    
     Input:
     - health_topic: The topic to search for
     
     Output:
     - search_results: Raw Tavily search results
-    - messages: Updated with search status
+    - topic_match: Indexed topic the results came from (None after a search)
+    - messages: Search status appended
     """
     
     topic = state.get("health_topic", "")
@@ -82,20 +937,46 @@ def search_medical_info(state: State) -> State:
     if not topic:
         raise ValueError("Health topic not set before search")
     
+    # A similar topic already searched (e.g. "HTN" after "hypertension")
+    index, update = _indexed_results(topic)
+    if update is not None:
+        return update
+    
     display_text_to_user(f"Searching for medical information about '{topic}'...")
     
     try:
         results = search_medical_information(topic)
-        state["search_results"] = results
-        state["messages"].append(
-            AIMessage(content=f"Found information about {topic}. Now creating a summary...")
-        )
     except Exception as e:
         error_msg = f"Error searching for medical information: {str(e)}"
         display_text_to_user(error_msg)
         raise
     
-    return state
+    _index_results(index, topic, results)
+    return _record_search_results(topic, results)
+
+
+async def asearch_medical_info(state: State) -> State:
+    """NODE 2 (async): see search_medical_info"""
+    
+    topic = state.get("health_topic", "")
+    
+    if not topic:
+        raise ValueError("Health topic not set before search")
+    
+    index, update = _indexed_results(topic)
+    if update is not None:
+        return update
+    
+    display_text_to_user(f"Searching for medical information about '{topic}'...")
+    
+    try:
+        results = await asearch_medical_information(topic)
+    except Exception as e:
+        display_text_to_user(f"Error searching for medical information: {str(e)}")
+        raise
+    
+    _index_results(index, topic, results)
+    return _record_search_results(topic, results)
 
 
 # ============================================================================
@@ -106,13 +987,18 @@ def summarize_results(state: State) -> State:
     """
     NODE 3: Summarize search results into patient-friendly language
     
+    The LLM call goes through the "llm" upstream (timeout, retries, circuit
+    breaker, see resilience.py); when it is unavailable the source excerpts
+    are shown instead of ending the session. Results too large for one
+    prompt are summarized with map-reduce (see map_reduce.py).
+    
     Input:
     - search_results: Raw Tavily search results
     - health_topic: The health topic
     
     Output:
     - summary: Patient-friendly summary
-    - messages: Updated with summary prompt
+    - messages: Summary status appended
     """
     
     search_results = state.get("search_results", "")
@@ -121,40 +1007,107 @@ def summarize_results(state: State) -> State:
     if not search_results:
         raise ValueError("No search results to summarize")
     
-    # Initialize LLM
-    llm = initialize_llm()
+    # Results reused from a similar topic -> that topic's summary
+    indexed_summary = _indexed_summary(state, search_results)
+    if indexed_summary is not None:
+        return _speculate_quiz(state, _record_summary(indexed_summary))
     
-    # Create summarization prompt
-    summarization_prompt = f"""
-You are a healthcare educator. Your task is to create a simple, patient-friendly 
-explanation of medical information.
-
-Health Topic: {topic}
-
-Medical Information (from web search):
-{search_results}
-
-Please create a clear summary that:
-1. Explains the condition in simple language (8th grade reading level)
-2. Covers: what it is, symptoms, causes, and treatment options
-3. Is 300-400 words maximum
-4. Includes citations or references to the sources
-5. Avoids medical jargon or explains it clearly
-
-Patient-Friendly Summary:
-"""
+    # Shared pooled client for this node's profile
+    llm = get_llm("summarize")
+    mode = budget_mode(state)
+    
+    # Create summarization prompt (brief one near the budget); too large for
+    # one prompt -> map-reduce
+    summarization_prompt = build_summarization_prompt(topic, search_results, mode)
+    map_reduce = mode == NORMAL and use_map_reduce(summarization_prompt, search_results)
+    
+    # Identical (topic, results, prompt version, model) -> stored summary
+    store, cache_key, cached_summary = _lookup_summary(topic, search_results, llm, mode, map_reduce)
+    if cached_summary is not None:
+        return _speculate_quiz(state, _record_summary(cached_summary))
     
+    # Token budget used up: show the sources instead of failing
+    if mode == EXHAUSTED:
+        return _record_summary(_source_summary(topic, search_results))
+    
+    calls = []
     try:
-        response = llm.invoke(summarization_prompt)
-        summary = response.content
-        state["summary"] = summary
-        state["messages"].append(AIMessage(content="Summary created successfully."))
+        if map_reduce:
+            response, calls = map_reduce_summarize(llm, topic, search_results, _no_response)
+        else:
+            response = call_upstream(
+                "llm", lambda: _bounded(llm, "summarize", mode).invoke(summarization_prompt), fallback=_no_response
+            )
+            calls = [(summarization_prompt, response)]
     except Exception as e:
         error_msg = f"Error summarizing results: {str(e)}"
         display_text_to_user(error_msg)
         raise
     
-    return state
+    # LLM unavailable: show the sources (not stored as the topic's summary)
+    if response is None:
+        update = _record_summary(_source_summary(topic, search_results, UNAVAILABLE_REASON))
+        return _account_calls(state, [c for c in calls if c[1] is not None], update)
+    summary = response.content
+    
+    if store is not None:
+        store.set(cache_key, summary, tag=summary_tag(topic, search_results))
+    _index_summary(state, topic, search_results, summary)
+    
+    # Start the first quiz question while the patient reads
+    update = _account_calls(state, calls, _record_summary(summary))
+    return _speculate_quiz(state, update)
+
+
+async def asummarize_results(state: State) -> State:
+    """NODE 3 (async): see summarize_results"""
+    
+    search_results = state.get("search_results", "")
+    topic = state.get("health_topic", "")
+    
+    if not search_results:
+        raise ValueError("No search results to summarize")
+    
+    indexed_summary = _indexed_summary(state, search_results)
+    if indexed_summary is not None:
+        return _aspeculate_quiz(state, _record_summary(indexed_summary))
+    
+    llm = get_llm("summarize")
+    mode = budget_mode(state)
+    
+    summarization_prompt = build_summarization_prompt(topic, search_results, mode)
+    map_reduce = mode == NORMAL and use_map_reduce(summarization_prompt, search_results)
+    
+    store, cache_key, cached_summary = await _alookup_summary(topic, search_results, llm, mode, map_reduce)
+    if cached_summary is not None:
+        return _aspeculate_quiz(state, _record_summary(cached_summary))
+    
+    if mode == EXHAUSTED:
+        return _record_summary(_source_summary(topic, search_results))
+    
+    calls = []
+    try:
+        if map_reduce:
+            response, calls = await amap_reduce_summarize(llm, topic, search_results, _no_response)
+        else:
+            response = await acall_upstream(
+                "llm", lambda: _bounded(llm, "summarize", mode).ainvoke(summarization_prompt), fallback=_no_response
+            )
+            calls = [(summarization_prompt, response)]
+    except Exception as e:
+        display_text_to_user(f"Error summarizing results: {str(e)}")
+        raise
+    
+    if response is None:
+        update = _record_summary(_source_summary(topic, search_results, UNAVAILABLE_REASON))
+        return _account_calls(state, [c for c in calls if c[1] is not None], update)
+    summary = response.content
+    
+    if store is not None:
+        await store.aset(cache_key, summary, tag=summary_tag(topic, search_results))
+    _index_summary(state, topic, search_results, summary)
+    update = _account_calls(state, calls, _record_summary(summary))
+    return _aspeculate_quiz(state, update)
 
 
 # ============================================================================
@@ -169,7 +1122,7 @@ def present_summary(state: State) -> State:
     - summary: Patient-friendly summary
     
     Output:
-    - messages: Updated with patient acknowledgment
+    - messages: Patient acknowledgment appended
     """
     
     summary = state.get("summary", "")
@@ -177,31 +1130,20 @@ def present_summary(state: State) -> State:
     if not summary:
         raise ValueError("No summary to present")
     
-    display = f"""
-{separator('=', 80)}
-HEALTH INFORMATION SUMMARY
-{separator('=', 80)}
-
-{summary}
-
-{separator('=', 80)}
-"""
-    
-    display_text_to_user(display)
-    
     # Wait for patient to finish reading
-    prompt = "Have you finished reading? Type 'ready' to proceed to the comprehension check: "
-    
-    response = ask_user_for_input(prompt)
+    response = request_patient_input(state, READY_PROMPT, display=_summary_display(summary))
     
-    while response.lower() != 'ready':
-        display_text_to_user("Please type 'ready' when you're finished reading.")
-        response = ask_user_for_input(prompt)
-    
-    state["messages"].append(HumanMessage(content="I've finished reading and I'm ready for the quiz"))
-    state["messages"].append(AIMessage(content="Great! Let me create a quiz question to check your understanding."))
+    if response.lower() != 'ready':
+        request_patient_input(
+            {}, READY_PROMPT, display="Please type 'ready' when you're finished reading."
+        )
     
-    return state
+    return _record_ready()
+
+
+async def apresent_summary(state: State) -> State:
+    """NODE 4 (async): see present_summary"""
+    return present_summary(state)
 
 
 # ============================================================================
@@ -212,15 +1154,25 @@ def generate_quiz(state: State) -> State:
     """
     NODE 5: Generate a comprehension check question
     
+    Questions come from a per-topic bank: the first request on a topic
+    generates QUIZ_BANK_SIZE distinct questions in one LLM call (or takes the
+    bank generated while the patient was reading), later requests are served
+    from the bank without a call. Questions that repeat one already asked are
+    skipped, and the next bank is generated in the background when the bank
+    runs low.
+    
     Input:
     - summary: Patient-friendly summary to base question on
     - health_topic: The health topic
     - quiz_count: Number of quizzes already done on this topic
+    - quiz_bank / asked_questions: Remaining and already asked questions
     
     Output:
     - quiz_question: Generated quiz question (different from previous)
+    - quiz_answer_key: Answer key and citation for a multiple-choice question
+    - quiz_bank / asked_questions: Updated bank and asked list
     - quiz_count: Incremented by 1
-    - messages: Updated with quiz intro
+    - messages: Quiz question appended
     
     Stand-out Feature: Generates different questions for multiple quizzes on same topic
     """
@@ -233,51 +1185,111 @@ def generate_quiz(state: State) -> State:
     if not summary:
         raise ValueError("No summary available for quiz generation")
     
-    # Initialize LLM
-    llm = initialize_llm()
+    # Serve the next new question from the topic's bank
+    asked = state.get("asked_questions") or []
+    item, bank = _take_from_bank(state.get("quiz_bank") or [], asked)
+    update = {}
+    
+    if item is None:
+        # Token budget used up: ask a standard question instead of failing
+        mode = budget_mode(state)
+        if mode == EXHAUSTED:
+            item = {"question": _fallback_question(topic, quiz_count), "answer_key": None}
+            return _record_quiz(item, [], asked, quiz_count)
+        
+        prompt, refill_prompt = _bank_prompts(state, mode)
+        update["quiz_bank_refill_at"] = None
+        
+        # Use the bank generated in the background, if any
+        speculator = get_quiz_speculator()
+        bank_text = None
+        if speculator is not None and refill_prompt and state.get("session_id"):
+            bank_text = speculator.take(state["session_id"], refill_prompt)
+        update = _speculation_usage(state, update)
+        
+        if not bank_text:
+            # Shared pooled client for this node's profile
+            llm = _bounded(get_llm("quiz"), "quiz", mode)
+            try:
+                response = call_upstream("llm", lambda: llm.invoke(prompt), fallback=_no_response)
+            except Exception as e:
+                error_msg = f"Error generating quiz question: {str(e)}"
+                display_text_to_user(error_msg)
+                raise
+            
+            # LLM unavailable: ask a standard question
+            if response is None:
+                item = {"question": _fallback_question(topic, quiz_count), "answer_key": None}
+                update.update(_record_quiz(item, [], asked, quiz_count))
+                return update
+            bank_text = response.content.strip()
+            update = _account(state, response, prompt, update)
+        
+        item, bank = _fresh_bank(bank_text, asked)
+        if item is None:
+            item = {"question": _fallback_question(topic, quiz_count), "answer_key": None}
     
-    # Create quiz prompt (request different question if this is a repeat quiz)
-    additional_instruction = ""
-    if quiz_count > 1:
-        additional_instruction = f"\n\nNote: This is quiz question #{quiz_count} on this topic. Please generate a DIFFERENT question that tests a different aspect or concept from the summary than previous questions."
+    update.update(_record_quiz(item, bank, asked, quiz_count))
     
-    # Create quiz prompt
-    quiz_prompt = f"""
-You are a healthcare educator creating a simple quiz to test patient understanding.
-
-Health Topic: {topic}
-
-Patient-Friendly Summary:
-{summary}
-
-Create ONE quiz question that tests understanding of key points from the summary. 
-
-The question should:
-1. Be clear and simple (8th grade reading level)
-2. Test understanding, not memorization
-3. Be answerable based on the summary
-4. Be relevant to patient education{additional_instruction}
+    # Generate the next bank while the patient answers the last questions
+    if _bank_is_low(state, update):
+        return _speculate_quiz(state, update)
+    return update
 
-Format your response as ONLY the question (no numbering, no answer choices unless 
-you're doing multiple choice). If you create multiple choice, include options A, B, C, D.
 
-Quiz Question:
-"""
+async def agenerate_quiz(state: State) -> State:
+    """NODE 5 (async): see generate_quiz"""
     
-    try:
-        response = llm.invoke(quiz_prompt)
-        quiz_question = response.content.strip()
-        state["quiz_question"] = quiz_question
-        state["quiz_count"] = quiz_count
+    summary = state.get("summary", "")
+    topic = state.get("health_topic", "")
+    quiz_count = state.get("quiz_count", 0) + 1
+    
+    if not summary:
+        raise ValueError("No summary available for quiz generation")
+    
+    asked = state.get("asked_questions") or []
+    item, bank = _take_from_bank(state.get("quiz_bank") or [], asked)
+    update = {}
+    
+    if item is None:
+        mode = budget_mode(state)
+        if mode == EXHAUSTED:
+            item = {"question": _fallback_question(topic, quiz_count), "answer_key": None}
+            return _record_quiz(item, [], asked, quiz_count)
         
-        question_label = f"(Question {quiz_count})" if quiz_count > 1 else ""
-        state["messages"].append(AIMessage(content=f"Quiz {question_label}: {quiz_question}"))
-    except Exception as e:
-        error_msg = f"Error generating quiz question: {str(e)}"
-        display_text_to_user(error_msg)
-        raise
+        prompt, refill_prompt = _bank_prompts(state, mode)
+        update["quiz_bank_refill_at"] = None
+        
+        speculator = get_quiz_speculator()
+        bank_text = None
+        if speculator is not None and refill_prompt and state.get("session_id"):
+            bank_text = await speculator.atake(state["session_id"], refill_prompt)
+        update = _speculation_usage(state, update)
+        
+        if not bank_text:
+            llm = _bounded(get_llm("quiz"), "quiz", mode)
+            try:
+                response = await acall_upstream("llm", lambda: llm.ainvoke(prompt), fallback=_no_response)
+            except Exception as e:
+                display_text_to_user(f"Error generating quiz question: {str(e)}")
+                raise
+            
+            if response is None:
+                item = {"question": _fallback_question(topic, quiz_count), "answer_key": None}
+                update.update(_record_quiz(item, [], asked, quiz_count))
+                return update
+            bank_text = response.content.strip()
+            update = _account(state, response, prompt, update)
+        
+        item, bank = _fresh_bank(bank_text, asked)
+        if item is None:
+            item = {"question": _fallback_question(topic, quiz_count), "answer_key": None}
+    
+    update.update(_record_quiz(item, bank, asked, quiz_count))
     
-    return state
+    if _bank_is_low(state, update):
+        return _aspeculate_quiz(state, update)
+    return update
 
 
 # ============================================================================
@@ -294,7 +1306,7 @@ def present_quiz(state: State) -> State:
     
     Output:
     - patient_answer: Patient's response
-    - messages: Updated with question and answer
+    - messages: Patient's answer appended
     """
     
     quiz_question = state.get("quiz_question", "")
@@ -303,28 +1315,22 @@ def present_quiz(state: State) -> State:
     if not quiz_question:
         raise ValueError("No quiz question available")
     
-    display = f"""
-{separator('=', 80)}
-COMPREHENSION CHECK QUIZ - Question {quiz_count}
-{separator('=', 80)}
-
-{quiz_question}
-
-{separator('=', 80)}
-"""
-    
-    display_text_to_user(display)
-    
     # Get patient's answer
-    prompt = "Please enter your answer: "
-    answer = ask_user_for_input(prompt)
+    answer = request_patient_input(
+        state, ANSWER_PROMPT, display=_quiz_display(quiz_question, quiz_count)
+    )
     
-    validate_non_empty_input(answer, "Quiz answer")
-    
-    state["patient_answer"] = answer
-    state["messages"].append(HumanMessage(content=f"My answer: {answer}"))
+    try:
+        validate_non_empty_input(answer, "Quiz answer")
+    except ValueError as e:
+        request_patient_input({}, ANSWER_PROMPT, display=f"Error: {str(e)}")
     
-    return state
+    return _record_answer(answer)
+
+
+async def apresent_quiz(state: State) -> State:
+    """NODE 6 (async): see present_quiz"""
+    return present_quiz(state)
 
 
 # ============================================================================
@@ -335,15 +1341,20 @@ def evaluate_answer(state: State) -> State:
     """
     NODE 7: Grade the patient's answer with explanation and citations
     
+    A multiple-choice answer is graded locally against the quiz's answer key;
+    free-text answers go to the LLM grader (or are checked against the
+    summary locally when the LLM is unavailable).
+    
     Input:
     - patient_answer: Patient's quiz answer
     - quiz_question: The quiz question
+    - quiz_answer_key: Answer key for a multiple-choice question (optional)
     - summary: The health information summary (for citations)
     
     Output:
     - grade: Numeric grade 0-100
     - feedback: Explanation with citations
-    - messages: Updated with grade and feedback
+    - messages: Grade and feedback appended
     """
     
     answer = state.get("patient_answer", "")
@@ -354,79 +1365,74 @@ def evaluate_answer(state: State) -> State:
     if not all([answer, question, summary]):
         raise ValueError("Missing required fields for evaluation")
     
-    # Initialize LLM
-    llm = initialize_llm()
+    # Multiple-choice answers are graded locally against the answer key
+    answer_key = state.get("quiz_answer_key")
+    choice = parse_choice(answer, answer_key)
+    if choice is not None:
+        return _record_grade(*grade_choice(choice, answer_key), local=True)
     
-    # Create grading prompt
-    grading_prompt = f"""
-You are a healthcare educator grading a patient's quiz answer.
-
-Health Topic: {topic}
-
-Medical Summary:
-{summary}
-
-Quiz Question:
-{question}
-
-Patient's Answer:
-{answer}
-
-Please grade this answer on a scale of 0-100 points. Consider:
-- Is the answer correct/accurate?
-- Does it show understanding of key concepts?
-- Is it partially correct?
-
-Provide:
-1. A numeric grade (0-100)
-2. An explanation of the grade (2-3 sentences)
-3. One or two citations/references from the summary that support the correct answer
-
-Format your response exactly as:
-GRADE: [number]
-EXPLANATION: [your explanation with citations from the summary]
-
-Example format:
-GRADE: 85
-EXPLANATION: Good understanding! You correctly identified [concept]. The summary notes that [citation from summary]. Consider also that [another point].
-"""
+    # Token budget used up: grade against the summary locally instead of failing
+    mode = budget_mode(state)
+    if mode == EXHAUSTED:
+        return _record_grade(*_local_grade(answer, summary), local=True)
+    
+    # Shared pooled client for this node's profile
+    llm = _bounded(get_llm("grade"), "grade", mode)
+    
+    # Create grading prompt (with a summary excerpt near the budget)
+    if mode == ECONOMY:
+        summary = _excerpt(summary)
+    grading_prompt = build_grading_prompt(topic, summary, question, answer)
     
     try:
-        response = llm.invoke(grading_prompt)
-        grading_result = response.content.strip()
-        
-        # Parse grade and feedback
-        lines = grading_result.split('\n')
-        grade = 0
-        feedback = ""
-        
-        for i, line in enumerate(lines):
-            if line.startswith("GRADE:"):
-                try:
-                    grade_str = line.replace("GRADE:", "").strip()
-                    grade = int(''.join(filter(str.isdigit, grade_str)))
-                    grade = min(100, max(0, grade))  # Clamp 0-100
-                except ValueError:
-                    grade = 70  # Default if parsing fails
-            elif line.startswith("EXPLANATION:"):
-                feedback = line.replace("EXPLANATION:", "").strip()
-                # Append any remaining lines
-                if i + 1 < len(lines):
-                    feedback += "\n" + "\n".join(lines[i+1:])
-                break
-        
-        state["grade"] = grade
-        state["feedback"] = feedback
-        state["messages"].append(
-            AIMessage(content=f"Grade: {grade}/100\n\n{feedback}")
-        )
-        
+        response = call_upstream("llm", lambda: llm.invoke(grading_prompt), fallback=_no_response)
+        if response is None:
+            # LLM unavailable: grade against the summary locally
+            return _record_grade(*_local_grade(answer, summary, UNAVAILABLE_REASON), local=True)
+        grade, feedback = parse_grading_response(response.content)
     except Exception as e:
         error_msg = f"Error evaluating answer: {str(e)}"
         display_text_to_user(error_msg)
         raise
     
-    return state
+    return _account(state, response, grading_prompt, _record_grade(grade, feedback))
+
+
+async def aevaluate_answer(state: State) -> State:
+    """NODE 7 (async): see evaluate_answer"""
+    
+    answer = state.get("patient_answer", "")
+    question = state.get("quiz_question", "")
+    summary = state.get("summary", "")
+    topic = state.get("health_topic", "")
+    
+    if not all([answer, question, summary]):
+        raise ValueError("Missing required fields for evaluation")
+    
+    answer_key = state.get("quiz_answer_key")
+    choice = parse_choice(answer, answer_key)
+    if choice is not None:
+        return _record_grade(*grade_choice(choice, answer_key), local=True)
+    
+    mode = budget_mode(state)
+    if mode == EXHAUSTED:
+        return _record_grade(*_local_grade(answer, summary), local=True)
+    
+    llm = _bounded(get_llm("grade"), "grade", mode)
+    if mode == ECONOMY:
+        summary = _excerpt(summary)
+    grading_prompt = build_grading_prompt(topic, summary, question, answer)
+    
+    try:
+        response = await acall_upstream("llm", lambda: llm.ainvoke(grading_prompt), fallback=_no_response)
+        if response is None:
+            return _record_grade(*_local_grade(answer, summary, UNAVAILABLE_REASON), local=True)
+        grade, feedback = parse_grading_response(response.content)
+    except Exception as e:
+        display_text_to_user(f"Error evaluating answer: {str(e)}")
+        raise
+    
+    return _account(state, response, grading_prompt, _record_grade(grade, feedback))
 
 
 # ============================================================================
@@ -443,7 +1449,7 @@ def ask_continue(state: State) -> State:
     
     Output:
     - should_continue: 'new_topic' (new health topic), 'more_questions' (more quiz on same topic), or 'exit'
-    - messages: Updated with continuation prompt
+    - messages: Patient's choice appended (topic fields reset on 'new_topic')
     
     Supports stand-out feature: Allow multiple quiz questions per topic
     """
@@ -451,66 +1457,17 @@ def ask_continue(state: State) -> State:
     grade = state.get("grade", 0)
     feedback = state.get("feedback", "")
     
-    display = f"""
-{separator('=', 80)}
-YOUR QUIZ RESULTS
-{separator('=', 80)}
-
-Grade: {grade}/100
-
-{feedback}
-
-{separator('=', 80)}
-"""
-    
-    display_text_to_user(display)
-    
     # Ask what patient wants to do next
-    prompt = """
-What would you like to do next?
-  (1) Another quiz question on this topic
-  (2) Learn about a new health topic
-  (3) Exit the session
-  
-Enter your choice (1, 2, or 3): """
-    
-    response = ask_user_for_input(prompt).lower().strip()
-    
-    valid_responses = {
-        '1': 'more_questions',
-        '2': 'new_topic',
-        '3': 'exit',
-        'more_questions': 'more_questions',
-        'new_topic': 'new_topic',
-        'exit': 'exit',
-    }
+    response = request_patient_input(
+        state, CONTINUE_PROMPT, display=_results_display(grade, feedback)
+    ).lower()
     
-    while response not in valid_responses:
-        display_text_to_user("Please enter '1', '2', or '3'")
-        response = ask_user_for_input(prompt).lower().strip()
-    
-    choice = valid_responses[response]
-    state["should_continue"] = choice
-    
-    if choice == 'more_questions':
-        state["messages"].append(
-            HumanMessage(content="I'd like another quiz question on this topic")
-        )
-        state["messages"].append(
-            AIMessage(content="Great! Let me create another quiz question about this topic...")
-        )
-    elif choice == 'new_topic':
-        state["messages"].append(
-            HumanMessage(content="I'd like to learn about another topic")
-        )
-        # Reset state for new topic but keep session continuity
-        state = reset_for_new_topic(state)
-    else:  # exit
-        state["messages"].append(
-            HumanMessage(content="I'm done learning. Thank you!")
-        )
-        display_text_to_user(
-            "\nThank you for using HealthBot! Stay informed, stay healthy.\n"
-        )
+    if response not in CONTINUE_CHOICES:
+        request_patient_input({}, CONTINUE_PROMPT, display="Please enter '1', '2', or '3'")
     
-    return state
+    return _record_choice(state, CONTINUE_CHOICES[response])
+
+
+async def aask_continue(state: State) -> State:
+    """NODE 8 (async): see ask_continue"""
+    return ask_continue(state)
@@ -0,0 +1,607 @@
+"""
+HealthBot Resilience
+Per-call timeouts, jittered retries, hedged requests and circuit breakers for
+the search and LLM upstreams, with per-upstream counters for /metrics
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Gauge values for healthbot_circuit_state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Per-upstream defaults (each overridable from .env, see get_upstream)
+UPSTREAM_DEFAULTS = {
+    "search": {"timeout": 15.0, "retries": 2},
+    "llm": {"timeout": 60.0, "retries": 2},
+}
+DEFAULT_BACKOFF = 0.5       # Seconds; retry n waits up to backoff * 2**(n-1)
+DEFAULT_MAX_BACKOFF = 8.0
+DEFAULT_FAILURE_THRESHOLD = 5  # Consecutive failed calls that open a circuit
+DEFAULT_RESET_TIMEOUT = 30.0   # Seconds a circuit stays open before a probe
+HEDGE_MIN_SAMPLES = 20         # Latencies needed before hedging starts
+LATENCY_WINDOW = 200           # Recent successful latencies kept per upstream
+
+# HTTP statuses worth retrying; any other 4xx means the request itself is bad
+RETRYABLE_STATUS = {408, 409, 425, 429}
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call failed after its retries, or its circuit is open"""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The upstream's circuit is open; the call was not attempted"""
+
+
+def is_retryable(error):
+    """
+    Whether a failed attempt is worth retrying
+    
+    Timeouts, connection errors, 5xx and rate limits are retried; programming
+    errors and other 4xx responses (bad key, bad request) are not.
+    """
+    if isinstance(error, (ValueError, TypeError, KeyError, AttributeError, NotImplementedError)):
+        return False
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in RETRYABLE_STATUS
+    return True
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+    
+    CLOSED lets every call through. failure_threshold failed calls in a row
+    open it; while OPEN calls are refused. After reset_timeout one probe call
+    is let through (HALF_OPEN): success closes the circuit, failure opens it
+    again.
+    """
+    
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """Whether a call may go ahead now (claims the probe when half-open)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+    
+    def release_probe(self):
+        """
+        Give back the half-open probe of a call that was cancelled
+        
+        The circuit goes back to OPEN with its original open time, so the next
+        call probes again instead of the circuit staying half-open for good.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+
+
+class Upstream:
+    """
+    Call wrapper for one external dependency (search API, LLM endpoint)
+    
+    Each call runs with a timeout and is retried with full-jitter exponential
+    backoff on transient errors. With hedge_percentile set, a second request
+    is started when the first has not answered within that percentile of
+    recent latencies, and the first answer wins. A circuit breaker refuses
+    calls while the upstream keeps failing; refused or failed calls go to the
+    caller's fallback (e.g. cached content) when one is given.
+    
+    Sync calls with a timeout or hedge run in a thread of their own (with
+    the caller's contextvars, so metrics and token streaming still work). An
+    attempt that times out, or loses to its hedge, is abandoned, not
+    interrupted: its thread runs until the HTTP client's own timeout ends
+    the request, but holds no slot later calls would queue behind.
+    """
+    
+    def __init__(
+        self,
+        name,
+        timeout=None,
+        retries=2,
+        backoff=DEFAULT_BACKOFF,
+        max_backoff=DEFAULT_MAX_BACKOFF,
+        hedge_percentile=None,
+        failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout=DEFAULT_RESET_TIMEOUT,
+    ):
+        """
+        Args:
+            name: Upstream name (metrics label)
+            timeout: Seconds per attempt (None = no timeout)
+            retries: Extra attempts after a transient failure
+            backoff: Base retry delay in seconds
+            max_backoff: Cap on a single retry delay
+            hedge_percentile: Latency percentile (e.g. 0.95) after which a
+                hedged second request starts; None disables hedging
+            failure_threshold: Consecutive failed calls that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+        """
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_percentile = hedge_percentile
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._running_abandoned = 0
+        self._counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "errors": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "abandoned": 0,
+            "short_circuits": 0,
+            "fallbacks": 0,
+        }
+    
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counters[key] += n
+    
+    def _observe(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+    
+    def latency_percentile(self, q):
+        """Percentile q (0-1) of recent successful attempt latencies, or None"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+    
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None when not hedging"""
+        if self.hedge_percentile is None or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency_percentile(self.hedge_percentile)
+    
+    def backoff_delay(self, retry):
+        """Full-jitter delay before retry number `retry` (1-based)"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (retry - 1)))
+    
+    def _submit(self, func):
+        """Run func in a new daemon thread with the caller's contextvars; returns a Future"""
+        future = Future()
+        context = contextvars.copy_context()
+        
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = context.run(func)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        
+        threading.Thread(target=run, name=f"healthbot-{self.name}", daemon=True).start()
+        return future
+    
+    def _abandon(self, futures):
+        """Give up on attempts still running (counted until their threads end)"""
+        for future in futures:
+            self._count("abandoned")
+            with self._lock:
+                self._running_abandoned += 1
+            future.add_done_callback(self._abandoned_done)
+    
+    def _abandoned_done(self, future):
+        with self._lock:
+            self._running_abandoned -= 1
+    
+    def _fallback(self, fallback, error):
+        if fallback is None:
+            raise error
+        value = fallback(error)
+        self._count("fallbacks")
+        return value
+    
+    def _unavailable(self, attempts, error):
+        failure = UpstreamUnavailable(f"{self.name} failed after {attempts} attempt(s): {error}")
+        failure.__cause__ = error
+        return failure
+    
+    # ------------------------------------------------------------------
+    # Single attempts
+    # ------------------------------------------------------------------
+    
+    def _attempt(self, func, timeout):
+        """One attempt (plus its hedge); raises TimeoutError past the timeout"""
+        delay = self.hedge_delay()
+        if timeout is None and delay is None:
+            return func()
+        
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        first = self._submit(func)
+        pending = {first}
+        error = None
+        try:
+            if delay is not None:
+                wait(pending, timeout=delay if deadline is None else min(delay, deadline - start))
+                if not first.done() and (deadline is None or time.monotonic() < deadline):
+                    pending.add(self._submit(func))
+                    self._count("hedges")
+            
+            while pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is not first:
+                            self._count("hedge_wins")
+                        return future.result()
+                    error = future.exception()
+        finally:
+            self._abandon(pending)
+        
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"{self.name} did not answer within {timeout:.1f}s")
+    
+    async def _aattempt(self, afunc, timeout):
+        """Async counterpart of _attempt"""
+        delay = self.hedge_delay()
+        if delay is None:
+            try:
+                return await asyncio.wait_for(afunc(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"{self.name} did not answer within {timeout:.1f}s") from None
+        
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + timeout if timeout is not None else None
+        first = asyncio.ensure_future(afunc())
+        pending = {first}
+        error = None
+        try:
+            await asyncio.wait(pending, timeout=delay if deadline is None else min(delay, deadline - start))
+            if not first.done() and (deadline is None or loop.time() < deadline):
+                pending.add(asyncio.ensure_future(afunc()))
+                self._count("hedges")
+            
+            while pending:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"{self.name} did not answer within {timeout:.1f}s")
+    
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+    
+    def _failed_attempt(self, error):
+        """Count a failed attempt; re-raise it when it is not worth retrying"""
+        if isinstance(error, TimeoutError):
+            self._count("timeouts")
+        if not is_retryable(error):
+            # The upstream answered; the request itself is at fault
+            self.breaker.record_success()
+            self._count("errors")
+            raise error
+    
+    def call(self, func, fallback=None, timeout=None):
+        """
+        Call the upstream with timeout, retries, hedging and circuit breaker
+        
+        Args:
+            func: Zero-argument callable making the request
+            fallback: Optional callable(error) returning a value to use when
+                the upstream is unavailable (circuit open or retries used up)
+            timeout: Per-attempt timeout overriding the upstream default
+        
+        Returns:
+            func's result, or the fallback's
+        
+        Raises:
+            UpstreamUnavailable: Unavailable and no fallback given
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuits")
+            return self._fallback(fallback, CircuitOpenError(f"{self.name} circuit is open"))
+        
+        error = None
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self._count("retries")
+                    time.sleep(self.backoff_delay(attempt))
+                start = time.monotonic()
+                try:
+                    result = self._attempt(func, timeout)
+                except Exception as e:
+                    self._failed_attempt(e)
+                    error = e
+                    continue
+                self._observe(time.monotonic() - start)
+                self.breaker.record_success()
+                self._count("successes")
+                return result
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # Cancelled or interrupted: neither success nor failure
+                self.breaker.release_probe()
+            raise
+        
+        self.breaker.record_failure()
+        self._count("failures")
+        return self._fallback(fallback, self._unavailable(self.retries + 1, error))
+    
+    async def acall(self, afunc, fallback=None, timeout=None):
+        """
+        Async version of call
+        
+        Args:
+            afunc: Zero-argument callable returning an awaitable
+            fallback: Optional callable(error) returning a value to use when
+                the upstream is unavailable
+            timeout: Per-attempt timeout overriding the upstream default
+        
+        Returns:
+            afunc's result, or the fallback's
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuits")
+            return self._fallback(fallback, CircuitOpenError(f"{self.name} circuit is open"))
+        
+        error = None
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self._count("retries")
+                    await asyncio.sleep(self.backoff_delay(attempt))
+                start = time.monotonic()
+                try:
+                    result = await self._aattempt(afunc, timeout)
+                except Exception as e:
+                    self._failed_attempt(e)
+                    error = e
+                    continue
+                self._observe(time.monotonic() - start)
+                self.breaker.record_success()
+                self._count("successes")
+                return result
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # Cancelled or interrupted: neither success nor failure
+                self.breaker.release_probe()
+            raise
+        
+        self.breaker.record_failure()
+        self._count("failures")
+        return self._fallback(fallback, self._unavailable(self.retries + 1, error))
+    
+    def stats(self):
+        """
+        Report call counters, circuit state and recent latency
+        
+        Returns:
+            Dict with the counters, state, opens, p50/p95 seconds, the
+            current hedge delay and the abandoned attempts still running
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            running_abandoned = self._running_abandoned
+        return {
+            **counters,
+            "running_abandoned": running_abandoned,
+            "state": self.breaker.state,
+            "opens": self.breaker.opens,
+            "p50": self.latency_percentile(0.5),
+            "p95": self.latency_percentile(0.95),
+            "hedge_delay": self.hedge_delay(),
+        }
+
+
+# ----------------------------------------------------------------------
+# Process-wide upstreams
+# ----------------------------------------------------------------------
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def resilience_enabled():
+    return os.getenv("HEALTHBOT_RESILIENCE", "on").lower() not in ("off", "0", "false")
+
+
+def get_upstream(name):
+    """
+    Return the process-wide wrapper for an upstream, creating it on first use
+    
+    Disable with HEALTHBOT_RESILIENCE=off. Per upstream ("search", "llm"),
+    HEALTHBOT_<NAME>_TIMEOUT, _RETRIES and _HEDGE_PERCENTILE override the
+    defaults; HEALTHBOT_RETRY_BACKOFF, HEALTHBOT_CIRCUIT_FAILURES and
+    HEALTHBOT_CIRCUIT_RESET apply to all.
+    
+    Returns:
+        Upstream, or None when disabled
+    """
+    if not resilience_enabled():
+        return None
+    
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        with _upstreams_lock:
+            upstream = _upstreams.get(name)
+            if upstream is None:
+                defaults = UPSTREAM_DEFAULTS.get(name, {})
+                prefix = f"HEALTHBOT_{name.upper()}"
+                timeout = _env_float(f"{prefix}_TIMEOUT", defaults.get("timeout"))
+                upstream = Upstream(
+                    name,
+                    timeout=timeout or None,
+                    retries=int(_env_float(f"{prefix}_RETRIES", defaults.get("retries", 2))),
+                    backoff=_env_float("HEALTHBOT_RETRY_BACKOFF", DEFAULT_BACKOFF),
+                    hedge_percentile=_env_float(f"{prefix}_HEDGE_PERCENTILE", None),
+                    failure_threshold=int(_env_float("HEALTHBOT_CIRCUIT_FAILURES", DEFAULT_FAILURE_THRESHOLD)),
+                    reset_timeout=_env_float("HEALTHBOT_CIRCUIT_RESET", DEFAULT_RESET_TIMEOUT),
+                )
+                _upstreams[name] = upstream
+    return upstream
+
+
+def reset_upstreams():
+    """Forget all upstreams (settings are re-read on next use)"""
+    with _upstreams_lock:
+        _upstreams.clear()
+
+
+def call_upstream(name, func, fallback=None, timeout=None):
+    """
+    Call an upstream through its wrapper (directly when resilience is off)
+    
+    Args:
+        name: Upstream name ("search", "llm")
+        func: Zero-argument callable making the request
+        fallback: Optional callable(error) used when the upstream is unavailable
+        timeout: Per-attempt timeout overriding the upstream default
+    
+    Returns:
+        func's result, or the fallback's
+    """
+    upstream = get_upstream(name)
+    if upstream is None:
+        return func()
+    return upstream.call(func, fallback=fallback, timeout=timeout)
+
+
+async def acall_upstream(name, afunc, fallback=None, timeout=None):
+    """Async version of call_upstream"""
+    upstream = get_upstream(name)
+    if upstream is None:
+        return await afunc()
+    return await upstream.acall(afunc, fallback=fallback, timeout=timeout)
+
+
+def upstream_stats():
+    """Return stats() of every upstream used so far, by name"""
+    with _upstreams_lock:
+        upstreams = dict(_upstreams)
+    return {name: upstream.stats() for name, upstream in upstreams.items()}
+
+
+def render_prometheus():
+    """
+    Render upstream counters and circuit states in Prometheus text format
+    
+    Returns:
+        Metrics text (empty when no upstream has been used)
+    """
+    stats = upstream_stats()
+    if not stats:
+        return ""
+    
+    lines = []
+    
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+    
+    family("healthbot_upstream_calls_total", "counter", "Upstream calls by result")
+    for name, s in stats.items():
+        for result in ("successes", "failures", "errors", "short_circuits"):
+            lines.append(f'healthbot_upstream_calls_total{{upstream="{name}",result="{result}"}} {s[result]}')
+    
+    family("healthbot_upstream_events_total", "counter", "Retries, timeouts, hedges, abandoned attempts and fallbacks")
+    for name, s in stats.items():
+        for event in ("retries", "timeouts", "hedges", "hedge_wins", "abandoned", "fallbacks"):
+            lines.append(f'healthbot_upstream_events_total{{upstream="{name}",event="{event}"}} {s[event]}')
+    
+    family("healthbot_upstream_abandoned_running", "gauge", "Abandoned sync attempts whose threads still run")
+    for name, s in stats.items():
+        lines.append(f'healthbot_upstream_abandoned_running{{upstream="{name}"}} {s["running_abandoned"]}')
+    
+    family("healthbot_circuit_state", "gauge", "Circuit breaker state (0 closed, 1 half-open, 2 open)")
+    for name, s in stats.items():
+        lines.append(f'healthbot_circuit_state{{upstream="{name}"}} {STATE_VALUES[s["state"]]}')
+    
+    family("healthbot_circuit_opens_total", "counter", "Times the circuit breaker opened")
+    for name, s in stats.items():
+        lines.append(f'healthbot_circuit_opens_total{{upstream="{name}"}} {s["opens"]}')
+    
+    family("healthbot_upstream_latency_seconds", "gauge", "Recent successful attempt latency")
+    for name, s in stats.items():
+        for quantile in ("p50", "p95"):
+            if s[quantile] is not None:
+                lines.append(
+                    f'healthbot_upstream_latency_seconds{{upstream="{name}",quantile="{quantile[1:]}"}} {s[quantile]:.6f}'
+                )
+    
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,267 @@
+"""
+HealthBot Search Client
+Long-lived Tavily search clients (sync and async) on pooled keep-alive HTTP
+connections, with separate connect and read timeouts. The sync client uses
+httpx like the LLM clients; the async one uses aiohttp, whose connection
+pool stays cheap at 100+ concurrent requests (httpcore's async pool spends
+time proportional to requests x connections on every scheduling step).
+"""
+
+import os
+import json
+import asyncio
+import threading
+
+# httpx and aiohttp are imported on first use, like the LLM clients (see llm_config.py)
+
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+# Connection pool and timeouts (overridable from .env)
+SEARCH_MAX_CONNECTIONS = 100
+SEARCH_MAX_KEEPALIVE_CONNECTIONS = 100  # Sync client only: below the concurrency, surplus connections are closed
+SEARCH_KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection is kept open
+SEARCH_CONNECT_TIMEOUT = 5.0
+SEARCH_READ_TIMEOUT = 15.0
+SEARCH_POOL_TIMEOUT = 10.0      # Seconds to wait for a free pooled connection
+
+
+class SearchHTTPError(Exception):
+    """Non-200 response from the search API"""
+    
+    def __init__(self, status_code, detail=""):
+        super().__init__(f"Search API returned HTTP {status_code}: {detail[:200]}")
+        # 429 and 5xx are retried by the "search" upstream, other 4xx are not
+        # (see resilience.is_retryable)
+        self.status_code = status_code
+
+
+class _PooledSearchClient:
+    """Settings, request body and statistics shared by the sync and async clients"""
+    
+    def __init__(self, api_key, url=None, connect_timeout=None, read_timeout=None,
+                 max_connections=None, max_keepalive_connections=None):
+        self.api_key = api_key
+        self.url = url or os.getenv("HEALTHBOT_TAVILY_URL", TAVILY_SEARCH_URL)
+        self.connect_timeout = connect_timeout or float(
+            os.getenv("HEALTHBOT_SEARCH_CONNECT_TIMEOUT", SEARCH_CONNECT_TIMEOUT)
+        )
+        self.read_timeout = read_timeout or float(os.getenv("HEALTHBOT_SEARCH_READ_TIMEOUT", SEARCH_READ_TIMEOUT))
+        self.max_connections = max_connections or int(
+            os.getenv("HEALTHBOT_SEARCH_MAX_CONNECTIONS", SEARCH_MAX_CONNECTIONS)
+        )
+        self.max_keepalive_connections = max_keepalive_connections or int(
+            os.getenv("HEALTHBOT_SEARCH_MAX_KEEPALIVE", SEARCH_MAX_KEEPALIVE_CONNECTIONS)
+        )
+        self._requests = 0
+        self._connections_opened = 0
+        self._stats_lock = threading.Lock()
+    
+    def _count_request(self):
+        with self._stats_lock:
+            self._requests += 1
+    
+    def _count_connection(self):
+        with self._stats_lock:
+            self._connections_opened += 1
+    
+    def _client_settings(self):
+        import httpx
+        return {
+            "headers": {"Content-Type": "application/json"},
+            "timeout": httpx.Timeout(
+                connect=self.connect_timeout,
+                read=self.read_timeout,
+                write=self.read_timeout,
+                pool=SEARCH_POOL_TIMEOUT,
+            ),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=SEARCH_KEEPALIVE_EXPIRY,
+            ),
+        }
+    
+    def _body(self, query, max_results, **kwargs):
+        """Tavily request body (same fields and defaults as tavily-python)"""
+        data = {
+            "query": query,
+            "search_depth": "basic",
+            "topic": "general",
+            "max_results": max_results,
+            "include_answer": False,
+            "include_raw_content": False,
+            "include_images": False,
+        }
+        data.update(kwargs)
+        data["api_key"] = self.api_key
+        return json.dumps(data)
+    
+    def _trace(self, event_name, info):
+        """httpcore trace hook: count freshly opened TCP connections"""
+        if event_name == "connection.connect_tcp.complete":
+            self._count_connection()
+    
+    async def _atrace(self, event_name, info):
+        self._trace(event_name, info)
+    
+    def stats(self):
+        """
+        Report request and connection pool statistics
+        
+        Returns:
+            Dict with requests, connections opened and reuse rate
+        """
+        with self._stats_lock:
+            requests, opened = self._requests, self._connections_opened
+        reused = max(0, requests - opened)
+        return {
+            "requests": requests,
+            "connections_opened": opened,
+            "open_connections": self._open_connections(),
+            "connection_reuse_rate": (reused / requests) if requests else 0.0,
+        }
+
+
+class TavilySearchClient(_PooledSearchClient):
+    """
+    Tavily search client on one keep-alive connection pool
+    
+    Drop-in for tavily.TavilyClient.search, but shared by every search of the
+    process: repeated searches reuse open TLS connections instead of opening
+    a new one per call. Thread-safe.
+    """
+    
+    def __init__(self, api_key, **settings):
+        super().__init__(api_key, **settings)
+        self._http_client = None
+        self._lock = threading.Lock()
+    
+    def _client(self):
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    import httpx
+                    self._http_client = httpx.Client(**self._client_settings())
+        return self._http_client
+    
+    def _open_connections(self):
+        pool = getattr(getattr(self._http_client, "_transport", None), "_pool", None)
+        return len(pool.connections) if pool is not None else 0
+    
+    def search(self, query, max_results=5, **kwargs):
+        """
+        Search Tavily
+        
+        Args:
+            query: Search query
+            max_results: Number of results
+            **kwargs: Other Tavily search fields (include_raw_content, ...)
+        
+        Returns:
+            Tavily response dict
+        """
+        self._count_request()
+        response = self._client().post(
+            self.url,
+            content=self._body(query, max_results, **kwargs),
+            extensions={"trace": self._trace},
+        )
+        if response.status_code != 200:
+            raise SearchHTTPError(response.status_code, response.text)
+        return response.json()
+    
+    def close(self):
+        """Close the connection pool (a later search opens a new one)"""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+
+class AsyncTavilySearchClient(_PooledSearchClient):
+    """
+    Async Tavily search client on keep-alive connection pools (aiohttp)
+    
+    Pooled connections belong to the event loop that opened them, so each
+    event loop gets its own session. The server's loop keeps one for its
+    lifetime; a session is closed when its loop shuts down through
+    asyncio.run (see _close_with_loop), and forgotten with its loop if the
+    loop was closed some other way.
+    
+    max_keepalive_connections only applies to the sync client: aiohttp has no
+    cap on idle connections, which close after SEARCH_KEEPALIVE_EXPIRY.
+    """
+    
+    def __init__(self, api_key, **settings):
+        super().__init__(api_key, **settings)
+        self._sessions = {}  # loop -> (session, closer)
+    
+    async def _session(self):
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(loop)
+        if entry is not None and not entry[0].closed:
+            return entry[0]
+        
+        # Drop sessions of loops closed without finalizing their async
+        # generators, which would otherwise keep those loops alive
+        for closed in [l for l in self._sessions if l.is_closed()]:
+            del self._sessions[closed]
+        
+        import aiohttp
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_connection)
+        session = aiohttp.ClientSession(
+            headers={"Content-Type": "application/json"},
+            connector=aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=SEARCH_KEEPALIVE_EXPIRY,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout,
+            ),
+            trace_configs=[trace],
+        )
+        closer = self._close_with_loop(loop, session)
+        await closer.__anext__()
+        self._sessions[loop] = (session, closer)
+        return session
+    
+    async def _close_with_loop(self, loop, session):
+        """
+        Async generator left open for the loop's lifetime: the loop's
+        shutdown_asyncgens() (run by asyncio.run) finalizes it, which closes
+        the session on its own loop
+        """
+        try:
+            yield
+        finally:
+            if self._sessions.get(loop, (None,))[0] is session:
+                del self._sessions[loop]
+            await session.close()
+    
+    async def _on_connection(self, session, context, params):
+        self._count_connection()
+    
+    def _open_connections(self):
+        count = 0
+        for session, _closer in list(self._sessions.values()):
+            connector = session.connector
+            if connector is not None and not connector.closed:
+                count += sum(len(c) for c in connector._conns.values()) + len(connector._acquired)
+        return count
+    
+    async def search(self, query, max_results=5, **kwargs):
+        """Async version of TavilySearchClient.search"""
+        self._count_request()
+        session = await self._session()
+        async with session.post(self.url, data=self._body(query, max_results, **kwargs)) as response:
+            if response.status != 200:
+                raise SearchHTTPError(response.status, await response.text())
+            return await response.json()
+    
+    async def aclose(self):
+        """Close the running loop's session"""
+        entry = self._sessions.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
@@ -0,0 +1,251 @@
+"""
+HealthBot Server
+HTTP and WebSocket front end serving many concurrent patient sessions from
+one compiled async workflow, keyed by thread_id and resumed from its
+checkpointer
+"""
+
+import re
+import uuid
+import asyncio
+import weakref
+
+from aiohttp import web, WSMsgType
+
+from session import HealthBotSession
+from metrics import get_metrics
+from resilience import resilience_enabled, render_prometheus as render_upstreams
+from workflow import get_workflow
+
+# Accepted session identifiers
+THREAD_ID_PATTERN = re.compile(r"^[\w.-]{1,128}$")
+
+# State fields sent with each turn (never the quiz answer key)
+PUBLIC_FIELDS = ("health_topic", "quiz_count", "grade")
+
+GRAPH_KEY = web.AppKey("graph", object)
+LOCKS_KEY = web.AppKey("locks", weakref.WeakValueDictionary)
+
+
+def turn_payload(thread_id, turn):
+    """
+    JSON body for a session turn
+    
+    Args:
+        thread_id: Session identifier
+        turn: Turn from HealthBotSession (see session._turn)
+    
+    Returns:
+        Dict with thread_id, done, display, prompt and the public state fields
+    """
+    state = turn["state"]
+    return {
+        "thread_id": thread_id,
+        "done": turn["done"],
+        "display": turn["display"],
+        "prompt": turn["prompt"],
+        **{field: state.get(field) for field in PUBLIC_FIELDS},
+    }
+
+
+def _session_lock(request, thread_id):
+    """Lock serializing the turns of one session (dropped once unused)"""
+    locks = request.app[LOCKS_KEY]
+    lock = locks.get(thread_id)
+    if lock is None:
+        lock = locks[thread_id] = asyncio.Lock()
+    return lock
+
+
+def _thread_id(request):
+    thread_id = request.match_info["thread_id"]
+    if not THREAD_ID_PATTERN.match(thread_id):
+        raise web.HTTPBadRequest(reason="Invalid thread_id")
+    return thread_id
+
+
+async def _json_body(request):
+    if not request.can_read_body:
+        return {}
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(reason="Body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(reason="Body must be a JSON object")
+    return body
+
+
+async def _open_session(session):
+    """Current turn of an existing session, or the first turn of a new one"""
+    turn = await session.acurrent_turn()
+    if turn["state"]:
+        return turn, False
+    return await session.astart(), True
+
+
+# ----------------------------------------------------------------------
+# HTTP handlers
+# ----------------------------------------------------------------------
+
+async def create_session(request):
+    """POST /sessions {"thread_id"?}: start a session (or resume an existing one)"""
+    body = await _json_body(request)
+    thread_id = body.get("thread_id") or uuid.uuid4().hex
+    if not isinstance(thread_id, str) or not THREAD_ID_PATTERN.match(thread_id):
+        raise web.HTTPBadRequest(reason="Invalid thread_id")
+    
+    session = HealthBotSession(request.app[GRAPH_KEY], thread_id)
+    async with _session_lock(request, thread_id):
+        turn, created = await _open_session(session)
+    return web.json_response(turn_payload(thread_id, turn), status=201 if created else 200)
+
+
+async def get_session(request):
+    """GET /sessions/{thread_id}: the session's pending turn"""
+    thread_id = _thread_id(request)
+    turn = await HealthBotSession(request.app[GRAPH_KEY], thread_id).acurrent_turn()
+    if not turn["state"]:
+        raise web.HTTPNotFound(reason=f"Unknown session {thread_id}")
+    return web.json_response(turn_payload(thread_id, turn))
+
+
+async def reply(request):
+    """POST /sessions/{thread_id}/reply {"answer"}: resume with the patient's reply"""
+    thread_id = _thread_id(request)
+    answer = (await _json_body(request)).get("answer")
+    if not isinstance(answer, str):
+        raise web.HTTPBadRequest(reason='Body must include "answer" (string)')
+    
+    session = HealthBotSession(request.app[GRAPH_KEY], thread_id)
+    async with _session_lock(request, thread_id):
+        turn = await session.acurrent_turn()
+        if not turn["state"]:
+            raise web.HTTPNotFound(reason=f"Unknown session {thread_id}")
+        if turn["done"]:
+            raise web.HTTPConflict(reason=f"Session {thread_id} is not waiting for input")
+        turn = await session.arespond(answer)
+    return web.json_response(turn_payload(thread_id, turn))
+
+
+async def get_usage(request):
+    """GET /sessions/{thread_id}/usage: token usage and budget mode"""
+    thread_id = _thread_id(request)
+    session = HealthBotSession(request.app[GRAPH_KEY], thread_id)
+    if not (await session.acurrent_turn())["state"]:
+        raise web.HTTPNotFound(reason=f"Unknown session {thread_id}")
+    return web.json_response(await session.ausage())
+
+
+async def health(request):
+    """GET /health: liveness check"""
+    return web.json_response({"status": "ok"})
+
+
+async def prometheus_metrics(request):
+    """GET /metrics: per-node metrics (HEALTHBOT_METRICS=on) and upstream health"""
+    metrics = get_metrics()
+    if metrics is None and not resilience_enabled():
+        raise web.HTTPNotFound(reason="Metrics are disabled (HEALTHBOT_METRICS=off)")
+    text = metrics.render_prometheus() if metrics is not None else ""
+    return web.Response(text=text + render_upstreams(), content_type="text/plain")
+
+
+# ----------------------------------------------------------------------
+# WebSocket handler
+# ----------------------------------------------------------------------
+
+async def session_socket(request):
+    """
+    GET /sessions/{thread_id}/ws: run a session over a WebSocket
+    
+    The server sends {"type": "turn", ...} on connect (starting the session
+    if it does not exist) and after every reply, preceded by
+    {"type": "token", "node", "text"} messages while the summary and grading
+    feedback are generated. The client sends {"answer": "..."} messages;
+    problems are reported as {"type": "error", "error"} without closing.
+    """
+    thread_id = _thread_id(request)
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    
+    # Tokens are queued by the streaming callback and sent in order
+    outbox = asyncio.Queue()
+    
+    async def send_all():
+        while True:
+            message = await outbox.get()
+            try:
+                if not ws.closed:
+                    await ws.send_json(message)
+            except ConnectionResetError:
+                pass  # Client went away; the session itself is saved
+            finally:
+                outbox.task_done()
+    
+    sender = asyncio.create_task(send_all())
+    session = HealthBotSession(
+        request.app[GRAPH_KEY],
+        thread_id,
+        on_token=lambda node, text: outbox.put_nowait({"type": "token", "node": node, "text": text}),
+    )
+    
+    async def send_turn(turn):
+        outbox.put_nowait({"type": "turn", **turn_payload(thread_id, turn)})
+        await outbox.join()
+    
+    try:
+        async with _session_lock(request, thread_id):
+            turn, _created = await _open_session(session)
+        await send_turn(turn)
+        
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                answer = msg.json().get("answer")
+            except (ValueError, AttributeError):
+                answer = None
+            if not isinstance(answer, str):
+                await ws.send_json({"type": "error", "error": 'Send {"answer": "..."}'})
+                continue
+            
+            async with _session_lock(request, thread_id):
+                try:
+                    turn = await session.arespond(answer)
+                except ValueError as e:
+                    await ws.send_json({"type": "error", "error": str(e)})
+                    continue
+            await send_turn(turn)
+    finally:
+        sender.cancel()
+    return ws
+
+
+def create_server_app(graph=None):
+    """
+    Build the aiohttp application
+    
+    Args:
+        graph: Compiled HealthBot workflow with async_mode=True. Defaults to
+            the process-wide one from workflow.get_workflow() (checkpointer
+            from HEALTHBOT_CHECKPOINTER; use 'sqlite' for sessions that
+            survive restarts).
+    
+    Returns:
+        aiohttp web.Application
+    """
+    if graph is None:
+        graph = get_workflow(async_mode=True)
+    
+    app = web.Application()
+    app[GRAPH_KEY] = graph  # Compiled once, shared by every session
+    app[LOCKS_KEY] = weakref.WeakValueDictionary()
+    app.router.add_post("/sessions", create_session)
+    app.router.add_get("/sessions/{thread_id}", get_session)
+    app.router.add_post("/sessions/{thread_id}/reply", reply)
+    app.router.add_get("/sessions/{thread_id}/usage", get_usage)
+    app.router.add_get("/sessions/{thread_id}/ws", session_socket)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", prometheus_metrics)
+    return app
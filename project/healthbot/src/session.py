@@ -0,0 +1,185 @@
+"""
+HealthBot Sessions
+Resume API for the interrupt-based workflow: start a session, read what the
+patient should see, and resume it with their reply
+"""
+
+from typing import get_type_hints
+
+from langgraph.constants import INTERRUPT
+
+from state import State
+from budget import usage_report
+from streaming import StreamTimings, stream_run, astream_run
+from workflow import create_config, initialize_empty_state
+
+STATE_KEYS = frozenset(get_type_hints(State))
+
+
+def _pending_interrupt(saved):
+    """Return the payload of the interrupt a session is paused on, if any"""
+    for _task_id, channel, value in saved.pending_writes or []:
+        if channel == INTERRUPT:
+            interrupt = value[0] if isinstance(value, (list, tuple)) else value
+            return interrupt.value
+    return None
+
+
+def _resume_as_node(saved):
+    """
+    Node to attribute the patient's reply to when resuming
+    
+    The reply is written as if by the node that ran just before the paused
+    one, so its outgoing edge re-triggers the paused node (which then finds
+    patient_input set). Falls back to LangGraph's own inference.
+    """
+    writes = (saved.metadata or {}).get("writes") or {}
+    return next(iter(writes), None)
+
+
+def _turn(saved):
+    """
+    Describe where a session stands after a run
+    
+    Reads the latest checkpoint directly rather than app.get_state(), which
+    re-inspects every node's source on each call.
+    
+    Returns:
+        Dict with:
+        - done: True once the workflow reached END
+        - display: Text to show the patient
+        - prompt: Question to ask (None when done)
+        - state: Current state values
+    """
+    if saved is None:
+        return {"done": True, "display": "", "prompt": None, "state": {}}
+    
+    channel_values = saved.checkpoint["channel_values"]
+    values = {k: v for k, v in channel_values.items() if k in STATE_KEYS}
+    payload = _pending_interrupt(saved)
+    
+    if payload is None:
+        messages = values.get("messages", [])
+        return {
+            "done": True,
+            "display": messages[-1].content if messages else "",
+            "prompt": None,
+            "state": values,
+        }
+    
+    return {
+        "done": False,
+        "display": payload.get("display", ""),
+        "prompt": payload.get("prompt"),
+        "state": values,
+    }
+
+
+class HealthBotSession:
+    """
+    One patient session on a compiled HealthBot workflow
+    
+    The session lives in the workflow's checkpointer under its thread_id,
+    so any process holding the same app/checkpointer can pick it up with
+    current_turn() and continue with respond(). Use the a-prefixed methods
+    for workflows compiled with async_mode=True.
+    
+    With on_token set, summary and grading feedback tokens are passed to
+    on_token(node, text) while they are generated, and self.timings records
+    time-to-first-token and total time per node. The saved state still holds
+    the complete text either way.
+    """
+    
+    def __init__(self, app, thread_id, recursion_limit=2000, on_token=None):
+        """
+        Args:
+            app: Compiled HealthBot workflow (with a checkpointer)
+            thread_id: Session identifier
+            recursion_limit: Maximum super-steps per run
+            on_token: Optional callable(node, text) to stream LLM tokens to
+        """
+        self.app = app
+        self.thread_id = thread_id
+        self.config = create_config(thread_id=thread_id, recursion_limit=recursion_limit)
+        self.on_token = on_token
+        self.timings = StreamTimings() if on_token else None
+    
+    def _run(self, input):
+        if self.on_token:
+            stream_run(self.app, input, self.config, self.on_token, self.timings)
+        else:
+            self.app.invoke(input, self.config)
+    
+    async def _arun(self, input):
+        if self.on_token:
+            await astream_run(self.app, input, self.config, self.on_token, self.timings)
+        else:
+            await self.app.ainvoke(input, self.config)
+    
+    # ------------------------------------------------------------------
+    # Sync API
+    # ------------------------------------------------------------------
+    
+    def start(self, initial_state=None):
+        """Run the workflow until it first needs the patient"""
+        state = initial_state or initialize_empty_state()
+        state["session_id"] = self.thread_id
+        self._run(state)
+        return self.current_turn()
+    
+    def current_turn(self):
+        """Return the pending turn without running anything"""
+        return _turn(self.app.checkpointer.get_tuple(self.config))
+    
+    def respond(self, answer):
+        """
+        Resume the session with the patient's reply
+        
+        Args:
+            answer: Patient's response to the pending prompt
+        
+        Returns:
+            The next turn (see _turn)
+        """
+        saved = self.app.checkpointer.get_tuple(self.config)
+        if _turn(saved)["done"]:
+            raise ValueError(f"Session {self.thread_id} is not waiting for input")
+        self.app.update_state(
+            self.config, {"patient_input": answer}, as_node=_resume_as_node(saved)
+        )
+        self._run(None)
+        return self.current_turn()
+    
+    def usage(self):
+        """Token usage, cost estimate and budget mode (see budget.usage_report)"""
+        return usage_report(self.current_turn()["state"])
+    
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
+    
+    async def astart(self, initial_state=None):
+        """Async version of start()"""
+        state = initial_state or initialize_empty_state()
+        state["session_id"] = self.thread_id
+        await self._arun(state)
+        return await self.acurrent_turn()
+    
+    async def acurrent_turn(self):
+        """Async version of current_turn()"""
+        return _turn(await self.app.checkpointer.aget_tuple(self.config))
+    
+    async def arespond(self, answer):
+        """Async version of respond()"""
+        saved = await self.app.checkpointer.aget_tuple(self.config)
+        if _turn(saved)["done"]:
+            raise ValueError(f"Session {self.thread_id} is not waiting for input")
+        await self.app.aupdate_state(
+            self.config, {"patient_input": answer}, as_node=_resume_as_node(saved)
+        )
+        await self._arun(None)
+        return await self.acurrent_turn()
+    
+    async def ausage(self):
+        """Async version of usage()"""
+        return usage_report((await self.acurrent_turn())["state"])
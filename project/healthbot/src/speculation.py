@@ -0,0 +1,288 @@
+"""
+HealthBot Speculative Quiz Generation
+Generate quiz banks in the background (the first while the patient is still
+reading the summary, later ones as a bank runs low), so generate_quiz can
+pick up a finished result
+"""
+
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from budget import get_daily_ledger, response_usage
+from resilience import call_upstream, acall_upstream
+
+# Background workers for sync sessions (each runs one blocking LLM call)
+SPECULATION_WORKERS = 8
+
+# Sessions with an outstanding speculation; the oldest are dropped beyond this
+SPECULATION_MAX_PENDING = 1000
+
+
+class QuizSpeculator:
+    """
+    Per-session background quiz generation
+    
+    start()/astart() launch the LLM call for a prompt under a session key;
+    take()/atake() return its text if the consumer asks for the same prompt,
+    waiting for it if it is still running: the call is already bounded by
+    the LLM upstream's timeout and retries, and a second inline call for the
+    same prompt would cost its tokens twice (the consumer only generates
+    inline when the speculation failed). A changed prompt (new summary,
+    different questions already asked) means the result is thrown away.
+    discard() cancels the session's work when the patient leaves the topic.
+    Calls go through the "llm" upstream (resilience.py) like the consumer's
+    own.
+    
+    Every call that finishes, used or not, is charged: its reported token
+    usage goes to the daily ledger at once and is held for the session
+    until a node adds it to the session's token usage (collect_usage()).
+    
+    Sync sessions run on a small thread pool; async sessions run as tasks on
+    the current event loop, outside the calling node's callback context so
+    that their tokens are not streamed as the summarizer's.
+    """
+    
+    def __init__(self, max_workers=SPECULATION_WORKERS, max_pending=SPECULATION_MAX_PENDING):
+        self.max_pending = max_pending
+        self._max_workers = max_workers
+        self._executor = None
+        self._pending = OrderedDict()  # session key -> job dict
+        self._usage = OrderedDict()  # session key -> [(topic, prompt tokens, completion tokens)]
+        self._lock = threading.Lock()
+        
+        # Metrics
+        self._started = 0
+        self._used = 0
+        self._discarded = 0
+        self._failed = 0
+        self._hidden_seconds = 0.0
+        self._waited_seconds = 0.0
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+    
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+    
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix="quiz-speculation"
+                    )
+        return self._executor
+    
+    def _register(self, key, job):
+        with self._lock:
+            previous = self._pending.pop(key, None)
+            self._pending[key] = job
+            evicted = []
+            while len(self._pending) > self.max_pending:
+                evicted.append(self._pending.popitem(last=False)[1])
+            self._started += 1
+        for old in filter(None, [previous] + evicted):
+            self._cancel(old)
+    
+    def _pop(self, key):
+        with self._lock:
+            return self._pending.pop(key, None)
+    
+    def _cancel(self, job):
+        job["future"].cancel()
+        with self._lock:
+            self._discarded += 1
+    
+    def _record_use(self, job, waited):
+        elapsed = job["finished"] - job["started"]
+        with self._lock:
+            self._used += 1
+            self._waited_seconds += waited
+            self._hidden_seconds += max(0.0, elapsed - waited)
+    
+    def _record_failure(self):
+        with self._lock:
+            self._failed += 1
+    
+    def _charge(self, key, job, response):
+        """Charge a finished call's tokens to the daily ledger and hold them for the session"""
+        prompt_tokens, completion_tokens = response_usage(response, job["prompt"])
+        get_daily_ledger().add(prompt_tokens + completion_tokens)
+        with self._lock:
+            self._prompt_tokens += prompt_tokens
+            self._completion_tokens += completion_tokens
+            self._usage.setdefault(key, []).append((job["topic"], prompt_tokens, completion_tokens))
+            self._usage.move_to_end(key)
+            while len(self._usage) > self.max_pending:
+                self._usage.popitem(last=False)
+    
+    def collect_usage(self, key):
+        """
+        Take the token usage of a session's finished calls not yet collected
+        
+        Args:
+            key: Session identifier
+        
+        Returns:
+            List of (topic, prompt_tokens, completion_tokens), one per call
+        """
+        with self._lock:
+            return self._usage.pop(key, [])
+    
+    # ------------------------------------------------------------------
+    # Sync sessions
+    # ------------------------------------------------------------------
+    
+    def start(self, key, prompt, llm, topic=None):
+        """
+        Generate the completion for prompt in a background thread
+        
+        Args:
+            key: Session identifier
+            prompt: Quiz prompt the consumer is expected to build
+            llm: Chat model to call
+            topic: Health topic the tokens are charged to
+        """
+        job = {"prompt": prompt, "topic": topic, "started": time.perf_counter(), "finished": None}
+        
+        def run():
+            try:
+                response = call_upstream("llm", lambda: llm.invoke(prompt))
+            finally:
+                job["finished"] = time.perf_counter()
+            self._charge(key, job, response)
+            return response.content.strip()
+        
+        job["future"] = self._get_executor().submit(run)
+        self._register(key, job)
+    
+    def take(self, key, prompt):
+        """
+        Return the speculative text for prompt, waiting if still running
+        
+        Args:
+            key: Session identifier
+            prompt: Prompt the consumer would send
+        
+        Returns:
+            Completion text, or None if there is no usable result (also when
+            the call failed or timed out in the LLM upstream)
+        """
+        job = self._pop(key)
+        if job is None:
+            return None
+        if job["prompt"] != prompt:
+            self._cancel(job)
+            return None
+        
+        asked = time.perf_counter()
+        try:
+            text = job["future"].result()
+        except Exception:
+            self._record_failure()
+            return None
+        self._record_use(job, time.perf_counter() - asked)
+        return text
+    
+    # ------------------------------------------------------------------
+    # Async sessions
+    # ------------------------------------------------------------------
+    
+    def astart(self, key, prompt, llm, topic=None):
+        """Async version of start(): runs as a task on the running loop"""
+        job = {"prompt": prompt, "topic": topic, "started": time.perf_counter(), "finished": None}
+        
+        async def run():
+            try:
+                response = await acall_upstream("llm", lambda: llm.ainvoke(prompt))
+            finally:
+                job["finished"] = time.perf_counter()
+            self._charge(key, job, response)
+            return response.content.strip()
+        
+        # A fresh context keeps the call out of the current node's run
+        job["future"] = asyncio.get_running_loop().create_task(run(), context=contextvars.Context())
+        self._register(key, job)
+    
+    async def atake(self, key, prompt):
+        """Async version of take()"""
+        job = self._pop(key)
+        if job is None:
+            return None
+        task = job["future"]
+        if job["prompt"] != prompt or task.get_loop() is not asyncio.get_running_loop():
+            self._cancel(job)
+            return None
+        
+        asked = time.perf_counter()
+        try:
+            text = await task
+        except Exception:
+            self._record_failure()
+            return None
+        self._record_use(job, time.perf_counter() - asked)
+        return text
+    
+    # ------------------------------------------------------------------
+    # Cancellation and metrics
+    # ------------------------------------------------------------------
+    
+    def discard(self, key):
+        """Cancel (or drop the result of) a session's speculative work"""
+        job = self._pop(key)
+        if job is not None:
+            self._cancel(job)
+    
+    def stats(self):
+        """
+        Speculation counters
+        
+        Returns:
+            Dict with started, used, discarded, failed, pending, use_rate,
+            hidden_seconds (generation time the patient did not wait for),
+            waited_seconds (time generate_quiz still waited) and the
+            prompt_tokens/completion_tokens of every finished call
+        """
+        with self._lock:
+            return {
+                "started": self._started,
+                "used": self._used,
+                "discarded": self._discarded,
+                "failed": self._failed,
+                "pending": len(self._pending),
+                "use_rate": self._used / self._started if self._started else 0.0,
+                "hidden_seconds": self._hidden_seconds,
+                "waited_seconds": self._waited_seconds,
+                "prompt_tokens": self._prompt_tokens,
+                "completion_tokens": self._completion_tokens,
+            }
+
+
+_speculator = None
+_speculator_lock = threading.Lock()
+
+
+def get_quiz_speculator():
+    """
+    Return the process-wide quiz speculator, creating it on first use
+    
+    Disabled with HEALTHBOT_SPECULATIVE_QUIZ=off.
+    
+    Returns:
+        QuizSpeculator, or None when speculation is disabled
+    """
+    global _speculator
+    
+    if os.getenv("HEALTHBOT_SPECULATIVE_QUIZ", "on").lower() in ("off", "0", "false"):
+        return None
+    
+    if _speculator is None:
+        with _speculator_lock:
+            if _speculator is None:
+                _speculator = QuizSpeculator()
+    return _speculator
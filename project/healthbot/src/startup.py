@@ -0,0 +1,136 @@
+"""
+HealthBot Startup Profiling
+Phase timings and an import-time breakdown for cold starts (see
+run_healthbot.py --profile-startup)
+"""
+
+import os
+import re
+import sys
+import time
+import subprocess
+import contextlib
+
+# One line of `python -X importtime` output: self us | cumulative us | module
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$")
+
+# Packages listed in the breakdown
+BREAKDOWN_TOP = 12
+
+_phases = []
+
+
+@contextlib.contextmanager
+def startup_phase(name):
+    """Time one startup phase (environment, imports, compile, ...)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - start))
+
+
+def phase_timings():
+    """Return the recorded (phase, seconds) pairs in order"""
+    return list(_phases)
+
+
+def importtime_enabled():
+    """Whether this interpreter runs with -X importtime"""
+    return "importtime" in sys._xoptions
+
+
+def parse_importtime(text):
+    """
+    Parse `python -X importtime` output
+    
+    Args:
+        text: stderr of the profiled process (other lines are skipped)
+    
+    Returns:
+        List of dicts with module, self_us, cumulative_us and depth
+    """
+    entries = []
+    for line in text.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": (len(match.group(3)) - 1) // 2,
+            })
+    return entries
+
+
+def import_breakdown(entries, top=BREAKDOWN_TOP):
+    """
+    Import self time per top-level package, largest first
+    
+    Returns:
+        List of (package, seconds, module count); the rest are summed into
+        one "(other)" row
+    """
+    packages = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        seconds, count = packages.get(package, (0.0, 0))
+        packages[package] = (seconds + entry["self_us"] / 1e6, count + 1)
+    
+    ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+    rows = [(package, seconds, count) for package, (seconds, count) in ranked[:top]]
+    rest = ranked[top:]
+    if rest:
+        rows.append(("(other)", sum(s for _p, (s, _c) in rest), sum(c for _p, (_s, c) in rest)))
+    return rows
+
+
+def profile_command(argv, quiet=False):
+    """
+    Run a Python command under -X importtime
+    
+    The command's stdout is passed through (discarded when quiet); its
+    importtime lines are collected and any other stderr output is passed
+    through.
+    
+    Args:
+        argv: Script and arguments (run with this interpreter)
+        quiet: Discard the command's stdout
+    
+    Returns:
+        Tuple (exit code, import entries, wall seconds)
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        stdout=subprocess.DEVNULL if quiet else None,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=os.environ.copy(),
+    )
+    wall = time.perf_counter() - start
+    other = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+    if other:
+        print("\n".join(other), file=sys.stderr)
+    return result.returncode, parse_importtime(result.stderr), wall
+
+
+def format_import_report(entries, wall=None):
+    """Text report of total import time and the per-package breakdown"""
+    total = sum(entry["self_us"] for entry in entries) / 1e6
+    lines = [f"Imports: {len(entries)} modules, {total:.3f}s"]
+    if wall is not None:
+        lines[0] += f" (process wall time {wall:.3f}s)"
+    for package, seconds, count in import_breakdown(entries):
+        share = seconds / total if total else 0.0
+        lines.append(f"  {package:<28} {seconds:>7.3f}s {share:>5.0%}  ({count} modules)")
+    return "\n".join(lines)
+
+
+def format_phase_report():
+    """Text report of the recorded startup phases"""
+    lines = ["Startup phases:"]
+    for name, seconds in _phases:
+        lines.append(f"  {name:<28} {seconds:>7.3f}s")
+    lines.append(f"  {'total':<28} {sum(s for _n, s in _phases):>7.3f}s")
+    return "\n".join(lines)
@@ -3,39 +3,90 @@ HealthBot State Schema
 Defines the structure of state throughout the workflow
 """
 
-from typing import Optional, List
+from typing import Annotated, Optional, List
+from langchain_core.messages import AnyMessage
 from langgraph.graph import MessagesState
 
+from history import bounded_messages
+from budget import merge_token_usage
+
 class State(MessagesState):
     """
     Extended MessagesState for HealthBot workflow
     
     Inherits from MessagesState:
-    - messages: List of chat messages
+    - messages: List of chat messages, bounded by the history policy
+      (see history.py; older turns are folded into a summary message)
     
     Additional fields:
     - health_topic: Current health topic user wants to learn about
     - search_results: Raw search results from Tavily
+    - topic_match: Cached topic whose search results answered this topic
+      (see topic_index.py; None after a fresh search)
     - summary: Patient-friendly summary of medical information
     - quiz_question: Generated comprehension check question
+    - quiz_answer_key: Answer letter, options and supporting citation for a
+      multiple-choice question (None for free-text questions)
+    - quiz_bank: Questions generated for the topic but not asked yet
+    - asked_questions: Stems of the questions asked on the topic (to skip repeats)
+    - quiz_bank_refill_at: Number of asked questions when the background
+      generation of the next bank started (None when no refill is pending)
     - patient_answer: Patient's answer to quiz question
     - grade: Numeric grade for answer (0-100)
     - feedback: Detailed feedback with citations
     - should_continue: Patient's choice ('new_topic', 'more_questions', 'exit')
     - session_id: Unique session identifier
     - quiz_count: Number of quizzes taken on current topic (for stand-out feature)
+    - patient_input: Patient's reply to the pending interrupt (consumed by the node)
+    - token_usage: Prompt/completion tokens and LLM calls for the session, with
+      per-topic totals (summed by its reducer; see budget.py)
     """
     
+    messages: Annotated[List[AnyMessage], bounded_messages]
     health_topic: Optional[str] = None
     search_results: Optional[str] = None
+    topic_match: Optional[str] = None
     summary: Optional[str] = None
     quiz_question: Optional[str] = None
+    quiz_answer_key: Optional[dict] = None
+    quiz_bank: Optional[List[dict]] = None
+    asked_questions: Optional[List[str]] = None
+    quiz_bank_refill_at: Optional[int] = None
     patient_answer: Optional[str] = None
     grade: Optional[int] = None
     feedback: Optional[str] = None
     should_continue: Optional[str] = None  # Changed from bool to str
     session_id: Optional[str] = None
     quiz_count: Optional[int] = 0  # Added for stand-out feature
+    patient_input: Optional[str] = None  # Set by the client when resuming
+    token_usage: Annotated[dict, merge_token_usage]  # Session token totals
+
+def new_topic_update():
+    """
+    Field values that clear topic-specific data for a new health topic
+    
+    messages and session_id are not included, so they carry over.
+    
+    Returns:
+        Partial state update
+    """
+    return {
+        "health_topic": None,
+        "search_results": None,
+        "topic_match": None,
+        "summary": None,
+        "quiz_question": None,
+        "quiz_answer_key": None,
+        "quiz_bank": None,
+        "asked_questions": None,
+        "quiz_bank_refill_at": None,
+        "patient_answer": None,
+        "grade": None,
+        "feedback": None,
+        "should_continue": None,
+        "quiz_count": 0,  # Reset quiz counter for new topic
+        "patient_input": None,
+    }
 
 def reset_for_new_topic(state: State) -> State:
     """
@@ -50,14 +101,6 @@ def reset_for_new_topic(state: State) -> State:
         Reset state with cleared topic-specific fields
     """
     # Keep session_id and messages for continuity, clear topic-specific fields
-    state["health_topic"] = None
-    state["search_results"] = None
-    state["summary"] = None
-    state["quiz_question"] = None
-    state["patient_answer"] = None
-    state["grade"] = None
-    state["feedback"] = None
-    state["should_continue"] = None
-    state["quiz_count"] = 0  # Reset quiz counter for new topic
+    state.update(new_topic_update())
     
     return state
@@ -0,0 +1,226 @@
+"""
+HealthBot Token Streaming
+Forward LLM tokens to the presentation layer while a node is still generating,
+and time each node's first token and full completion
+"""
+
+import time
+import asyncio
+import warnings
+from collections import defaultdict
+
+from langchain_core._api import LangChainBetaWarning
+
+# Nodes whose LLM output is shown to the patient. Quiz banks are not streamed:
+# which question is served is only known once the whole bank is parsed
+STREAMED_NODES = ("summarize_results", "evaluate_answer")
+
+# Grading completions open with a GRADE line (see nodes.GRADING_PROMPT); only
+# the explanation after this label is streamed, as the feedback
+SHOWN_AFTER = {"evaluate_answer": "EXPLANATION:"}
+
+# Answer keys (see nodes.QUIZ_BANK_PROMPT) are never streamed to the patient
+HIDDEN_MARKERS = ("ANSWER:",)
+
+# Tag for LLM calls whose output is intermediate (e.g. map-reduce notes, see
+# map_reduce.py) and never streamed, even from a streamed node
+NO_STREAM_TAG = "nostream"
+
+
+class StreamTimings:
+    """
+    Per-node time-to-first-token and total generation time
+    
+    One record per LLM call: {node, ttft, total, tokens}. Times are seconds
+    from the model call starting; ttft is None if no token arrived.
+    """
+    
+    def __init__(self):
+        self.records = []
+        self._runs = {}
+    
+    def start(self, run_id, node):
+        self._runs[run_id] = {"node": node, "start": time.perf_counter(), "ttft": None, "tokens": 0}
+    
+    def token(self, run_id):
+        """Count a token; returns the run's node (None for untracked runs)"""
+        run = self._runs.get(run_id)
+        if run is None:
+            return None
+        if run["ttft"] is None:
+            run["ttft"] = time.perf_counter() - run["start"]
+        run["tokens"] += 1
+        return run["node"]
+    
+    def token_node(self, run_id):
+        """Node of a tracked run (None for untracked runs)"""
+        run = self._runs.get(run_id)
+        return run["node"] if run else None
+    
+    def end(self, run_id):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        self.records.append({
+            "node": run["node"],
+            "ttft": run["ttft"],
+            "total": time.perf_counter() - run["start"],
+            "tokens": run["tokens"],
+        })
+    
+    def summary(self):
+        """
+        Aggregate the records by node
+        
+        Returns:
+            Dict of node -> {calls, ttft_avg, ttft_max, total_avg, total_max}
+        """
+        by_node = defaultdict(list)
+        for record in self.records:
+            by_node[record["node"]].append(record)
+        
+        summary = {}
+        for node, records in by_node.items():
+            ttfts = [r["ttft"] for r in records if r["ttft"] is not None]
+            totals = [r["total"] for r in records]
+            summary[node] = {
+                "calls": len(records),
+                "ttft_avg": sum(ttfts) / len(ttfts) if ttfts else None,
+                "ttft_max": max(ttfts) if ttfts else None,
+                "total_avg": sum(totals) / len(totals),
+                "total_max": max(totals),
+            }
+        return summary
+
+
+class HiddenTailFilter:
+    """
+    Withhold each LLM run's streamed text from the first hidden marker on
+    
+    Text that could be the start of a marker is held back until the next
+    token shows whether it is one. A run started with begin(run_id, after)
+    also withholds everything up to the end of its `after` label.
+    """
+    
+    def __init__(self, markers=HIDDEN_MARKERS):
+        self.markers = markers
+        self._runs = {}  # run_id -> [text so far, chars shown, hidden, label to wait for]
+    
+    def begin(self, run_id, after=None):
+        """Start a run, showing nothing before the `after` label if given"""
+        self._runs[run_id] = ["", 0, False, after]
+    
+    def _held(self, text):
+        """Length of the longest end of text that starts a marker"""
+        return max(
+            (k for m in self.markers for k in range(len(m) - 1, 0, -1) if text.endswith(m[:k])),
+            default=0,
+        )
+    
+    def feed(self, run_id, token):
+        """Add a token; returns the text that can be shown now"""
+        run = self._runs.setdefault(run_id, ["", 0, False, None])
+        if run[2]:
+            return ""
+        run[0] += token
+        if run[3]:
+            start = run[0].find(run[3])
+            if start < 0:
+                return ""
+            # Shown text starts at the first non-space after the label
+            rest = run[0][start + len(run[3]):]
+            if not rest.strip():
+                return ""
+            run[1] = len(run[0]) - len(rest.lstrip())
+            run[3] = None
+        text, shown = run[0], run[1]
+        
+        found = [i for i in (text.find(m) for m in self.markers) if i >= 0]
+        if found:
+            end = min(found)
+            run[2] = True
+        else:
+            end = len(text) - self._held(text)
+        run[1] = max(shown, end)
+        return text[shown:end]
+    
+    def flush(self, run_id):
+        """End a run; returns any held-back text that turned out to be safe"""
+        run = self._runs.pop(run_id, None)
+        if run is None or run[2] or run[3]:
+            return ""
+        return run[0][run[1]:]
+
+
+def stream_run(app, input, config, on_token=None, timings=None):
+    """
+    Run the graph once, forwarding node tokens as they are generated
+    
+    Drives astream_events() on an event loop of its own, so the graph's sync
+    nodes run in worker threads and still return the complete text. Call
+    astream_run() instead from inside a running event loop.
+    
+    Args:
+        app: Compiled HealthBot workflow
+        input: Initial state, or None to resume
+        config: Run config (thread_id etc.)
+        on_token: Callable(node, text) for each streamed token
+        timings: StreamTimings to record into
+    
+    Returns:
+        The StreamTimings used
+    """
+    return asyncio.run(astream_run(app, input, config, on_token, timings))
+
+
+async def astream_run(app, input, config, on_token=None, timings=None, nodes=STREAMED_NODES):
+    """
+    Run the graph once through its astream_events API, forwarding node tokens
+    as they are generated
+    
+    Args:
+        app: Compiled HealthBot workflow (sync or async nodes)
+        input: Initial state, or None to resume
+        config: Run config (thread_id etc.)
+        on_token: Callable(node, text) for each streamed token
+        timings: StreamTimings to record into
+        nodes: Graph nodes whose tokens are forwarded
+    
+    Returns:
+        The StreamTimings used
+    """
+    timings = timings or StreamTimings()
+    nodes = frozenset(nodes)
+    hidden = HiddenTailFilter()
+    
+    with warnings.catch_warnings():
+        # astream_events() warns on first use that its API is in beta
+        warnings.filterwarnings("ignore", category=LangChainBetaWarning, message="This API is in beta")
+        events = app.astream_events(input, config, version="v2")
+    
+    async for event in events:
+        kind = event["event"]
+        if not kind.startswith("on_chat_model_"):
+            continue
+        run_id = event["run_id"]
+        
+        if kind == "on_chat_model_start":
+            node = event.get("metadata", {}).get("langgraph_node")
+            if node in nodes and NO_STREAM_TAG not in event.get("tags", ()):
+                timings.start(run_id, node)
+                hidden.begin(run_id, SHOWN_AFTER.get(node))
+        elif kind == "on_chat_model_stream":
+            text = event["data"]["chunk"].content
+            node = timings.token(run_id)
+            if node is not None and text and on_token:
+                text = hidden.feed(run_id, text)
+                if text:
+                    on_token(node, text)
+        elif kind == "on_chat_model_end":
+            node = timings.token_node(run_id)
+            text = hidden.flush(run_id)
+            if node is not None and text and on_token:
+                on_token(node, text)
+            timings.end(run_id)
+    
+    return timings
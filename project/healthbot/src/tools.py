@@ -4,34 +4,364 @@ Tavily search integration for medical information retrieval
 """
 
 import os
-from dotenv import load_dotenv
-from tavily import TavilyClient
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from environment import load_environment
+from cache import TieredCache, get_cache_path, normalize_topic
+from metrics import record_search
+from resilience import call_upstream, acall_upstream, UpstreamUnavailable
+from search_client import TavilySearchClient, AsyncTavilySearchClient
+
+# Search result cache settings (overridable from .env)
+SEARCH_CACHE_TTL = 24 * 60 * 60       # Seconds a cached search stays fresh
+SEARCH_CACHE_STALE_TTL = 6 * 60 * 60  # Extra seconds served stale while refreshing
+SEARCH_CACHE_MEMORY_ENTRIES = 256
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+# Formatted output when a search finds nothing (never cached or indexed)
+NO_SEARCH_RESULTS = "No search results found"
+
+# Result count and length (HEALTHBOT_SEARCH_RESULTS, HEALTHBOT_SEARCH_DOC_CHARS).
+# Longer documents are fetched as full page text; large result sets are
+# summarized with map-reduce (see map_reduce.py)
+SEARCH_RESULTS = 5
+TAVILY_MAX_RESULTS = 20   # Per query; use fan-out for more
+DOC_CHARS = 300           # Excerpt length per result
+
+# Multi-query fan-out (HEALTHBOT_SEARCH_FANOUT=on): one query per aspect,
+# merged by URL and ranked with reciprocal rank fusion
+SEARCH_ASPECTS = ("symptoms", "causes", "treatment", "prevention")
+FANOUT_WORKERS = 4        # Aspect searches in flight at once per topic
+FANOUT_MAX_RESULTS = 10   # Merged results kept
+RRF_K = 60                # Rank fusion constant (higher = flatter)
+
+# Search clients: overrides (e.g. fakes for offline runs) or the long-lived
+# pooled Tavily clients (see search_client.py)
+_search_client = None
+_async_search_client = None
+_search_client_lock = threading.Lock()
 
 def load_env_from_project_root():
-    """Load .env from project root"""
-    try:
-        current_file_dir = os.path.dirname(os.path.abspath(__file__))
-        # From src/ go up 2 levels to project/
-        project_root = os.path.dirname(os.path.dirname(current_file_dir))
-        env_path = os.path.join(project_root, ".env")
+    """Load .env from project root (once per process, see environment.py)"""
+    return load_environment() is not None
+
+def get_search_cache():
+    """
+    Return the process-wide search result cache, creating it on first use
+    
+    Disable with HEALTHBOT_SEARCH_CACHE=off; TTLs can be set with
+    HEALTHBOT_SEARCH_CACHE_TTL and HEALTHBOT_SEARCH_CACHE_STALE_TTL (seconds).
+    
+    Returns:
+        TieredCache, or None when caching is disabled
+    """
+    global _search_cache
+    
+    if os.getenv("HEALTHBOT_SEARCH_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = TieredCache(
+                    "search_results",
+                    path=get_cache_path(),
+                    max_memory_entries=SEARCH_CACHE_MEMORY_ENTRIES,
+                    default_ttl=int(os.getenv("HEALTHBOT_SEARCH_CACHE_TTL", SEARCH_CACHE_TTL)),
+                    stale_ttl=int(os.getenv("HEALTHBOT_SEARCH_CACHE_STALE_TTL", SEARCH_CACHE_STALE_TTL)),
+                )
+    return _search_cache
+
+
+def search_cache_key(topic: str, max_results: int, fanout: bool = False) -> str:
+    """Build the search cache key from the normalized topic and result count"""
+    key = f"{normalize_topic(topic)}|{max_results}"
+    if document_chars() != DOC_CHARS:
+        key = f"{key}|{document_chars()}c"
+    return f"{key}|fanout{fanout_result_count()}" if fanout else key
+
+
+def search_result_count() -> int:
+    """Default number of results per search (HEALTHBOT_SEARCH_RESULTS)"""
+    return int(os.getenv("HEALTHBOT_SEARCH_RESULTS", SEARCH_RESULTS))
+
+
+def document_chars() -> int:
+    """Characters kept per result (HEALTHBOT_SEARCH_DOC_CHARS)"""
+    return int(os.getenv("HEALTHBOT_SEARCH_DOC_CHARS", DOC_CHARS))
+
+
+def fanout_result_count() -> int:
+    """Merged results kept from a fan-out (HEALTHBOT_SEARCH_FANOUT_RESULTS)"""
+    return int(os.getenv("HEALTHBOT_SEARCH_FANOUT_RESULTS", FANOUT_MAX_RESULTS))
+
+
+def _search_options(max_results: int) -> dict:
+    """Tavily search arguments: result count (capped) and full page text when needed"""
+    options = {"max_results": min(max_results, TAVILY_MAX_RESULTS)}
+    if document_chars() > DOC_CHARS:
+        options["include_raw_content"] = True
+    return options
+
+
+def fanout_enabled() -> bool:
+    """Whether searches fan out into one query per aspect (HEALTHBOT_SEARCH_FANOUT)"""
+    return os.getenv("HEALTHBOT_SEARCH_FANOUT", "off").lower() in ("on", "1", "true")
+
+
+def set_search_clients(client=None, async_client=None):
+    """
+    Override the search clients used by the search functions
+    
+    Any object with a Tavily-compatible search(query, max_results=...) method
+    works; async_client.search must be a coroutine. Pass None to go back to
+    the pooled Tavily clients.
+    
+    Args:
+        client: Client for search_medical_information
+        async_client: Client for asearch_medical_information
+    """
+    global _search_client, _async_search_client
+    _search_client = client
+    _async_search_client = async_client
+
+
+def _get_tavily_api_key():
+    """Return the Tavily API key, loading .env if needed"""
+    load_environment()  # No-op after the first call
+    
+    api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key:
+        raise EnvironmentError("TAVILY_API_KEY not found in project/.env")
+    return api_key
+
+
+def _get_async_search_client():
+    """Return the long-lived async search client, creating it on first use"""
+    global _async_search_client
+    if _async_search_client is None:
+        with _search_client_lock:
+            if _async_search_client is None:
+                _async_search_client = AsyncTavilySearchClient(_get_tavily_api_key())
+    return _async_search_client
+
+
+def build_search_query(topic: str, aspect: str = None) -> str:
+    """Build the Tavily query for a health topic (optionally one aspect of it)"""
+    if aspect:
+        return f"{topic} {aspect} patient education medical information"
+    return f"{topic} patient education medical information"
+
+
+def build_aspect_queries(topic: str, aspects=SEARCH_ASPECTS):
+    """Build one Tavily query per aspect of a health topic"""
+    return [build_search_query(topic, aspect) for aspect in aspects]
+
+
+def _url_key(url: str) -> str:
+    """URL identity for de-duplication (scheme, www., fragment and trailing / ignored)"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/")
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+
+def merge_search_results(responses, max_results=FANOUT_MAX_RESULTS):
+    """
+    Merge several Tavily responses into one, de-duplicated by URL
+    
+    Results are ranked by reciprocal rank fusion: a result scores
+    1 / (RRF_K + rank) for every query that returned it, so pages several
+    aspect queries agree on come first while each query's top hits still
+    make the cut. Ties go to the higher Tavily score.
+    
+    Args:
+        responses: Tavily response dicts (one per query)
+        max_results: Number of merged results to keep
+    
+    Returns:
+        Tavily-shaped dict with the merged "results"
+    """
+    merged = {}
+    for response in responses:
+        for rank, result in enumerate((response or {}).get("results", []), 1):
+            url = result.get("url", "")
+            key = _url_key(url) if url else f"untitled:{result.get('title', '')}"
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {"result": result, "fusion": 0.0, "score": 0.0, "queries": 0}
+            elif len(result.get("content", "")) > len(entry["result"].get("content", "")):
+                entry["result"] = result  # Keep the fullest copy of a page
+            entry["fusion"] += 1.0 / (RRF_K + rank)
+            entry["score"] = max(entry["score"], result.get("score") or 0.0)
+            entry["queries"] += 1
+    
+    ranked = sorted(merged.values(), key=lambda e: (e["fusion"], e["score"]), reverse=True)
+    return {"results": [entry["result"] for entry in ranked[:max_results]]}
+
+
+def format_search_results(results, doc_chars: int = None) -> str:
+    """
+    Format a Tavily response for the summarization prompt
+    
+    Args:
+        results: Tavily search response dict
+        doc_chars: Characters kept per result (defaults to
+            HEALTHBOT_SEARCH_DOC_CHARS); above DOC_CHARS the full page text
+            (raw_content) is used when present, on one line
         
-        if os.path.exists(env_path):
-            load_dotenv(env_path)
-            return True
-    except:
-        # If file resolution fails (e.g., in Jupyter), try absolute path
+    Returns:
+        Numbered results with title, source URL and a content excerpt
+    """
+    doc_chars = document_chars() if doc_chars is None else doc_chars
+    output = ""
+    if results and "results" in results:
+        for i, result in enumerate(results["results"], 1):
+            title = result.get("title", "Untitled")
+            url = result.get("url", "")
+            content = result.get("content", "")
+            if doc_chars > DOC_CHARS:
+                content = " ".join((result.get("raw_content") or content).split())
+            
+            output += f"\n{i}. {title}\n"
+            output += f"   Source: {url}\n"
+            output += f"   {content[:doc_chars]}...\n"
+    
+    return output if output else NO_SEARCH_RESULTS
+
+
+class _UncachedResults(str):
+    """Results that must not be stored: old fallback results, partial fan-outs"""
+
+
+def _is_cacheable(output: str) -> bool:
+    # Fallback results keep their original age (storing them again would make
+    # them look fresh) and partial fan-outs should be retried
+    return output != NO_SEARCH_RESULTS and not isinstance(output, _UncachedResults)
+
+
+def _cached_fallback(topic: str, max_results: int, fanout: bool = False):
+    """
+    Fallback for an unavailable search API: the last cached results for the
+    topic, however old (the error is re-raised when there are none)
+    """
+    def fallback(error):
+        cache = get_search_cache()
+        key = search_cache_key(topic, max_results, fanout)
+        cached = cache.last_value(key) if cache is not None else None
+        if cached is None:
+            raise error
+        return _UncachedResults(cached)
+    return fallback
+
+
+def _get_sync_search_client():
+    """Return the long-lived sync search client, creating it on first use"""
+    global _search_client
+    if _search_client is None:
+        with _search_client_lock:
+            if _search_client is None:
+                _search_client = TavilySearchClient(_get_tavily_api_key())
+    return _search_client
+
+
+def fanout_workers() -> int:
+    """Aspect searches in flight at once per topic (HEALTHBOT_SEARCH_FANOUT_WORKERS)"""
+    return max(1, int(os.getenv("HEALTHBOT_SEARCH_FANOUT_WORKERS", FANOUT_WORKERS)))
+
+
+def _query_tavily(client, query: str, max_results: int):
+    """One search API call through the "search" upstream (raw response)"""
+    start = time.perf_counter()
+    try:
+        return call_upstream("search", lambda: client.search(query, **_search_options(max_results)))
+    finally:
+        record_search(time.perf_counter() - start)
+
+
+async def _aquery_tavily(client, query: str, max_results: int, limit: asyncio.Semaphore):
+    """Async counterpart of _query_tavily, bounded by a semaphore"""
+    async with limit:
+        start = time.perf_counter()
         try:
-            env_path = r"c:\Training\Udacity\AI_Agents_LangGraph\project\.env"
-            if os.path.exists(env_path):
-                load_dotenv(env_path)
-                return True
-        except:
-            pass
-    return False
+            return await acall_upstream("search", lambda: client.search(query, **_search_options(max_results)))
+        finally:
+            record_search(time.perf_counter() - start)
 
-def search_medical_information(topic: str, max_results: int = 5) -> str:
+
+def _merge_fanout(topic: str, max_results: int, outcomes) -> str:
     """
-    Search for medical information using Tavily API
+    Merge the aspect searches of a fan-out into formatted results
+    
+    Failed aspect queries are skipped (the merged results are then not
+    cached); when all failed, the cached fallback or the first error is used.
+    """
+    responses = [o for o in outcomes if not isinstance(o, BaseException)]
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    if not responses:
+        error = errors[0]
+        if not isinstance(error, UpstreamUnavailable):
+            error = Exception(f"Tavily search failed: {str(error)}")
+        return _cached_fallback(topic, max_results, fanout=True)(error)
+    
+    output = format_search_results(merge_search_results(responses, fanout_result_count()))
+    return _UncachedResults(output) if errors else output
+
+
+def _fanout_tavily(topic: str, max_results: int) -> str:
+    """
+    Search every aspect of a topic concurrently and merge the results (no caching)
+    
+    At most HEALTHBOT_SEARCH_FANOUT_WORKERS aspect searches of this topic
+    run at once, on threads of this call (like the async path's semaphore),
+    so concurrent sessions do not queue behind each other's searches.
+    
+    Args:
+        topic: Health topic to search for
+        max_results: Results requested per aspect query
+        
+    Returns:
+        Formatted, de-duplicated search results as string
+    """
+    client = _get_sync_search_client()
+    queries = build_aspect_queries(topic)
+    outcomes = []
+    with ThreadPoolExecutor(min(fanout_workers(), len(queries)), thread_name_prefix="healthbot-fanout") as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _query_tavily, client, query, max_results)
+            for query in queries
+        ]
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+    return _merge_fanout(topic, max_results, outcomes)
+
+
+async def _afanout_tavily(topic: str, max_results: int) -> str:
+    """Async counterpart of _fanout_tavily (bounded per topic by a semaphore)"""
+    client = _get_async_search_client()
+    limit = asyncio.Semaphore(fanout_workers())
+    outcomes = await asyncio.gather(
+        *(_aquery_tavily(client, query, max_results, limit) for query in build_aspect_queries(topic)),
+        return_exceptions=True,
+    )
+    return _merge_fanout(topic, max_results, outcomes)
+
+
+def _search_tavily(topic: str, max_results: int) -> str:
+    """
+    Run the Tavily search and format the results (no caching)
     
     Args:
         topic: Health topic to search for
@@ -40,40 +370,112 @@ def search_medical_information(topic: str, max_results: int = 5) -> str:
     Returns:
         Formatted search results as string
     """
-    # Load environment (skip if already loaded)
-    if not os.getenv('ENV_ALREADY_LOADED'):
-        load_env_from_project_root()
+    client = _get_sync_search_client()
     
-    api_key = os.getenv("TAVILY_API_KEY")
-    if not api_key:
-        raise EnvironmentError("TAVILY_API_KEY not found in project/.env")
+    start = time.perf_counter()
+    try:
+        results = call_upstream(
+            "search",
+            lambda: client.search(build_search_query(topic), **_search_options(max_results)),
+            fallback=_cached_fallback(topic, max_results),
+        )
+        return results if isinstance(results, str) else format_search_results(results)
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        raise Exception(f"Tavily search failed: {str(e)}")
+    finally:
+        record_search(time.perf_counter() - start)
+
+
+async def _asearch_tavily(topic: str, max_results: int) -> str:
+    """Async counterpart of _search_tavily (no caching)"""
+    client = _get_async_search_client()
+    
+    start = time.perf_counter()
+    try:
+        results = await acall_upstream(
+            "search",
+            lambda: client.search(build_search_query(topic), **_search_options(max_results)),
+            fallback=_cached_fallback(topic, max_results),
+        )
+        return results if isinstance(results, str) else format_search_results(results)
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        raise Exception(f"Tavily search failed: {str(e)}")
+    finally:
+        record_search(time.perf_counter() - start)
+
+
+def search_medical_information(topic: str, max_results: int = None, fanout: bool = None) -> str:
+    """
+    Search for medical information using Tavily API
     
-    # Use Tavily client directly (no LangChain wrapper)
-    client = TavilyClient(api_key=api_key)
+    Results are cached by normalized topic and max_results (memory + disk).
+    Expired entries are served while a background refresh runs. The API call
+    goes through the "search" upstream (timeout, retries, circuit breaker,
+    see resilience.py); while it is unavailable the last cached results are
+    served, however old.
     
-    # Build search query
-    query = f"{topic} patient education medical information"
+    With fan-out, one query per aspect in SEARCH_ASPECTS runs concurrently and
+    the results are merged by URL (see merge_search_results), for about the
+    wall time of one search.
     
-    try:
-        # Execute search
-        results = client.search(query, max_results=max_results)
-        
-        # Format results
-        output = ""
-        if results and "results" in results:
-            for i, result in enumerate(results["results"], 1):
-                title = result.get("title", "Untitled")
-                url = result.get("url", "")
-                content = result.get("content", "")
-                
-                output += f"\n{i}. {title}\n"
-                output += f"   Source: {url}\n"
-                output += f"   {content[:300]}...\n"
+    Args:
+        topic: Health topic to search for
+        max_results: Number of results to return (per aspect with fan-out;
+            defaults to HEALTHBOT_SEARCH_RESULTS, at most TAVILY_MAX_RESULTS)
+        fanout: Fan out into aspect queries (defaults to HEALTHBOT_SEARCH_FANOUT)
         
-        return output if output else "No search results found"
+    Returns:
+        Formatted search results as string
+    """
+    max_results = max_results or search_result_count()
+    fanout = fanout_enabled() if fanout is None else fanout
+    search = _fanout_tavily if fanout else _search_tavily
+    
+    cache = get_search_cache()
+    if cache is None:
+        return str(search(topic, max_results))
+    
+    return str(cache.get_or_compute(
+        search_cache_key(topic, max_results, fanout),
+        lambda: search(topic, max_results),
+        tag=normalize_topic(topic),
+        cacheable=_is_cacheable,
+    ))
+
+
+async def asearch_medical_information(topic: str, max_results: int = None, fanout: bool = None) -> str:
+    """
+    Async version of search_medical_information
+    
+    Shares the same cache; the network calls do not block the event loop.
+    
+    Args:
+        topic: Health topic to search for
+        max_results: Number of results to return (per aspect with fan-out;
+            defaults to HEALTHBOT_SEARCH_RESULTS)
+        fanout: Fan out into aspect queries (defaults to HEALTHBOT_SEARCH_FANOUT)
         
-    except Exception as e:
-        raise Exception(f"Tavily search failed: {str(e)}")
+    Returns:
+        Formatted search results as string
+    """
+    max_results = max_results or search_result_count()
+    fanout = fanout_enabled() if fanout is None else fanout
+    asearch = _afanout_tavily if fanout else _asearch_tavily
+    
+    cache = get_search_cache()
+    if cache is None:
+        return str(await asearch(topic, max_results))
+    
+    return str(await cache.aget_or_compute(
+        search_cache_key(topic, max_results, fanout),
+        lambda: asearch(topic, max_results),
+        tag=normalize_topic(topic),
+        cacheable=_is_cacheable,
+    ))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,497 @@
+"""
+HealthBot Topic Index
+Local BM25 retrieval index over previously fetched search results and
+summaries, so a new topic that means the same as a cached one
+("hypertension", "high blood pressure", "HTN") is answered without a new
+search or summary
+
+Rebuild offline from the search cache and summary store with:
+    python src/topic_index.py --rebuild
+"""
+
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import argparse
+import threading
+from collections import Counter
+
+from cache import get_cache_path, normalize_topic, summary_tag
+from metrics import record_cache
+from tools import SEARCH_CACHE_TTL
+
+# Similarity (0-1, see TopicIndex.similarity) at which a cached topic
+# answers. Unrelated topics are kept out by requiring the query terms in the
+# topic or result titles (and AMBIGUITY_MARGIN), so the threshold only drops
+# weak title matches: aliases found in one corpus title score about 0.6
+DEFAULT_THRESHOLD = 0.4
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field weights: how many times the topic and result titles are indexed
+TOPIC_WEIGHT = 3
+TITLE_WEIGHT = 2
+
+# Share of the result body and summary score added to break ties between
+# entries the topic and titles score alike
+BODY_WEIGHT = 0.01
+
+# A match must beat every other eligible entry by this much: "blood
+# pressure" is in the titles of both hypertension and hypotension
+AMBIGUITY_MARGIN = 0.1
+
+# Topics kept (least recently updated are dropped) and entry lifetime: as
+# long as the search results stay fresh in the search cache, so a match never
+# serves results older than a direct search would
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL = SEARCH_CACHE_TTL
+
+TABLE = "topic_index"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_TITLE_LINE = re.compile(r"^\s*\d+\.\s+(.+)$", re.MULTILINE)
+# Formatting of tools.format_search_results that is not about the topic
+_NUMBERING = re.compile(r"^\s*\d+\.\s+", re.MULTILINE)
+_SOURCE_LINE = re.compile(r"^\s*Source:.*$", re.MULTILINE)
+_URL = re.compile(r"https?://\S+")
+
+# Words that carry no topic meaning in queries or documents
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the "
+    "this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords"""
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def result_text(search_results):
+    """Formatted search results without the result numbers, source lines and URLs"""
+    text = _SOURCE_LINE.sub("", search_results or "")
+    return _URL.sub("", _NUMBERING.sub("", text))
+
+
+def key_tokens(topic, search_results):
+    """
+    Tokens of what a topic's results are about: the topic and the result titles
+    
+    The topic is repeated (TOPIC_WEIGHT) so it counts for more than the
+    titles (TITLE_WEIGHT). URLs are left out: their digits would match
+    "type 1" or "stage 2".
+    """
+    titles = " ".join(_TITLE_LINE.findall(search_results or ""))
+    return tokenize(topic) * TOPIC_WEIGHT + tokenize(_URL.sub("", titles)) * TITLE_WEIGHT
+
+
+def body_tokens(search_results, summary=None):
+    """Tokens of the result bodies and summary (result numbers and URLs left out)"""
+    return tokenize(result_text(search_results)) + tokenize(_URL.sub("", summary or ""))
+
+
+class TopicIndex:
+    """
+    BM25 index of cached topics, persisted in the cache SQLite file
+    
+    Each entry holds a topic's formatted search results and, once generated,
+    its summary. Two fields are indexed: the key (the topic and the result
+    titles) and the body (the result text and the summary). match() scores
+    a new topic against every entry's key and returns the best one if its
+    similarity reaches the threshold; the body only breaks ties, so a page
+    that merely mentions a term ("smoking" on a COPD page) does not make its
+    topic an alias. Entries older than ttl are ignored and dropped on
+    rebuild. Safe to share between threads.
+    """
+    
+    def __init__(self, path=None, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        """
+        Args:
+            path: SQLite file, or None for a memory-only index
+            threshold: Minimum similarity (0-1) for a match
+            max_entries: Topics kept (least recently updated dropped)
+            ttl: Seconds an entry can answer new topics (None = forever)
+        """
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        
+        self._lock = threading.RLock()
+        self._entries = {}    # topic -> {"search_results", "summary", "updated_at"}
+        # Per field ("key", "body"): topic -> token count, topic -> distinct
+        # tokens, token -> {topic: term frequency} and the total token count
+        self._lengths = {"key": {}, "body": {}}
+        self._terms = {"key": {}, "body": {}}
+        self._postings = {"key": {}, "body": {}}
+        self._total_length = {"key": 0, "body": 0}
+        self._counters = {"lookups": 0, "hits": 0, "misses": 0, "adds": 0}
+        
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+                "topic TEXT PRIMARY KEY, search_results TEXT NOT NULL, "
+                "summary TEXT, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+            self._load()
+    
+    # ------------------------------------------------------------------
+    # In-memory index
+    # ------------------------------------------------------------------
+    
+    def _load(self):
+        rows = self._conn.execute(
+            f"SELECT topic, search_results, summary, updated_at FROM {TABLE} ORDER BY updated_at"
+        ).fetchall()
+        for topic, search_results, summary, updated_at in rows:
+            self._index(topic, search_results, summary, updated_at)
+    
+    def _unindex(self, topic):
+        if topic not in self._entries:
+            return
+        del self._entries[topic]
+        for field, field_postings in self._postings.items():
+            self._total_length[field] -= self._lengths[field].pop(topic)
+            for token in self._terms[field].pop(topic):
+                postings = field_postings[token]
+                del postings[topic]
+                if not postings:
+                    del field_postings[token]
+    
+    def _index(self, topic, search_results, summary, updated_at):
+        self._unindex(topic)
+        self._entries[topic] = {
+            "search_results": search_results,
+            "summary": summary,
+            "updated_at": updated_at,
+        }
+        fields = {
+            "key": Counter(key_tokens(topic, search_results)),
+            "body": Counter(body_tokens(search_results, summary)),
+        }
+        for field, tokens in fields.items():
+            self._lengths[field][topic] = sum(tokens.values())
+            self._terms[field][topic] = tuple(tokens)
+            self._total_length[field] += self._lengths[field][topic]
+            for token, tf in tokens.items():
+                self._postings[field].setdefault(token, {})[topic] = tf
+    
+    def _idf(self, field, token):
+        n = len(self._postings[field].get(token, ()))
+        count = len(self._entries)
+        return math.log(1 + (count - n + 0.5) / (n + 0.5))
+    
+    def _bm25(self, field, query):
+        """BM25 score of every entry sharing a query term, over its upper bound (0-1)"""
+        avg_length = self._total_length[field] / len(self._entries) or 1.0
+        scores = {}
+        bound = 0.0
+        for token in query:
+            idf = self._idf(field, token)
+            bound += idf * (BM25_K1 + 1)
+            for candidate, tf in self._postings[field].get(token, {}).items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[field][candidate] / avg_length)
+                scores[candidate] = scores.get(candidate, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return {candidate: score / bound for candidate, score in scores.items()}
+    
+    def _eligible(self, candidate, query):
+        """
+        Every query term is in the candidate's topic or result titles, and
+        every number in its topic is in the query
+        """
+        key = self._postings["key"]
+        numbers = [t for t in tokenize(candidate) if any(ch.isdigit() for ch in t)]
+        return all(candidate in key.get(token, ()) for token in query) and all(t in query for t in numbers)
+    
+    def _fresh(self, entry, now):
+        return self.ttl is None or now - entry["updated_at"] < self.ttl
+    
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    
+    def similarity(self, topic):
+        """
+        Similarity of a topic to every fresh entry
+        
+        BM25 score over the entry's topic and result titles, divided by its
+        upper bound for the query (every query term saturated), so scores
+        fall in 0-1 whatever the query length; the body score adds at most
+        BODY_WEIGHT to break ties. Only entries whose topic or titles contain
+        every query term are scored: body text mentioning a risk factor, a
+        drug or a related condition ("smoking", "insulin", "diabetes" on a
+        hypertension page) is not what the entry is about. An entry whose
+        topic has a number the query lacks is left out too: "diabetes" is
+        not "type 1 diabetes", nor is "type 2 diabetes".
+        
+        Returns:
+            Dict topic -> similarity (entries not eligible are left out)
+        """
+        query = set(tokenize(topic))
+        if not query:
+            return {}
+        
+        with self._lock:
+            if not self._entries:
+                return {}
+            now = time.time()
+            key_scores = self._bm25("key", query)
+            body_scores = self._bm25("body", query)
+            return {
+                candidate: (score + BODY_WEIGHT * body_scores.get(candidate, 0.0)) / (1 + BODY_WEIGHT)
+                for candidate, score in key_scores.items()
+                if self._fresh(self._entries[candidate], now) and self._eligible(candidate, query)
+            }
+    
+    def match(self, topic, threshold=None):
+        """
+        Best cached entry for a topic, if similar enough
+        
+        An entry for the same normalized topic always matches. Otherwise the
+        best entry must reach the threshold and beat the next one by
+        AMBIGUITY_MARGIN.
+        
+        Args:
+            topic: Topic the patient asked for
+            threshold: Minimum similarity (defaults to the index threshold)
+        
+        Returns:
+            Dict with topic, search_results, summary and similarity, or None
+        """
+        threshold = self.threshold if threshold is None else threshold
+        normalized = normalize_topic(topic)
+        
+        with self._lock:
+            self._counters["lookups"] += 1
+            entry = self._entries.get(normalized)
+            if entry is not None and self._fresh(entry, time.time()):
+                best, score = normalized, 1.0
+            else:
+                scores = self.similarity(normalized)
+                ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+                best, score = ranked[0] if ranked else (None, 0.0)
+                if len(ranked) > 1 and score - ranked[1][1] < AMBIGUITY_MARGIN:
+                    best = None
+            
+            hit = best is not None and score >= threshold
+            self._counters["hits" if hit else "misses"] += 1
+            record_cache(TABLE, hit)
+            if not hit:
+                return None
+            return {"topic": best, "similarity": score, **self._entries[best]}
+    
+    def get(self, topic):
+        """Entry for a topic (search_results, summary, updated_at), or None"""
+        with self._lock:
+            entry = self._entries.get(normalize_topic(topic))
+            return dict(entry) if entry is not None else None
+    
+    def add(self, topic, search_results, summary=None):
+        """
+        Index (or replace) a topic's search results and summary
+        
+        Args:
+            topic: Topic the results were fetched for
+            search_results: Formatted search results
+            summary: Patient-friendly summary (None until generated)
+        """
+        topic = normalize_topic(topic)
+        now = time.time()
+        with self._lock:
+            self._index(topic, search_results, summary, now)
+            self._counters["adds"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {TABLE} (topic, search_results, summary, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (topic, search_results, summary, now),
+                )
+            self._prune()
+            if self._conn is not None:
+                self._conn.commit()
+    
+    def set_summary(self, topic, search_results, summary):
+        """
+        Store the summary generated for an indexed topic's search results
+        
+        Ignored when the entry now holds different search results. The entry
+        keeps its age: it expires with its search results.
+        """
+        topic = normalize_topic(topic)
+        with self._lock:
+            entry = self._entries.get(topic)
+            if entry is None or entry["search_results"] != search_results:
+                return
+            updated_at = entry["updated_at"]
+            self._index(topic, search_results, summary, updated_at)
+            if self._conn is not None:
+                self._conn.execute(
+                    f"UPDATE {TABLE} SET summary = ? WHERE topic = ?",
+                    (summary, topic),
+                )
+                self._conn.commit()
+    
+    def _prune(self):
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        oldest = sorted(self._entries, key=lambda t: self._entries[t]["updated_at"])[:excess]
+        for topic in oldest:
+            self._unindex(topic)
+        if self._conn is not None:
+            self._conn.executemany(f"DELETE FROM {TABLE} WHERE topic = ?", [(t,) for t in oldest])
+    
+    def rebuild(self, entries):
+        """
+        Replace the whole index
+        
+        Args:
+            entries: Iterable of (topic, search_results, summary, updated_at)
+        
+        Returns:
+            Number of topics indexed
+        """
+        now = time.time()
+        with self._lock:
+            self._entries.clear()
+            for field in self._postings:
+                self._lengths[field].clear()
+                self._terms[field].clear()
+                self._postings[field].clear()
+                self._total_length[field] = 0
+            for topic, search_results, summary, updated_at in entries:
+                if self.ttl is None or now - updated_at < self.ttl:
+                    self._index(normalize_topic(topic), search_results, summary, updated_at)
+            if self._conn is not None:
+                self._conn.execute(f"DELETE FROM {TABLE}")
+                self._conn.executemany(
+                    f"INSERT INTO {TABLE} (topic, search_results, summary, updated_at) VALUES (?, ?, ?, ?)",
+                    [(t, e["search_results"], e["summary"], e["updated_at"]) for t, e in self._entries.items()],
+                )
+            self._prune()
+            if self._conn is not None:
+                self._conn.commit()
+            return len(self._entries)
+    
+    def stats(self):
+        """
+        Report index size and match counters
+        
+        Returns:
+            Dict with entries, lookups, hits, misses, adds and hit_rate
+        """
+        with self._lock:
+            stats = {"entries": len(self._entries), **self._counters}
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+
+# ----------------------------------------------------------------------
+# Offline rebuild
+# ----------------------------------------------------------------------
+
+def cached_topic_entries(path):
+    """
+    Topic entries recovered from the search cache and summary store
+    
+    Search results come from the search cache (key "topic|max_results", with
+    optional "|<chars>c" and "|fanout<merged results>" suffixes; the most
+    recent per topic). A topic gets the most recent stored summary generated
+    from those exact results (summaries are tagged with the topic and a hash
+    of their search results, see cache.summary_tag); a summary of an older
+    result set is left out.
+    
+    Args:
+        path: Cache SQLite file
+    
+    Returns:
+        List of (topic, search_results, summary, updated_at)
+    """
+    conn = sqlite3.connect(path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        results = {}
+        if "search_results" in tables:
+            for key, value, created_at in conn.execute(
+                "SELECT key, value, created_at FROM search_results ORDER BY created_at"
+            ):
+                results[normalize_topic(key.split("|", 1)[0])] = (json.loads(value), created_at)
+        summaries = {}
+        if "summaries" in tables:
+            for tag, value in conn.execute(
+                "SELECT tag, value FROM summaries WHERE tag IS NOT NULL ORDER BY created_at"
+            ):
+                summaries[tag] = json.loads(value)
+    finally:
+        conn.close()
+    
+    return [
+        (topic, search_results, summaries.get(summary_tag(topic, search_results)), created_at)
+        for topic, (search_results, created_at) in results.items()
+    ]
+
+
+_topic_index = None
+_topic_index_lock = threading.Lock()
+
+
+def index_ttl():
+    """Entry lifetime: HEALTHBOT_TOPIC_INDEX_TTL, else the search cache TTL"""
+    ttl = os.getenv("HEALTHBOT_TOPIC_INDEX_TTL") or os.getenv("HEALTHBOT_SEARCH_CACHE_TTL", DEFAULT_TTL)
+    return float(ttl)
+
+
+def get_topic_index():
+    """
+    Return the process-wide topic index, creating it on first use
+    
+    Enabled with HEALTHBOT_TOPIC_INDEX=on; HEALTHBOT_TOPIC_INDEX_THRESHOLD
+    sets the similarity needed for a match, _MAX_ENTRIES and _TTL bound it
+    (the TTL defaults to the search cache's, HEALTHBOT_SEARCH_CACHE_TTL).
+    
+    Returns:
+        TopicIndex, or None when the index is disabled
+    """
+    global _topic_index
+    
+    if os.getenv("HEALTHBOT_TOPIC_INDEX", "off").lower() not in ("on", "1", "true"):
+        return None
+    
+    if _topic_index is None:
+        with _topic_index_lock:
+            if _topic_index is None:
+                _topic_index = TopicIndex(
+                    path=get_cache_path(),
+                    threshold=float(os.getenv("HEALTHBOT_TOPIC_INDEX_THRESHOLD", DEFAULT_THRESHOLD)),
+                    max_entries=int(os.getenv("HEALTHBOT_TOPIC_INDEX_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                    ttl=index_ttl(),
+                )
+    return _topic_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HealthBot topic index")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Rebuild the index from the search cache and summary store")
+    parser.add_argument("--path", default=None, help="Cache SQLite file (default: cache dir)")
+    parser.add_argument("--query", help="Show the closest cached topics for a query")
+    args = parser.parse_args()
+    
+    path = args.path or get_cache_path()
+    index = TopicIndex(path=path, ttl=index_ttl())
+    if args.rebuild:
+        count = index.rebuild(cached_topic_entries(path))
+        print(f"Indexed {count} topics from {path}")
+    if args.query:
+        scores = index.similarity(args.query)
+        for topic, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:5]:
+            print(f"  {score:.2f}  {topic}")
+    print(index.stats())
@@ -3,16 +3,41 @@ HealthBot Utility Functions
 Display text, get user input, and validate responses
 """
 
-import time
-import os
+import re
+
+from langgraph.errors import NodeInterrupt
 
 def display_text_to_user(text):
     """
-    Display text to patient in notebook
-    Includes delay to ensure text renders before asking for input
+    Display a status line to the operator console
+    
+    Patient-facing text travels in interrupt payloads (see
+    request_patient_input); this only prints and never waits.
     """
     print(text)
-    time.sleep(1)  # Wait for render to complete
+
+def request_patient_input(state, prompt, display=""):
+    """
+    Return the patient's reply, or pause the graph until one arrives
+    
+    If the client has not supplied state["patient_input"] yet, raises a
+    LangGraph NodeInterrupt carrying what to show and what to ask. The
+    session is checkpointed and holds no thread while it waits; the client
+    resumes it with update_state({"patient_input": ...}) and invoke(None),
+    which re-runs the node with the reply in place.
+    
+    Args:
+        state: Current workflow state
+        prompt: Question to ask the patient
+        display: Text to show before the question
+        
+    Returns:
+        Patient's response (stripped of whitespace)
+    """
+    response = state.get("patient_input")
+    if response is None:
+        raise NodeInterrupt({"display": display, "prompt": prompt})
+    return response.strip()
 
 def ask_user_for_input(prompt):
     """
@@ -107,3 +132,35 @@ def format_grade_report(grade, feedback):
 def separator(char="-", length=50):
     """Create a text separator for readability"""
     return char * length
+
+def display_header(title):
+    """Title block that opens a patient display"""
+    return f"""
+{separator('=', 80)}
+{title}
+{separator('=', 80)}
+"""
+
+def unstreamed_display(display, title, text):
+    """
+    What is left of a display once its header and streamed text were shown
+    
+    A client that prints a node's tokens as they arrive prints the header of
+    the display they belong to first; this returns the rest of the display
+    (e.g. the grade line and closing separator). If the display does not hold
+    that header and text, it is returned whole.
+    
+    Args:
+        display: Display text of the turn
+        title: Title of the display the text was streamed into
+        text: Text streamed during the turn
+    
+    Returns:
+        Display text still to show
+    """
+    header = display_header(title)
+    text = text.strip()
+    if not text or not display.startswith(header) or text not in display:
+        return display
+    rest = display[len(header):].replace(text, "", 1)
+    return "\n" + re.sub(r"\n{3,}", "\n\n", rest).lstrip("\n")
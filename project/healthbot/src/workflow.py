@@ -3,11 +3,14 @@ HealthBot Workflow
 LangGraph workflow orchestrating all 8 nodes
 """
 
+import threading
+
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.runnables import RunnableConfig
 
 from state import State
+from checkpointer import create_checkpointer
+from metrics import get_metrics
 from nodes import (
     ask_for_topic,
     search_medical_info,
@@ -17,10 +20,34 @@ from nodes import (
     present_quiz,
     evaluate_answer,
     ask_continue,
+    aask_for_topic,
+    asearch_medical_info,
+    asummarize_results,
+    apresent_summary,
+    agenerate_quiz,
+    apresent_quiz,
+    aevaluate_answer,
+    aask_continue,
 )
 
+# Node name -> (sync implementation, async implementation)
+NODES = {
+    "ask_for_topic": (ask_for_topic, aask_for_topic),
+    "search_medical_info": (search_medical_info, asearch_medical_info),
+    "summarize_results": (summarize_results, asummarize_results),
+    "present_summary": (present_summary, apresent_summary),
+    "generate_quiz": (generate_quiz, agenerate_quiz),
+    "present_quiz": (present_quiz, apresent_quiz),
+    "evaluate_answer": (evaluate_answer, aevaluate_answer),
+    "ask_continue": (ask_continue, aask_continue),
+}
+
+# Compiled workflows shared by get_workflow(), keyed by async_mode
+_compiled = {}
+_compiled_lock = threading.Lock()
+
 
-def create_healthbot_workflow():
+def create_healthbot_workflow(async_mode=False, checkpointer=None, metrics=None):
     """
     Create and compile the HealthBot LangGraph workflow
     
@@ -29,6 +56,17 @@ def create_healthbot_workflow():
     present_summary -> generate_quiz -> present_quiz -> evaluate_answer ->
     ask_continue -> [ask_for_topic (continue) OR END (exit)]
     
+    Args:
+        async_mode: Use the async node implementations. The compiled graph
+            must then be driven with ainvoke/astream; many sessions can run
+            concurrently on one event loop.
+        checkpointer: Checkpoint saver to compile with. Defaults to the one
+            selected by HEALTHBOT_CHECKPOINTER ('memory' or 'sqlite', see
+            checkpointer.create_checkpointer).
+        metrics: NodeMetrics collector to record every node run with.
+            Defaults to the process-wide one when HEALTHBOT_METRICS=on;
+            otherwise nodes are added unwrapped (no overhead).
+    
     Returns:
         Compiled workflow (CompiledGraph)
     """
@@ -36,15 +74,12 @@ def create_healthbot_workflow():
     # Create workflow
     workflow = StateGraph(State)
     
-    # Add all 8 nodes
-    workflow.add_node("ask_for_topic", ask_for_topic)
-    workflow.add_node("search_medical_info", search_medical_info)
-    workflow.add_node("summarize_results", summarize_results)
-    workflow.add_node("present_summary", present_summary)
-    workflow.add_node("generate_quiz", generate_quiz)
-    workflow.add_node("present_quiz", present_quiz)
-    workflow.add_node("evaluate_answer", evaluate_answer)
-    workflow.add_node("ask_continue", ask_continue)
+    metrics = metrics or get_metrics()
+    
+    # Add all 8 nodes (wrapped for per-node metrics when enabled)
+    for name, (sync_node, async_node) in NODES.items():
+        node = async_node if async_mode else sync_node
+        workflow.add_node(name, metrics.wrap(name, node) if metrics else node)
     
     # Define edges (linear workflow with conditional at end)
     workflow.add_edge(START, "ask_for_topic")
@@ -83,13 +118,35 @@ def create_healthbot_workflow():
         }
     )
     
-    # Compile with memory checkpointer
-    memory = MemorySaver()
-    app = workflow.compile(checkpointer=memory)
+    # Compile with the configured checkpointer (in-memory by default)
+    app = workflow.compile(checkpointer=checkpointer or create_checkpointer())
     
     return app
 
 
+def get_workflow(async_mode=False):
+    """
+    Return the process-wide compiled workflow, compiling it on first use
+    
+    Entry points and servers call this instead of create_healthbot_workflow()
+    so a process builds and compiles the graph (and its checkpointer) once.
+    Sessions are kept apart by thread_id.
+    
+    Args:
+        async_mode: Sync or async node implementations (one graph each)
+    
+    Returns:
+        Compiled workflow (CompiledGraph)
+    """
+    app = _compiled.get(async_mode)
+    if app is None:
+        with _compiled_lock:
+            app = _compiled.get(async_mode)
+            if app is None:
+                app = _compiled[async_mode] = create_healthbot_workflow(async_mode=async_mode)
+    return app
+
+
 def create_config(thread_id="healthbot_session_default", recursion_limit=2000):
     """
     Create runtime configuration for workflow execution
@@ -97,7 +154,7 @@ def create_config(thread_id="healthbot_session_default", recursion_limit=2000):
     Args:
         thread_id: Unique session identifier
         recursion_limit: Maximum recursion depth
-        
+    
     Returns:
         RunnableConfig
     """
@@ -118,12 +175,19 @@ def initialize_empty_state():
         "messages": [],
         "health_topic": None,
         "search_results": None,
+        "topic_match": None,
         "summary": None,
         "quiz_question": None,
+        "quiz_answer_key": None,
+        "quiz_bank": None,
+        "asked_questions": None,
+        "quiz_bank_refill_at": None,
         "patient_answer": None,
         "grade": None,
         "feedback": None,
         "should_continue": None,
         "session_id": None,
         "quiz_count": 0,
+        "patient_input": None,
+        "token_usage": {},
     }
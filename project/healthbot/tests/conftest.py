@@ -0,0 +1,94 @@
+"""
+HealthBot Test Fixtures
+Shared setup for the test suite: src on the path, a private cache directory,
+upstream settings, the fakes and the local search stand-in
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Caches, summaries and the daily ledger never touch the project's cache dir
+os.environ["HEALTHBOT_CACHE_DIR"] = tempfile.mkdtemp(prefix="healthbot-tests-")
+
+import pytest
+
+from fakes import SearchStandIn
+
+
+@pytest.fixture(scope="session")
+def search_stand_in():
+    """Local HTTP stand-in for the Tavily search endpoint (see fakes.SearchStandIn)"""
+    stand_in = SearchStandIn(latency=0.02)
+    stand_in.url = stand_in.start()
+    yield stand_in
+    stand_in.stop()
+
+
+@pytest.fixture
+def stand_in(search_stand_in):
+    """The search stand-in with its counters and status reset"""
+    search_stand_in.reset()
+    yield search_stand_in
+    search_stand_in.reset()
+
+
+@pytest.fixture
+def upstream_settings(monkeypatch):
+    """
+    Set upstream settings for one test: upstream_settings(llm_timeout=0.2, ...)
+    sets HEALTHBOT_LLM_TIMEOUT and the process-wide upstreams re-read them
+    """
+    import resilience
+    
+    def apply(**settings):
+        for name, value in settings.items():
+            monkeypatch.setenv(f"HEALTHBOT_{name.upper()}", str(value))
+        resilience.reset_upstreams()
+    
+    yield apply
+    resilience.reset_upstreams()
+
+
+@pytest.fixture
+def fake_upstreams(monkeypatch):
+    """
+    Route the LLM and search to the fakes for one test: fake_upstreams(
+    llm_latency=0.05, search_latency=0.05) installs them (see
+    fakes.install_fakes) with node status lines silenced, and the pooled
+    clients come back afterwards
+    """
+    import utils
+    import tools
+    import llm_config
+    from fakes import install_fakes
+    
+    monkeypatch.setattr(utils, "print", lambda *args, **kwargs: None, raising=False)
+    yield install_fakes
+    llm_config.get_llm_registry().close()
+    tools.set_search_clients()
+
+
+@pytest.fixture
+def no_caches(monkeypatch):
+    """
+    Every session does its own (fake) I/O: no search or summary cache, no
+    topic index and no speculative quiz generation
+    """
+    for name in ("SEARCH_CACHE", "SUMMARY_CACHE", "TOPIC_INDEX", "SPECULATIVE_QUIZ"):
+        monkeypatch.setenv(f"HEALTHBOT_{name}", "off")
+
+
+@pytest.fixture
+def fake_workflow(fake_upstreams, no_caches):
+    """
+    Build workflows on zero-latency fakes with no caches: fake_workflow(
+    checkpointer=MemorySaver()) takes create_healthbot_workflow's arguments
+    """
+    from workflow import create_healthbot_workflow
+    
+    fake_upstreams()
+    return create_healthbot_workflow
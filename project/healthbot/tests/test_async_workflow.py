@@ -0,0 +1,91 @@
+"""
+HealthBot Async Workflow Tests
+Runs whole patient sessions through the async workflow against the fakes,
+and checks that concurrent sessions overlap their LLM and search waits.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+from workflow import create_healthbot_workflow
+from session import HealthBotSession
+
+LATENCY = 0.2  # Seconds per fake LLM or search call
+SESSIONS = 20
+TOPICS = ["diabetes", "hypertension", "asthma", "migraine"]
+
+
+@pytest.fixture
+def app(fake_upstreams, no_caches):
+    """Async workflow on the fakes, with every session doing its own I/O"""
+    fake_upstreams(llm_latency=LATENCY, search_latency=LATENCY)
+    return create_healthbot_workflow(async_mode=True)
+
+
+async def run_session(app, thread_id, topic):
+    """Run one scripted session: topic -> ready -> answer -> exit"""
+    session = HealthBotSession(app, thread_id=thread_id)
+    turns = [await session.astart()]
+    for answer in [topic, "ready", "D", "3"]:
+        turns.append(await session.arespond(answer))
+    return turns
+
+
+def test_session_runs_to_the_end(app):
+    turns = asyncio.run(run_session(app, "async_single", "asthma"))
+    
+    assert all(not turn["done"] for turn in turns[:-1])
+    assert all(turn["prompt"] for turn in turns[:-1])
+    final = turns[-1]
+    assert final["done"]
+    assert final["state"]["health_topic"] == "asthma"
+    assert final["state"]["summary"]
+    assert final["state"]["quiz_question"]
+    assert final["state"]["grade"] is not None
+    assert final["state"]["feedback"]
+    assert final["state"]["should_continue"] == "exit"
+
+
+def test_finished_session_refuses_more_input(app):
+    async def scenario():
+        await run_session(app, "async_finished", "asthma")
+        with pytest.raises(ValueError):
+            await HealthBotSession(app, thread_id="async_finished").arespond("again")
+    
+    asyncio.run(scenario())
+
+
+def test_concurrent_sessions_overlap(app):
+    async def scenario():
+        start = time.perf_counter()
+        await run_session(app, "async_solo", "diabetes")
+        single = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            run_session(app, f"async_{i}", TOPICS[i % len(TOPICS)])
+            for i in range(SESSIONS)
+        ))
+        return single, time.perf_counter() - start, results
+    
+    single, concurrent, results = asyncio.run(scenario())
+    
+    for i, turns in enumerate(results):
+        state = turns[-1]["state"]
+        assert turns[-1]["done"]
+        assert state["health_topic"] == TOPICS[i % len(TOPICS)]
+        assert state["grade"] is not None
+    
+    # Serial sessions would take SESSIONS * single; overlapping ones take
+    # little more than one session's waits plus the graph's own CPU time
+    assert concurrent < single * SESSIONS / 3, (single, concurrent)
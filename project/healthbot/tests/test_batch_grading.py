@@ -0,0 +1,96 @@
+"""
+HealthBot Batch Grading Tests
+Checks that batch grading (sync and async) returns results in the order of
+the answers, fails only the bad items, grades like one-by-one grading, and
+finishes well ahead of it.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+from fakes import FakeHealthChatModel, fake_completion
+from nodes import build_grading_prompt, parse_grading_response
+from batch_grading import grade_answers, agrade_answers, summarize_grades
+
+SUMMARY = "Asthma narrows the airways. Inhalers relieve symptoms (Source: example.org)."
+ANSWERS = 60
+LATENCY = 0.05
+
+
+class FlakyFakeModel(FakeHealthChatModel):
+    """Fake model that fails on answers containing 'FAIL'"""
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if "FAIL" in messages[-1].content:
+            raise RuntimeError("simulated provider error")
+        return super()._generate(messages, stop, run_manager, **kwargs)
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if "FAIL" in messages[-1].content:
+            raise RuntimeError("simulated provider error")
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def make_records(count=ANSWERS):
+    records = []
+    for i in range(count):
+        answer = "FAIL" if i % 25 == 7 else f"Answer {i}: inhalers open the airways"
+        records.append({
+            "topic": "asthma",
+            "summary": SUMMARY,
+            "question": "How do inhalers help with asthma?",
+            "answer": answer,
+        })
+    records.append({"topic": "asthma", "summary": SUMMARY, "question": "Q", "answer": ""})
+    return records
+
+
+def expected_grade(record):
+    prompt = build_grading_prompt(record["topic"], record["summary"], record["question"], record["answer"])
+    return parse_grading_response(fake_completion(prompt))[0]
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["sync", "async"])
+def test_batch_keeps_order_and_per_item_errors(use_async):
+    llm = FlakyFakeModel(latency=LATENCY)
+    records = make_records()
+    
+    start = time.perf_counter()
+    for record in records[:10]:
+        grade_answers([record], llm=llm)
+    sequential = (time.perf_counter() - start) / 10 * len(records)
+    
+    start = time.perf_counter()
+    if use_async:
+        results = asyncio.run(agrade_answers(records, max_concurrency=16, llm=llm))
+    else:
+        results = grade_answers(records, max_concurrency=16, llm=llm)
+    batch = time.perf_counter() - start
+    
+    assert len(results) == len(records)
+    for record, result in zip(records, results):
+        should_fail = record["answer"] in ("", "FAIL")
+        assert result["answer"] == record["answer"]
+        assert (result["error"] is not None) == should_fail
+        if not should_fail:
+            assert result["grade"] == expected_grade(record)
+    assert batch < sequential / 2
+
+
+def test_summarize_grades():
+    records = make_records(10)
+    summary = summarize_grades(grade_answers(records, llm=FlakyFakeModel()))
+    grades = [expected_grade(r) for r in records if r["answer"] not in ("", "FAIL")]
+    
+    assert (summary["graded"], summary["failed"]) == (9, 2)
+    assert summary["average_grade"] == sum(grades) / len(grades)
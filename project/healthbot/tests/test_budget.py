@@ -0,0 +1,129 @@
+"""
+HealthBot Budget Tests
+Checks that the daily token ledger survives a restart and is shared by the
+processes using one cache file, that budget modes follow it, and that
+budgeted sessions finish within about one call of their budget.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import multiprocessing
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+import budget
+import nodes
+from budget import (
+    BudgetPolicy, DailyTokenLedger, budget_mode, set_budget_policy, NORMAL, ECONOMY, EXHAUSTED,
+)
+from session import HealthBotSession
+
+
+def _spend(path, tokens, calls):
+    ledger = DailyTokenLedger(path=path)
+    for _ in range(calls):
+        ledger.add(tokens)
+    ledger.flush()
+
+
+def test_ledger_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ledger = DailyTokenLedger(path=path, sync_interval=0)
+    ledger.add(300)
+    ledger.add(200, day="2026-01-01")
+    
+    restarted = DailyTokenLedger(path=path)
+    assert restarted.used() == 300
+    assert restarted.used("2026-01-01") == 200
+
+
+def test_ledger_is_shared_by_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    workers = [multiprocessing.Process(target=_spend, args=(path, 10, 50)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    assert DailyTokenLedger(path=path).used() == 4 * 10 * 50
+
+
+def test_ledger_keeps_recent_days(tmp_path):
+    ledger = DailyTokenLedger(days=2, path=str(tmp_path / "cache.sqlite"), sync_interval=0)
+    for day in ("2026-01-01", "2026-01-02", "2026-01-03"):
+        ledger.add(1, day=day)
+    assert [ledger.used(day) for day in ("2026-01-01", "2026-01-02", "2026-01-03")] == [0, 1, 1]
+    
+    ledger.reset()
+    assert ledger.used("2026-01-03") == 0
+
+
+def test_budget_mode_follows_session_and_daily_use(monkeypatch, tmp_path):
+    ledger = DailyTokenLedger(path=str(tmp_path / "cache.sqlite"), sync_interval=0)
+    monkeypatch.setattr(budget, "_ledger", ledger)
+    policy = BudgetPolicy(session_tokens=1000, daily_tokens=10000, economy_at=0.8)
+    
+    def state(tokens):
+        return {"token_usage": {"prompt_tokens": tokens, "completion_tokens": 0}}
+    
+    assert budget_mode(state(100), policy) == NORMAL
+    assert budget_mode(state(800), policy) == ECONOMY
+    assert budget_mode(state(1000), policy) == EXHAUSTED
+    
+    ledger.add(9000)
+    assert budget_mode(state(0), policy) == ECONOMY
+    ledger.add(1000)
+    assert budget_mode(state(0), policy) == EXHAUSTED
+
+
+@pytest.fixture
+def use_budget(monkeypatch, tmp_path):
+    """Set the process-wide budget policy for one test, on a fresh ledger"""
+    monkeypatch.setattr(budget, "_ledger", DailyTokenLedger(path=str(tmp_path / "cache.sqlite")))
+    previous = budget.get_budget_policy()
+    yield set_budget_policy
+    set_budget_policy(previous)
+
+
+def test_budgeted_sessions_finish_near_the_budget(fake_workflow, use_budget, monkeypatch):
+    largest_call = 0
+    
+    def track_calls(usage_update):
+        def wrapper(topic, prompt_tokens, completion_tokens):
+            nonlocal largest_call
+            largest_call = max(largest_call, prompt_tokens + completion_tokens)
+            return usage_update(topic, prompt_tokens, completion_tokens)
+        return wrapper
+    
+    monkeypatch.setattr(nodes, "usage_update", track_calls(nodes.usage_update))
+    monkeypatch.setattr(nodes, "session_usage_update", track_calls(nodes.session_usage_update))
+    app = fake_workflow(checkpointer=MemorySaver())
+    replies = []
+    for t in range(3):
+        replies += [f"topic {t}", "ready", "B", "1", "B", "2" if t < 2 else "3"]
+    
+    def run_session(thread_id):
+        session = HealthBotSession(app, thread_id)
+        session.start()
+        for reply in replies:
+            turn = session.respond(reply)
+        assert turn["done"]
+        usage = session.usage()
+        return usage["prompt_tokens"] + usage["completion_tokens"], usage["mode"]
+    
+    use_budget(BudgetPolicy())
+    free, _mode = run_session("budget_free")
+    limit = free // 2
+    use_budget(BudgetPolicy(session_tokens=limit))
+    budgeted = [run_session(f"budget_{i}") for i in range(3)]
+    
+    for tokens, mode in budgeted:
+        assert tokens <= limit + largest_call
+        assert mode != NORMAL
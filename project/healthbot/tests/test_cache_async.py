@@ -0,0 +1,142 @@
+"""
+HealthBot Cache Async Tests
+Checks that TieredCache's async methods keep SQLite work off the event loop,
+so concurrent sessions' cache I/O overlaps with the rest of their work.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+from cache import FRESH, MISS, TOUCH_BATCH, TieredCache
+
+DISK_DELAY = 0.05  # Seconds added to every SQLite call
+
+
+class SlowConnection:
+    """SQLite connection whose every call blocks for a while (a slow disk)"""
+    
+    def __init__(self, conn, delay):
+        self.conn = conn
+        self.delay = delay
+        self.calls = 0
+    
+    def _wait(self):
+        self.calls += 1
+        time.sleep(self.delay)
+    
+    def execute(self, *args):
+        self._wait()
+        return self.conn.execute(*args)
+    
+    def executemany(self, *args):
+        self._wait()
+        return self.conn.executemany(*args)
+    
+    def commit(self):
+        self._wait()
+        return self.conn.commit()
+
+
+@pytest.fixture
+def slow_cache(tmp_path):
+    cache = TieredCache("test_async", path=str(tmp_path / "cache.sqlite"))
+    cache._conn = SlowConnection(cache._conn, DISK_DELAY)
+    return cache
+
+
+async def _with_ticker(work):
+    """Run work while a ticker measures the event loop; returns (result, longest gap)"""
+    gaps = []
+    done = asyncio.Event()
+    
+    async def ticker():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+    
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    try:
+        result = await work
+    finally:
+        done.set()
+        await tick
+    return result, max(gaps)
+
+
+def test_disk_io_leaves_event_loop_free(slow_cache):
+    async def compute(i):
+        return f"value {i}"
+    
+    async def sessions():
+        return await asyncio.gather(*(
+            slow_cache.aget_or_compute(f"key {i}", lambda i=i: compute(i)) for i in range(8)
+        ))
+    
+    values, longest_gap = asyncio.run(_with_ticker(sessions()))
+    
+    assert values == [f"value {i}" for i in range(8)]
+    # Every miss does several slow SQLite calls; run on the loop, each would
+    # stall the ticker for at least DISK_DELAY
+    assert slow_cache._conn.calls >= 8 * 3
+    assert longest_gap < DISK_DELAY
+
+
+def test_disk_io_overlaps_upstream_waits(slow_cache):
+    steps, step = 30, 0.01  # An upstream conversation of many short round trips
+    upstream = steps * step
+    
+    async def cached_session(i):
+        for _ in range(2):
+            await slow_cache.aget_or_compute(f"key {i}", lambda: asyncio.sleep(0, result="cached"))
+    
+    async def upstream_session():
+        for _ in range(steps):
+            await asyncio.sleep(step)
+    
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(cached_session(0), upstream_session(), cached_session(1))
+        return time.perf_counter() - start
+    
+    calls = slow_cache._conn.calls
+    seconds = asyncio.run(run())
+    disk = (slow_cache._conn.calls - calls) * DISK_DELAY
+    
+    assert disk >= upstream
+    # One by one this is disk + upstream; overlapped, the longer of the two
+    assert seconds < disk + upstream * 0.5
+
+
+def test_async_round_trip_and_memory_hits(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    
+    async def write_and_read():
+        cache = TieredCache("test_async", path=path)
+        for i in range(TOUCH_BATCH):
+            await cache.aset(f"topic {i}", {"summary": f"text {i}"}, tag=f"topic {i}")
+        hits = [await cache.alookup(f"topic {i}") for i in range(TOUCH_BATCH)]
+        return cache, hits
+    
+    cache, hits = asyncio.run(write_and_read())
+    assert hits == [({"summary": f"text {i}"}, FRESH) for i in range(TOUCH_BATCH)]
+    assert cache.stats()["memory_hits"] == TOUCH_BATCH
+    # A full batch of memory-hit accesses was written to disk
+    assert cache._touched == {}
+    
+    reopened = TieredCache("test_async", path=path)
+    assert asyncio.run(reopened.aget("topic 0")) == {"summary": "text 0"}
+    assert asyncio.run(reopened.alookup("other")) == (None, MISS)
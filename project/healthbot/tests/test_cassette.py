@@ -0,0 +1,136 @@
+"""
+HealthBot Cassette Tests
+Records sessions on the fakes to a cassette and checks that they replay with
+no network and no misses (at zero latency, at the recorded latency, and
+under every caching strategy), and that unrecorded calls fail at once.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+from cache import get_summary_store
+from cassette import (
+    LLM, SEARCH, RECORD, REPLAY, ORIGINAL, ZERO, Cassette, CassetteMiss, install_cassette,
+)
+from resilience import is_retryable
+from tools import get_search_cache
+from session import HealthBotSession
+
+TOPICS = ["asthma", "diabetes", "asthma", "gout"]
+LLM_LATENCY = 0.1
+SEARCH_LATENCY = 0.04
+
+
+def run_sessions(app, topics=TOPICS):
+    """One topic and quiz per session; returns (seconds, summaries)"""
+    summaries = []
+    start = time.perf_counter()
+    for i, topic in enumerate(topics):
+        session = HealthBotSession(app, f"cassette-{time.monotonic_ns()}-{i}")
+        session.start()
+        for reply in (topic, "ready", "B"):
+            turn = session.respond(reply)
+        summaries.append(turn["state"]["summary"])
+    return time.perf_counter() - start, summaries
+
+
+def use_caches(monkeypatch, search, summary):
+    monkeypatch.setenv("HEALTHBOT_SEARCH_CACHE", search)
+    monkeypatch.setenv("HEALTHBOT_SUMMARY_CACHE", summary)
+    for store in (get_search_cache(), get_summary_store()):
+        if store is not None:
+            store.clear()
+
+
+@pytest.fixture
+def recording(fake_upstreams, no_caches, tmp_path):
+    """
+    Cassette recorded from sessions on the fakes
+    
+    Returns:
+        Tuple (path, stats, seconds, summaries, create_healthbot_workflow)
+    """
+    from workflow import create_healthbot_workflow
+    
+    path = str(tmp_path / "test.cassette.gz")
+    fake_upstreams(llm_latency=LLM_LATENCY, search_latency=SEARCH_LATENCY)
+    cassette = install_cassette(RECORD, path)
+    seconds, summaries = run_sessions(create_healthbot_workflow())
+    cassette.close()
+    return path, dict(cassette.stats), seconds, summaries, create_healthbot_workflow
+
+
+@pytest.mark.parametrize("search, summary", [
+    ("off", "off"), ("on", "off"), ("off", "on"), ("on", "on"),
+])
+def test_zero_latency_replay(recording, monkeypatch, search, summary):
+    path, recorded, seconds, summaries, create_workflow = recording
+    use_caches(monkeypatch, search, summary)
+    
+    replay = install_cassette(REPLAY, path, ZERO)
+    replayed_seconds, replayed = run_sessions(create_workflow())
+    
+    assert replay.stats["misses"] == 0
+    assert replayed == summaries
+    assert replayed_seconds < seconds / 2
+    if (search, summary) == ("off", "off"):
+        assert (replay.stats[LLM], replay.stats[SEARCH]) == (recorded[LLM], recorded[SEARCH])
+    else:
+        # The repeated topic is answered from the cache
+        assert replay.stats[LLM] + replay.stats[SEARCH] < recorded[LLM] + recorded[SEARCH]
+
+
+def test_original_latency_replay(recording):
+    path, recorded, seconds, summaries, create_workflow = recording
+    
+    replay = install_cassette(REPLAY, path, ORIGINAL)
+    replayed_seconds, replayed = run_sessions(create_workflow())
+    
+    assert replay.stats["misses"] == 0
+    assert replayed == summaries
+    assert abs(replayed_seconds - seconds) <= 0.25 * seconds
+
+
+def test_unrecorded_call_is_a_miss(recording):
+    path, _recorded, _seconds, _summaries, create_workflow = recording
+    
+    replay = install_cassette(REPLAY, path, ZERO)
+    session = HealthBotSession(create_workflow(), "cassette-miss")
+    session.start()
+    with pytest.raises(Exception, match="is not on cassette"):
+        session.respond("migraine")
+    
+    assert replay.stats["misses"] == 1
+    assert not is_retryable(CassetteMiss("missing"))
+
+
+def test_repeated_requests_replay_in_order(tmp_path):
+    path = str(tmp_path / "order.cassette.gz")
+    cassette = Cassette(path, RECORD)
+    for n in range(2):
+        cassette.record(SEARCH, "same", {"n": n}, 0.01)
+    cassette.close()
+    
+    replay = Cassette(path, REPLAY)
+    assert [replay.lookup(SEARCH, "same")["response"]["n"] for _ in range(3)] == [0, 1, 1]
+    assert len(replay) == 2
+
+
+def test_unknown_format_is_refused(tmp_path):
+    path = str(tmp_path / "future.cassette.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"cassette": 99}) + "\n")
+    
+    with pytest.raises(ValueError):
+        Cassette(path, REPLAY)
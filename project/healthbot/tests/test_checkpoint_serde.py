@@ -0,0 +1,144 @@
+"""
+HealthBot Checkpoint Serializer Tests
+Checks that everything checkpointing writes during real sessions decodes
+from the CompactSerializer exactly as from the default serializer, that
+compact checkpoints are at least 2x smaller, and that blobs written by the
+default serializer stay readable.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from checkpointer import InstrumentedSerializer, SQLiteCheckpointSaver
+from checkpoint_serde import COMPACT_TYPE, CompactSerializer, create_serializer
+from session import HealthBotSession
+
+SERIALIZERS = {
+    "compact": CompactSerializer(),
+    "no zlib": CompactSerializer(compress=False),
+}
+
+
+class CapturingSerializer(InstrumentedSerializer):
+    """Keeps every object serialized, with its kind"""
+    
+    def __init__(self):
+        super().__init__(keep_records=False)
+        self.captured = []
+    
+    def dumps_typed(self, obj):
+        self.captured.append((self._kind(obj), obj))
+        return super().dumps_typed(obj)
+
+
+@pytest.fixture
+def captured(fake_workflow, monkeypatch):
+    """[(kind, obj)] of everything two sessions checkpoint, with full-length search results"""
+    monkeypatch.setenv("HEALTHBOT_SEARCH_RESULTS", "10")
+    monkeypatch.setenv("HEALTHBOT_SEARCH_DOC_CHARS", "2000")
+    serde = CapturingSerializer()
+    app = fake_workflow(checkpointer=MemorySaver(serde=serde))
+    for i in range(2):
+        session = HealthBotSession(app, f"serde_{i}")
+        session.start()
+        for topic in range(2):
+            session.respond(f"topic {topic}")
+            session.respond("ready")
+            session.respond("B")
+            session.respond("1")  # More questions
+            session.respond("C")
+            session.respond("2" if topic == 0 else "3")
+    return serde.captured
+
+
+@pytest.mark.parametrize("name", SERIALIZERS)
+def test_round_trip_matches_default(captured, name):
+    default, compact = JsonPlusSerializer(), SERIALIZERS[name]
+    
+    for kind, obj in captured:
+        expected = default.loads_typed(default.dumps_typed(obj))
+        blob = compact.dumps_typed(obj)
+        assert compact.loads_typed(blob) == expected, kind
+
+
+def test_compact_checkpoints_are_smaller(captured):
+    default, compact = JsonPlusSerializer(), SERIALIZERS["compact"]
+    checkpoints = [obj for kind, obj in captured if kind == "checkpoint"]
+    
+    default_bytes = sum(len(default.dumps_typed(obj)[1]) for obj in checkpoints)
+    compact_bytes = sum(len(compact.dumps_typed(obj)[1]) for obj in checkpoints)
+    
+    assert checkpoints
+    assert default_bytes >= 2 * compact_bytes
+
+
+@pytest.mark.parametrize("message", [
+    HumanMessage(content="What is asthma?", id="m1"),
+    AIMessage(
+        content="Grade: 0/100",
+        usage_metadata={"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+        response_metadata={"temperature": 0.0},
+    ),
+    SystemMessage(content="x" * 2000, additional_kwargs={"history": {"folded": 0, "topics": []}}),
+])
+def test_message_fields_survive(message):
+    serde = CompactSerializer()
+    decoded = serde.loads_typed(serde.dumps_typed({"messages": [message]}))["messages"][0]
+    
+    assert type(decoded) is type(message)
+    assert decoded == message
+
+
+def test_fallbacks_to_default():
+    serde, default = CompactSerializer(), JsonPlusSerializer()
+    
+    assert serde.dumps_typed(b"raw")[0] != COMPACT_TYPE
+    lone_surrogate = {"text": "bad \ud800 text"}
+    blob = serde.dumps_typed(lone_surrogate)
+    assert blob[0] != COMPACT_TYPE
+    assert serde.loads_typed(blob) == default.loads_typed(default.dumps_typed(lone_surrogate))
+    
+    # Blobs from the default serializer are read as before
+    old = default.dumps_typed({"messages": [AIMessage(content="hi")]})
+    assert serde.loads_typed(old) == {"messages": [AIMessage(content="hi")]}
+
+
+def test_switching_serializers_keeps_sessions(fake_workflow, tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = SQLiteCheckpointSaver(path, compaction_interval=0)
+    session = HealthBotSession(fake_workflow(checkpointer=saver), "switch")
+    session.start()
+    session.respond("asthma")
+    saver.close()
+    
+    saver = SQLiteCheckpointSaver(path, compaction_interval=0, serde=CompactSerializer())
+    try:
+        session = HealthBotSession(fake_workflow(checkpointer=saver), "switch")
+        turn = session.respond("ready")
+        assert turn["state"]["health_topic"] == "asthma"
+        assert turn["state"]["quiz_question"]
+    finally:
+        saver.close()
+
+
+def test_create_serializer(monkeypatch):
+    assert create_serializer() is None
+    assert isinstance(create_serializer("compact"), CompactSerializer)
+    
+    monkeypatch.setenv("HEALTHBOT_CHECKPOINT_SERDE", "compact")
+    monkeypatch.setenv("HEALTHBOT_CHECKPOINT_COMPRESS", "off")
+    assert create_serializer().compress is False
+    
+    with pytest.raises(ValueError):
+        create_serializer("pickle")
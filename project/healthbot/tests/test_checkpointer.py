@@ -0,0 +1,154 @@
+"""
+HealthBot Checkpointer Tests
+Checks that the SQLite checkpointer keeps only the newest checkpoints per
+session (which can still be resumed), evicts idle sessions after their TTL,
+and keeps sessions across restarts.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from checkpointer import SQLiteCheckpointSaver, create_checkpointer
+from session import HealthBotSession
+
+KEEP_LAST = 3
+
+
+@pytest.fixture
+def saver_factory(tmp_path):
+    """Build SQLite savers on one file in tmp_path; all are closed afterwards"""
+    savers = []
+    
+    def make(**options):
+        options.setdefault("keep_last", KEEP_LAST)
+        options.setdefault("compaction_interval", 0)
+        saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.sqlite"), **options)
+        savers.append(saver)
+        return saver
+    
+    yield make
+    for saver in savers:
+        saver.close()
+
+
+def quiz_session(app, thread_id, rounds=3):
+    """Start a session and take `rounds` quizzes; returns the session, left waiting"""
+    session = HealthBotSession(app, thread_id)
+    session.start()
+    session.respond("asthma")
+    session.respond("ready")
+    for _ in range(rounds):
+        session.respond("B")
+        session.respond("1")  # More questions
+    return session
+
+
+def checkpoints(saver, thread_id):
+    return list(saver.list({"configurable": {"thread_id": thread_id}}))
+
+
+def test_keeps_the_newest_checkpoints(fake_workflow, saver_factory):
+    saver = saver_factory()
+    app = fake_workflow(checkpointer=saver)
+    session = quiz_session(app, "retention")
+    
+    stats = saver.stats()
+    assert len(checkpoints(saver, "retention")) == KEEP_LAST
+    assert stats["pruned"] == stats["puts"] - KEEP_LAST
+    assert stats["threads"] == 1
+    
+    # The pruned session still resumes where it paused
+    turn = session.respond("B")
+    assert not turn["done"] and turn["state"]["grade"] is not None
+    assert session.respond("3")["done"]
+
+
+def test_pruned_history_is_smaller_than_memory_saver(fake_workflow, saver_factory):
+    memory = MemorySaver()
+    quiz_session(fake_workflow(checkpointer=memory), "memory")
+    saver = saver_factory()
+    quiz_session(fake_workflow(checkpointer=saver), "sqlite")
+    
+    assert len(checkpoints(memory, "memory")) > len(checkpoints(saver, "sqlite"))
+
+
+def test_idle_threads_are_evicted(fake_workflow, saver_factory):
+    saver = saver_factory(thread_ttl=0.2)
+    app = fake_workflow(checkpointer=saver)
+    quiz_session(app, "idle", rounds=1)
+    time.sleep(0.3)
+    quiz_session(app, "active", rounds=1)
+    
+    result = saver.compact()
+    
+    assert result["evicted_threads"] == 1
+    assert checkpoints(saver, "idle") == []
+    assert HealthBotSession(app, "idle").current_turn()["done"]
+    assert len(checkpoints(saver, "active")) == KEEP_LAST
+    assert saver.stats()["threads"] == 1
+
+
+def test_compaction_applies_a_lower_keep_last(fake_workflow, saver_factory):
+    quiz_session(fake_workflow(checkpointer=saver_factory(keep_last=None)), "grown")
+    saver = saver_factory(keep_last=2)
+    
+    result = saver.compact()
+    
+    assert result["pruned"] > 0
+    assert len(checkpoints(saver, "grown")) == 2
+
+
+def test_sessions_survive_a_restart(fake_workflow, saver_factory):
+    first = saver_factory()
+    quiz_session(fake_workflow(checkpointer=first), "restart", rounds=1)
+    pending = HealthBotSession(fake_workflow(checkpointer=first), "restart").current_turn()
+    first.close()
+    
+    app = fake_workflow(checkpointer=saver_factory())
+    session = HealthBotSession(app, "restart")
+    assert session.current_turn()["prompt"] == pending["prompt"]
+    assert session.respond("B")["state"]["quiz_count"] == pending["state"]["quiz_count"]
+
+
+def test_delete_thread(fake_workflow, saver_factory):
+    saver = saver_factory()
+    quiz_session(fake_workflow(checkpointer=saver), "deleted", rounds=1)
+    
+    saver.delete_thread("deleted")
+    
+    stats = saver.stats()
+    assert (stats["threads"], stats["checkpoints"], stats["writes"]) == (0, 0, 0)
+
+
+def test_keep_last_minimum(tmp_path):
+    with pytest.raises(ValueError):
+        SQLiteCheckpointSaver(str(tmp_path / "checkpoints.sqlite"), keep_last=1)
+
+
+def test_create_checkpointer_from_env(monkeypatch, tmp_path):
+    assert isinstance(create_checkpointer(), MemorySaver)
+    
+    monkeypatch.setenv("HEALTHBOT_CHECKPOINTER", "sqlite")
+    monkeypatch.setenv("HEALTHBOT_CHECKPOINT_PATH", str(tmp_path / "env.sqlite"))
+    monkeypatch.setenv("HEALTHBOT_CHECKPOINT_KEEP_LAST", "4")
+    monkeypatch.setenv("HEALTHBOT_CHECKPOINT_COMPACTION_INTERVAL", "0")
+    saver = create_checkpointer()
+    try:
+        assert isinstance(saver, SQLiteCheckpointSaver)
+        assert saver.keep_last == 4
+        assert saver.path == str(tmp_path / "env.sqlite")
+    finally:
+        saver.close()
+    
+    with pytest.raises(ValueError):
+        create_checkpointer("redis")
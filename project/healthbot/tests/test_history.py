@@ -0,0 +1,124 @@
+"""
+HealthBot Message History Tests
+Checks that the bounded history policy keeps a long session's checkpoints
+flat in size, folds the dropped turns into one summary message, and stays
+out of the way when unbounded.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import history
+from history import HistoryPolicy, SUMMARY_MESSAGE_ID, SUMMARY_MAX_TOPICS, bounded_messages
+from checkpointer import SQLiteCheckpointSaver
+from session import HealthBotSession
+
+TOPICS = 30
+MAX_MESSAGES = 40
+
+
+@pytest.fixture
+def use_policy():
+    """Set the process-wide history policy for one test"""
+    previous = history.get_history_policy()
+    yield history.set_history_policy
+    history.set_history_policy(previous)
+
+
+def run_topics(app, saver, topics=TOPICS):
+    """One session over many topics; returns per-topic (checkpoint bytes, messages)"""
+    session = HealthBotSession(app, "history")
+    samples = []
+    session.start()
+    for i in range(topics):
+        session.respond(f"topic {i}")
+        session.respond("ready")
+        session.respond("B")
+        turn = session.respond("2" if i < topics - 1 else "3")
+        
+        saved = saver.get_tuple(session.config)
+        _, blob = saver.serde.dumps_typed(saved.checkpoint)
+        samples.append((len(blob), turn["state"]["messages"]))
+    return samples
+
+
+def topic_turn(topic, grade):
+    return [
+        HumanMessage(content=f"I want to learn about: {topic}"),
+        AIMessage(content=f"Grade: {grade}/100\n\nWell done."),
+    ]
+
+
+def test_bounded_checkpoints_stay_flat(fake_workflow, use_policy):
+    use_policy(HistoryPolicy(max_messages=MAX_MESSAGES))
+    saver = SQLiteCheckpointSaver(":memory:", keep_last=2, compaction_interval=0)
+    try:
+        samples = run_topics(fake_workflow(checkpointer=saver), saver)
+    finally:
+        saver.close()
+    
+    # Once the message bound and the summary's topic cap are both reached,
+    # size stays flat (the last topic ends the session, so compare the one
+    # before it)
+    sizes = [size for size, _ in samples]
+    assert sizes[-2] <= sizes[TOPICS // 2] * 1.10
+    for _, messages in samples:
+        assert len(messages) <= MAX_MESSAGES + 1
+    messages = samples[-1][1]
+    assert messages[0].id == SUMMARY_MESSAGE_ID
+    topics = [topic for topic, _grades in messages[0].additional_kwargs["history"]["topics"]]
+    assert len(topics) == SUMMARY_MAX_TOPICS and "topic 0" not in topics
+
+
+def test_unbounded_history_keeps_everything(fake_workflow, use_policy):
+    use_policy(HistoryPolicy())
+    saver = SQLiteCheckpointSaver(":memory:", keep_last=2, compaction_interval=0)
+    try:
+        samples = run_topics(fake_workflow(checkpointer=saver), saver, topics=5)
+    finally:
+        saver.close()
+    
+    counts = [len(messages) for _, messages in samples]
+    assert counts == sorted(counts) and counts[0] < counts[-1]
+    assert all(m.id != SUMMARY_MESSAGE_ID for m in samples[-1][1])
+
+
+def test_fold_keeps_topics_and_grades(use_policy):
+    use_policy(HistoryPolicy(max_messages=2))
+    messages = []
+    for i in range(3):
+        messages = bounded_messages(messages, topic_turn(f"topic {i}", 50 + i))
+    
+    summary, *kept = messages
+    assert [m.content for m in kept] == [m.content for m in topic_turn("topic 2", 52)]
+    assert summary.additional_kwargs["history"] == {
+        "folded": 4, "topics": [["topic 0", [50]], ["topic 1", [51]]],
+    }
+    assert "- Learned about topic 1 - quiz grades: 51" in summary.content
+
+
+def test_fold_caps_the_topics_listed(use_policy):
+    use_policy(HistoryPolicy(max_messages=2))
+    messages = []
+    for i in range(SUMMARY_MAX_TOPICS + 5):
+        messages = bounded_messages(messages, topic_turn(f"topic {i}", 100))
+    
+    topics = messages[0].additional_kwargs["history"]["topics"]
+    assert len(topics) == SUMMARY_MAX_TOPICS
+    assert topics[-1][0] == f"topic {SUMMARY_MAX_TOPICS + 3}"
+
+
+def test_token_bound_without_fold(use_policy):
+    use_policy(HistoryPolicy(max_tokens=20, fold=False))
+    messages = bounded_messages([], [HumanMessage(content="x" * 200), AIMessage(content="short")])
+    
+    assert [m.content for m in messages] == ["short"]
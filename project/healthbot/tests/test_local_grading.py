@@ -0,0 +1,100 @@
+"""
+HealthBot Local Grading Tests
+Checks that multiple-choice answers are graded against the quiz answer key
+without the LLM (in well under a millisecond), and that free-text answers
+and answers to open questions still go to the LLM grader.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+from fakes import fake_completion
+from nodes import evaluate_answer, build_quiz_bank_prompt, parse_quiz_bank, parse_choice
+
+TOPIC = "diabetes"
+SUMMARY = fake_completion(f"Health Topic: {TOPIC}\nsummarize")
+QUESTIONS = 50
+
+
+def quiz_bank():
+    return parse_quiz_bank(fake_completion(build_quiz_bank_prompt(TOPIC, SUMMARY, count=QUESTIONS)))
+
+
+@pytest.fixture(scope="module")
+def bank():
+    """Multiple-choice questions with their answer keys"""
+    return [item for item in quiz_bank() if item["answer_key"]]
+
+
+def answer_state(item, answer):
+    """evaluate_answer input: quiz with answer key plus a patient answer"""
+    return {
+        "health_topic": TOPIC,
+        "summary": SUMMARY,
+        "quiz_question": item["question"],
+        "quiz_answer_key": item["answer_key"],
+        "patient_answer": answer,
+        "token_usage": {},
+    }
+
+
+@pytest.mark.parametrize("answer, choice", [
+    ("A", "A"), ("b", "B"), ("(C)", "C"), ("D)", "D"), ("E", None),
+    ("Eating well and taking medicine as prescribed", None),
+])
+def test_parse_choice(bank, answer, choice):
+    assert parse_choice(answer, bank[0]["answer_key"]) == choice
+
+
+def test_choice_matches_option_text(bank):
+    answer_key = bank[0]["answer_key"]
+    for letter, option in answer_key["options"].items():
+        assert parse_choice(option.upper(), answer_key) == letter
+        assert parse_choice(f"{letter}) {option}", answer_key) == letter
+
+
+def test_multiple_choice_is_graded_locally(fake_upstreams, bank):
+    fake_upstreams(llm_latency=1.0)  # An LLM call would be obvious
+    
+    timings = []
+    for i, item in enumerate(bank):
+        answer_key = item["answer_key"]
+        wrong = next(letter for letter in answer_key["options"] if letter != answer_key["answer"])
+        picked = answer_key["answer"] if i % 2 else wrong
+        start = time.perf_counter()
+        update = evaluate_answer(answer_state(item, picked.lower()))
+        timings.append(time.perf_counter() - start)
+        
+        assert update["token_usage"] == {"grades": 1, "local_grades": 1}
+        assert update["grade"] == (100 if picked == answer_key["answer"] else 0)
+        assert answer_key["options"][answer_key["answer"]] in update["feedback"]
+    
+    assert sum(timings) / len(timings) < 0.001
+
+
+def test_free_text_goes_to_the_llm(fake_upstreams, bank):
+    fake_upstreams()
+    update = evaluate_answer(answer_state(bank[0], "Eating well and taking medicine as prescribed"))
+    
+    assert update["token_usage"]["local_grades"] == 0
+    assert update["token_usage"]["calls"] == 1
+    assert 0 <= update["grade"] <= 100
+
+
+def test_open_questions_go_to_the_llm(fake_upstreams):
+    fake_upstreams()
+    open_questions = [item for item in quiz_bank() if item["answer_key"] is None]
+    assert open_questions
+    update = evaluate_answer(answer_state(open_questions[0], "B"))
+    
+    assert update["token_usage"]["local_grades"] == 0
+    assert update["token_usage"]["calls"] == 1
@@ -0,0 +1,119 @@
+"""
+HealthBot Map-Reduce Tests
+Checks that map-reduce keeps summarize latency flat and every prompt within
+the context limit as the search results grow, and that the reduce prompt
+fits its token budget even when the collapse rounds cannot shrink the fact
+lists enough.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import llm_config
+from budget import estimate_text_tokens
+from fakes import FakeHealthChatModel, fake_search_response, _prompt_text
+from map_reduce import MAX_COLLAPSE_ROUNDS, MAP_REDUCE, fit_notes, map_reduce_summarize
+from nodes import summarize_results, asummarize_results
+from tools import format_search_results
+
+REDUCE_TOKENS = 500
+CONTEXT_TOKENS = 8000  # Model context limit the prompts must fit
+
+
+class RecordingChatModel(FakeHealthChatModel):
+    """Fake chat model, slower for longer prompts, that records every prompt's size"""
+    
+    prompt_tokens: list = []
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompt_tokens.append(estimate_text_tokens(_prompt_text(messages)))
+        return super()._generate(messages, stop, run_manager, **kwargs)
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompt_tokens.append(estimate_text_tokens(_prompt_text(messages)))
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+class WordyChatModel(FakeHealthChatModel):
+    """Fact lists that never get shorter: every map or collapse call returns 300 tokens"""
+    
+    prompts: list = []
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = _prompt_text(messages)
+        self.prompts.append(prompt)
+        if prompt.rstrip().endswith("Facts:"):
+            text = "\n".join(f"- Fact {i} about asthma [1]" for i in range(50))
+            return self._result(text[: 300 * 4], prompt)
+        return self._result("Asthma summary [1]", prompt)
+    
+    def _result(self, text, prompt):
+        return ChatResult(generations=[ChatGeneration(message=self._message(text, prompt))])
+
+
+def search_results(count):
+    """Formatted results for count full-length pages"""
+    return format_search_results(fake_search_response("asthma", count, include_raw_content=True), doc_chars=4000)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_latency_stays_flat_and_prompts_fit(fake_upstreams, no_caches, monkeypatch, use_async):
+    monkeypatch.setenv("HEALTHBOT_SUMMARY_MODE", MAP_REDUCE)
+    fake_upstreams()
+    llm = RecordingChatModel(latency=0.05, token_latency=0.00002, prompt_tokens=[])
+    registry = llm_config.get_llm_registry()
+    for profile in list(registry.profiles):
+        registry.register(profile, llm)
+    
+    seconds = {}
+    for count in (5, 50):
+        state = {"health_topic": "asthma", "search_results": search_results(count), "messages": []}
+        start = time.perf_counter()
+        update = asyncio.run(asummarize_results(state)) if use_async else summarize_results(state)
+        seconds[count] = time.perf_counter() - start
+        assert "excerpts straight from the sources" not in update["summary"]
+    
+    # Ten times the sources: more map calls in parallel, not longer ones
+    assert seconds[50] < seconds[5] * 1.5
+    assert max(llm.prompt_tokens) <= CONTEXT_TOKENS
+
+
+def test_fit_notes_keeps_top_ranked_whole_bullets():
+    notes = ["- a [1]\n- b [1]", "- c [2]\n- d [2]", "- e [3]"]
+    assert fit_notes(notes, max_tokens=100) == notes
+    # 22 characters: the first list, then as much of the second as fits in whole bullets
+    assert fit_notes(notes, max_tokens=6) == ["- a [1]\n- b [1]", "- c [2]"]
+    assert fit_notes(notes, max_tokens=4) == ["- a [1]\n- b [1]"]
+    # Not even one whole bullet fits: the first list is cut mid-bullet
+    assert fit_notes(notes, max_tokens=1) == ["- a "]
+
+
+def test_reduce_prompt_fits_after_collapse_rounds(monkeypatch):
+    monkeypatch.setenv("HEALTHBOT_RESILIENCE", "off")
+    monkeypatch.setenv("HEALTHBOT_REDUCE_MAX_TOKENS", str(REDUCE_TOKENS))
+    monkeypatch.setenv("HEALTHBOT_MAP_CHUNK_TOKENS", "1000")
+    llm = WordyChatModel(prompts=[])
+    results = format_search_results(fake_search_response("asthma", 20, include_raw_content=True), doc_chars=4000)
+    
+    response, calls = map_reduce_summarize(llm, "asthma", results)
+    
+    collapses = [p for p in llm.prompts if "Fact lists:" in p]
+    reduce_prompt = llm.prompts[-1]
+    assert response.content == "Asthma summary [1]"
+    # Every collapse round ran and left the notes too large
+    assert len(collapses) >= MAX_COLLAPSE_ROUNDS
+    notes = reduce_prompt.split("(source numbers in brackets):\n", 1)[1].split("\n\nSources:\n", 1)[0]
+    assert estimate_text_tokens(notes) <= REDUCE_TOKENS
+    assert notes.startswith("- Fact 0 about asthma [1]")
+    assert len(calls) == len(llm.prompts)
@@ -0,0 +1,77 @@
+"""
+HealthBot Quiz Bank Tests
+Checks that a bank of questions per LLM call saves quiz calls over one
+question per call, that no session is asked the same question twice, and
+that reworded repeats are recognized.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+import nodes
+from nodes import is_near_duplicate
+from session import HealthBotSession
+
+QUESTIONS = 8  # Questions asked per session
+
+
+def ask_questions(app, thread_id, questions=QUESTIONS):
+    """
+    Ask `questions` questions on one topic
+    
+    Returns:
+        Tuple (questions asked, quiz LLM calls)
+    """
+    session = HealthBotSession(app, thread_id)
+    session.start()
+    session.respond("diabetes")
+    session.respond("ready")
+    for _ in range(questions - 1):
+        session.respond("B")
+        session.respond("1")  # More questions
+    turn = session.respond("B")
+    usage = session.usage()
+    # All but the summary and the LLM-graded answers to open questions
+    calls = usage["calls"] - 1 - (usage["grades"] - usage["local_grades"])
+    session.respond("3")
+    return turn["state"]["asked_questions"], calls
+
+
+@pytest.mark.parametrize("bank_size", [1, 5])
+def test_no_question_is_repeated(fake_workflow, monkeypatch, bank_size):
+    monkeypatch.setattr(nodes, "QUIZ_BANK_SIZE", bank_size)
+    app = fake_workflow(checkpointer=MemorySaver())
+    
+    asked, _calls = ask_questions(app, f"bank_repeats_{bank_size}")
+    
+    assert len(asked) == QUESTIONS
+    assert not any(is_near_duplicate(question, asked[:n]) for n, question in enumerate(asked))
+
+
+def test_bank_saves_quiz_calls(fake_workflow, monkeypatch):
+    app = fake_workflow(checkpointer=MemorySaver())
+    
+    monkeypatch.setattr(nodes, "QUIZ_BANK_SIZE", 1)
+    _asked, single = ask_questions(app, "bank_single")
+    monkeypatch.setattr(nodes, "QUIZ_BANK_SIZE", 5)
+    _asked, banked = ask_questions(app, "bank_banked")
+    
+    assert single == QUESTIONS
+    assert banked < single
+
+
+def test_reworded_question_is_a_repeat():
+    asked = ["Which of these is a common symptom of diabetes?"]
+    
+    assert is_near_duplicate("What is a common symptom of diabetes?", asked)
+    assert not is_near_duplicate("Which food choice helps prevent diabetes?", asked)
+    assert not is_near_duplicate("What is a common symptom of diabetes?", [])
@@ -0,0 +1,255 @@
+"""
+HealthBot Resilience Tests
+Checks the upstream wrapper: retries and backoff, hedged requests, the
+circuit breaker state machine (including probes cancelled while half-open),
+that abandoned attempts do not hold up later calls, and that a session
+still finishes while both upstreams are down.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+import tools
+import resilience
+from session import HealthBotSession
+from workflow import create_healthbot_workflow
+from resilience import (
+    HEDGE_MIN_SAMPLES,
+    CircuitBreaker,
+    CircuitOpenError,
+    Upstream,
+    UpstreamUnavailable,
+    CLOSED,
+    OPEN,
+    HALF_OPEN,
+)
+
+RESET = 0.05  # Seconds the test circuits stay open
+
+
+def dead_upstream():
+    """An upstream whose circuit opened after one failed call"""
+    upstream = Upstream("test", retries=0, backoff=0.0, failure_threshold=1, reset_timeout=RESET)
+    
+    def fail():
+        raise ConnectionError("down")
+    
+    with pytest.raises(Exception):
+        upstream.call(fail)
+    assert upstream.breaker.state == OPEN
+    return upstream
+
+
+def test_cancelled_half_open_probe_releases_the_circuit():
+    upstream = dead_upstream()
+    time.sleep(RESET)
+    
+    async def hang():
+        await asyncio.sleep(10)
+    
+    async def ok():
+        return "ok"
+    
+    async def run():
+        probe = asyncio.create_task(upstream.acall(hang))
+        await asyncio.sleep(0.01)
+        assert upstream.breaker.state == HALF_OPEN
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # The probe was given back: the next call probes and closes the circuit
+        assert upstream.breaker.state == OPEN
+        return await upstream.acall(ok)
+    
+    assert asyncio.run(run()) == "ok"
+    assert upstream.breaker.state == CLOSED
+
+
+def test_open_circuit_refuses_until_reset():
+    upstream = dead_upstream()
+    with pytest.raises(CircuitOpenError):
+        upstream.call(lambda: "ok")
+    assert upstream.call(lambda: "ok", fallback=lambda error: "cached") == "cached"
+    
+    time.sleep(RESET)
+    assert upstream.call(lambda: "ok") == "ok"
+    assert upstream.breaker.state == CLOSED
+    assert upstream.stats()["short_circuits"] == 2
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def failing(errors, result="ok"):
+    """Callable raising the given errors in turn, then returning result"""
+    errors = list(errors)
+    calls = []
+    
+    def call():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+    call.calls = calls
+    return call
+
+
+def test_transient_errors_are_retried():
+    upstream = Upstream("test", retries=2, backoff=0.0)
+    call = failing([ConnectionError("reset"), HTTPError(503)])
+    assert upstream.call(call) == "ok"
+    assert len(call.calls) == 3
+    
+    call = failing([TimeoutError("slow"), HTTPError(429), ConnectionError("reset")])
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(call)
+    assert len(call.calls) == 3
+    
+    stats = upstream.stats()
+    assert (stats["successes"], stats["failures"], stats["retries"], stats["timeouts"]) == (1, 1, 4, 1)
+
+
+def test_bad_requests_are_not_retried():
+    upstream = Upstream("test", retries=2, backoff=0.0, failure_threshold=1)
+    for error in (HTTPError(400), ValueError("bad prompt")):
+        call = failing([error])
+        with pytest.raises(type(error)):
+            upstream.call(call)
+        assert len(call.calls) == 1
+    # The upstream answered: the circuit stays closed
+    assert upstream.breaker.state == CLOSED
+    assert upstream.stats()["errors"] == 2
+
+
+def test_backoff_is_full_jitter_exponential_and_capped(monkeypatch):
+    upstream = Upstream("test", retries=3, backoff=0.1, max_backoff=0.3)
+    random.seed(0)
+    for retry in range(1, 8):
+        for _ in range(50):
+            assert 0 <= upstream.backoff_delay(retry) <= min(0.3, 0.1 * 2 ** (retry - 1))
+    
+    sleeps = []
+    monkeypatch.setattr(resilience.time, "sleep", sleeps.append)
+    monkeypatch.setattr(upstream, "backoff_delay", lambda retry: retry / 10)
+    upstream.call(failing([ConnectionError()] * 3))
+    assert sleeps == [0.1, 0.2, 0.3]
+
+
+def test_breaker_state_machine():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=RESET)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED  # Not two failures in a row
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opens == 1
+    assert not breaker.allow()
+    
+    time.sleep(RESET)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # One probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opens == 2
+    assert not breaker.allow()
+    
+    time.sleep(RESET)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0 and breaker.allow()
+
+
+def test_slow_attempt_is_hedged():
+    upstream = Upstream("test", timeout=2.0, retries=0, hedge_percentile=0.9)
+    for _ in range(HEDGE_MIN_SAMPLES):
+        upstream._observe(0.01)
+    release = threading.Event()
+    calls = []
+    
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)  # The first request hangs
+            return "slow"
+        return "fast"
+    
+    start = time.perf_counter()
+    assert upstream.call(call) == "fast"
+    assert time.perf_counter() - start < 0.5
+    stats = upstream.stats()
+    assert (stats["hedges"], stats["hedge_wins"], stats["abandoned"], stats["running_abandoned"]) == (1, 1, 1, 1)
+    
+    release.set()
+    time.sleep(0.05)
+    assert upstream.stats()["running_abandoned"] == 0
+
+
+def test_abandoned_attempts_do_not_block_later_calls():
+    upstream = Upstream("test", timeout=0.05, retries=0, failure_threshold=10 ** 6)
+    release = threading.Event()
+    hung = 48  # More than any fixed worker pool the upstream could have
+    
+    def hang():
+        release.wait(5)
+    
+    with ThreadPoolExecutor(hung) as pool:
+        outcomes = list(pool.map(lambda i: upstream.call(hang, fallback=lambda error: "timed out"), range(hung)))
+    assert outcomes == ["timed out"] * hung
+    assert upstream.stats()["running_abandoned"] == hung
+    
+    # A healthy call still gets a thread at once
+    start = time.perf_counter()
+    assert upstream.call(lambda: "ok") == "ok"
+    assert time.perf_counter() - start < 0.05
+    
+    release.set()
+    time.sleep(0.05)
+    stats = upstream.stats()
+    assert (stats["timeouts"], stats["abandoned"], stats["running_abandoned"]) == (hung, hung, 0)
+
+
+def test_session_finishes_with_both_upstreams_down(fake_upstreams, no_caches, upstream_settings,
+                                                   monkeypatch, tmp_path):
+    # Search results expire at once: only the last value can serve them
+    monkeypatch.setenv("HEALTHBOT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("HEALTHBOT_SEARCH_CACHE", "on")
+    monkeypatch.setenv("HEALTHBOT_SEARCH_CACHE_TTL", "0")
+    monkeypatch.setenv("HEALTHBOT_SEARCH_CACHE_STALE_TTL", "0")
+    monkeypatch.setattr(tools, "_search_cache", None)
+    upstream_settings(retry_backoff=0.001)
+    fakes = fake_upstreams()
+    app = create_healthbot_workflow()
+    
+    def run_session(thread_id):
+        session = HealthBotSession(app, thread_id)
+        session.start()
+        for reply in ("asthma", "ready", "B"):
+            turn = session.respond(reply)
+        return turn["state"]
+    
+    healthy = run_session("resilience_up")
+    fakes["llm"].failure_rate = 1.0
+    fakes["search"].failure_rate = 1.0
+    down = run_session("resilience_down")
+    
+    assert down["search_results"] == healthy["search_results"]
+    assert "excerpts straight from the sources" in down["summary"]
+    assert down["quiz_question"]
+    assert down["grade"] is not None
+    assert resilience.upstream_stats()["llm"]["fallbacks"] > 0
@@ -0,0 +1,84 @@
+"""
+HealthBot Search Client Tests
+Runs the pooled Tavily clients against a local HTTP stand-in: 100+
+concurrent searches all succeed on reused keep-alive connections, error
+statuses surface as SearchHTTPError, and the async client lets go of the
+sessions of closed event loops.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+from search_client import TavilySearchClient, AsyncTavilySearchClient, SearchHTTPError
+
+CONCURRENCY = 100
+SEARCHES = 400  # Several searches per connection
+
+
+def test_sync_client_reuses_connections_at_100_concurrent(stand_in):
+    client = TavilySearchClient("test-key", url=stand_in.url)
+    try:
+        with ThreadPoolExecutor(CONCURRENCY) as pool:
+            responses = list(pool.map(lambda i: client.search(f"topic {i}", max_results=3), range(SEARCHES)))
+    finally:
+        client.close()
+    
+    assert [r["query"] for r in responses] == [f"topic {i}" for i in range(SEARCHES)]
+    assert all(len(r["results"]) == 3 for r in responses)
+    stats = client.stats()
+    assert stats["requests"] == stand_in.requests == SEARCHES
+    assert stats["connections_opened"] == stand_in.connections <= CONCURRENCY
+    assert stats["connection_reuse_rate"] > 0
+
+
+def test_async_client_reuses_connections_at_100_concurrent(stand_in):
+    client = AsyncTavilySearchClient("test-key", url=stand_in.url, max_connections=CONCURRENCY)
+    
+    async def run():
+        return await asyncio.gather(*(client.search(f"topic {i}", max_results=3) for i in range(SEARCHES)))
+    
+    responses = asyncio.run(run())
+    
+    assert [r["query"] for r in responses] == [f"topic {i}" for i in range(SEARCHES)]
+    stats = client.stats()
+    assert stats["requests"] == stand_in.requests == SEARCHES
+    assert stand_in.connections <= CONCURRENCY
+    assert stats["connection_reuse_rate"] > 0
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_error_status_raises_search_http_error(stand_in, status):
+    stand_in.set_status(status)
+    client = TavilySearchClient("test-key", url=stand_in.url)
+    async_client = AsyncTavilySearchClient("test-key", url=stand_in.url)
+    
+    with pytest.raises(SearchHTTPError) as error:
+        client.search("asthma")
+    assert error.value.status_code == status
+    client.close()
+    
+    with pytest.raises(SearchHTTPError) as error:
+        asyncio.run(async_client.search("asthma"))
+    assert error.value.status_code == status
+
+
+def test_async_sessions_are_dropped_with_their_loops(stand_in):
+    client = AsyncTavilySearchClient("test-key", url=stand_in.url)
+    asyncio.run(client.search("asthma"))
+    assert client._sessions == {}  # Closed by asyncio.run
+    
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(client.search("asthma"))
+    loop.close()  # Without shutdown_asyncgens()
+    asyncio.run(client.search("asthma"))
+    assert loop not in client._sessions
@@ -0,0 +1,133 @@
+"""
+HealthBot Search Fan-out Tests
+Checks URL de-duplication and reciprocal rank fusion of aspect searches,
+that a fan-out finds more pages than one query, that concurrent fan-outs
+(sync and async) each take about the time of one search, and that fan-outs
+keeping different numbers of merged results are cached apart.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import tools
+from tools import (
+    RRF_K,
+    merge_search_results,
+    search_cache_key,
+    search_medical_information,
+    asearch_medical_information,
+    set_search_clients,
+)
+
+LATENCY = 0.1  # Seconds per search API call
+
+
+def result(url, score=0.5, content="text"):
+    return {"title": url, "url": url, "content": content, "score": score}
+
+
+def test_merge_removes_duplicate_urls():
+    responses = [
+        {"results": [result("https://www.example.org/asthma/"), result("https://example.org/a")]},
+        {"results": [result("http://example.org/asthma#causes"), result("https://example.org/a?page=2")]},
+    ]
+    urls = [r["url"] for r in merge_search_results(responses)["results"]]
+    
+    # Scheme, www., fragment and trailing slash are ignored; queries are not
+    assert urls == ["https://www.example.org/asthma/", "https://example.org/a", "https://example.org/a?page=2"]
+
+
+def test_merge_ranks_by_reciprocal_rank_fusion():
+    shared = result("https://example.org/shared", score=0.1)
+    responses = [
+        {"results": [result("https://example.org/one", score=0.9), dict(shared)]},
+        {"results": [result("https://example.org/two", score=0.8), dict(shared, content="a longer copy")]},
+    ]
+    merged = merge_search_results(responses)["results"]
+    
+    # Found by both queries (2 / (RRF_K + 2)) beats a single top hit (1 / (RRF_K + 1))
+    assert 2 / (RRF_K + 2) > 1 / (RRF_K + 1)
+    assert [r["url"] for r in merged] == [
+        "https://example.org/shared", "https://example.org/one", "https://example.org/two",
+    ]
+    # The fullest copy of a page is kept
+    assert merged[0]["content"] == "a longer copy"
+    assert len(merge_search_results(responses, max_results=2)["results"]) == 2
+
+
+def overlapping_response(query):
+    """One page every query finds, plus one page for the query itself"""
+    slug = query.replace(" ", "-")
+    return {"results": [result("https://example.org/overview"), result(f"https://example.org/{slug}")]}
+
+
+class SlowSearchClient:
+    def search(self, query, max_results=5, **kwargs):
+        time.sleep(LATENCY)
+        return overlapping_response(query)
+
+
+class AsyncSlowSearchClient:
+    async def search(self, query, max_results=5, **kwargs):
+        await asyncio.sleep(LATENCY)
+        return overlapping_response(query)
+
+
+def use_fanout(monkeypatch):
+    monkeypatch.setenv("HEALTHBOT_SEARCH_CACHE", "off")
+    monkeypatch.setenv("HEALTHBOT_RESILIENCE", "off")
+    monkeypatch.setenv("HEALTHBOT_SEARCH_FANOUT_WORKERS", str(len(tools.SEARCH_ASPECTS)))
+
+
+def pages(output):
+    return output.count("   Source: ")
+
+
+def test_concurrent_sync_fanouts_take_one_search_each(monkeypatch):
+    use_fanout(monkeypatch)
+    set_search_clients(SlowSearchClient(), None)
+    sessions = 8
+    try:
+        with ThreadPoolExecutor(sessions) as pool:
+            start = time.perf_counter()
+            outputs = list(pool.map(lambda i: search_medical_information(f"topic {i}", fanout=True), range(sessions)))
+            seconds = time.perf_counter() - start
+    finally:
+        set_search_clients()
+    
+    # Overview page once, plus one page per aspect
+    assert all(pages(output) == 1 + len(tools.SEARCH_ASPECTS) for output in outputs)
+    assert seconds < LATENCY * 2.5
+
+
+def test_async_fanout_takes_one_search(monkeypatch):
+    use_fanout(monkeypatch)
+    set_search_clients(None, AsyncSlowSearchClient())
+    try:
+        single = asyncio.run(asearch_medical_information("asthma", fanout=False))
+        start = time.perf_counter()
+        output = asyncio.run(asearch_medical_information("asthma", fanout=True))
+        seconds = time.perf_counter() - start
+    finally:
+        set_search_clients()
+    
+    assert pages(output) > pages(single)
+    assert seconds < LATENCY * 1.5
+
+
+def test_merged_result_count_is_in_the_cache_key(monkeypatch):
+    monkeypatch.setenv("HEALTHBOT_SEARCH_FANOUT_RESULTS", "10")
+    ten = search_cache_key("asthma", 5, fanout=True)
+    monkeypatch.setenv("HEALTHBOT_SEARCH_FANOUT_RESULTS", "20")
+    
+    assert search_cache_key("asthma", 5, fanout=True) != ten
+    assert search_cache_key("asthma", 5) == "asthma|5"
@@ -0,0 +1,159 @@
+"""
+HealthBot Server Tests
+Drives patient sessions through the HTTP and WebSocket front end on the
+fakes: whole sessions, resuming, streamed tokens, request errors, and many
+sessions at once on one server.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import asyncio
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from server import create_server_app
+
+# Patient replies after the welcome turn: topic, ready, answer, more,
+# answer, exit
+REPLIES = ["diabetes", "ready", "B", "1", "C", "3"]
+SESSIONS = 25
+
+
+@pytest.fixture
+def serve(fake_workflow):
+    """
+    Run a scenario against a server on the async workflow: serve(scenario)
+    calls `await scenario(client)` with an aiohttp TestClient
+    """
+    graph = fake_workflow(async_mode=True)
+    
+    def run(scenario):
+        async def main():
+            async with TestClient(TestServer(create_server_app(graph))) as client:
+                return await scenario(client)
+        return asyncio.run(main())
+    
+    return run
+
+
+async def http_session(client, thread_id):
+    """One scripted session over HTTP; returns every turn"""
+    resp = await client.post("/sessions", json={"thread_id": thread_id})
+    assert resp.status == 201
+    turns = [await resp.json()]
+    for answer in REPLIES:
+        resp = await client.post(f"/sessions/{thread_id}/reply", json={"answer": answer})
+        assert resp.status == 200
+        turns.append(await resp.json())
+    return turns
+
+
+def test_http_session(serve):
+    async def scenario(client):
+        turns = await http_session(client, "http-1")
+        resp = await client.get("/sessions/http-1/usage")
+        return turns, resp.status, await resp.json()
+    
+    turns, usage_status, usage = serve(scenario)
+    
+    assert [turn["done"] for turn in turns] == [False] * len(REPLIES) + [True]
+    assert all(turn["prompt"] for turn in turns[:-1])
+    assert turns[-1]["health_topic"] == "diabetes"
+    assert turns[-1]["quiz_count"] == 2
+    assert turns[-1]["grade"] is not None
+    for turn in turns:
+        assert set(turn) == {"thread_id", "done", "display", "prompt", "health_topic", "quiz_count", "grade"}
+    assert usage_status == 200 and usage["calls"] > 0
+
+
+def test_sessions_resume(serve):
+    async def scenario(client):
+        first = await (await client.post("/sessions", json={"thread_id": "resume-1"})).json()
+        await client.post("/sessions/resume-1/reply", json={"answer": "asthma"})
+        again = await client.post("/sessions", json={"thread_id": "resume-1"})
+        pending = await client.get("/sessions/resume-1")
+        return first, again.status, await again.json(), await pending.json()
+    
+    first, status, again, pending = serve(scenario)
+    
+    assert status == 200
+    assert again == pending
+    assert again["health_topic"] == "asthma"
+    assert again["prompt"] != first["prompt"]
+
+
+def test_new_session_gets_an_id(serve):
+    async def scenario(client):
+        resp = await client.post("/sessions")
+        return resp.status, await resp.json()
+    
+    status, turn = serve(scenario)
+    
+    assert status == 201
+    assert turn["thread_id"] and not turn["done"]
+
+
+def test_request_errors(serve):
+    async def scenario(client):
+        await http_session(client, "errors-1")
+        return [
+            (await client.post("/sessions/errors-1/reply", json={"answer": "1"})).status,
+            (await client.post("/sessions/unknown/reply", json={"answer": "1"})).status,
+            (await client.get("/sessions/unknown")).status,
+            (await client.get("/sessions/unknown/usage")).status,
+            (await client.post("/sessions", json={"thread_id": "bad id!"})).status,
+            (await client.post("/sessions/errors-1/reply", data="not json")).status,
+            (await client.post("/sessions/errors-1/reply", json={"answer": 3})).status,
+            (await client.get("/health")).status,
+        ]
+    
+    assert serve(scenario) == [409, 404, 404, 404, 400, 400, 400, 200]
+
+
+def test_websocket_session(serve):
+    async def scenario(client):
+        turns, tokens = [], {}
+        async with client.ws_connect("/sessions/ws-1/ws") as ws:
+            async def next_turn():
+                while True:
+                    message = await ws.receive_json()
+                    if message["type"] == "token":
+                        tokens[message["node"]] = tokens.get(message["node"], "") + message["text"]
+                    elif message["type"] == "turn":
+                        return message
+            
+            turns.append(await next_turn())
+            await ws.send_json({"wrong": "field"})
+            error = await ws.receive_json()
+            for answer in REPLIES:
+                await ws.send_json({"answer": answer})
+                turns.append(await next_turn())
+        return turns, tokens, error
+    
+    turns, tokens, error = serve(scenario)
+    
+    assert error["type"] == "error"
+    assert [turn["done"] for turn in turns] == [False] * len(REPLIES) + [True]
+    assert turns[-1]["grade"] is not None
+    assert tokens  # Summary, quiz and feedback text streamed before their turns
+
+
+def test_concurrent_sessions_complete(fake_upstreams, serve):
+    fake_upstreams(llm_latency=0.05, search_latency=0.05)
+    
+    async def scenario(client):
+        return await asyncio.gather(*(
+            http_session(client, f"load-{i}") for i in range(SESSIONS)
+        ))
+    
+    results = serve(scenario)
+    
+    assert len(results) == SESSIONS
+    assert all(turns[-1]["done"] for turns in results)
@@ -0,0 +1,181 @@
+"""
+HealthBot Speculation Tests
+Checks that a speculative quiz result is used for a matching prompt, thrown
+away for another prompt or after discard(), and waited for (not generated
+twice) when it outlasts the LLM timeout through a retry, and that whole
+sessions wait less for their quiz with speculation on.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import speculation
+from speculation import QuizSpeculator
+from session import HealthBotSession
+
+LATENCY = 0.05
+
+
+class ScriptedLLM:
+    """Chat model stand-in: sleeps, then fails for the first `failures` calls"""
+    
+    def __init__(self, latency=LATENCY, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def _answer(self, prompt):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.failures
+        if fail:
+            raise ConnectionError("injected failure")
+        return AIMessage(
+            content=f"  Question for {prompt}  ",
+            usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15},
+        )
+    
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        return self._answer(prompt)
+    
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+
+def test_matching_prompt_is_used_and_charged(upstream_settings):
+    upstream_settings(resilience="off")
+    speculator = QuizSpeculator()
+    llm = ScriptedLLM()
+    speculator.start("s1", "prompt 1", llm, topic="asthma")
+    
+    assert speculator.take("s1", "prompt 1") == "Question for prompt 1"
+    assert speculator.take("s1", "prompt 1") is None  # Used once
+    assert llm.calls == 1
+    assert speculator.collect_usage("s1") == [("asthma", 10, 5)]
+    stats = speculator.stats()
+    assert (stats["used"], stats["discarded"], stats["pending"]) == (1, 0, 0)
+
+
+def test_changed_prompt_and_discard_throw_the_result_away(upstream_settings):
+    upstream_settings(resilience="off")
+    speculator = QuizSpeculator()
+    llm = ScriptedLLM()
+    speculator.start("s1", "prompt 1", llm)
+    speculator.start("s2", "prompt 2", llm)
+    
+    assert speculator.take("s1", "another prompt") is None
+    speculator.discard("s2")
+    assert speculator.take("s2", "prompt 2") is None
+    
+    stats = speculator.stats()
+    assert (stats["used"], stats["discarded"], stats["pending"]) == (0, 2, 0)
+
+
+def test_call_outlasting_the_timeout_is_waited_for(upstream_settings):
+    # First attempt fails, the retry succeeds: the whole call takes longer
+    # than one LLM timeout but is still answered by the speculation
+    upstream_settings(llm_timeout=LATENCY * 3, llm_retries=1, retry_backoff=0.001)
+    speculator = QuizSpeculator()
+    llm = ScriptedLLM(latency=LATENCY * 2, failures=1)
+    speculator.start("s1", "prompt 1", llm)
+    
+    start = time.perf_counter()
+    assert speculator.take("s1", "prompt 1") == "Question for prompt 1"
+    assert time.perf_counter() - start > LATENCY * 3
+    assert llm.calls == 2
+    assert speculator.stats()["used"] == 1
+
+
+def test_failed_call_leaves_generation_to_the_consumer(upstream_settings):
+    upstream_settings(llm_timeout=LATENCY, llm_retries=0)
+    speculator = QuizSpeculator()
+    llm = ScriptedLLM(latency=LATENCY * 3)
+    speculator.start("s1", "prompt 1", llm)
+    
+    assert speculator.take("s1", "prompt 1") is None
+    assert speculator.stats()["failed"] == 1
+    assert speculator.collect_usage("s1") == []
+
+
+def test_async_take_waits_and_discard_cancels(upstream_settings):
+    upstream_settings(llm_timeout=LATENCY * 3, llm_retries=1, retry_backoff=0.001)
+    speculator = QuizSpeculator()
+    
+    async def run():
+        llm = ScriptedLLM(latency=LATENCY * 2, failures=1)
+        speculator.astart("s1", "prompt 1", llm)
+        used = await speculator.atake("s1", "prompt 1")
+        
+        slow = ScriptedLLM(latency=10)
+        speculator.astart("s2", "prompt 2", slow)
+        await asyncio.sleep(0)
+        speculator.discard("s2")
+        await asyncio.sleep(0.01)
+        return used, llm.calls
+    
+    assert asyncio.run(run()) == ("Question for prompt 1", 2)
+    stats = speculator.stats()
+    assert (stats["used"], stats["discarded"], stats["pending"]) == (1, 1, 0)
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["sync", "async"])
+def test_sessions_wait_less_for_the_quiz(fake_upstreams, no_caches, monkeypatch, use_async):
+    from workflow import create_healthbot_workflow
+    
+    latency, read_time, sessions = 0.3, 0.6, 3
+    fake_upstreams(llm_latency=latency, search_latency=0.0)
+    app = create_healthbot_workflow(async_mode=use_async)
+    
+    async def one(label, i):
+        session = HealthBotSession(app, f"spec_{label}_{i}")
+        await session.astart()
+        await session.arespond("asthma")
+        await asyncio.sleep(read_time)  # Patient reads the summary
+        start = time.perf_counter()
+        await session.arespond("ready")
+        wait = time.perf_counter() - start
+        await session.arespond("D")
+        return wait
+    
+    def wait_for_quiz(label):
+        if use_async:
+            async def run():
+                return await asyncio.gather(*(one(label, i) for i in range(sessions)))
+            waits = asyncio.run(run())
+        else:
+            waits = []
+            for i in range(sessions):
+                session = HealthBotSession(app, f"spec_{label}_{i}")
+                session.start()
+                session.respond("asthma")
+                time.sleep(read_time)
+                start = time.perf_counter()
+                session.respond("ready")
+                waits.append(time.perf_counter() - start)
+                session.respond("D")
+        return sum(waits) / len(waits)
+    
+    off = wait_for_quiz("off")
+    monkeypatch.setenv("HEALTHBOT_SPECULATIVE_QUIZ", "on")
+    monkeypatch.setattr(speculation, "_speculator", None)  # Fresh counters
+    on = wait_for_quiz("on")
+    
+    stats = speculation._speculator.stats()
+    assert on < off / 2
+    assert stats["used"] == sessions
+    assert stats["hidden_seconds"] > sessions * latency / 2
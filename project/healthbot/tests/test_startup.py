@@ -0,0 +1,42 @@
+"""
+HealthBot Cold Start Tests
+Checks, in a fresh interpreter, that importing the workflow and compiling
+the graph loads no provider modules and stays within the cold start budget.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Modules that must only load on first use
+LAZY_MODULES = ("langchain_openai", "openai", "tavily", "dotenv")
+BUDGET = 3.0  # Seconds
+
+CHILD = f"""
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {SRC_DIR!r})
+from workflow import get_workflow
+get_workflow()
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def test_cold_start_is_lazy_and_within_budget():
+    env = dict(os.environ, HEALTHBOT_SEARCH_CACHE="off", HEALTHBOT_SUMMARY_CACHE="off")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], capture_output=True, text=True, check=True, env=env
+    ).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    
+    assert report["loaded"] == []
+    assert report["seconds"] < BUDGET
@@ -0,0 +1,85 @@
+"""
+HealthBot Streaming Tests
+Checks that the summary and grading feedback streamed during sync and async
+sessions equal what the state saved (and that quiz banks and the grade line
+are not streamed), that the first token arrives well before the completion
+finishes, and that a client printing the stream is left with the rest of
+each display.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import asyncio
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+from nodes import DISPLAY_TITLES, _results_display
+from session import HealthBotSession
+from streaming import StreamTimings, HiddenTailFilter
+from utils import unstreamed_display
+
+# A hedged answer goes to the LLM grader, whose feedback is streamed
+SCRIPT = ["asthma", "ready", "I think D", "3"]
+LATENCY = 0.2
+
+
+def streamed(tokens, node):
+    return "".join(text for n, text in tokens if n == node)
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["sync", "async"])
+def test_streamed_text_matches_the_state(fake_upstreams, fake_workflow, use_async):
+    fake_upstreams(llm_latency=LATENCY)
+    app = fake_workflow(async_mode=use_async)
+    tokens, timings = [], StreamTimings()
+    session = HealthBotSession(app, "stream", on_token=lambda node, text: tokens.append((node, text)))
+    session.timings = timings
+    
+    async def run():
+        turn = await session.astart()
+        for answer in SCRIPT:
+            turn = await session.arespond(answer)
+        return turn
+    
+    if use_async:
+        turn = asyncio.run(run())
+    else:
+        turn = session.start()
+        for answer in SCRIPT:
+            turn = session.respond(answer)
+    
+    state = turn["state"]
+    assert streamed(tokens, "summarize_results") == state["summary"]
+    assert streamed(tokens, "evaluate_answer") == state["feedback"]
+    assert streamed(tokens, "generate_quiz") == ""
+    # The fake spreads its latency over the words
+    summary = timings.summary()
+    assert summary
+    for node_timings in summary.values():
+        assert node_timings["ttft_avg"] < node_timings["total_avg"] / 4
+
+
+def test_grading_stream_starts_after_the_explanation_label():
+    hidden = HiddenTailFilter()
+    hidden.begin("run", "EXPLANATION:")
+    tokens = ["GRADE: 8", "0\nEXPLAN", "ATION:", " Inhalers", " open the airways."]
+    
+    shown = "".join(hidden.feed("run", token) for token in tokens) + hidden.flush("run")
+    assert shown == "Inhalers open the airways."
+
+
+def test_streamed_display_keeps_its_grade_and_footer():
+    title = DISPLAY_TITLES["evaluate_answer"]
+    display = _results_display(80, "Inhalers open the airways.")
+    
+    rest = unstreamed_display(display, title, "Inhalers open the airways.")
+    assert "Inhalers" not in rest and title not in rest
+    assert "Grade: 80/100" in rest and rest.rstrip().endswith("=" * 80)
+    # Text that is not in the display leaves it whole
+    assert unstreamed_display(display, title, "something else") == display
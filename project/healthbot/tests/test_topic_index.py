@@ -0,0 +1,151 @@
+"""
+HealthBot Topic Index Tests
+Checks that aliases of indexed topics are answered from the index at the
+default threshold (and unrelated or near-miss topics are not), that indexed
+topics expire with their search results, and that an offline rebuild pairs
+each topic only with a summary of its current results.
+
+Usage:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import topic_index
+from cache import TieredCache, summary_tag
+from fakes import (
+    MEDICAL_CORPUS, TOPIC_ALIASES, UNRELATED_TOPICS, NEAR_MISS_TOPICS,
+    CorpusSearchClient, corpus_response,
+)
+from session import HealthBotSession
+from tools import SEARCH_CACHE_TTL, format_search_results, set_search_clients
+from topic_index import DEFAULT_TTL, TopicIndex, cached_topic_entries, index_ttl
+
+
+def corpus_index(topics=MEDICAL_CORPUS):
+    index = TopicIndex()
+    for topic in topics:
+        index.add(topic, format_search_results(corpus_response(topic)))
+    return index
+
+
+def run_sessions(app, queries, label):
+    """One session per query; returns LLM calls"""
+    calls = 0
+    for i, query in enumerate(queries):
+        session = HealthBotSession(app, f"topic_{label}_{i}")
+        session.start()
+        for reply in (query, "ready", "B", "3"):
+            session.respond(reply)
+        calls += session.usage()["calls"]
+    return calls
+
+
+def test_aliases_match_their_topic():
+    index = corpus_index()
+    
+    matches = {query: index.match(query) for query in TOPIC_ALIASES}
+    
+    wrong = {q: m["topic"] for q, m in matches.items() if m and m["topic"] != TOPIC_ALIASES[q]}
+    assert wrong == {}
+    assert sum(m is not None for m in matches.values()) >= len(TOPIC_ALIASES) // 2
+    assert [q for q in UNRELATED_TOPICS if index.match(q) is not None] == []
+
+
+def test_near_miss_topics_do_not_match():
+    for indexed, query in NEAR_MISS_TOPICS:
+        assert corpus_index([indexed]).match(query) is None, query
+
+
+def test_body_mentions_do_not_match():
+    index = TopicIndex()
+    index.add("hypertension", format_search_results({"results": [
+        {"title": "High Blood Pressure", "url": "https://example.org/htn",
+         "content": "People with diabetes or kidney disease often have high blood pressure."},
+    ]}))
+    index.set_summary("hypertension", index.get("hypertension")["search_results"],
+                      "High blood pressure is common with diabetes.")
+    
+    assert index.match("diabetes") is None
+    assert index.match("kidney disease") is None
+    assert index.match("high blood pressure")["topic"] == "hypertension"
+
+
+def test_index_saves_searches_and_summaries(fake_workflow, monkeypatch, tmp_path):
+    monkeypatch.setenv("HEALTHBOT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(topic_index, "_topic_index", None)
+    app = fake_workflow(checkpointer=MemorySaver())
+    queries = list(MEDICAL_CORPUS) + list(TOPIC_ALIASES) + UNRELATED_TOPICS
+    
+    results = {}
+    for mode in ("off", "on"):
+        monkeypatch.setenv("HEALTHBOT_TOPIC_INDEX", mode)
+        search = CorpusSearchClient()
+        set_search_clients(search, None)
+        calls = run_sessions(app, queries, mode)
+        results[mode] = (search.calls, calls)
+    
+    stats = topic_index.get_topic_index().stats()
+    assert results["on"][0] < results["off"][0]
+    assert results["on"][1] < results["off"][1]
+    assert stats["hits"] > 0
+
+
+def test_ttl_follows_the_search_cache(monkeypatch):
+    monkeypatch.delenv("HEALTHBOT_TOPIC_INDEX_TTL", raising=False)
+    monkeypatch.delenv("HEALTHBOT_SEARCH_CACHE_TTL", raising=False)
+    assert DEFAULT_TTL == SEARCH_CACHE_TTL == index_ttl()
+    monkeypatch.setenv("HEALTHBOT_SEARCH_CACHE_TTL", "3600")
+    assert index_ttl() == 3600
+    monkeypatch.setenv("HEALTHBOT_TOPIC_INDEX_TTL", "60")
+    assert index_ttl() == 60
+
+
+def test_summary_does_not_extend_an_entry(tmp_path):
+    index = TopicIndex(path=str(tmp_path / "cache.sqlite"), ttl=0.2)
+    index.add("asthma", "1. Asthma guide\n   Source: https://example.org\n   Airways...")
+    added_at = index.get("asthma")["updated_at"]
+    time.sleep(0.1)
+    index.set_summary("asthma", index.get("asthma")["search_results"], "Asthma summary")
+    
+    entry = index.get("asthma")
+    assert entry["summary"] == "Asthma summary"
+    assert entry["updated_at"] == added_at
+    time.sleep(0.1)
+    assert index.match("asthma") is None
+    
+    reopened = TopicIndex(path=str(tmp_path / "cache.sqlite"), ttl=None)
+    assert reopened.get("asthma") == entry
+
+
+def test_rebuild_pairs_summaries_with_their_own_results(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    searches = TieredCache("search_results", path=path)
+    summaries = TieredCache("summaries", path=path)
+    
+    searches.set("asthma|5", "asthma results v1", tag="asthma")
+    summaries.set("key v1", "summary of v1", tag=summary_tag("Asthma", "asthma results v1"))
+    searches.set("asthma|5", "asthma results v2", tag="asthma")  # Searched again
+    searches.set("gout|5", "gout results", tag="gout")
+    summaries.set("key gout", "summary of gout", tag=summary_tag("gout", "gout results"))
+    
+    entries = {topic: (results, summary) for topic, results, summary, _ in cached_topic_entries(path)}
+    assert entries == {
+        "asthma": ("asthma results v2", None),
+        "gout": ("gout results", "summary of gout"),
+    }
+    
+    summaries.set("key v2", "summary of v2", tag=summary_tag("asthma", "asthma results v2"))
+    entries = {topic: summary for topic, _, summary, _ in cached_topic_entries(path)}
+    assert entries["asthma"] == "summary of v2"
+    
+    # Every summary of a topic is dropped together
+    assert summaries.invalidate_tag("asthma", subtags=True) == 2
+    assert summaries.get("key gout") == "summary of gout"